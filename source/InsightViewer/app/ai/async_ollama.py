@@ -0,0 +1,126 @@
+"""
+Asyncio Ollama client for the FastAPI RAG services.
+
+One `httpx.AsyncClient` with a bounded connection pool is shared by every
+request of the service, so a worker waiting on a slow generation holds a
+coroutine rather than a thread. Calls go through an `AsyncRequestScheduler`
+(priority queue, concurrency cap, embedding singleflight) and an optional
+circuit breaker, and their timeouts follow the request deadline.
+
+Requires `httpx`; the Flask app keeps using the `requests` based providers.
+"""
+
+from __future__ import annotations
+
+import json
+from contextlib import AbstractContextManager, nullcontext
+from typing import Any, AsyncIterator
+
+import httpx
+
+from .breaker import CircuitBreaker
+from .deadline import check_deadline, request_timeout
+from .errors import ProviderRequestError, ProviderResponseError
+from .scheduler import AsyncRequestScheduler, flight_key
+
+
+class AsyncOllamaClient:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 300.0,
+        max_connections: int = 100,
+        scheduler: AsyncRequestScheduler | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.base_url = (base_url or "").rstrip("/")
+        self.timeout = float(timeout)
+        self.scheduler = scheduler or AsyncRequestScheduler()
+        self.breaker = breaker
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(request_timeout(self.timeout), connect=10.0)
+
+    def _guard(self) -> AbstractContextManager:
+        return self.breaker.guard() if self.breaker is not None else nullcontext()
+
+    async def _post(self, path: str, payload: dict[str, Any]) -> dict[str, Any]:
+        with self._guard():
+            try:
+                r = await self._client.post(path, json=payload, timeout=self._timeout())
+            except httpx.HTTPError as e:
+                check_deadline()
+                raise ProviderRequestError(f"Ollama request failed: {e}") from e
+            if r.status_code != 200:
+                raise ProviderRequestError(f"Ollama HTTP {r.status_code}: {r.text[:5000]}", status_code=r.status_code)
+        try:
+            return r.json()
+        except ValueError as e:
+            raise ProviderResponseError(f"Ollama response JSON parse failed: {e}") from e
+
+    async def embed(self, text: str, model: str) -> list[float]:
+        """Embedding of `text`; concurrent requests for the same text share one call."""
+
+        async def call() -> list[float]:
+            body = await self._post("/api/embeddings", {"model": model, "prompt": text})
+            vec = body.get("embedding")
+            if not isinstance(vec, list):
+                raise ProviderResponseError("Ollama response missing 'embedding' list")
+            return vec
+
+        return await self.scheduler.run(call, key=flight_key("embed", model, text))
+
+    async def generate(self, prompt: str, model: str, options: dict[str, Any] | None = None) -> str:
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": options or {}}
+        body = await self.scheduler.run(lambda: self._post("/api/generate", payload))
+        text = body.get("response")
+        if not isinstance(text, str):
+            raise ProviderResponseError("Ollama response missing 'response' string")
+        return text.strip()
+
+    async def generate_stream(
+        self, prompt: str, model: str, options: dict[str, Any] | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Answer pieces as Ollama produces them. The scheduler slot is held until
+        the stream ends; closing the iterator (`aclose`) drops the connection,
+        which stops the generation.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True, "options": options or {}}
+        async with self.scheduler.slot():
+            with self._guard():
+                try:
+                    async with self._client.stream(
+                        "POST", "/api/generate", json=payload, timeout=self._timeout()
+                    ) as r:
+                        if r.status_code != 200:
+                            await r.aread()
+                            raise ProviderRequestError(
+                                f"Ollama HTTP {r.status_code}: {r.text[:5000]}", status_code=r.status_code
+                            )
+                        async for line in r.aiter_lines():
+                            if not line:
+                                continue
+                            try:
+                                body = json.loads(line)
+                            except ValueError as e:
+                                raise ProviderResponseError(f"Ollama stream line parse failed: {e}") from e
+                            if body.get("error"):
+                                raise ProviderResponseError(f"Ollama stream error: {body['error']}")
+                            text = body.get("response")
+                            if isinstance(text, str) and text:
+                                yield text
+                            if body.get("done"):
+                                return
+                except httpx.HTTPError as e:
+                    check_deadline()
+                    raise ProviderRequestError(f"Ollama stream failed: {e}") from e
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
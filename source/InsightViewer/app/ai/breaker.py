@@ -0,0 +1,132 @@
+"""
+Per-provider circuit breaker.
+
+After `failure_threshold` consecutive transport or 5xx failures the breaker
+opens and calls fail immediately with `ProviderUnavailableError`. Once
+`reset_timeout` has passed a single trial call is let through (half-open):
+success closes the breaker again, failure re-opens it for another period.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from .errors import ProviderBusyError, ProviderRequestError, ProviderUnavailableError
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _trips_breaker(e: BaseException) -> bool:
+    """Transport errors and 5xx only: a 429 or Busy means the provider is up but full."""
+    if not isinstance(e, ProviderRequestError) or isinstance(e, (ProviderBusyError, ProviderUnavailableError)):
+        return False
+    return e.status_code is None or e.status_code >= 500
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = max(0.0, float(reset_timeout))
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._counters = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def before_call(self) -> None:
+        """Raise `ProviderUnavailableError` unless a call may go ahead now."""
+        with self._lock:
+            if self._state == OPEN:
+                wait = self._opened_at + self.reset_timeout - time.monotonic()
+                if wait > 0:
+                    self._counters["rejected"] += 1
+                    raise ProviderUnavailableError(
+                        f"{self.name} is unavailable (circuit open, next attempt in {wait:.0f}s)"
+                    )
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN:
+                if self._trial_running:
+                    self._counters["rejected"] += 1
+                    raise ProviderUnavailableError(f"{self.name} is unavailable (circuit half-open, probe running)")
+                self._trial_running = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._counters["opened"] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def _release_trial(self) -> None:
+        with self._lock:
+            self._trial_running = False
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Run the block as one call to the provider. Outages count as failures;
+        an answer of any other kind (including a 4xx) shows the provider is up.
+        Errors that say nothing about the provider (our own queue or deadline,
+        a closed stream) leave the state alone.
+        """
+        self.before_call()
+        try:
+            yield
+        except ProviderRequestError as e:
+            if _trips_breaker(e):
+                self.record_failure()
+            elif isinstance(e, (ProviderBusyError, ProviderUnavailableError)):
+                self._release_trial()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            self._release_trial()
+            raise
+        else:
+            self.record_success()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = dict(self._counters)
+            out["state"] = self._state
+            out["consecutive_failures"] = self._failures
+            out["failure_threshold"] = self.failure_threshold
+            out["reset_timeout"] = self.reset_timeout
+            if self._state == OPEN:
+                out["retry_in_s"] = round(max(0.0, self._opened_at + self.reset_timeout - time.monotonic()), 1)
+        return out
+
+
+def breaker_from_config(cfg, section: str, name: str) -> CircuitBreaker:
+    """
+    Read BREAKER_FAILURES (default 5) and BREAKER_RESET_SECONDS (default 30)
+    from the provider's config section.
+    """
+    return CircuitBreaker(
+        name,
+        failure_threshold=cfg.getint(section, "BREAKER_FAILURES", fallback=5),
+        reset_timeout=cfg.getfloat(section, "BREAKER_RESET_SECONDS", fallback=30.0),
+    )
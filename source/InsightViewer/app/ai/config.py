@@ -26,3 +26,13 @@ def load_config() -> configparser.ConfigParser:
     cfg.read(str(path))
     return cfg
 
+
+def resolve_data_path(path: str | None) -> Path | None:
+    """
+    Resolve a file path from the config: relative paths are taken from the
+    directory holding config.ini, empty means "no file".
+    """
+    path = (path or "").strip()
+    if not path:
+        return None
+    return Path(os.getenv("BASE_DIR") or project_root()) / path
@@ -0,0 +1,79 @@
+"""
+Request deadlines.
+
+A route sets a time budget once (`with deadline(20):` or `@with_deadline(20)`)
+and every provider, scheduler and Neo4j call made inside it clips its own
+timeout to what is left, so a slow dependency cannot hold the worker longer
+than the request allows. Nested deadlines can only shorten the budget.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, TypeVar
+
+from .errors import DeadlineExceeded
+
+
+T = TypeVar("T")
+
+_deadline: ContextVar[float | None] = ContextVar("ai_request_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    at = time.monotonic() + max(0.0, float(seconds))
+    outer = _deadline.get()
+    if outer is not None:
+        at = min(at, outer)
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def with_deadline(seconds: float) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator form of `deadline` for route functions (plain or `async def`)."""
+
+    def wrap(fn: Callable[..., T]) -> Callable[..., T]:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def inner_async(*args, **kwargs):
+                with deadline(seconds):
+                    return await fn(*args, **kwargs)
+
+            return inner_async
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs) -> T:
+            with deadline(seconds):
+                return fn(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+
+def remaining() -> float | None:
+    """Seconds left in the current deadline, or None when there is none."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check_deadline() -> None:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def request_timeout(default: float) -> float:
+    """`default` clipped to the time left; raises once the deadline has passed."""
+    check_deadline()
+    left = remaining()
+    return default if left is None else min(float(default), left)
@@ -0,0 +1,206 @@
+"""
+Content-addressed embedding cache.
+
+Vectors are keyed by (provider, model, dimensions, normalized text) and kept
+in a small in-process LRU in front of a SQLite file. The file is shared by the
+Flask app, the ingestion scripts and the RAG services, so text embedded once
+by any of them is not sent to the provider again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable
+
+from .config import load_config, resolve_data_path
+from .types import EmbedBatchItem, EmbedBatchRequest, EmbedBatchResponse, EmbedRequest
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def cache_key(provider: str, model: str, text: str, dimensions: int | None = None) -> str:
+    raw = "\0".join([provider, model, str(dimensions or 0), normalize_text(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache: an LRU of `memory_items` vectors in front of an optional
+    SQLite file (`path=None` keeps it in memory only). Vectors are stored as
+    float32. Safe to share between threads; the file can be shared between
+    processes (WAL mode).
+    """
+
+    def __init__(self, path: str | os.PathLike | None = None, memory_items: int = 10000):
+        self.path = Path(path) if path else None
+        self.memory_items = max(0, int(memory_items))
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vec BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, vec: list[float]) -> None:
+        if not self.memory_items:
+            return
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> list[float] | None:
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return vec
+            if self._conn is not None:
+                row = self._conn.execute("SELECT vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vec = array("f", row[0]).tolist()
+                    self._remember(key, vec)
+                    self._counters["disk_hits"] += 1
+                    return vec
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, vec: list[float]) -> None:
+        with self._lock:
+            self._remember(key, vec)
+            self._counters["writes"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vec, created_at) VALUES (?, ?, ?, ?)",
+                    (key, len(vec), array("f", vec).tobytes(), time.time()),
+                )
+                self._conn.commit()
+
+    def get_or_compute(
+        self,
+        provider: str,
+        model: str,
+        text: str,
+        compute: Callable[[str], list[float]],
+        dimensions: int | None = None,
+    ) -> list[float]:
+        key = cache_key(provider, model, text, dimensions)
+        vec = self.get(key)
+        if vec is None:
+            vec = [float(x) for x in compute(text)]
+            self.put(key, vec)
+        return vec
+
+    async def get_or_compute_async(
+        self,
+        provider: str,
+        model: str,
+        text: str,
+        compute: Callable[[str], Awaitable[list[float]]],
+        dimensions: int | None = None,
+    ) -> list[float]:
+        """`get_or_compute` for coroutine `compute` functions (the asyncio services)."""
+        key = cache_key(provider, model, text, dimensions)
+        vec = self.get(key)
+        if vec is None:
+            vec = [float(x) for x in await compute(text)]
+            self.put(key, vec)
+        return vec
+
+    def stats(self) -> dict[str, int | str | None]:
+        with self._lock:
+            out: dict[str, int | str | None] = dict(self._counters)
+            out["memory_items"] = len(self._memory)
+        lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+        out["saved_calls"] = out["memory_hits"] + out["disk_hits"]
+        out["hit_rate_pct"] = round(100.0 * out["saved_calls"] / lookups, 1) if lookups else 0
+        out["path"] = str(self.path) if self.path else None
+        return out
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+
+def embed_text(provider, text: str, model: str, cache: EmbeddingCache | None = None) -> list[float]:
+    """`provider.embed` through the cache (the shared one unless given)."""
+    cache = cache or get_embedding_cache()
+    return cache.get_or_compute(
+        provider.id,
+        model,
+        text,
+        lambda t: provider.embed(EmbedRequest(text=t, model=model)).embedding,
+    )
+
+
+def embed_texts(
+    provider,
+    texts: Iterable[str],
+    model: str,
+    cache: EmbeddingCache | None = None,
+    **batch_limits,
+) -> EmbedBatchResponse:
+    """`provider.embed_batch` for the cache misses only; items keep input order."""
+    cache = cache or get_embedding_cache()
+    texts = list(texts)
+    keys = [cache_key(provider.id, model, t) for t in texts]
+    items: list[EmbedBatchItem | None] = []
+    missing: list[int] = []
+    for i, key in enumerate(keys):
+        vec = cache.get(key)
+        items.append(EmbedBatchItem(index=i, embedding=vec) if vec is not None else None)
+        if vec is None:
+            missing.append(i)
+
+    if missing:
+        fetched = provider.embed_batch(
+            EmbedBatchRequest(texts=[texts[i] for i in missing], model=model),
+            **batch_limits,
+        )
+        for i, item in zip(missing, fetched.items):
+            if item.error is None:
+                cache.put(keys[i], item.embedding)
+            items[i] = EmbedBatchItem(index=i, embedding=item.embedding, error=item.error)
+
+    return EmbedBatchResponse(items=items)
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Process-wide cache configured from the optional [EMBED_CACHE] section:
+    PATH (default cache/embeddings.sqlite; relative paths are taken from the
+    directory holding config.ini, empty keeps it in memory only) and
+    MEMORY_ITEMS.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cfg = load_config()
+                _cache = EmbeddingCache(
+                    path=resolve_data_path(cfg.get("EMBED_CACHE", "PATH", fallback="cache/embeddings.sqlite")),
+                    memory_items=cfg.getint("EMBED_CACHE", "MEMORY_ITEMS", fallback=10000),
+                )
+    return _cache
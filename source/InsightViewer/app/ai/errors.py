@@ -10,9 +10,43 @@ class ProviderConfigError(AIError):
 
 
 class ProviderRequestError(AIError):
-    pass
+    def __init__(self, message: str, status_code: int | None = None, retry_after: str | None = None):
+        super().__init__(message)
+        # Upstream HTTP status, when the provider answered with an error.
+        self.status_code = status_code
+        self.retry_after = retry_after
 
 
 class ProviderResponseError(AIError):
     pass
 
+
+class ProviderBusyError(ProviderRequestError):
+    """No backend slot became free within the queue timeout."""
+
+    def __init__(self, message: str):
+        super().__init__(message, status_code=503)
+
+
+class ProviderUnavailableError(ProviderRequestError):
+    """The provider's circuit breaker is open; the call was not attempted."""
+
+    def __init__(self, message: str):
+        super().__init__(message, status_code=503)
+
+
+class DeadlineExceeded(AIError):
+    """The request's time budget ran out before the call could finish."""
+
+
+def is_outage(e: BaseException) -> bool:
+    """
+    True for failures of the provider rather than of the input: open circuit,
+    busy queue, exhausted deadline, transport errors, 429 and 5xx. Batch
+    callers retry or stop on these instead of failing single items.
+    """
+    if isinstance(e, (ProviderUnavailableError, ProviderBusyError, DeadlineExceeded)):
+        return True
+    if isinstance(e, ProviderRequestError):
+        return e.status_code is None or e.status_code == 429 or e.status_code >= 500
+    return False
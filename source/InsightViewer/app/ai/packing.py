@@ -0,0 +1,173 @@
+"""
+Token-budgeted packing of retrieved chunks into a prompt.
+
+Chunks are picked by maximal marginal relevance (MMR): each step takes the
+chunk with the best trade-off between its own relevance and its similarity to
+what is already picked, so overlapping windows of the same paragraph do not
+crowd out other evidence. Chunks that are (almost) contained in a picked one
+are dropped outright. Picking stops when the token budget is used; the picked
+chunks are then grouped by the node that owns them.
+
+Similarity is word-shingle overlap, which needs no extra model calls.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from .providers.base import estimate_tokens
+
+
+# Context windows by model-name prefix; the first matching prefix wins.
+# Ollama models are listed at the num_ctx the services run them with.
+CONTEXT_WINDOWS: tuple[tuple[str, int], ...] = (
+    ("gpt-4.1", 1_000_000),
+    ("gpt-4o", 128_000),
+    ("gpt-5", 400_000),
+    ("o1", 200_000),
+    ("o3", 200_000),
+    ("o4", 200_000),
+)
+DEFAULT_CONTEXT_WINDOW = 8192
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def context_window(model: str) -> int:
+    name = (model or "").strip().lower()
+    for prefix, size in CONTEXT_WINDOWS:
+        if name.startswith(prefix):
+            return size
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def evidence_budget(model: str, prompt_text: str, max_tokens: int, cap: int | None = None) -> int:
+    """
+    Tokens left for evidence once the rest of the prompt (`prompt_text`) and
+    the answer (`max_tokens`) are reserved, optionally capped at `cap`.
+    """
+    left = context_window(model) - estimate_tokens(prompt_text) - int(max_tokens)
+    if cap is not None:
+        left = min(left, int(cap))
+    return max(0, left)
+
+
+def shingles(text: str, k: int = 5) -> frozenset[int]:
+    words = _WORD.findall((text or "").lower())
+    if len(words) <= k:
+        return frozenset([hash(tuple(words))]) if words else frozenset()
+    return frozenset(hash(tuple(words[i:i + k])) for i in range(len(words) - k + 1))
+
+
+def jaccard(a: frozenset[int], b: frozenset[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def containment(a: frozenset[int], b: frozenset[int]) -> float:
+    """Share of the smaller set found in the larger one."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max(0, int(max_tokens)) * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + " ..."
+
+
+@dataclass
+class PackedContext:
+    chunks: list[dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+    budget: int = 0
+    candidates: int = 0
+    dropped_duplicates: int = 0
+    dropped_budget: int = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "budget_tokens": self.budget,
+            "used_tokens": self.tokens,
+            "candidates": self.candidates,
+            "packed": len(self.chunks),
+            "dropped_duplicates": self.dropped_duplicates,
+            "dropped_budget": self.dropped_budget,
+        }
+
+
+def _relevance(chunks: list[dict[str, Any]], score_key: str) -> list[float]:
+    scores = [c.get(score_key) for c in chunks]
+    if all(isinstance(s, (int, float)) for s in scores) and scores:
+        top = max(scores) or 1.0
+        return [float(s) / top for s in scores]
+    # No scores (graph traversal): nearer chunks first, then retrieval order.
+    return [1.0 / (1 + float(c.get("distance") or 0)) - i * 1e-6 for i, c in enumerate(chunks)]
+
+
+def pack_chunks(
+    chunks: list[dict[str, Any]],
+    budget_tokens: int,
+    *,
+    text_key: str = "text",
+    score_key: str = "score",
+    owner_key: str = "owner_id_rc",
+    max_chunk_tokens: int = 350,
+    mmr_lambda: float = 0.7,
+    duplicate_threshold: float = 0.8,
+) -> PackedContext:
+    """
+    Pick chunks for the prompt. Returned chunks are copies with `text_key`
+    truncated to `max_chunk_tokens`, a `tokens` estimate and their MMR `rank`,
+    ordered by owner group (groups by their best rank, chunks within a group
+    in input order).
+    """
+    result = PackedContext(budget=max(0, int(budget_tokens)))
+    items = []
+    for i, ch in enumerate(chunks):
+        text = str(ch.get(text_key) or "").strip()
+        if not text:
+            continue
+        text = truncate_to_tokens(text, max_chunk_tokens)
+        items.append({"index": i, "chunk": ch, "text": text, "tokens": estimate_tokens(text), "shingles": shingles(text)})
+    result.candidates = len(items)
+
+    relevance = _relevance([it["chunk"] for it in items], score_key)
+    picked: list[dict[str, Any]] = []
+    remaining = list(range(len(items)))
+    while remaining:
+        best, best_score = None, None
+        for j in list(remaining):
+            it = items[j]
+            overlap = max((containment(it["shingles"], p["shingles"]) for p in picked), default=0.0)
+            if overlap >= duplicate_threshold:
+                remaining.remove(j)
+                result.dropped_duplicates += 1
+                continue
+            if result.tokens + it["tokens"] > result.budget:
+                continue
+            redundancy = max((jaccard(it["shingles"], p["shingles"]) for p in picked), default=0.0)
+            score = mmr_lambda * relevance[j] - (1 - mmr_lambda) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = j, score
+        if best is None:
+            break
+        remaining.remove(best)
+        items[best]["rank"] = len(picked)
+        picked.append(items[best])
+        result.tokens += items[best]["tokens"]
+    result.dropped_budget = len(remaining)
+
+    groups: dict[Any, list[dict[str, Any]]] = {}
+    for it in picked:
+        owner = it["chunk"].get(owner_key) or f"chunk-{it['index']}"
+        groups.setdefault(owner, []).append(it)
+    for members in sorted(groups.values(), key=lambda g: min(it["rank"] for it in g)):
+        for it in sorted(members, key=lambda it: it["index"]):
+            result.chunks.append({**it["chunk"], text_key: it["text"], "tokens": it["tokens"], "rank": it["rank"]})
+    return result
@@ -1,6 +1,6 @@
-from .base import AIProvider
+from .base import AIProvider, pooled_session
 from .ollama_provider import OllamaProvider
 from .openai_provider import OpenAIProvider
 
-__all__ = ["AIProvider", "OpenAIProvider", "OllamaProvider"]
+__all__ = ["AIProvider", "OpenAIProvider", "OllamaProvider", "pooled_session"]
 
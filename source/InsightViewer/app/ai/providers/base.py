@@ -1,17 +1,148 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager, nullcontext
+from typing import Iterator
 
-from ..types import ChatRequest, ChatResponse, EmbedRequest, EmbedResponse, ProviderId
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..breaker import CircuitBreaker
+from ..errors import AIError, is_outage
+from ..types import (
+    ChatRequest,
+    ChatResponse,
+    EmbedBatchItem,
+    EmbedBatchRequest,
+    EmbedBatchResponse,
+    EmbedRequest,
+    EmbedResponse,
+    ProviderId,
+)
+
+
+def pooled_session(pool_size: int = 10) -> requests.Session:
+    """HTTP session with a keep-alive pool, shared by every call of one provider."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, int(pool_size)))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough 4-chars-per-token estimate; only used to size batches.
+    return len(text) // 4 + 1
+
+
+def split_batches(texts: list[str], max_items: int, max_tokens: int) -> list[list[int]]:
+    """
+    Group text indexes into batches of at most `max_items` texts and
+    `max_tokens` estimated tokens. A text over the token budget gets a batch
+    of its own rather than being dropped.
+    """
+    max_items = max(1, int(max_items))
+    batches: list[list[int]] = []
+    current: list[int] = []
+    tokens = 0
+    for i, text in enumerate(texts):
+        t = estimate_tokens(text)
+        if current and (len(current) >= max_items or tokens + t > max_tokens):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(i)
+        tokens += t
+    if current:
+        batches.append(current)
+    return batches
 
 
 class AIProvider(ABC):
     id: ProviderId
 
+    # Defaults for embed_batch; providers override them from config.
+    embed_batch_size: int = 32
+    embed_batch_tokens: int = 8000
+
+    # Set by the registry; without one, calls are never failed fast.
+    breaker: CircuitBreaker | None = None
+
+    def _guard(self) -> AbstractContextManager:
+        """Context for one call to the provider, tracked by the breaker if any."""
+        return self.breaker.guard() if self.breaker is not None else nullcontext()
+
+    @property
+    def native_batch(self) -> bool:
+        """True when `_embed_many` sends one request for the whole list."""
+        return False
+
     @abstractmethod
     def chat(self, req: ChatRequest) -> ChatResponse:
         raise NotImplementedError
 
+    def chat_stream(self, req: ChatRequest) -> Iterator[str]:
+        """
+        Yield the answer in pieces as the model produces them. Closing the
+        iterator early closes the upstream connection, which stops generation.
+        Providers without streaming yield the whole answer once.
+        """
+        yield self.chat(req).text
+
     def embed(self, req: EmbedRequest) -> EmbedResponse:
         raise NotImplementedError("Embeddings not supported by this provider")
 
+    def _embed_many(self, texts: list[str], model: str) -> list[list[float]]:
+        """One request for several texts; providers with a list API override this."""
+        return [self.embed(EmbedRequest(text=text, model=model)).embedding for text in texts]
+
+    def embed_batch(
+        self,
+        req: EmbedBatchRequest,
+        *,
+        max_batch_size: int | None = None,
+        max_batch_tokens: int | None = None,
+    ) -> EmbedBatchResponse:
+        """
+        Embed many texts with as few requests as the batch limits allow.
+
+        A failing batch is split in half and retried, so one oversize or bad
+        text only fails its own item. Items come back in input order, each
+        with either `embedding` or `error` set. Outages (`is_outage`) are
+        raised instead: they say nothing about the texts.
+        """
+        texts = list(req.texts)
+        if not self.native_batch:
+            return EmbedBatchResponse(items=[self._embed_item(i, text, req.model) for i, text in enumerate(texts)])
+
+        results: dict[int, EmbedBatchItem] = {}
+        pending = split_batches(
+            texts,
+            max_batch_size or self.embed_batch_size,
+            max_batch_tokens or self.embed_batch_tokens,
+        )
+        while pending:
+            batch = pending.pop(0)
+            try:
+                vectors = self._embed_many([texts[i] for i in batch], req.model)
+                if len(vectors) != len(batch):
+                    raise AIError(f"expected {len(batch)} embeddings, got {len(vectors)}")
+            except AIError as e:
+                if is_outage(e):
+                    raise
+                if len(batch) > 1:
+                    mid = len(batch) // 2
+                    pending[:0] = [batch[:mid], batch[mid:]]
+                else:
+                    results[batch[0]] = EmbedBatchItem(index=batch[0], error=str(e))
+                continue
+            for i, vec in zip(batch, vectors):
+                results[i] = EmbedBatchItem(index=i, embedding=vec)
+        return EmbedBatchResponse(items=[results[i] for i in range(len(texts))])
+
+    def _embed_item(self, index: int, text: str, model: str) -> EmbedBatchItem:
+        try:
+            return EmbedBatchItem(index=index, embedding=self.embed(EmbedRequest(text=text, model=model)).embedding)
+        except AIError as e:
+            if is_outage(e):
+                raise
+            return EmbedBatchItem(index=index, error=str(e))
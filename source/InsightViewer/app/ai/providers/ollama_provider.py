@@ -1,12 +1,43 @@
 from __future__ import annotations
 
-from typing import Any
+import json
+from typing import Any, Iterator
 
 import requests
 
+from ..breaker import CircuitBreaker
+from ..deadline import check_deadline, request_timeout
 from ..errors import ProviderConfigError, ProviderRequestError, ProviderResponseError
+from ..scheduler import RequestScheduler, flight_key
 from ..types import ChatRequest, ChatResponse, EmbedRequest, EmbedResponse
-from .base import AIProvider
+from .base import AIProvider, pooled_session
+
+
+# Endpoint/payload-key combinations used by different Ollama versions/clients.
+EMBED_ROUTES: tuple[tuple[str, str], ...] = tuple(
+    (ep, key)
+    for ep in ("/api/embeddings", "/api/embed", "/api/embeds")
+    for key in ("prompt", "input", "text")
+)
+
+
+def _extract_embedding(body: Any) -> list | None:
+    if not isinstance(body, dict):
+        return None
+    if isinstance(body.get("embedding"), list):
+        return body["embedding"]
+    if isinstance(body.get("embeddings"), list) and body["embeddings"]:
+        first = body["embeddings"][0]
+        if isinstance(first, dict) and isinstance(first.get("embedding"), list):
+            return first["embedding"]
+        if isinstance(first, list):
+            return first
+        return None
+    if isinstance(body.get("data"), list) and body["data"]:
+        d0 = body["data"][0]
+        if isinstance(d0, dict) and isinstance(d0.get("embedding"), list):
+            return d0["embedding"]
+    return None
 
 
 class OllamaProvider(AIProvider):
@@ -18,6 +49,11 @@ class OllamaProvider(AIProvider):
         auth_token: str | None = None,
         timeout: int = 60,
         think: bool | None = None,
+        session: requests.Session | None = None,
+        embed_batch_size: int = 32,
+        embed_batch_tokens: int = 8000,
+        scheduler: RequestScheduler | None = None,
+        breaker: CircuitBreaker | None = None,
     ):
         self._base_url = (base_url or "").rstrip("/")
         self._auth = auth_token
@@ -25,6 +61,22 @@ class OllamaProvider(AIProvider):
         self._think = think
         if not self._base_url:
             raise ProviderConfigError("OLLAMA.BASE not configured")
+        self._session = session or pooled_session()
+        # (endpoint, payload key) that last returned an embedding; probed on
+        # first use and again only after it stops working.
+        self._embed_route: tuple[str, str] | None = None
+        # Whether /api/embed accepts a list input (Ollama >= 0.3); None until tried.
+        self._batch_supported: bool | None = None
+        self.embed_batch_size = max(1, int(embed_batch_size))
+        self.embed_batch_tokens = max(1, int(embed_batch_tokens))
+        # Every request to the server takes a slot here, so batch embedding
+        # cannot starve interactive chat and duplicate requests are sent once.
+        self.scheduler = scheduler or RequestScheduler()
+        self.breaker = breaker
+
+    @property
+    def embed_route(self) -> tuple[str, str] | None:
+        return self._embed_route
 
     def _headers(self) -> dict[str, str]:
         headers: dict[str, str] = {"Content-Type": "application/json"}
@@ -32,13 +84,13 @@ class OllamaProvider(AIProvider):
             headers["Authorization"] = f"Bearer {self._auth}"
         return headers
 
-    def chat(self, req: ChatRequest) -> ChatResponse:
+    def _generate(self, req: ChatRequest, stream: bool) -> requests.Response:
         # Using /api/generate for compatibility with existing codebase scripts.
         url = f"{self._base_url}/api/generate"
         payload: dict[str, Any] = {
             "model": req.model,
             "prompt": f"{req.system}\n\n{req.user}".strip(),
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": float(req.temperature),
             },
@@ -46,20 +98,35 @@ class OllamaProvider(AIProvider):
         if self._think is not None:
             payload["think"] = self._think
         try:
-            r = requests.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
+            r = self._session.post(url, json=payload, headers=self._headers(), timeout=request_timeout(self._timeout), stream=stream)
         except requests.RequestException as e:
+            check_deadline()
             raise ProviderRequestError(f"Ollama request failed: {e}") from e
 
         # If model doesn't support thinking, retry without the think flag.
         if r.status_code == 400 and "does not support thinking" in r.text and "think" in payload:
+            r.close()
             payload.pop("think")
             try:
-                r = requests.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
+                r = self._session.post(url, json=payload, headers=self._headers(), timeout=request_timeout(self._timeout), stream=stream)
             except requests.RequestException as e:
+                check_deadline()
                 raise ProviderRequestError(f"Ollama request failed: {e}") from e
+        return r
+
+    def chat(self, req: ChatRequest) -> ChatResponse:
+        # Sampled answers differ per call, so only deterministic ones are coalesced.
+        key = None
+        if float(req.temperature) == 0.0:
+            key = flight_key("chat", req.model, req.system, req.user, req.max_tokens)
+        with self._guard():
+            return self.scheduler.run(lambda: self._chat(req), key=key)
+
+    def _chat(self, req: ChatRequest) -> ChatResponse:
+        r = self._generate(req, stream=False)
 
         if not r.ok:
-            raise ProviderRequestError(f"Ollama HTTP {r.status_code}: {r.text[:5000]}")
+            raise ProviderRequestError(f"Ollama HTTP {r.status_code}: {r.text[:5000]}", status_code=r.status_code)
 
         try:
             body = r.json()
@@ -73,52 +140,122 @@ class OllamaProvider(AIProvider):
 
         return ChatResponse(text=text, raw=body)
 
+    def chat_stream(self, req: ChatRequest) -> Iterator[str]:
+        # The slot is held until the stream ends or the caller closes it.
+        with self._guard(), self.scheduler.slot():
+            yield from self._chat_stream(req)
+
+    def _chat_stream(self, req: ChatRequest) -> Iterator[str]:
+        r = self._generate(req, stream=True)
+        # Ollama stops generating when the connection drops, which happens on
+        # leaving this block (including when the caller closes the iterator).
+        with r:
+            if not r.ok:
+                raise ProviderRequestError(f"Ollama HTTP {r.status_code}: {r.text[:5000]}", status_code=r.status_code)
+            try:
+                for line in r.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    try:
+                        body = json.loads(line)
+                    except ValueError as e:
+                        raise ProviderResponseError(f"Ollama stream line parse failed: {e}") from e
+                    if body.get("error"):
+                        raise ProviderResponseError(f"Ollama stream error: {body['error']}")
+                    text = body.get("response")
+                    if isinstance(text, str) and text:
+                        yield text
+                    if body.get("done"):
+                        return
+            except requests.RequestException as e:
+                raise ProviderRequestError(f"Ollama stream interrupted: {e}") from e
+
+    def _try_embed(self, route: tuple[str, str], req: EmbedRequest) -> tuple[EmbedResponse | None, str | None, int | None]:
+        ep, key = route
+        payload = {"model": req.model, key: req.text}
+        try:
+            r = self._session.post(f"{self._base_url}{ep}", json=payload, headers=self._headers(), timeout=request_timeout(self._timeout))
+        except requests.RequestException as e:
+            # The server is not answering at all; other routes will not help.
+            check_deadline()
+            raise ProviderRequestError(f"Ollama request failed: {e}") from e
+
+        if not r.ok:
+            return None, f"{r.status_code} {r.text}", r.status_code
+
+        try:
+            body = r.json()
+        except Exception as e:
+            return None, str(e), r.status_code
+
+        emb = _extract_embedding(body)
+        if isinstance(emb, list) and emb and all(isinstance(x, (int, float)) for x in emb[:10]):
+            return EmbedResponse(embedding=[float(x) for x in emb], raw=body), None, r.status_code
+        return None, f"{ep}: no embedding in response", r.status_code
+
     def embed(self, req: EmbedRequest) -> EmbedResponse:
-        # Try common endpoints/param shapes used by different Ollama versions/clients.
-        endpoints = ["/api/embeddings", "/api/embed", "/api/embeds"]
-        payloads = [
-            {"model": req.model, "prompt": req.text},
-            {"model": req.model, "input": req.text},
-            {"model": req.model, "text": req.text},
-        ]
+        with self._guard():
+            return self.scheduler.run(lambda: self._embed(req), key=flight_key("embed", req.model, req.text))
 
+    def _embed(self, req: EmbedRequest) -> EmbedResponse:
+        known = self._embed_route
         last_err: str | None = None
-        for ep in endpoints:
-            url = f"{self._base_url}{ep}"
-            for payload in payloads:
-                try:
-                    r = requests.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
-                except requests.RequestException as e:
-                    last_err = str(e)
-                    continue
-
-                if not r.ok:
-                    last_err = f"{r.status_code} {r.text}"
-                    continue
-
-                try:
-                    body = r.json()
-                except Exception as e:
-                    last_err = str(e)
-                    continue
-
-                emb = None
-                if isinstance(body, dict):
-                    if isinstance(body.get("embedding"), list):
-                        emb = body["embedding"]
-                    elif isinstance(body.get("embeddings"), list) and body["embeddings"]:
-                        first = body["embeddings"][0]
-                        if isinstance(first, dict) and isinstance(first.get("embedding"), list):
-                            emb = first["embedding"]
-                        elif isinstance(first, list):
-                            emb = first
-                    elif isinstance(body.get("data"), list) and body["data"]:
-                        d0 = body["data"][0]
-                        if isinstance(d0, dict) and isinstance(d0.get("embedding"), list):
-                            emb = d0["embedding"]
-
-                if isinstance(emb, list) and emb and all(isinstance(x, (int, float)) for x in emb[:10]):
-                    return EmbedResponse(embedding=[float(x) for x in emb], raw=body)
-
-        raise ProviderRequestError(f"Failed to obtain embedding from Ollama. Last error: {last_err}")
+        last_status: int | None = None
+        if known is not None:
+            resp, last_err, last_status = self._try_embed(known, req)
+            if resp is not None:
+                return resp
+            self._embed_route = None
+
+        for route in EMBED_ROUTES:
+            if route == known:
+                continue
+            resp, err, status = self._try_embed(route, req)
+            if resp is not None:
+                self._embed_route = route
+                return resp
+            last_err, last_status = err, status
+
+        raise ProviderRequestError(
+            f"Failed to obtain embedding from Ollama. Last error: {last_err}",
+            status_code=last_status,
+        )
+
+    @property
+    def native_batch(self) -> bool:
+        return self._batch_supported is not False
+
+    def _embed_many(self, texts: list[str], model: str) -> list[list[float]]:
+        with self._guard():
+            return self.scheduler.run(lambda: self._embed_list(texts, model), key=flight_key("embed_many", model, texts))
+
+    def _embed_each(self, texts: list[str], model: str) -> list[list[float]]:
+        # Already inside a slot: call the endpoint directly, not through embed().
+        return [self._embed(EmbedRequest(text=text, model=model)).embedding for text in texts]
+
+    def _embed_list(self, texts: list[str], model: str) -> list[list[float]]:
+        if self._batch_supported is False or len(texts) == 1:
+            return self._embed_each(texts, model)
 
+        url = f"{self._base_url}/api/embed"
+        payload = {"model": model, "input": texts}
+        try:
+            r = self._session.post(url, json=payload, headers=self._headers(), timeout=request_timeout(self._timeout))
+        except requests.RequestException as e:
+            check_deadline()
+            raise ProviderRequestError(f"Ollama request failed: {e}") from e
+
+        if r.status_code in (404, 405):
+            # Older server without the list endpoint: embed one by one from now on.
+            self._batch_supported = False
+            return self._embed_each(texts, model)
+        if not r.ok:
+            raise ProviderRequestError(f"Ollama HTTP {r.status_code}: {r.text[:5000]}", status_code=r.status_code)
+
+        try:
+            body = r.json()
+            vectors = [[float(x) for x in v] for v in body["embeddings"]]
+        except Exception as e:
+            raise ProviderResponseError(f"Ollama batch embedding response unexpected: {e}") from e
+        self._batch_supported = True
+        return vectors
@@ -1,23 +1,38 @@
 from __future__ import annotations
 
+import json
 import os
-from typing import Any
+from typing import Any, Iterator
 
 import requests
 
+from ..breaker import CircuitBreaker
+from ..deadline import check_deadline, request_timeout
 from ..errors import ProviderConfigError, ProviderRequestError, ProviderResponseError
 from ..types import ChatRequest, ChatResponse, EmbedRequest, EmbedResponse
-from .base import AIProvider
+from .base import AIProvider, pooled_session
 
 
 class OpenAIProvider(AIProvider):
     id = "openai"
 
-    def __init__(self, api_key: str | None = None, base_url: str = "https://api.openai.com"):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str = "https://api.openai.com",
+        session: requests.Session | None = None,
+        embed_batch_size: int = 128,
+        embed_batch_tokens: int = 100000,
+        breaker: CircuitBreaker | None = None,
+    ):
         self._api_key = api_key or os.environ.get("OPENAI_API_KEY")
         self._base_url = base_url.rstrip("/")
         if not self._api_key:
             raise ProviderConfigError("OPENAI_API_KEY not set in environment")
+        self._session = session or pooled_session()
+        self.embed_batch_size = max(1, int(embed_batch_size))
+        self.embed_batch_tokens = max(1, int(embed_batch_tokens))
+        self.breaker = breaker
 
     # Models that require max_completion_tokens instead of max_tokens
     _MAX_COMPLETION_TOKENS_MODELS = ("o1", "o3", "o4", "gpt-5")
@@ -29,8 +44,7 @@ class OpenAIProvider(AIProvider):
     # Use a much higher limit so there are tokens left for the actual response.
     _REASONING_MIN_TOKENS = 16000
 
-    def chat(self, req: ChatRequest) -> ChatResponse:
-        url = f"{self._base_url}/v1/chat/completions"
+    def _chat_payload(self, req: ChatRequest) -> tuple[dict[str, Any], int]:
         use_new_params = self._uses_max_completion_tokens(req.model)
         tokens_key = "max_completion_tokens" if use_new_params else "max_tokens"
         token_limit = int(req.max_tokens)
@@ -38,27 +52,36 @@ class OpenAIProvider(AIProvider):
             token_limit = self._REASONING_MIN_TOKENS
         payload: dict[str, Any] = {
             "model": req.model,
-            "messages": [
-                {"role": "system", "content": req.system},
-                {"role": "user", "content": req.user},
-            ],
+            "messages": (
+                [{"role": "system", "content": req.system}] if req.system else []
+            ) + [{"role": "user", "content": req.user}],
             tokens_key: token_limit,
         }
         if not use_new_params:
             payload["temperature"] = float(req.temperature)
-        headers = {
+        timeout = 180 if use_new_params else 45
+        return payload, timeout
+
+    def _headers(self) -> dict[str, str]:
+        return {
             "Authorization": f"Bearer {self._api_key}",
             "Content-Type": "application/json",
         }
-        timeout = 180 if use_new_params else 45
-        try:
-            r = requests.post(url, json=payload, headers=headers, timeout=timeout)
-        except requests.RequestException as e:
-            raise ProviderRequestError(f"OpenAI request failed: {e}") from e
 
-        # Keep error messages secret-safe (no key), include status code and response text.
-        if not r.ok:
-            raise ProviderRequestError(f"OpenAI HTTP {r.status_code}: {r.text[:5000]}")
+    def chat(self, req: ChatRequest) -> ChatResponse:
+        url = f"{self._base_url}/v1/chat/completions"
+        payload, timeout = self._chat_payload(req)
+        headers = self._headers()
+        with self._guard():
+            try:
+                r = self._session.post(url, json=payload, headers=headers, timeout=request_timeout(timeout))
+            except requests.RequestException as e:
+                check_deadline()
+                raise ProviderRequestError(f"OpenAI request failed: {e}") from e
+
+            # Keep error messages secret-safe (no key), include status code and response text.
+            if not r.ok:
+                raise ProviderRequestError(f"OpenAI HTTP {r.status_code}: {r.text[:5000]}", status_code=r.status_code, retry_after=r.headers.get("Retry-After"))
 
         try:
             body = r.json()
@@ -78,29 +101,66 @@ class OpenAIProvider(AIProvider):
 
         return ChatResponse(text=content, raw=body)
 
-    def embed(self, req: EmbedRequest) -> EmbedResponse:
+    def chat_stream(self, req: ChatRequest) -> Iterator[str]:
+        url = f"{self._base_url}/v1/chat/completions"
+        payload, timeout = self._chat_payload(req)
+        payload["stream"] = True
+        with self._guard():
+            try:
+                r = self._session.post(url, json=payload, headers=self._headers(), timeout=request_timeout(timeout), stream=True)
+            except requests.RequestException as e:
+                check_deadline()
+                raise ProviderRequestError(f"OpenAI request failed: {e}") from e
+            if not r.ok:
+                with r:
+                    raise ProviderRequestError(f"OpenAI HTTP {r.status_code}: {r.text[:5000]}", status_code=r.status_code)
+
+        # Leaving the with-block (done, error or the caller closing us) drops
+        # the connection, and OpenAI stops generating.
+        with r:
+            try:
+                for line in r.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    try:
+                        choices = json.loads(data).get("choices") or []
+                    except (ValueError, AttributeError) as e:
+                        raise ProviderResponseError(f"OpenAI stream chunk unexpected: {e}. Chunk: {data[:500]}") from e
+                    if not choices:
+                        continue
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if isinstance(text, str) and text:
+                        yield text
+            except requests.RequestException as e:
+                raise ProviderRequestError(f"OpenAI stream interrupted: {e}") from e
+
+    def _post_embeddings(self, model: str, text_input: str | list[str]) -> dict[str, Any]:
         url = f"{self._base_url}/v1/embeddings"
         payload: dict[str, Any] = {
-            "model": req.model,
-            "input": req.text,
+            "model": model,
+            "input": text_input,
         }
-        headers = {
-            "Authorization": f"Bearer {self._api_key}",
-            "Content-Type": "application/json",
-        }
-        try:
-            r = requests.post(url, json=payload, headers=headers, timeout=45)
-        except requests.RequestException as e:
-            raise ProviderRequestError(f"OpenAI embedding request failed: {e}") from e
+        with self._guard():
+            try:
+                r = self._session.post(url, json=payload, headers=self._headers(), timeout=request_timeout(45))
+            except requests.RequestException as e:
+                check_deadline()
+                raise ProviderRequestError(f"OpenAI embedding request failed: {e}") from e
 
-        if not r.ok:
-            raise ProviderRequestError(f"OpenAI embeddings HTTP {r.status_code}: {r.text[:5000]}")
+            if not r.ok:
+                raise ProviderRequestError(f"OpenAI embeddings HTTP {r.status_code}: {r.text[:5000]}", status_code=r.status_code)
 
         try:
-            body = r.json()
+            return r.json()
         except Exception as e:
             raise ProviderResponseError(f"OpenAI embeddings JSON parse failed: {e}") from e
 
+    def embed(self, req: EmbedRequest) -> EmbedResponse:
+        body = self._post_embeddings(req.model, req.text)
+
         try:
             emb = body["data"][0]["embedding"]
         except Exception as e:
@@ -111,3 +171,17 @@ class OpenAIProvider(AIProvider):
 
         return EmbedResponse(embedding=[float(x) for x in emb], raw=body)
 
+    @property
+    def native_batch(self) -> bool:
+        return True
+
+    def _embed_many(self, texts: list[str], model: str) -> list[list[float]]:
+        body = self._post_embeddings(model, texts)
+        try:
+            data = sorted(body["data"], key=lambda d: d["index"])
+            vectors = [[float(x) for x in d["embedding"]] for d in data]
+        except Exception as e:
+            raise ProviderResponseError(f"OpenAI embeddings response shape unexpected: {e}. Body: {str(body)[:2000]}") from e
+        if any(not v for v in vectors):
+            raise ProviderResponseError("OpenAI embeddings missing vector data")
+        return vectors
@@ -0,0 +1,261 @@
+"""
+Embedding provenance on Chunk nodes and incremental re-embedding.
+
+Every writer of `Chunk.embedding` also stores, next to the vector:
+
+    embeddingHash      content_hash() of the chunk text that was embedded
+    embeddingModel     embedding model name
+    embeddingDims      vector size
+    embeddingMaxChars  characters the text was cut to before embedding (0: none)
+    embeddingAt        when the vector was written
+
+(for another vector property `p` the names are `pHash`, `pModel`, ...).
+`reembed_stale` walks the chunks by elementId, recomputes the hash of the
+current text and re-embeds only chunks whose vector is missing, was made by
+another model, belongs to an older text, or was cut at another length than
+the current `max_chars` would cut it. Vectors written before this
+bookkeeping existed carry no model; they count as stale unless
+`adopt_unversioned` stamps them with the current model as they are.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import time
+from typing import Any, Callable, Iterable, Sequence
+
+from .config import load_config
+from .embed_cache import embed_texts, normalize_text
+from .scheduler import BATCH, request_priority
+
+DEFAULT_MODEL = "mxbai-embed-large:latest"
+DEFAULT_TEXT_PROPERTIES = ("text", "content", "body", "chunkText", "value")
+DEFAULT_MAX_CHARS = 1000
+
+
+def content_hash(text: str) -> str:
+    """Hash of the chunk text (whitespace-normalized, before truncation)."""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def pick_text(row: dict[str, Any], properties: Iterable[str] = DEFAULT_TEXT_PROPERTIES) -> str:
+    for name in properties:
+        value = row.get(name)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ""
+
+
+@functools.lru_cache(maxsize=1)
+def default_embedding_model() -> str:
+    """[OLLAMA] EMB_MODEL, the model the Chunk embeddings are built with (read once)."""
+    return load_config().get("OLLAMA", "EMB_MODEL", fallback=None) or DEFAULT_MODEL
+
+
+def meta_properties(embedding_property: str = "embedding") -> dict[str, str]:
+    return {
+        "hash": f"{embedding_property}Hash",
+        "model": f"{embedding_property}Model",
+        "dims": f"{embedding_property}Dims",
+        "max_chars": f"{embedding_property}MaxChars",
+        "at": f"{embedding_property}At",
+    }
+
+
+def write_embeddings_cypher(embedding_property: str = "embedding") -> str:
+    """
+    UNWIND write of `$rows` ({eid, embedding, hash, max_chars?}) with
+    provenance for `$model`; rows without max_chars record `$max_chars`.
+    """
+    m = meta_properties(embedding_property)
+    return f"""
+    UNWIND $rows AS row
+    MATCH (c)
+    WHERE elementId(c) = row.eid
+    SET c.{embedding_property} = row.embedding,
+        c.{m['hash']} = row.hash,
+        c.{m['model']} = $model,
+        c.{m['dims']} = size(row.embedding),
+        c.{m['max_chars']} = coalesce(row.max_chars, $max_chars),
+        c.{m['at']} = datetime()
+    """
+
+
+def _adopt_cypher(embedding_property: str) -> str:
+    m = meta_properties(embedding_property)
+    return f"""
+    UNWIND $rows AS row
+    MATCH (c)
+    WHERE elementId(c) = row.eid AND c.{embedding_property} IS NOT NULL
+    SET c.{m['hash']} = row.hash,
+        c.{m['model']} = $model,
+        c.{m['dims']} = size(c.{embedding_property}),
+        c.{m['max_chars']} = coalesce(c.{m['max_chars']}, row.max_chars),
+        c.{m['at']} = coalesce(c.{m['at']}, datetime())
+    """
+
+
+def _page_cypher(label: str, embedding_property: str, text_properties: Sequence[str]) -> str:
+    m = meta_properties(embedding_property)
+    texts = ", ".join(f"c.{p} AS {p}" for p in text_properties)
+    return f"""
+    MATCH (c:{label})
+    WHERE ($project IS NULL OR c.projectName = $project)
+      AND elementId(c) > $after
+    RETURN elementId(c) AS eid, {texts},
+           c.{embedding_property} IS NOT NULL AS embedded,
+           c.{m['hash']} AS hash,
+           c.{m['model']} AS model,
+           c.{m['max_chars']} AS max_chars
+    ORDER BY eid
+    LIMIT $limit
+    """
+
+
+def _embedded_length(text: str, max_chars: int) -> int:
+    return len(text) if max_chars <= 0 else min(len(text), max_chars)
+
+
+def staleness(
+    row: dict[str, Any], text_hash: str, model: str, text: str = "", max_chars: int | None = None
+) -> str | None:
+    """
+    Why the chunk's vector needs work ("missing", "unversioned",
+    "model_changed", "text_changed", "truncation_changed"), or None. The
+    truncation is only compared when `max_chars` is given and the vector
+    records one; it matters only if the two limits cut `text` differently.
+    """
+    if not row.get("embedded"):
+        return "missing"
+    if row.get("model") is None and row.get("hash") is None:
+        return "unversioned"
+    if row.get("model") != model:
+        return "model_changed"
+    if row.get("hash") != text_hash:
+        return "text_changed"
+    if (
+        max_chars is not None
+        and row.get("max_chars") is not None
+        and _embedded_length(text, int(row["max_chars"])) != _embedded_length(text, max_chars)
+    ):
+        return "truncation_changed"
+    return None
+
+
+def reembed_stale(
+    session,
+    provider,
+    model: str,
+    *,
+    project: str | None = None,
+    label: str = "Chunk",
+    embedding_property: str = "embedding",
+    text_properties: Sequence[str] = DEFAULT_TEXT_PROPERTIES,
+    max_chars: int | None = DEFAULT_MAX_CHARS,
+    page_size: int = 500,
+    max_chunks: int | None = None,
+    adopt_unversioned: bool = False,
+    dry_run: bool = False,
+    embed_batch_size: int | None = None,
+    check_dimensions: Callable[[int], Iterable[str] | None] | None = None,
+) -> dict[str, Any]:
+    """
+    Re-embed the chunks (of `project`, or all) whose vector is stale for
+    `model`. Stops after `max_chunks` re-embedded chunks, reporting
+    `complete: False`; the next call starts over and skips what is fresh.
+    With `dry_run` only the counts are reported.
+
+    Texts are cut to `max_chars` before embedding (0: whole text), and a
+    vector cut differently counts as stale. With `max_chars=None` every
+    chunk keeps the cut it was embedded with (DEFAULT_MAX_CHARS if unknown).
+
+    `check_dimensions` is called with each new vector size before vectors of
+    that size are written and may raise to stop the run (see
+    graph.partitions.ensure_vector_dimensions); the index names it returns
+    are reported as `recreated_indexes`.
+    """
+    started = time.monotonic()
+    if max_chars is not None:
+        max_chars = max(0, int(max_chars))
+    totals: dict[str, Any] = {
+        "seen": 0, "fresh": 0, "no_text": 0,
+        "missing": 0, "unversioned": 0, "model_changed": 0, "text_changed": 0, "truncation_changed": 0,
+        "reembedded": 0, "adopted": 0, "failed": 0, "recreated_indexes": [],
+    }
+    dims: set[int] = set()
+    page_cypher = _page_cypher(label, embedding_property, text_properties)
+    write_cypher = write_embeddings_cypher(embedding_property)
+    adopt_cypher = _adopt_cypher(embedding_property)
+
+    after = ""
+    complete = True
+    while True:
+        rows = session.run(page_cypher, project=project, after=after, limit=page_size).data()
+        if not rows:
+            break
+        after = rows[-1]["eid"]
+
+        todo: list[tuple[str, str, str, int]] = []
+        adopt: list[dict[str, Any]] = []
+        for row in rows:
+            totals["seen"] += 1
+            text = pick_text(row, text_properties)
+            if not text:
+                totals["no_text"] += 1
+                continue
+            text_hash = content_hash(text)
+            reason = staleness(row, text_hash, model, text, max_chars)
+            if reason is None:
+                totals["fresh"] += 1
+                continue
+            totals[reason] += 1
+            cut = max_chars
+            if cut is None:
+                cut = DEFAULT_MAX_CHARS if row.get("max_chars") is None else int(row["max_chars"])
+            if reason == "unversioned" and adopt_unversioned:
+                adopt.append({"eid": row["eid"], "hash": text_hash, "max_chars": cut})
+                continue
+            if cut > 0:
+                text = text[:cut]
+            todo.append((row["eid"], text, text_hash, cut))
+
+        if dry_run:
+            continue
+
+        if adopt:
+            session.run(adopt_cypher, rows=adopt, model=model).consume()
+            totals["adopted"] += len(adopt)
+
+        if max_chunks is not None and totals["reembedded"] + len(todo) > max_chunks:
+            todo = todo[: max(0, max_chunks - totals["reembedded"])]
+            complete = False
+        if todo:
+            with request_priority(BATCH):
+                result = embed_texts(
+                    provider, [text for _, text, _, _ in todo], model, max_batch_size=embed_batch_size
+                )
+            writes = []
+            for (eid, _, text_hash, cut), item in zip(todo, result.items):
+                if item.error is not None:
+                    totals["failed"] += 1
+                    continue
+                writes.append({"eid": eid, "embedding": item.embedding, "hash": text_hash, "max_chars": cut})
+            new_dims = {len(w["embedding"]) for w in writes} - dims
+            if check_dimensions is not None:
+                for size in sorted(new_dims):
+                    totals["recreated_indexes"] += list(check_dimensions(size) or [])
+            dims |= new_dims
+            if writes:
+                session.run(write_cypher, rows=writes, model=model, max_chars=None).consume()
+            totals["reembedded"] += len(writes)
+        if not complete:
+            break
+
+    totals["model"] = model
+    totals["max_chars"] = max_chars
+    totals["dims"] = sorted(dims)
+    totals["complete"] = complete
+    totals["dry_run"] = dry_run
+    totals["elapsed_ms"] = round(1000 * (time.monotonic() - started), 1)
+    return totals
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
 from typing import Iterable
 
+from .breaker import breaker_from_config
 from .config import load_config
 from .errors import ProviderConfigError
-from .providers import OllamaProvider, OpenAIProvider
+from .providers import AIProvider, OllamaProvider, OpenAIProvider
+from .response_cache import CachingProvider, ResponseCache, response_cache_from_config
+from .scheduler import scheduler_from_config
 from .types import ProviderId
 
 
@@ -25,10 +29,23 @@ class ProviderInfo:
 class ProviderRegistry:
     """
     Single place to construct providers and list model options.
+
+    Providers are built once and kept, so their pooled HTTP sessions (and the
+    Ollama embedding route) survive across requests; use `get_registry()`
+    rather than constructing one per request. Unless [LLM_CACHE] disables
+    it, providers come wrapped in the temperature-0 response cache.
+
+    Standalone batch scripts pass `batch_job=True` so their Ollama provider
+    holds at most BATCH_MAX_CONCURRENCY requests in flight.
     """
 
-    def __init__(self):
-        self._cfg = load_config()
+    def __init__(self, cfg=None, batch_job: bool = False):
+        self._cfg = cfg if cfg is not None else load_config()
+        self._batch_job = batch_job
+        self._providers: dict[str, AIProvider] = {}
+        self._lock = threading.Lock()
+        self._response_cache: ResponseCache | None = None
+        self._response_cache_loaded = False
 
         # Defaults
         self._openai_models = _split_csv(self._cfg.get("OPENAI", "MODELS", fallback="")) or [
@@ -48,12 +65,72 @@ class ProviderRegistry:
         out.append(ProviderInfo(id="ollama", label="Ollama", models=self._ollama_models))
         return out
 
-    def get_provider(self, provider_id: ProviderId):
+    def get_provider(self, provider_id: ProviderId) -> AIProvider:
+        provider = self._providers.get(provider_id)
+        if provider is not None:
+            return provider
+        with self._lock:
+            provider = self._providers.get(provider_id)
+            if provider is None:
+                provider = self._build_provider(provider_id)
+                cache = self._get_response_cache()
+                if cache is not None:
+                    provider = CachingProvider(provider, cache)
+                self._providers[provider_id] = provider
+        return provider
+
+    def _get_response_cache(self) -> ResponseCache | None:
+        if not self._response_cache_loaded:
+            self._response_cache = response_cache_from_config(self._cfg)
+            self._response_cache_loaded = True
+        return self._response_cache
+
+    @property
+    def response_cache(self) -> ResponseCache | None:
+        with self._lock:
+            return self._get_response_cache()
+
+    def _embed_batch_limits(self, section: str, size: int, tokens: int) -> dict[str, int]:
+        return {
+            "embed_batch_size": self._cfg.getint(section, "EMBED_BATCH_SIZE", fallback=size),
+            "embed_batch_tokens": self._cfg.getint(section, "EMBED_BATCH_TOKENS", fallback=tokens),
+        }
+
+    def _build_provider(self, provider_id: ProviderId) -> AIProvider:
         if provider_id == "openai":
-            return OpenAIProvider()
+            return OpenAIProvider(
+                breaker=breaker_from_config(self._cfg, "OPENAI", "OpenAI"),
+                **self._embed_batch_limits("OPENAI", 128, 100000),
+            )
         if provider_id == "ollama":
             if not self._ollama_base:
                 raise ProviderConfigError("OLLAMA.BASE not configured in config.ini")
-            return OllamaProvider(base_url=self._ollama_base, auth_token=self._ollama_auth)
+            return OllamaProvider(
+                base_url=self._ollama_base,
+                auth_token=self._ollama_auth,
+                scheduler=scheduler_from_config(self._cfg, "OLLAMA", batch_job=self._batch_job),
+                breaker=breaker_from_config(self._cfg, "OLLAMA", "Ollama"),
+                **self._embed_batch_limits("OLLAMA", 32, 8000),
+            )
         raise ProviderConfigError(f"Unknown provider: {provider_id}")
 
+
+_registry: ProviderRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ProviderRegistry:
+    """Process-wide registry; the ini is read on first use only."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ProviderRegistry()
+    return _registry
+
+
+def reset_registry() -> None:
+    """Drop the shared registry so the next call re-reads the config."""
+    global _registry
+    with _registry_lock:
+        _registry = None
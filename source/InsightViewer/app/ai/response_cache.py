@@ -0,0 +1,142 @@
+"""
+Cache for deterministic chat completions.
+
+Only temperature-0 requests are cached, keyed by provider, model, the full
+message list, temperature and max tokens. Entries expire after a TTL and live
+in a SQLite file (or in memory when no path is configured). A request can
+opt out with `ChatRequest(no_cache=True)`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .config import load_config, resolve_data_path
+from .types import ChatRequest, ChatResponse
+
+
+def is_cacheable(req: ChatRequest) -> bool:
+    return not req.no_cache and float(req.temperature) == 0.0
+
+
+def response_key(provider: str, req: ChatRequest) -> str:
+    raw = json.dumps(
+        {
+            "provider": provider,
+            "model": req.model,
+            "messages": [
+                {"role": "system", "content": req.system},
+                {"role": "user", "content": req.user},
+            ],
+            "temperature": float(req.temperature),
+            "max_tokens": int(req.max_tokens),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: str | os.PathLike | None = None, ttl_seconds: int = 86400):
+        self.path = Path(path) if path else None
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self._memory: dict[str, tuple[float, str, Any]] = {}
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._counters = {"hits": 0, "misses": 0, "writes": 0}
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_responses ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL, raw TEXT, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> ChatResponse | None:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT created_at, text, raw FROM chat_responses WHERE key = ?", (key,)
+                ).fetchone()
+                entry = (row[0], row[1], json.loads(row[2]) if row[2] else None) if row else None
+            else:
+                entry = self._memory.get(key)
+
+            if entry is None or entry[0] < cutoff:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            return ChatResponse(text=entry[1], raw=entry[2], cached=True)
+
+    def put(self, key: str, resp: ChatResponse) -> None:
+        now = time.time()
+        with self._lock:
+            self._counters["writes"] += 1
+            if self._conn is None:
+                self._memory[key] = (now, resp.text, resp.raw)
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_responses (key, text, raw, created_at) VALUES (?, ?, ?, ?)",
+                (key, resp.text, json.dumps(resp.raw, default=str) if resp.raw is not None else None, now),
+            )
+            self._conn.execute("DELETE FROM chat_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.commit()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = dict(self._counters)
+        out["ttl_seconds"] = self.ttl_seconds
+        out["path"] = str(self.path) if self.path else None
+        return out
+
+
+class CachingProvider:
+    """
+    Wraps a provider so deterministic `chat()` calls are answered from the
+    cache. Everything else (streaming, embeddings, attributes) goes straight
+    to the wrapped provider.
+    """
+
+    def __init__(self, inner, cache: ResponseCache):
+        self._inner = inner
+        self._cache = cache
+
+    def __getattr__(self, name: str):
+        return getattr(self._inner, name)
+
+    def chat(self, req: ChatRequest) -> ChatResponse:
+        if not is_cacheable(req):
+            return self._inner.chat(req)
+        key = response_key(self._inner.id, req)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        resp = self._inner.chat(req)
+        self._cache.put(key, resp)
+        return resp
+
+
+def response_cache_from_config(cfg=None) -> ResponseCache | None:
+    """
+    Build the cache from the optional [LLM_CACHE] section: ENABLED (default
+    true), TTL_SECONDS (default one day) and PATH (default
+    cache/llm_responses.sqlite; empty keeps it in memory only).
+    """
+    cfg = cfg if cfg is not None else load_config()
+    if not cfg.getboolean("LLM_CACHE", "ENABLED", fallback=True):
+        return None
+    return ResponseCache(
+        path=resolve_data_path(cfg.get("LLM_CACHE", "PATH", fallback="cache/llm_responses.sqlite")),
+        ttl_seconds=cfg.getint("LLM_CACHE", "TTL_SECONDS", fallback=86400),
+    )
@@ -0,0 +1,325 @@
+"""
+Admission control for a shared model backend.
+
+`RequestScheduler` caps how many requests run against the backend at once and
+admits waiting requests by priority class (interactive before batch, FIFO
+within a class). Requests sharing a key while one is in flight are coalesced:
+only the first one is sent and the others get its result ("singleflight").
+
+The priority of the calling code is taken from a context variable, so batch
+jobs wrap their work in `with request_priority(BATCH):` instead of passing
+the class through every call.
+
+Both the cap and the priorities hold within one process. A standalone batch
+script has its own scheduler and never yields to the app's interactive
+requests; it is kept small by BATCH_MAX_CONCURRENCY instead.
+
+`AsyncRequestScheduler` applies the same rules to coroutines for the asyncio
+services.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+
+from .deadline import remaining
+from .errors import DeadlineExceeded, ProviderBusyError
+
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+T = TypeVar("T")
+
+_priority: ContextVar[str] = ContextVar("ai_request_priority", default=INTERACTIVE)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(name: str) -> Iterator[None]:
+    """Run the block's model requests in priority class `name`."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority class: {name}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def flight_key(*parts: Any) -> str:
+    """Key under which identical in-flight requests are coalesced."""
+    raw = json.dumps(parts, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class _Admission:
+    """Queue state and statistics shared by the thread and asyncio schedulers."""
+
+    def __init__(self, max_concurrency: int = 2, queue_timeout: float = 120.0):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.queue_timeout = max(0.0, float(queue_timeout))
+        self._active = 0
+        # Heap of (priority rank, arrival) tickets; the head is admitted next.
+        self._waiting: list[tuple[int, int]] = []
+        self._arrivals = itertools.count()
+        self._inflight: dict[str, Any] = {}
+        self._counters = {"admitted": 0, "coalesced": 0, "timeouts": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _enqueue(self, priority: str | None) -> tuple[tuple[int, int], float, bool]:
+        """Queue a ticket; returns it with the wait limit and whether the request deadline sets it."""
+        ticket = (PRIORITIES[priority or current_priority()], next(self._arrivals))
+        heapq.heappush(self._waiting, ticket)
+        limit = self.queue_timeout
+        # A request deadline shorter than the queue timeout bounds the wait too.
+        left = remaining()
+        by_deadline = left is not None and left < limit
+        if by_deadline:
+            limit = max(0.0, left)
+        return ticket, limit, by_deadline
+
+    def _may_enter(self, ticket: tuple[int, int]) -> bool:
+        return self._active < self.max_concurrency and self._waiting[0] == ticket
+
+    def _dequeue(self, ticket: tuple[int, int]) -> None:
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+
+    def _timed_out(self, by_deadline: bool) -> Exception:
+        self._counters["timeouts"] += 1
+        if by_deadline:
+            return DeadlineExceeded("Request deadline exceeded while queued for the model backend")
+        return ProviderBusyError(f"Model backend busy: no slot free after {self.queue_timeout:.0f}s in queue")
+
+    def _admit(self, started: float) -> None:
+        heapq.heappop(self._waiting)
+        self._active += 1
+        waited = time.monotonic() - started
+        self._counters["admitted"] += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def _snapshot(self) -> dict[str, Any]:
+        out: dict[str, Any] = dict(self._counters)
+        out["max_concurrency"] = self.max_concurrency
+        out["active"] = self._active
+        out["queued"] = len(self._waiting)
+        out["queued_by_priority"] = {
+            name: sum(1 for rank, _ in self._waiting if rank == r) for name, r in PRIORITIES.items()
+        }
+        out["in_flight_keys"] = len(self._inflight)
+        admitted = self._counters["admitted"]
+        out["avg_wait_ms"] = round(1000.0 * self._wait_total / admitted, 1) if admitted else 0
+        out["max_wait_ms"] = round(1000.0 * self._wait_max, 1)
+        return out
+
+
+class RequestScheduler(_Admission):
+    def __init__(self, max_concurrency: int = 2, queue_timeout: float = 120.0):
+        super().__init__(max_concurrency, queue_timeout)
+        self._cond = threading.Condition()
+
+    def _acquire(self, priority: str | None) -> None:
+        started = time.monotonic()
+        with self._cond:
+            ticket, limit, by_deadline = self._enqueue(priority)
+            give_up_at = started + limit
+            try:
+                while not self._may_enter(ticket):
+                    wait = give_up_at - time.monotonic()
+                    if wait <= 0:
+                        raise self._timed_out(by_deadline)
+                    self._cond.wait(wait)
+            except BaseException:
+                self._dequeue(ticket)
+                self._cond.notify_all()
+                raise
+            self._admit(started)
+            # The new head may fit into another free slot.
+            self._cond.notify_all()
+
+    def _release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: str | None = None) -> Iterator[None]:
+        """Hold one backend slot for the duration of the block."""
+        self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def run(self, fn: Callable[[], T], key: str | None = None, priority: str | None = None) -> T:
+        """
+        Call `fn` inside a slot. With a `key`, callers arriving while an equal
+        request is in flight wait for that request instead of sending their own.
+        """
+        if key is None:
+            with self.slot(priority):
+                return fn()
+
+        with self._cond:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            left = remaining()
+            if not flight.done.wait(None if left is None else max(0.0, left)):
+                raise DeadlineExceeded("Request deadline exceeded while waiting for an identical request")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            with self.slot(priority):
+                flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return self._snapshot()
+
+
+class AsyncRequestScheduler(_Admission):
+    """
+    The same admission rules for asyncio code: waiting never blocks the event
+    loop, and coalesced callers await the first caller's task. Use one
+    instance per event loop.
+    """
+
+    def __init__(self, max_concurrency: int = 2, queue_timeout: float = 120.0):
+        super().__init__(max_concurrency, queue_timeout)
+        self._cond: asyncio.Condition | None = None
+
+    def _condition(self) -> asyncio.Condition:
+        # Created on first use so it binds to the running loop.
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def _acquire(self, priority: str | None) -> None:
+        started = time.monotonic()
+        cond = self._condition()
+        async with cond:
+            ticket, limit, by_deadline = self._enqueue(priority)
+            try:
+                await asyncio.wait_for(cond.wait_for(lambda: self._may_enter(ticket)), timeout=limit)
+            except asyncio.TimeoutError:
+                self._dequeue(ticket)
+                cond.notify_all()
+                raise self._timed_out(by_deadline) from None
+            except BaseException:
+                self._dequeue(ticket)
+                cond.notify_all()
+                raise
+            self._admit(started)
+            cond.notify_all()
+
+    async def _release(self) -> None:
+        cond = self._condition()
+        async with cond:
+            self._active -= 1
+            cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, priority: str | None = None) -> AsyncIterator[None]:
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            await self._release()
+
+    async def run(self, fn: Callable[[], Awaitable[T]], key: str | None = None, priority: str | None = None) -> T:
+        if key is None:
+            async with self.slot(priority):
+                return await fn()
+
+        while (flight := self._inflight.get(key)) is not None:
+            self._counters["coalesced"] += 1
+            left = remaining()
+            try:
+                return await asyncio.wait_for(asyncio.shield(flight), None if left is None else max(0.0, left))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("Request deadline exceeded while waiting for an identical request") from None
+            except asyncio.CancelledError:
+                # Only the leader was cancelled: send the request ourselves instead.
+                # (Task.cancelling needs 3.11; on 3.10 a follower cancelled in
+                # the same step as its leader takes over as well.)
+                cancelling = getattr(asyncio.current_task(), "cancelling", lambda: 0)
+                if not flight.cancelled() or cancelling():
+                    raise
+
+        flight = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            async with self.slot(priority):
+                result = await fn()
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark it retrieved so a flight without followers does not log a warning.
+            flight.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict[str, Any]:
+        return self._snapshot()
+
+
+def scheduler_from_config(
+    cfg, section: str = "OLLAMA", scheduler_cls: type[_Admission] = RequestScheduler, batch_job: bool = False
+):
+    """
+    Build a scheduler (`RequestScheduler` unless `scheduler_cls` says
+    otherwise) from MAX_CONCURRENCY (default 2) and QUEUE_TIMEOUT (seconds,
+    default 120) in the given config section. Standalone batch jobs
+    (`batch_job`) take BATCH_MAX_CONCURRENCY (default 1) instead.
+    """
+    if batch_job:
+        max_concurrency = cfg.getint(section, "BATCH_MAX_CONCURRENCY", fallback=1)
+    else:
+        max_concurrency = cfg.getint(section, "MAX_CONCURRENCY", fallback=2)
+    return scheduler_cls(
+        max_concurrency=max_concurrency,
+        queue_timeout=cfg.getfloat(section, "QUEUE_TIMEOUT", fallback=120.0),
+    )
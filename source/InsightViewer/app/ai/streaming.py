@@ -0,0 +1,62 @@
+"""
+Server-sent-event framing for streamed answers.
+
+A streamed answer is a `sources` event (what the answer is grounded on), one
+`token` event per piece of text, then `done` with the metadata the buffered
+JSON response carries. Failures after the stream has started are sent as an
+`error` event.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Iterable, Iterator
+
+from .errors import AIError
+
+
+SSE_MIMETYPE = "text/event-stream"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def wants_event_stream(req) -> bool:
+    """True when the client asks for SSE (`Accept: text/event-stream`)."""
+    best = req.accept_mimetypes.best_match(["application/json", SSE_MIMETYPE])
+    return best == SSE_MIMETYPE
+
+
+def sse_frame(event: str, data: Any) -> str:
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_answer(sources: Any, tokens: Iterable[str], meta: dict[str, Any] | None = None) -> Iterator[str]:
+    """
+    Frame `tokens` (usually `provider.chat_stream(...)`) as SSE. If the client
+    goes away the server closes this generator, which closes `tokens` and with
+    it the upstream model request.
+    """
+    started = time.monotonic()
+    yield sse_frame("sources", sources)
+
+    chars = 0
+    try:
+        for text in tokens:
+            if text:
+                chars += len(text)
+                yield sse_frame("token", {"text": text})
+    except AIError as e:
+        yield sse_frame("error", {"success": False, "error": str(e)})
+        return
+    except Exception as e:
+        yield sse_frame("error", {"success": False, "error": f"Unexpected error: {e}"})
+        return
+    finally:
+        close = getattr(tokens, "close", None)
+        if close is not None:
+            close()
+
+    done = dict(meta or {})
+    done.update({"success": True, "chars": chars, "elapsed_ms": int((time.monotonic() - started) * 1000)})
+    yield sse_frame("done", done)
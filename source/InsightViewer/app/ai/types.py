@@ -20,12 +20,15 @@ class ChatRequest:
     model: str
     temperature: float = 0.2
     max_tokens: int = 2000
+    # Skip the response cache for this call (it only applies at temperature 0).
+    no_cache: bool = False
 
 
 @dataclass(frozen=True)
 class ChatResponse:
     text: str
     raw: Optional[dict[str, Any]] = None
+    cached: bool = False
 
 
 @dataclass(frozen=True)
@@ -39,3 +42,25 @@ class EmbedResponse:
     embedding: list[float]
     raw: Optional[dict[str, Any]] = None
 
+
+
+@dataclass(frozen=True)
+class EmbedBatchRequest:
+    texts: list[str]
+    model: str
+
+
+@dataclass(frozen=True)
+class EmbedBatchItem:
+    index: int
+    embedding: Optional[list[float]] = None
+    error: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class EmbedBatchResponse:
+    items: list[EmbedBatchItem]
+
+    @property
+    def failed(self) -> list[EmbedBatchItem]:
+        return [item for item in self.items if item.error is not None]
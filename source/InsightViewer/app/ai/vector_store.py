@@ -0,0 +1,520 @@
+"""
+Local vector engine: an in-process sidecar to the Neo4j vector index.
+
+Per project, the Chunk embeddings are mirrored into a float32 matrix in a
+memory-mapped file (rows L2-normalized, so a dot product is the cosine
+score), with the row's `id_rc` and a hash of the stored vector kept next to
+it. `sync_from_neo4j` walks the project's chunks and rewrites only rows whose
+hash changed, adds new ones and drops deleted ones.
+
+Queries never leave the process: `search` scans the matrix exactly or, for
+large projects, through an IVF index (k-means cells, only the `nprobe`
+nearest cells are scanned); `score_many` scores a whole batch of queries in
+one matrix product. Results are ranked within the project, so `k` means k
+project chunks rather than k global neighbours filtered afterwards.
+
+Requires numpy; without it `available()` is False and callers keep using
+`db.index.vector.queryNodes`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+try:  # optional; without numpy retrieval stays on the Neo4j vector index
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+from .config import load_config, resolve_data_path
+
+
+DTYPE = "float32"
+# Matrix rows scored per step in score_many, bounding the temporary matrix.
+BLOCK_ROWS = 8192
+
+SYNC_PAGE_CYPHER = """
+MATCH (c:Chunk)
+WHERE c.projectName = $project
+  AND c.id_rc IS NOT NULL
+  AND c.embedding IS NOT NULL
+  AND elementId(c) > $after
+RETURN elementId(c) AS eid, c.id_rc AS id_rc, c.embedding AS embedding
+ORDER BY eid
+LIMIT $limit
+"""
+
+
+def available() -> bool:
+    return np is not None
+
+
+def vector_hash(vec: Sequence[float]) -> str:
+    """Hash of a vector as stored (float32), used to skip unchanged rows on sync."""
+    return hashlib.blake2b(np.asarray(vec, dtype=DTYPE).tobytes(), digest_size=8).hexdigest()
+
+
+def _normalized(mat):
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def _top_k(scores, k: int):
+    """Indices of the k highest scores, best first."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class VectorStore:
+    """
+    One project's vectors. Files in `path`: meta.json (version, dim, row ids
+    and hashes), vectors.<version>.f32 (capacity x dim matrix) and, once
+    built, ivf.<version>.npz (centroids and the cell of every row).
+
+    A published version is never written again. The first change copies the
+    matrix to the next version's file; `flush` publishes it by replacing
+    meta.json and prunes all but the previous version. Readers compare
+    meta.json before every query and reload when another instance (e.g. the
+    sync script) published a new version, so ids and rows always match.
+    One writer per path at a time; any number of readers.
+    """
+
+    def __init__(self, path: str | os.PathLike, ivf_min_rows: int = 20000, nprobe: int = 8):
+        if np is None:
+            raise RuntimeError("numpy is required for the local vector store")
+        self.path = Path(path)
+        self.ivf_min_rows = max(1, int(ivf_min_rows))
+        self.nprobe = max(1, int(nprobe))
+        self._lock = threading.RLock()
+        self.dim: int | None = None
+        self._ids: list[str] = []
+        self._hashes: list[str] = []
+        self._pos: dict[str, int] = {}
+        self._mat = None
+        self._centroids = None
+        self._assign = None
+        self._synced_at: float | None = None
+        self._version = 0
+        self._working: int | None = None
+        self._loaded = None
+        self._counters = {"searches": 0, "ivf_searches": 0, "batch_queries": 0, "reloads": 0}
+        self._load()
+
+    # ----- persistence -----
+
+    @property
+    def _meta_file(self) -> Path:
+        return self.path / "meta.json"
+
+    def _matrix_file(self, version: int) -> Path:
+        # version 0: a store written before versioning
+        return self.path / (f"vectors.{version}.f32" if version else "vectors.f32")
+
+    def _ivf_file(self, version: int) -> Path:
+        return self.path / (f"ivf.{version}.npz" if version else "ivf.npz")
+
+    def _meta_signature(self):
+        try:
+            st = self._meta_file.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> None:
+        for attempt in range(3):
+            signature = self._meta_signature()
+            if signature is None:
+                return
+            meta = json.loads(self._meta_file.read_text(encoding="utf-8"))
+            try:
+                self._apply_meta(meta)
+            except FileNotFoundError:
+                # pruned by a writer that published twice since meta.json was read
+                if attempt == 2:
+                    raise
+                continue
+            self._loaded = signature
+            return
+
+    def _apply_meta(self, meta: dict[str, Any]) -> None:
+        version = int(meta.get("version") or 0)
+        dim = meta.get("dim")
+        ids = list(meta.get("ids") or [])
+        mat = centroids = assign = None
+        matrix_file = self._matrix_file(version)
+        if dim and (ids or matrix_file.exists()):
+            capacity = matrix_file.stat().st_size // (4 * dim)
+            if capacity > 0:
+                mat = np.memmap(matrix_file, dtype=DTYPE, mode="r", shape=(capacity, dim))
+        ivf_file = self._ivf_file(version)
+        if mat is not None and ivf_file.exists():
+            with np.load(ivf_file) as ivf:
+                centroids = ivf["centroids"]
+                assign = np.zeros(mat.shape[0], dtype=np.int32)
+                assign[: len(ivf["assign"])] = ivf["assign"]
+        self._version, self._working = version, None
+        self.dim = dim
+        self._ids = ids
+        self._hashes = list(meta.get("hashes") or [])
+        self._pos = {id_rc: i for i, id_rc in enumerate(ids)}
+        self._synced_at = meta.get("synced_at")
+        self._mat, self._centroids, self._assign = mat, centroids, assign
+
+    def refresh(self) -> bool:
+        """Reload if another instance published a new version; unflushed local changes win."""
+        with self._lock:
+            if self._working is not None:
+                return False
+            signature = self._meta_signature()
+            if signature is None or signature == self._loaded:
+                return False
+            self._load()
+            self._counters["reloads"] += 1
+            return True
+
+    def _begin_write(self) -> None:
+        """Move to a private copy of the matrix (the next version) before the first change."""
+        if self._working is not None:
+            return
+        self.refresh()
+        version = self._version + 1
+        target = self._matrix_file(version)
+        self.path.mkdir(parents=True, exist_ok=True)
+        if self._mat is not None:
+            shutil.copyfile(self._matrix_file(self._version), target)
+            self._mat = np.memmap(target, dtype=DTYPE, mode="r+", shape=self._mat.shape)
+        else:
+            target.unlink(missing_ok=True)
+        self._working = version
+
+    def _save_meta(self, version: int) -> None:
+        tmp = self._meta_file.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({
+                "version": version, "dim": self.dim, "ids": self._ids,
+                "hashes": self._hashes, "synced_at": self._synced_at,
+            }),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self._meta_file)
+
+    def _save_ivf(self, version: int) -> None:
+        if self._centroids is None:
+            return
+        tmp = self.path / f"ivf.{version}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self._centroids, assign=self._assign[: len(self._ids)])
+        os.replace(tmp, self._ivf_file(version))
+
+    def _prune(self) -> None:
+        for f in list(self.path.glob("vectors*.f32")) + list(self.path.glob("ivf*.npz")):
+            m = re.fullmatch(r"(?:vectors|ivf)(?:\.(\d+))?\.(?:f32|npz)", f.name)
+            if m and int(m.group(1) or 0) < self._version - 1:
+                try:
+                    f.unlink()
+                except OSError:  # still mapped by a reader on Windows; retried next flush
+                    pass
+
+    def _capacity(self) -> int:
+        return 0 if self._mat is None else self._mat.shape[0]
+
+    def _grow(self, rows: int) -> None:
+        capacity = self._capacity()
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, 2 * capacity, 1024)
+        if self._mat is not None:
+            self._mat.flush()
+        matrix_file = self._matrix_file(self._working)
+        with open(matrix_file, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._mat = np.memmap(matrix_file, dtype=DTYPE, mode="r+", shape=(new_capacity, self.dim))
+        if self._assign is not None:
+            self._assign = np.resize(self._assign, new_capacity)
+
+    def flush(self) -> None:
+        """Publish the pending changes as a new version."""
+        with self._lock:
+            if self._working is None:
+                return
+            if self._mat is not None:
+                self._mat.flush()
+            self._save_ivf(self._working)
+            self._save_meta(self._working)
+            self._version, self._working = self._working, None
+            self._loaded = self._meta_signature()
+            self._prune()
+
+    # ----- writes -----
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, items: Iterable[tuple[str, Sequence[float]]]) -> dict[str, int]:
+        """Add or replace vectors by id_rc; rows whose hash is unchanged are skipped."""
+        out = {"added": 0, "updated": 0, "unchanged": 0, "wrong_dim": 0}
+        with self._lock:
+            self.refresh()
+            for id_rc, vec in items:
+                vec = np.asarray(vec, dtype=DTYPE)
+                if self.dim is None:
+                    self.dim = int(vec.shape[0])
+                if vec.shape != (self.dim,):
+                    out["wrong_dim"] += 1
+                    continue
+                h = vector_hash(vec)
+                row = self._pos.get(id_rc)
+                if row is not None and self._hashes[row] == h:
+                    out["unchanged"] += 1
+                    continue
+                self._begin_write()
+                if row is None:
+                    row = len(self._ids)
+                    self._grow(row + 1)
+                    self._ids.append(id_rc)
+                    self._hashes.append(h)
+                    self._pos[id_rc] = row
+                    out["added"] += 1
+                else:
+                    self._hashes[row] = h
+                    out["updated"] += 1
+                unit = _normalized(vec)
+                self._mat[row] = unit
+                if self._centroids is not None:
+                    self._assign[row] = int(np.argmax(self._centroids @ unit))
+        return out
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._begin_write()
+            self._mat = self._centroids = self._assign = None
+            self._matrix_file(self._working).unlink(missing_ok=True)
+            self.dim = None
+            self._ids, self._hashes, self._pos = [], [], {}
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """Drop rows by id_rc; the last row moves into the gap so the matrix stays dense."""
+        removed = 0
+        with self._lock:
+            for id_rc in ids:
+                row = self._pos.pop(id_rc, None)
+                if row is None:
+                    continue
+                self._begin_write()
+                last = len(self._ids) - 1
+                if row != last:
+                    moved = self._ids[last]
+                    self._mat[row] = self._mat[last]
+                    self._ids[row] = moved
+                    self._hashes[row] = self._hashes[last]
+                    self._pos[moved] = row
+                    if self._assign is not None:
+                        self._assign[row] = self._assign[last]
+                self._ids.pop()
+                self._hashes.pop()
+                removed += 1
+        return removed
+
+    def sync_from_neo4j(self, session, project: str, page_size: int = 2000) -> dict[str, Any]:
+        """
+        Mirror the project's `Chunk.embedding` values: pages through the chunks
+        by elementId, upserts changed vectors and removes rows whose chunk is
+        gone or lost its embedding. Rebuilds the IVF index when the project is
+        large enough and the matrix changed. Vectors of another size than the
+        stored ones (a new embedding model) replace the store's contents.
+        """
+        started = time.monotonic()
+        totals = {"seen": 0, "added": 0, "updated": 0, "unchanged": 0, "wrong_dim": 0, "removed": 0}
+        seen: set[str] = set()
+        after = ""
+        while True:
+            rows = session.run(SYNC_PAGE_CYPHER, project=project, after=after, limit=page_size).data()
+            if not rows:
+                break
+            after = rows[-1]["eid"]
+            batch = [(str(r["id_rc"]), r["embedding"]) for r in rows if r.get("embedding")]
+            if batch and totals["seen"] == 0 and self.dim not in (None, len(batch[0][1])):
+                self._clear()  # the embedding model changed size; start over
+            seen.update(id_rc for id_rc, _ in batch)
+            for key, n in self.upsert(batch).items():
+                totals[key] += n
+            totals["seen"] += len(batch)
+        with self._lock:
+            self._begin_write()
+            totals["removed"] = self.remove([id_rc for id_rc in list(self._ids) if id_rc not in seen])
+            changed = totals["added"] + totals["updated"] + totals["removed"]
+            if changed and len(self._ids) >= self.ivf_min_rows:
+                self.build_ivf()
+            elif len(self._ids) < self.ivf_min_rows:
+                self._centroids = self._assign = None
+            self._synced_at = time.time()
+            self.flush()
+        totals["rows"] = len(self._ids)
+        totals["elapsed_ms"] = round(1000 * (time.monotonic() - started), 1)
+        return totals
+
+    def build_ivf(self, nlist: int | None = None, iterations: int = 10, sample: int = 50000, seed: int = 0) -> None:
+        """Train k-means cells (default sqrt(rows)) on a sample and assign every row."""
+        with self._lock:
+            self._begin_write()
+            n = len(self._ids)
+            if n == 0:
+                self._centroids = self._assign = None
+                return
+            nlist = max(1, min(int(nlist or round(n ** 0.5)), n))
+            rng = np.random.default_rng(seed)
+            rows = self._mat[:n]
+            train = rows[rng.choice(n, size=min(n, sample), replace=False)]
+            centroids = train[rng.choice(len(train), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                cells = np.argmax(train @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = train[cells == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = _normalized(centroids)
+            assign = np.zeros(self._capacity(), dtype=np.int32)
+            for start in range(0, n, BLOCK_ROWS):
+                block = rows[start:start + BLOCK_ROWS]
+                assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+            self._centroids, self._assign = centroids.astype(DTYPE), assign
+
+    # ----- reads -----
+
+    def _query_matrix(self, queries) -> Any:
+        q = np.asarray(queries, dtype=DTYPE)
+        if q.ndim == 1:
+            q = q[None, :]
+        if q.shape[1] != self.dim:
+            raise ValueError(f"query has {q.shape[1]} dimensions, store has {self.dim}")
+        return _normalized(q)
+
+    def search(self, query: Sequence[float], k: int = 10, mode: str = "auto", nprobe: int | None = None) -> list[tuple[str, float]]:
+        """
+        Top-k (id_rc, cosine score) pairs, best first. `mode` is "exact",
+        "ivf" or "auto" (IVF once it is built for a large enough store).
+        """
+        with self._lock:
+            self.refresh()
+            n = len(self._ids)
+            if n == 0 or k <= 0:
+                return []
+            q = self._query_matrix(query)[0]
+            use_ivf = self._centroids is not None and (
+                mode == "ivf" or (mode == "auto" and n >= self.ivf_min_rows)
+            )
+            self._counters["searches"] += 1
+            if use_ivf:
+                self._counters["ivf_searches"] += 1
+                cells = _top_k(self._centroids @ q, nprobe or self.nprobe)
+                rows = np.flatnonzero(np.isin(self._assign[:n], cells))
+                scores = self._mat[rows] @ q
+                best = _top_k(scores, k)
+                return [(self._ids[rows[i]], float(scores[i])) for i in best]
+            scores = self._mat[:n] @ q
+            return [(self._ids[i], float(scores[i])) for i in _top_k(scores, k)]
+
+    def score_many(self, queries: Sequence[Sequence[float]], k: int = 10) -> list[list[tuple[str, float]]]:
+        """
+        Exact top-k for every query at once: one matrix product per block of
+        stored rows instead of one lookup per query.
+        """
+        with self._lock:
+            self.refresh()
+            n = len(self._ids)
+            if n == 0 or k <= 0 or len(queries) == 0:
+                return [[] for _ in queries]
+            q = self._query_matrix(queries)
+            self._counters["batch_queries"] += len(q)
+            k = min(k, n)
+            best_scores = np.full((len(q), 0), -np.inf, dtype=DTYPE)
+            best_rows = np.zeros((len(q), 0), dtype=np.int64)
+            for start in range(0, n, BLOCK_ROWS):
+                scores = q @ self._mat[start:min(n, start + BLOCK_ROWS)].T
+                rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+                scores = np.concatenate([best_scores, scores], axis=1)
+                rows = np.concatenate([best_rows, rows], axis=1)
+                keep = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(scores, keep, axis=1)
+                best_rows = np.take_along_axis(rows, keep, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind="stable")
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            best_rows = np.take_along_axis(best_rows, order, axis=1)
+            return [
+                [(self._ids[r], float(s)) for r, s in zip(rows_, scores_)]
+                for rows_, scores_ in zip(best_rows, best_scores)
+            ]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self.refresh()
+            out: dict[str, Any] = dict(self._counters)
+            out["rows"] = len(self._ids)
+            out["dim"] = self.dim
+            out["capacity"] = self._capacity()
+            out["ivf_cells"] = 0 if self._centroids is None else int(self._centroids.shape[0])
+            out["synced_at"] = self._synced_at
+            out["version"] = self._version
+            out["path"] = str(self.path)
+        return out
+
+
+_stores: dict[str, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def _settings() -> dict[str, Any]:
+    cfg = load_config()
+    return {
+        "enabled": cfg.getboolean("VECTOR_STORE", "ENABLED", fallback=False),
+        "path": resolve_data_path(cfg.get("VECTOR_STORE", "PATH", fallback="cache/vectors")),
+        "ivf_min_rows": cfg.getint("VECTOR_STORE", "IVF_MIN_ROWS", fallback=20000),
+        "nprobe": cfg.getint("VECTOR_STORE", "NPROBE", fallback=8),
+    }
+
+
+def get_vector_store(project: str | None, create: bool = False) -> VectorStore | None:
+    """
+    The project's store when the optional [VECTOR_STORE] section enables it
+    (ENABLED, PATH default cache/vectors, IVF_MIN_ROWS, NPROBE) and numpy is
+    installed. Without `create`, only a store that has been synced is
+    returned, so callers can fall back to the Neo4j index.
+    """
+    if not project or np is None:
+        return None
+    with _stores_lock:
+        store = _stores.get(project)
+        if store is None:
+            settings = _settings()
+            if not settings["enabled"] or settings["path"] is None:
+                return None
+            folder = settings["path"] / re.sub(r"[^A-Za-z0-9_.-]", "_", project)
+            if not create and not (folder / "meta.json").exists():
+                return None
+            store = _stores[project] = VectorStore(
+                folder, ivf_min_rows=settings["ivf_min_rows"], nprobe=settings["nprobe"]
+            )
+    store.refresh()
+    return store if (create or len(store)) else None
+
+
+def vector_store_stats() -> dict[str, Any]:
+    with _stores_lock:
+        stores = dict(_stores)
+    return {
+        "available": available(),
+        "enabled": available() and _settings()["enabled"],
+        "projects": {project: store.stats() for project, store in stores.items()},
+    }
@@ -26,7 +26,7 @@ import sys
 import json 
 import configparser
 from datetime import datetime, date 
-from flask import Flask, abort, render_template, request, jsonify, render_template_string, url_for, send_from_directory, send_file, redirect
+from flask import Flask, abort, render_template, request, jsonify, render_template_string, url_for, send_from_directory, send_file, redirect, Response, stream_with_context
 import jwt  # Import the jwt module  
 from flask.json.provider import DefaultJSONProvider
 from neo4j import GraphDatabase
@@ -53,6 +53,16 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'rout
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'backend\auth')))
 
 from backend.auth.security_bp import security_bp
+from graph.serialize import convert_dates, infer_visual_node_type, expanded_node_to_vis, GraphAccumulator
+from graph.wire import graph_response
+from graph.projection import load_projection_policy, set_projection_policy
+from graph.custom_graph import load_custom_graph as load_custom_graph_members
+from graph.schema import IV_NODE_CONSTRAINT, iv_node_constraint_exists
+from graph.context import bump_graph_version, configure_graph_context
+from ai.errors import AIError, ProviderRequestError
+from ai.registry import get_registry
+from ai.streaming import SSE_HEADERS, SSE_MIMETYPE, sse_answer, wants_event_stream
+from ai.types import ChatRequest
 
 SYSTEM_BUNDLE = (
     "You are a senior front-end engineer.  "
@@ -130,61 +140,8 @@ print("Loaded sections:", config.sections())
 if "NEO4J" in config:
     print("NEO4J URI from config:", config.get("NEO4J", "URI", fallback=None))
 
-# --- NEW: Ollama embedding config & helpers ---
-OLLAMA_URL = config.get("OLLAMA", "BASE", fallback=None)
-OLLAMA_EMB_MODEL = config.get("OLLAMA", "EMB_MODEL", fallback=None)
-
-def _ollama_post_embedding(text: str, timeout: int = 30):
-    """
-    Try common Ollama embedding endpoints and return a vector list on success.
-    Handles several response shapes returned by different Ollama clients.
-    """
-    if not OLLAMA_URL or not OLLAMA_EMB_MODEL:
-        raise RuntimeError("OLLAMA.BASE or OLLAMA.EMB.MODEL not configured in config.ini")
-
-    url_base = OLLAMA_URL.rstrip('/')
-    endpoints = [
-        "/api/embeddings",  # some clients
-        "/api/embed",       # other clients
-        "/api/embeds",
-    ]
-    payload_variants = [
-        {"model": OLLAMA_EMB_MODEL, "prompt": text},
-        {"model": OLLAMA_EMB_MODEL, "input": text},
-        {"model": OLLAMA_EMB_MODEL, "text": text},
-    ]
-    last_err = None
-    for ep in endpoints:
-        for payload in payload_variants:
-            try:
-                r = requests.post(f"{url_base}{ep}", json=payload, timeout=timeout)
-                if not r.ok:
-                    last_err = f"{r.status_code} {r.text}"
-                    continue
-                j = r.json()
-                # common shapes:
-                if isinstance(j, dict):
-                    if "embedding" in j and isinstance(j["embedding"], list):
-                        return j["embedding"]
-                    if "embeddings" in j:
-                        emb = j["embeddings"]
-                        if isinstance(emb, list) and emb:
-                            first = emb[0]
-                            if isinstance(first, dict) and "embedding" in first:
-                                return first["embedding"]
-                            if isinstance(first, list):
-                                return first
-                    if "data" in j and isinstance(j["data"], list):
-                        d0 = j["data"][0]
-                        if isinstance(d0, dict) and "embedding" in d0:
-                            return d0["embedding"]
-                # fallback: if top-level json is list and first element is list
-                if isinstance(j, list) and j and isinstance(j[0], list):
-                    return j[0]
-            except Exception as e:
-                last_err = str(e)
-                continue
-    raise RuntimeError(f"Failed to obtain embedding from Ollama. Last error: {last_err}")
+# What the graph UI receives of node properties ([GRAPH_UI] section, optional)
+set_projection_policy(load_projection_policy(config))
 
 # --- Neo4j Setup ---
 NEO4J_URI = config["NEO4J"]["URI"]
@@ -198,6 +155,15 @@ if not OPENAI_API_KEY:
 
 driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
 
+# id_rc lookups match on the IVNode label; without its unique constraint they
+# fall back to a label scan. See scripts/ivnode_upgrade/USAGE.txt.
+try:
+    with driver.session() as _session:
+        if not iv_node_constraint_exists(_session):
+            print(f"WARNING: constraint {IV_NODE_CONSTRAINT} missing; run scripts/ivnode_upgrade/01_add_ivnode_label.py")
+except Exception as e:
+    print(f"WARNING: could not check {IV_NODE_CONSTRAINT}: {e}")
+
 # --- initialize route modules that need the driver BEFORE registering blueprints ---
 # import module object, call its init_driver(driver), then import their blueprints
 import routes.createNodeTypes as createNodeTypes
@@ -218,12 +184,21 @@ ops_vector.init_driver(driver)
 import routes.meeting_graph as meeting_graph
 meeting_graph.init_driver(driver)
 
+import routes.quiz_search as quiz_search
+quiz_search.init_driver(driver)
+
+import routes.graph_api as graph_api
+graph_api.init_driver(driver)
+
+# Cached prompt grounding context for the AI endpoints ([GRAPH_CONTEXT] section, optional)
+configure_graph_context(driver, config)
+
 # if other route modules expose init_driver, do the same:
 # import routes.createRelationsTypes as createRelationsTypes
 # createRelationsTypes.init_driver(driver)
 
 # Now import blueprints and register them
-from routes.createNodeTypes import nodes_bp, get_node_types, get_node_type_visuals, add_node_type, update_node_properties, test_post, create_name_indexes, get_custom_graphs
+from routes.createNodeTypes import nodes_bp, get_node_types, get_node_type_visuals, add_node_type, update_node_properties, test_post, create_name_indexes, get_custom_graphs, get_node_type, get_node_type_registry
 from routes.createRelationsTypes import relations_bp, get_edge_types
 from routes.ai_graph import ai_graph_bp
 from routes.global_search import global_search_bp
@@ -231,6 +206,8 @@ from routes.retrieval import retrieval_bp
 from routes.ops_vector import ops_vector_bp
 from routes.templates_api import bp as templates_api_bp
 from routes.meeting_graph import meeting_graph_bp
+from routes.quiz_search import quiz_search_bp
+from routes.graph_api import graph_api_bp
 
 # Register Blueprints
 app.register_blueprint(relations_bp, url_prefix="/relations")
@@ -241,6 +218,8 @@ app.register_blueprint(retrieval_bp)
 app.register_blueprint(ops_vector_bp)
 app.register_blueprint(templates_api_bp, url_prefix="/api")
 app.register_blueprint(meeting_graph_bp)
+app.register_blueprint(quiz_search_bp)
+app.register_blueprint(graph_api_bp)
 
 @app.route("/")
 def root():
@@ -325,70 +304,11 @@ def quiz_results_page():
     project = user_data["project"]        
     return render_template("quiz_results.html")
 
-# --- NEW: vector search API used by quiz front-end ---
-@app.post("/api/quiz/search")
-def api_quiz_search():
-  # Validate JWT and extract user data
-    user_data, error_response, status_code = validate_jwt()
-    if error_response:
-        return error_response, status_code
-
-    # Extract user data from JWT
-    uid = user_data["uid"]
-    project = user_data["project"]        
-    """
-    POST JSON: { "question": "...", "top_k": 6 }
-    Returns top matching Chunk nodes (id, text, score).
-    """
-    data = request.get_json() or {}
-    question = (data.get("question") or "").strip()
-    if not question:
-        return jsonify({"success": False, "error": "Missing 'question'"}), 400
-    try:
-        emb = _ollama_post_embedding(question)
-    except Exception as e:
-        app.logger.exception("Failed to get embedding")
-        return jsonify({"success": False, "error": str(e)}), 500
-
-    top_k = int(data.get("top_k", 6))
-    try:
-        with driver.session() as session:
-            # use the vector index; pass dimension = len(emb)
-            rows = session.run("""
-                CALL db.index.vector.queryNodes('chunk_embedding_index', $dim, $vec)
-                YIELD node, score
-                RETURN node.id_rc AS id, node.text AS text, score
-                ORDER BY score DESC
-                LIMIT $k
-            """, dim=len(emb), vec=emb, k=top_k).data()
-        return jsonify({"success": True, "rows": rows})
-    except Exception as e:
-        app.logger.exception("Neo4j vector query failed")
-        return jsonify({"success": False, "error": str(e)}), 500
-
 def render_page(page):
     if request.path.startswith('/api/') or request.path.startswith('/static/'):
         abort(404)
     return render_template(page)
 
-def convert_dates(obj):
-    """
-    Recursively convert datetime/date/neo4j.time.Date to ISO strings
-    in nested dict/list structures.
-    """
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    if type(obj).__module__.startswith('neo4j'):
-        return obj.isoformat() if hasattr(obj, 'isoformat') else str(obj)
-    if isinstance(obj, dict):
-        return {k: convert_dates(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [convert_dates(v) for v in obj]
-    if isinstance(obj, tuple):
-        return tuple(convert_dates(v) for v in obj)
-    return obj
-
-
 @app.route("/login")
 def login_page():
     return render_template("login.html")
@@ -438,22 +358,42 @@ def get_projects():
 
 
 
-def infer_visual_node_type(labels):
-    label_list = list(labels or [])
-    if not label_list:
-        return "Unknown"
+NDJSON_MIMETYPE = "application/x-ndjson"
 
-    excluded = {"CustomGraph", "customGraphNode", "customGraphNodePosition"}
 
-    for label in label_list:
-        if label not in excluded and label != "NodeType":
-            return label
+def _wants_ndjson():
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
 
-    for label in label_list:
-        if label not in excluded:
-            return label
 
-    return label_list[0]
+def _stream_cypher_ndjson(query, params, project):
+    """
+    Yields one JSON frame per line while the Neo4j cursor is consumed:
+    {"type": "node", "node": {...}} / {"type": "edge", "edge": {...}} for every
+    item seen for the first time, then a closing {"type": "summary", ...}.
+    Errors after the stream has started are reported as {"type": "error", ...}.
+    """
+    started = datetime.now()
+    graph = GraphAccumulator(project=project, retain=False)
+    try:
+        with driver.session() as session:
+            result = session.run(query, params)
+            for record in result:
+                for kind, item in graph.add_record(record):
+                    yield app.json.dumps({"type": kind, kind: item}) + "\n"
+
+        elapsed_ms = int((datetime.now() - started).total_seconds() * 1000)
+        print(f"[{datetime.now()}] run-cypher stream done. Nodes: {graph.node_count}, Edges: {graph.edge_count}, {elapsed_ms} ms")
+        yield app.json.dumps({
+            "type": "summary",
+            "success": True,
+            "nodes": graph.node_count,
+            "edges": graph.edge_count,
+            "elapsed_ms": elapsed_ms,
+        }) + "\n"
+    except Exception as e:
+        print(f"Error in run_cypher stream: {e}")
+        yield app.json.dumps({"type": "error", "success": False, "error": str(e)}) + "\n"
 
 
 @app.route("/run-cypher", methods=["POST"])
@@ -470,101 +410,37 @@ def run_cypher():
         data = request.json or {}
         query = data.get("query")
         project = data.get("project")  # <-- NEW: current project from frontend
+        # Query parameters, e.g. from /api/search/build-cypher (stable text, cached plans)
+        params = data.get("params") or {}
+        if not isinstance(params, dict):
+            return jsonify({"success": False, "error": "params must be an object"}), 400
         print("run-cpyher query: ", query)
         print("run-cpyher project: ", project)
 
-        nodes = {}
-        edges = []
+        # Opt-in streaming: "Accept: application/x-ndjson"
+        if _wants_ndjson():
+            return Response(
+                stream_with_context(_stream_cypher_ndjson(query, params, project)),
+                mimetype=NDJSON_MIMETYPE,
+                headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"},
+            )
 
         print(f"[{datetime.now()}] Start.")
 
+        graph = GraphAccumulator(project=project)
         with driver.session() as session:
-            result = session.run(query)
-            for record in result:
-                for value in record.values():
-                    # Debugging
-                    print("Debugging value:", value)
-                    print("Labels 1:", getattr(value, "labels", None))
-
-                    # ---- NODES ----
-                    if hasattr(value, "id") and hasattr(value, "labels"):
-                        properties = dict(value)
-
-                        # FILTER BY PROJECT for nodes
-                        if project and properties.get("projectName") != project:
-                            # Node is from another project -> skip
-                            continue
-
-                        node_id = properties.get("id_rc", str(value.id))
-                        if node_id not in nodes:
-                            properties = convert_dates(properties)
-
-                            full_name = properties.get("name", f"Node {node_id}")
-                            short_name = full_name.split(".")[-1]
-                            nodeType = infer_visual_node_type(value.labels)
-
-                            nodes[node_id] = {
-                                "id": node_id,
-                                "label": short_name,
-                                "nodeType": nodeType,
-                                "labels": list(value.labels),
-                                "properties": properties
-                            }
-
-                    # ---- RELATIONSHIPS ----
-                    if hasattr(value, "start_node") and hasattr(value, "end_node"):
-                        print("run_cypher relationship edges:", value)
-
-                        rel_props = dict(value)
-                        start_props = dict(value.start_node)
-                        end_props   = dict(value.end_node)
-
-                        # FILTER BY PROJECT for relationships
-                        if project:
-                            start_proj = start_props.get("projectName")
-                            end_proj   = end_props.get("projectName")
-
-                            # if neither end is in this project, skip the relationship
-                            if start_proj != project and end_proj != project:
-                                continue
-
-                        start_id = start_props.get("id_rc", str(value.start_node.id))
-                        end_id   = end_props.get("id_rc", str(value.end_node.id))
-                        rel_id   = rel_props.get("id_rc") or str(value.id)
-
-                        edge = {
-                            "id": rel_id,
-                            "from": start_id,
-                            "to": end_id,
-                            "type": value.type,
-                            "label": value.type
-                        }
-
-                        print("DEBUG: Edge deduplication check:", rel_id)
-                        edge = convert_dates(edge)
-
-                        if edge not in edges:
-                            edges.append(edge)
-
-        # Convert all dates/datetimes to strings on the FULL payload
+            graph.add_records(session.run(query, params))
+
         payload = {
             "success": True,
-            "nodes": list(nodes.values()),
-            "edges": edges,
+            "nodes": graph.nodes,
+            "edges": graph.edges,
         }
-        payload = convert_dates(payload)
-
-        print("DEBUG payload repr in run_cypher:")
-        print(repr(payload))   # <--- NEW: raw repr, no JSON encoding
 
         print(f"[{datetime.now()}] Stop.")
         print(f"[{datetime.now()}] Nodes: {len(payload['nodes'])}, Edges: {len(payload['edges'])}")
-        try:
-            print(json.dumps(payload, indent=4))
-        except TypeError as e:
-            print("DEBUG json.dumps failed in run_cypher:", e)
 
-        return jsonify(payload)
+        return graph_response(payload)
     except Exception as e:
         print(f"Error in run_cypher: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -593,20 +469,12 @@ def add_node():
         if not node_name or not node_label:
             return jsonify({"success": False, "error": "Missing 'name' or 'label' in request"}), 400
 
-        # Query to fetch properties of the corresponding NodeType
-        node_type_query = """
-        MATCH (t:NodeType {name: $label})
-        RETURN t
-        """
+        # Properties of the corresponding NodeType (from the NodeType registry)
+        node_type_properties = get_node_type(node_label)
+        if not node_type_properties:
+            return jsonify({"success": False, "error": f"NodeType '{node_label}' not found"}), 404
 
         with driver.session() as session:
-            # Fetch NodeType properties
-            result = session.run(node_type_query, label=node_label)
-            record = result.single()
-            if not record:
-                return jsonify({"success": False, "error": f"NodeType '{node_label}' not found"}), 404
-
-            node_type_properties = dict(record["t"])  # Extract NodeType properties
             print("NodeType properties before filtering:", node_type_properties)  # Debugging log
 
             excluded_keys = {"size", "id_rc", "id", "name"}  # avoid clobbering generated id_rc and node name
@@ -618,7 +486,7 @@ def add_node():
 
             # Add the new node with combined properties including id_rc
             create_node_query = f"""
-            CREATE (n:{node_label} {{name: $name, id_rc: $id_rc, image: $image}})
+            CREATE (n:{node_label}:IVNode {{name: $name, id_rc: $id_rc, image: $image}})
             SET n += $properties
             RETURN n.id_rc AS node_id, labels(n) AS labels
             """
@@ -631,6 +499,7 @@ def add_node():
                 node_id = record["node_id"]
                 node_labels = record["labels"]
                 print("Node created with id_rc:", node_id, "and labels:", node_labels)  # Debugging log
+                bump_graph_version(project)
                 return jsonify({"success": True, "node_id": node_id, "labels": node_labels})
             else:
                 return jsonify({"success": False, "error": "Failed to create node"}), 500
@@ -656,7 +525,7 @@ def update_node():
         return jsonify({"success": False, "error": "Missing node ID or name"}), 400
 
     query = """
-    MATCH (n)
+    MATCH (n:IVNode)
     WHERE n.id_rc = $node_id
     SET n.name = $new_name
     RETURN n.name AS updated_name
@@ -721,15 +590,12 @@ def expand_node():
             edge_type_filter = "AND type(r) IN $edge_types"
 
         
+        # Seed by the unique IVNode(id_rc) index; IVNode never carries layout labels
         query = """
-        MATCH (n)-[r]-(m)
-        WHERE (n.id_rc = $node_id OR m.id_rc = $node_id)
-        AND NOT 'CustomGraph' IN labels(n)
-        AND NOT 'CustomGraph' IN labels(m)
-        AND NOT 'customGraphNode' IN labels(n)
-        AND NOT 'customGraphNode' IN labels(m)
-        AND NOT 'customGraphNodePosition' IN labels(n)
-        AND NOT 'customGraphNodePosition' IN labels(m)
+        MATCH (s:IVNode {id_rc: $node_id})-[r]-(other)
+        WHERE NOT 'CustomGraph' IN labels(other)
+        AND NOT 'customGraphNode' IN labels(other)
+        AND NOT 'customGraphNodePosition' IN labels(other)
         """ + edge_type_filter + """
         WITH DISTINCT r, startNode(r) AS n, endNode(r) AS m
         RETURN n, r, m
@@ -774,17 +640,7 @@ def expand_node():
                     if not node_id_rc or node_id_rc in nodes_dict:
                         continue
 
-                    _full_name = node.get("name") or (list(node.labels)[0] if node.labels else "Unknown")
-                    nodes_dict[node_id_rc] = {
-                        "id": node_id_rc,
-                        "id_rc": node_id_rc,
-                        "label": _full_name.split(".")[-1] if _full_name else _full_name,
-                        "nodeType": infer_visual_node_type(node.labels),
-                        "labels": list(node.labels),
-                        "properties": dict(node),
-                        "color": node.get("color", "#97C2FC"),
-                        "shape": node.get("shape", "ellipse"),
-                    }
+                    nodes_dict[node_id_rc] = expanded_node_to_vis(node)
 
                 # --- edges ---
                 print("********************")
@@ -828,8 +684,7 @@ def expand_node():
             "edges": list(edges_dict.values()),
         }
         payload = convert_dates(payload)
-        print("DEBUG: expand_node response payload:", payload)
-        return jsonify(payload)
+        return graph_response(payload)
 
     except Exception as e:
         import traceback
@@ -880,12 +735,13 @@ def delete_selected():
             # Delete nodes
             if selected_nodes:
                 query = """
-                MATCH (n)
+                MATCH (n:IVNode)
                 WHERE n.id_rc IN $node_ids
                 DETACH DELETE n
                 """
                 print(f"Executing query: {query} with node_ids: {selected_nodes}")
                 session.run(query, node_ids=selected_nodes)
+        bump_graph_version(project)
 
         return jsonify({"success": True})
     except Exception as e:
@@ -926,7 +782,7 @@ def edit_node(node_id):
     try:
         with driver.session() as session:
             query = """
-            MATCH (n)
+            MATCH (n:IVNode)
             WHERE n.id_rc = $node_id
             RETURN n.name_unique AS name_unique
             """
@@ -940,7 +796,7 @@ def edit_node(node_id):
                 name_unique = f"node_{node_id}_{uuid.uuid4().hex[:8]}"
                 print(f"Generating name_unique for node {node_id}: {name_unique}")
                 update_query = """
-                MATCH (n)
+                MATCH (n:IVNode)
                 WHERE n.id_rc = $node_id
                 SET n.name_unique = $name_unique
                 RETURN n.name_unique AS name_unique
@@ -1052,7 +908,7 @@ def edit_node_v4(node_id):
         with driver.session() as session:
             # Fetch the node's name and unique identifier
             query = """
-            MATCH (n)
+            MATCH (n:IVNode)
             WHERE n.id_rc = $node_id
             RETURN n.name AS node_name, n.name_unique AS name_unique
             """
@@ -1069,7 +925,7 @@ def edit_node_v4(node_id):
                 # Generate a unique value if `name_unique` doesn't exist
                 name_unique = f"node_{node_id}_{uuid.uuid4().hex[:8]}"
                 update_query = """
-                MATCH (n)
+                MATCH (n:IVNode)
                 WHERE n.id_rc = $node_id
                 SET n.name_unique = $name_unique
                 RETURN n.name_unique AS name_unique
@@ -1185,7 +1041,7 @@ def show_html(node_id):
         # Fetch the unique name for the node
         with driver.session() as session:
             query = """
-            MATCH (n)
+            MATCH (n:IVNode)
             WHERE n.id_rc = $node_id
             RETURN n.name_unique AS name_unique
             """
@@ -1242,123 +1098,13 @@ def load_custom_graph(customLoadGraphName):
     uid = user_data["uid"]
     project = user_data["project"]
 
-    queryNodes = """
-        MATCH (s:CustomGraph)-[r]-(t)
-        WHERE s.name = $customLoadGraphName
-        WITH t
-        MATCH (origNode)
-        WHERE t.original_id = origNode.id_rc
-        MATCH (ntype:NodeType) WHERE ntype.name IN labels(origNode)
-        RETURN origNode, t.x AS x, t.y AS y, ntype.size AS size, t
-    """
-
-    queryNodeType = """
-        MATCH (s:NodeType)
-        WHERE s.name = $NodeTypeName
-        RETURN s
-    """
-
-    print("loadCustomGraph query:", queryNodes)
-
     try:
         with driver.session() as session:
-            result = session.run(queryNodes, customLoadGraphName=customLoadGraphName)
-
-            nodes = {}
-            edges = []
-
-            for record in result:
-                origNode = record["origNode"]
-                tNode = record["t"]
-
-                # FILTER BY PROJECT for nodes
-                origNodeProp = dict(origNode)
-                print("origNodeProp: "+ origNodeProp.get("projectName") +" : project: "+ project)
-                if project and origNodeProp.get("projectName") != project:
-                    print(f"Skipping node: {origNodeProp.get('name')} (projectName: {origNodeProp.get('projectName')})")
-                    continue
-
-                origNode_name = origNodeProp.get("name", str(origNode.id))
-                origNode_id = origNodeProp.get("id_rc", str(origNode.id))
-                origNodeLabels = list(origNode.labels)
-
-                resultNodeType = session.run(queryNodeType, NodeTypeName=origNodeLabels[0])
-                recordNodeType = resultNodeType.single()
-                print("recordNodeType:", recordNodeType)
-
-                # Assuming `recordNodeType` is the Record object you provided
-                node_data = recordNodeType["s"]  # Access the Node object from the Record
-                node_properties = dict(node_data)  # Convert the Node object to a dictionary
-                shape_value = node_properties.get("shape")  # Extract the value for the key 'shape'
-
-                x = record["x"]
-                y = record["y"]
-                size = record["size"]
-                full_name = origNode_name  # Extract name property
-                short_name = full_name.split(".")[-1]  # Get last part after the last dot
-                nodes[origNode_id] = {
-                    "id": origNode_id,
-                    "label": short_name,
-                    "name": full_name,
-                    "shape": shape_value,
-                    "color": node_properties.get("color", "#97C2FC"),
-                    "image": origNodeProp.get("image", ""),
-                    "x": x,
-                    "y": y,
-                    "size": size,
-                    "labels": origNodeLabels,  # Include all labels
-                    "properties": convert_dates(convert_neo4j_id(origNode))  # Convert properties
-                }
-                print("Node added:", nodes[origNode_id])
-
-                # Find relationships for this node
-                rel_query = """
-                    MATCH (n)-[r]->(m)
-                    WHERE (n.id_rc = $node_id OR m.id_rc = $node_id)
-                      AND NOT 'CustomGraph' IN labels(m)
-                      AND NOT 'customGraphNode' IN labels(m)
-                      AND NOT 'customGraphNodePosition' IN labels(m)
-                      AND NOT 'CustomGraph' IN labels(n)
-                      AND NOT 'customGraphNode' IN labels(n)
-                      AND NOT 'customGraphNodePosition' IN labels(n)
-                    RETURN n, r, m
-                """
-                rel_result = session.run(rel_query, node_id=origNode_id)
-                for rel_record in rel_result:
-                    n_node = rel_record["n"]
-                    m_node = rel_record["m"]
-                    relationship = rel_record["r"]
-
-                    # FILTER BY PROJECT for relationships
-                    n_props = dict(n_node)
-                    m_props = dict(m_node)
-                    if project:
-                        n_proj = n_props.get("projectName")
-                        m_proj = m_props.get("projectName")
-                        if n_proj != project and m_proj != project:
-                            print(f"Skipping relationship: {relationship} (projects: {n_proj}, {m_proj})")
-                            continue
-
-                    # Process relationship
-                    rel_props = dict(relationship)
-                    rel_id = rel_props.get("id_rc") or str(relationship.id)
-                    start_props = dict(relationship.start_node)
-                    end_props = dict(relationship.end_node)
-                    edge = {
-                        "id": rel_id,
-                        "from": start_props.get("id_rc", str(relationship.start_node.id)),
-                        "to": end_props.get("id_rc", str(relationship.end_node.id)),
-                        "type": relationship.type,
-                        "label": relationship.type  # Set the label to the relationship type
-                    }
-
-                    if edge not in edges:
-                        edges.append(edge)
+            graph = load_custom_graph_members(session, customLoadGraphName, project or None, get_node_type_registry())
 
-            print("Load graph completed")
-            print("list(nodes.values()):", list(nodes.values()))
-            payload = {"success": True, "nodes": list(nodes.values()), "edges": edges}
-            return jsonify(convert_dates(payload))
+        print(f"Load graph completed: {len(graph['nodes'])} nodes, {len(graph['edges'])} edges")
+        payload = {"success": True, "nodes": graph["nodes"], "edges": graph["edges"]}
+        return graph_response(payload)
 
     except Exception as e:
         app.logger.exception("Error in loadCustomGraph")  # Logs file:line + stack
@@ -1461,69 +1207,63 @@ def openai_cypher():
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
 
-    # Otherwise send to OpenAI for analysis (no DB execution)
-    payload = {
-        "model": "gpt-4o-mini",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.0,
-        "max_tokens": 2000
-    }
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    # Otherwise send to OpenAI for analysis (no DB execution). Temperature 0,
+    # so a repeated prompt is answered from the response cache.
+    chat_request = ChatRequest(
+        system="",
+        user=prompt,
+        model="gpt-4o-mini",
+        temperature=0.0,
+        max_tokens=2000,
+        no_cache=bool(data.get("no_cache")),
+    )
 
     try:
-        resp = requests.post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers, timeout=30)
-
+        resp = get_registry().get_provider("openai").chat(chat_request)
+    except ProviderRequestError as e:
         # Handle billing / quota / rate-limit explicitly for clearer client messages
-        if resp.status_code == 402:
+        if e.status_code == 402:
             # Payment required / insufficient funds
-            body = resp.json() if resp.headers.get("Content-Type", "").startswith("application/json") else {"text": resp.text}
-            return jsonify({"success": False, "error": "Payment required: insufficient funds or billing issue", "detail": body}), 402
-
-        if resp.status_code == 429:
-            body = resp.json() if resp.headers.get("Content-Type", "").startswith("application/json") else {"text": resp.text}
-            retry_after = resp.headers.get("Retry-After")
-            return jsonify({"success": False, "error": "Rate limited or quota exhausted", "retry_after": retry_after, "detail": body}), 429
-
-        resp.raise_for_status()
-        body = resp.json()
-        content = (body.get("choices", [{}])[0].get("message", {}) or {}).get("content", "") or ""
-        content = _strip_fences(content)
-        # Debug: print raw OpenAI content (trimmed)
-        try:
-            print("OpenAI raw content (trimmed 10000 chars):\n", content[:10000])
-        except Exception:
-            print("OpenAI raw content: <unprintable>")
+            return jsonify({"success": False, "error": "Payment required: insufficient funds or billing issue", "detail": str(e)}), 402
+        if e.status_code == 429:
+            return jsonify({"success": False, "error": "Rate limited or quota exhausted", "retry_after": e.retry_after, "detail": str(e)}), 429
+        return jsonify({"success": False, "error": str(e)}), 500
+    except AIError as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        import re
+    content = _strip_fences(resp.text)
+    # Debug: print raw OpenAI content (trimmed)
+    try:
+        print("OpenAI raw content (trimmed 10000 chars):\n", content[:10000])
+    except Exception:
+        print("OpenAI raw content: <unprintable>")
 
-        def extract_code_block(text: str) -> str | None:
-            # 1) fenced code block, optionally labeled "cypher"
-            m = re.search(r"```(?:\s*cypher\s*\n)?(.*?)```", text, re.S | re.I)
-            if m:
-                return m.group(1).strip()
-            # 2) fallback: find a Cypher-looking line starting with MATCH
-            m2 = re.search(r"(?i)(MATCH\s+[\s\S]*?)(?:$|\n{2,})", text)
-            if m2:
-                return m2.group(1).strip()
-            return None
-
-        # ensure assistant_text is defined (use the extracted/stripped content)
-        assistant_text = content
-        suggested_cypher = extract_code_block(assistant_text)
-        print("suggested_cypher:", suggested_cypher)
-        # return assistant text plus parsed cypher (no DB execution here)
-        return jsonify({
-            "success": True,
-            "executed": False,
-            "response": assistant_text,
-            "suggested_cypher": suggested_cypher,
-            "raw": body
-        })
-    except requests.RequestException as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    import re
+
+    def extract_code_block(text: str) -> str | None:
+        # 1) fenced code block, optionally labeled "cypher"
+        m = re.search(r"```(?:\s*cypher\s*\n)?(.*?)```", text, re.S | re.I)
+        if m:
+            return m.group(1).strip()
+        # 2) fallback: find a Cypher-looking line starting with MATCH
+        m2 = re.search(r"(?i)(MATCH\s+[\s\S]*?)(?:$|\n{2,})", text)
+        if m2:
+            return m2.group(1).strip()
+        return None
+
+    # ensure assistant_text is defined (use the extracted/stripped content)
+    assistant_text = content
+    suggested_cypher = extract_code_block(assistant_text)
+    print("suggested_cypher:", suggested_cypher)
+    # return assistant text plus parsed cypher (no DB execution here)
+    return jsonify({
+        "success": True,
+        "executed": False,
+        "response": assistant_text,
+        "suggested_cypher": suggested_cypher,
+        "cached": resp.cached,
+        "raw": resp.raw
+    })
 
 def _extract_code_block(text: str) -> str | None:
     import re
@@ -1544,7 +1284,7 @@ from html import unescape
 def ensure_name_unique(session, node_id: str) -> str:
     """Ensure n.name_unique is set and return it."""
     q = """
-    MATCH (n) WHERE n.id_rc = $node_id
+    MATCH (n:IVNode) WHERE n.id_rc = $node_id
     RETURN n.name_unique AS name_unique
     """
     rec = session.run(q, node_id=node_id).single()
@@ -1552,7 +1292,7 @@ def ensure_name_unique(session, node_id: str) -> str:
         return rec["name_unique"]
     name_unique = f"node_{node_id}_{uuid.uuid4().hex[:8]}"
     session.run("""
-        MATCH (n) WHERE n.id_rc = $node_id
+        MATCH (n:IVNode) WHERE n.id_rc = $node_id
         SET n.name_unique = $name_unique
     """, node_id=node_id, name_unique=name_unique)
     return name_unique
@@ -1673,8 +1413,6 @@ def openai_generate():
     except Exception:
         max_tokens = 2500
 
-    headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
-
     if mode == "split":
         # Ask for structured JSON with separate html/css/js
         messages = [
@@ -1688,24 +1426,20 @@ def openai_generate():
             {"role": "user", "content": f" {prompt}"}
         ]
 
-    payload = {
-        "model": model,
-        "messages": messages,
-        "temperature": temperature,
-        "max_tokens": max_tokens
-    }
+    # Only temperature-0 requests are served from the response cache.
+    chat_request = ChatRequest(
+        system=messages[0]["content"],
+        user=messages[1]["content"],
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        no_cache=bool(data.get("no_cache")),
+    )
 
     try:
-        r = requests.post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers, timeout=45)
-
-        if r.status_code in (402, 429):
-            body = r.json() if r.headers.get("Content-Type", "").startswith("application/json") else {"text": r.text}
-            return jsonify({"success": False, "error": "OpenAI error", "detail": body}), r.status_code
-
-        r.raise_for_status()
-        body = r.json()
-        content = (body.get("choices", [{}])[0].get("message", {}) or {}).get("content", "") or ""
-        content = _strip_fences(content)
+        resp = get_registry().get_provider("openai").chat(chat_request)
+        body = resp.raw
+        content = _strip_fences(resp.text)
         # Debug: print raw OpenAI content (trimmed)
         try:
             print("OpenAI raw content (trimmed 10000 chars):\n", content[:10000])
@@ -1775,6 +1509,7 @@ def openai_generate():
                 "css": css,
                 "js": js,
                 "code": bundled,   # keep legacy 'code' as a ready-to-render doc
+                "cached": resp.cached,
                 "raw": body
             })
 
@@ -1789,13 +1524,15 @@ def openai_generate():
             "success": True,
             "html": content,   # complete document
             "code": content,   # legacy field
+            "cached": resp.cached,
             "raw": body
         })
 
-    
-    
-
-    except requests.RequestException as e:
+    except ProviderRequestError as e:
+        if e.status_code in (402, 429):
+            return jsonify({"success": False, "error": "OpenAI error", "detail": str(e)}), e.status_code
+        return jsonify({"success": False, "error": str(e)}), 500
+    except AIError as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/assessment")
@@ -1920,6 +1657,17 @@ def ask_question():
         return jsonify({"success": False, "error": "OPENAI_API_KEY not set"}), 500
 
     prompt = f"Context:\n{context}\n\nQuestion:\n{question}"
+
+    # Opt-in streaming: "Accept: text/event-stream"
+    if wants_event_stream(request):
+        provider = get_registry().get_provider("openai")
+        chat_request = ChatRequest(system="", user=prompt, model="gpt-4.1-mini", temperature=0.2, max_tokens=500)
+        return Response(
+            stream_with_context(sse_answer({"context_chars": len(context)}, provider.chat_stream(chat_request), {"model": chat_request.model})),
+            mimetype=SSE_MIMETYPE,
+            headers=SSE_HEADERS,
+        )
+
     payload = {
         "model": "gpt-4.1-mini",
         "messages": [{"role": "user", "content": prompt}],
@@ -2031,7 +1779,7 @@ def get_edge_types_for_node(node_id):
 
     try:
         query = """
-        MATCH (n)-[r]->() WHERE n.id_rc = $node_id
+        MATCH (n:IVNode)-[r]->() WHERE n.id_rc = $node_id
         RETURN DISTINCT type(r) AS edge_type
         """
         with driver.session() as session:
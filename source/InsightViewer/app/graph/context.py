@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import configparser
+import threading
+import time
+from dataclasses import dataclass, field, replace
 from typing import Any, Iterable
 
+from graph.schema import IV_NODE_LABEL
+
 
 @dataclass(frozen=True)
 class GraphContext:
@@ -10,6 +15,7 @@ class GraphContext:
     labels: list[str]
     rel_types: list[str]
     sample_nodes: list[dict[str, Any]]
+    node_type_names: list[str] = field(default_factory=list)
 
 
 def _flatten_labels(rows: Iterable[dict[str, Any]]) -> list[str]:
@@ -18,7 +24,8 @@ def _flatten_labels(rows: Iterable[dict[str, Any]]) -> list[str]:
         ls = r.get("labels") or []
         if isinstance(ls, list):
             for x in ls:
-                if isinstance(x, str) and x:
+                # IVNode is on every domain node; it tells the model nothing
+                if isinstance(x, str) and x and x != IV_NODE_LABEL:
                     out.add(x)
     return sorted(out)
 
@@ -82,6 +89,155 @@ def fetch_graph_context(session, project: str | None, sample_limit: int = 8) ->
     return GraphContext(project=proj, labels=labels, rel_types=rel_types, sample_nodes=sample_nodes)
 
 
+def fetch_node_type_names(session, project: str | None) -> list[str]:
+    """NodeType names for the project (plus shared ones); all names if the project has none."""
+    cypher = """
+    MATCH (n:NodeType)
+    WHERE $project IS NULL OR n.projectName = $project OR n.projectName IS NULL
+    RETURN DISTINCT n.name AS name
+    ORDER BY name
+    LIMIT 200
+    """
+    rows = session.run(cypher, project=project).data()
+    if not rows and project:
+        rows = session.run(cypher, project=None).data()
+    return [str(row.get("name") or "").strip() for row in rows if str(row.get("name") or "").strip()]
+
+
+@dataclass
+class _CacheEntry:
+    ctx: GraphContext
+    version: int
+    fetched_at: float
+
+
+class GraphContextCache:
+    """
+    Per-project GraphContext cache for prompt grounding.
+
+    Entries hold the largest sample (max_sample_limit); callers get a copy with
+    their sample_limit applied. bump() is called by write paths: it invalidates
+    the project (and the all-projects entry) and re-warms it in a background
+    thread. An entry older than ttl_seconds is still served once while a
+    background refresh replaces it.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, max_sample_limit: int = 30):
+        self.ttl_seconds = ttl_seconds
+        self.max_sample_limit = max_sample_limit
+        self._lock = threading.Lock()
+        self._entries: dict[str | None, _CacheEntry] = {}
+        self._versions: dict[str | None, int] = {}
+        self._global_version = 0
+        self._refreshing: set[str | None] = set()
+        self._driver = None
+
+    @staticmethod
+    def _key(project: str | None) -> str | None:
+        return (project or "").strip() or None
+
+    def _version(self, key: str | None) -> int:
+        return self._global_version + self._versions.get(key, 0)
+
+    def _fetch(self, driver, key: str | None) -> GraphContext:
+        with driver.session() as session:
+            ctx = fetch_graph_context(session, key, sample_limit=self.max_sample_limit)
+            return replace(ctx, node_type_names=fetch_node_type_names(session, key))
+
+    def _store(self, key: str | None, ctx: GraphContext, version: int) -> None:
+        with self._lock:
+            # a bump during the fetch makes this result stale already
+            if version == self._version(key):
+                self._entries[key] = _CacheEntry(ctx, version, time.monotonic())
+
+    def _refresh(self, driver, key: str | None) -> None:
+        try:
+            with self._lock:
+                version = self._version(key)
+            self._store(key, self._fetch(driver, key), version)
+        except Exception as e:
+            print(f"GraphContext refresh failed for project={key!r}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_async(self, driver, key: str | None) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(driver, key), daemon=True).start()
+
+    def get(self, driver, project: str | None, sample_limit: int = 8) -> GraphContext:
+        key = self._key(project)
+        with self._lock:
+            self._driver = driver
+            version = self._version(key)
+            entry = self._entries.get(key)
+
+        if entry is None or entry.version != version:
+            ctx = self._fetch(driver, key)
+            self._store(key, ctx, version)
+        else:
+            ctx = entry.ctx
+            if time.monotonic() - entry.fetched_at > self.ttl_seconds:
+                self._refresh_async(driver, key)
+        return replace(ctx, sample_nodes=ctx.sample_nodes[:max(0, int(sample_limit))])
+
+    def bump(self, project: str | None = None) -> None:
+        """Invalidate after a write; project=None invalidates every project."""
+        key = self._key(project)
+        with self._lock:
+            if key is None:
+                self._global_version += 1
+                keys = list(self._entries)
+            else:
+                self._versions[key] = self._versions.get(key, 0) + 1
+                self._versions[None] = self._versions.get(None, 0) + 1
+                keys = [k for k in (key, None) if k in self._entries]
+            driver = self._driver
+        if driver is not None:
+            for k in keys:
+                self._refresh_async(driver, k)
+
+    def warm(self, driver, projects: Iterable[str | None]) -> None:
+        """Load the given projects in the background (e.g. at startup)."""
+        with self._lock:
+            self._driver = driver
+        for project in projects:
+            self._refresh_async(driver, self._key(project))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+graph_context_cache = GraphContextCache()
+
+
+def get_graph_context(driver, project: str | None, sample_limit: int = 8) -> GraphContext:
+    """Cached fetch_graph_context plus NodeType names, see GraphContextCache."""
+    return graph_context_cache.get(driver, project, sample_limit)
+
+
+def bump_graph_version(project: str | None = None) -> None:
+    graph_context_cache.bump(project)
+
+
+def configure_graph_context(driver, cfg: configparser.ConfigParser | None = None) -> None:
+    """
+    Reads the optional [GRAPH_CONTEXT] section and warms the listed projects:
+      TTL_SECONDS = 300
+      WARM_PROJECTS = ProjectA, ProjectB
+    """
+    if cfg is None or not cfg.has_section("GRAPH_CONTEXT"):
+        return
+    section = cfg["GRAPH_CONTEXT"]
+    graph_context_cache.ttl_seconds = section.getfloat("TTL_SECONDS", graph_context_cache.ttl_seconds)
+    projects = [p.strip() for p in section.get("WARM_PROJECTS", "").split(",") if p.strip()]
+    graph_context_cache.warm(driver, projects)
+
+
 def format_context_for_prompt(ctx: GraphContext) -> str:
     parts: list[str] = []
     parts.append("Graph context:")
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+from graph.projection import project_vis_node
+from graph.schema import IV_NODE_LABEL
+from graph.serialize import convert_dates
+
+
+# One row per layout member: saved position and the original node. NodeType
+# visuals come from the caller's NodeType registry.
+LAYOUT_MEMBERS_CYPHER = """
+MATCH (s:CustomGraph)-[]-(t)
+WHERE s.name = $name
+MATCH (orig:IVNode {id_rc: t.original_id})
+WHERE ($project IS NULL OR orig.projectName = $project)
+RETURN orig, t.x AS x, t.y AS y
+"""
+
+# Relationships among the layout members only (induced subgraph).
+LAYOUT_EDGES_CYPHER = """
+UNWIND $ids AS member_id
+MATCH (n:IVNode {id_rc: member_id})-[r]->(m:IVNode)
+WHERE m.id_rc IN $ids
+RETURN n.id_rc AS from, m.id_rc AS to, type(r) AS type, r.id_rc AS rel_id_rc, id(r) AS rel_id
+"""
+
+
+def _member_node(record, node_types: Mapping[str, Mapping[str, Any]]) -> dict[str, Any] | None:
+    orig = record["orig"]
+    labels = list(orig.labels)
+    # size, shape and color from the NodeType of the first typed label
+    # (IVNode is on every member and names no type); untyped members are skipped
+    size_types = [node_types[label] for label in labels if label != IV_NODE_LABEL and label in node_types]
+    if not size_types:
+        return None
+    vis = size_types[0]
+
+    props = dict(orig)
+    node_id = props.get("id_rc", str(orig.id))
+    full_name = props.get("name", str(orig.id))
+
+    properties = dict(props)
+    properties["id"] = node_id
+    return project_vis_node({
+        "id": node_id,
+        "label": full_name.split(".")[-1],
+        "name": full_name,
+        "shape": vis.get("shape"),
+        "color": vis.get("color") or "#97C2FC",
+        "image": props.get("image", ""),
+        "x": record["x"],
+        "y": record["y"],
+        "size": size_types[0].get("size"),
+        "labels": labels,
+        "properties": convert_dates(properties),
+    })
+
+
+def load_custom_graph(session, name: str, project: str | None,
+                      node_types: Mapping[str, Mapping[str, Any]]) -> dict[str, Any]:
+    """
+    Loads a saved layout in two queries: members with positions, then the
+    relationships between members. node_types maps NodeType name to its
+    properties. Returns {"nodes": [...], "edges": [...]}.
+    """
+    nodes: dict[str, dict[str, Any]] = {}
+    for record in session.run(LAYOUT_MEMBERS_CYPHER, name=name, project=project):
+        node = _member_node(record, node_types)
+        if node is not None:
+            nodes[node["id"]] = node
+
+    edges: dict[str, dict[str, Any]] = {}
+    if nodes:
+        rows = session.run(LAYOUT_EDGES_CYPHER, ids=list(nodes))
+        for row in rows:
+            rel_id = row["rel_id_rc"] or str(row["rel_id"])
+            if rel_id in edges:
+                continue
+            edges[rel_id] = {
+                "id": rel_id,
+                "from": row["from"],
+                "to": row["to"],
+                "type": row["type"],
+                "label": row["type"],
+            }
+
+    return {"nodes": list(nodes.values()), "edges": list(edges.values())}
@@ -0,0 +1,262 @@
+"""
+Per-project partitions of the Chunk vector index.
+
+A Neo4j 5 vector index cannot filter before ranking, so top-k from the global
+`chunk_embedding_index` is top-k over every project and a small project's
+chunks can be filtered away entirely. Each project's chunks therefore also
+carry a project label (`Chunk_<project>`) with their own vector index;
+querying the partition index makes k mean k within the project.
+
+Fulltext search needs no partition: `db.index.fulltext.queryNodes` returns
+every match, so the project filter after it loses nothing.
+
+`ensure_partition` labels the project's chunks and creates the index
+(idempotent); ingestion calls it after writing chunks or embeddings.
+Vector retrieval (`resolve_vector_index`, `partition_indexes`) uses the
+partition index when it is ONLINE and the global index otherwise.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+from typing import Any
+
+CHUNK_LABEL = "Chunk"
+GLOBAL_VECTOR_INDEXES = ("chunk_embedding_index", "chunk_embedding")
+EMBEDDING_PROPERTY = "embedding"
+
+# How long retrieval trusts a partition lookup before asking Neo4j again.
+LOOKUP_TTL_SECONDS = 60.0
+
+PARTITION_INDEXES_CYPHER = """
+SHOW INDEXES YIELD name, state
+WHERE name IN $names
+RETURN name, state
+"""
+
+VECTOR_INDEXES_CYPHER = """
+SHOW INDEXES YIELD name, type, labelsOrTypes, properties, options
+WHERE type = 'VECTOR'
+RETURN name, labelsOrTypes, properties, options
+"""
+
+
+class VectorDimensionError(ValueError):
+    """New embeddings do not fit the size the Chunk vector indexes were created for."""
+
+
+def partition_slug(project: str) -> str:
+    """Identifier-safe form of the project name; a hash suffix keeps distinct names apart."""
+    slug = re.sub(r"[^A-Za-z0-9_]", "_", project.strip())
+    if slug != project.strip():
+        slug += "_" + hashlib.blake2b(project.encode("utf-8"), digest_size=3).hexdigest()
+    return slug
+
+
+def partition_label(project: str) -> str:
+    return f"{CHUNK_LABEL}_{partition_slug(project)}"
+
+
+def vector_index_name(project: str) -> str:
+    return f"chunk_embedding_{partition_slug(project)}"
+
+
+def _detect_dimensions(session, project: str) -> int | None:
+    row = session.run(
+        f"""
+        MATCH (c:{CHUNK_LABEL} {{projectName: $project}})
+        WHERE c.{EMBEDDING_PROPERTY} IS NOT NULL
+        RETURN size(c.{EMBEDDING_PROPERTY}) AS dim
+        LIMIT 1
+        """,
+        project=project,
+    ).single()
+    return int(row["dim"]) if row and row["dim"] else None
+
+
+def _vector_index_ddl(name: str, label: str, dimensions: int, similarity: str) -> str:
+    return f"""
+    CREATE VECTOR INDEX {name} IF NOT EXISTS
+    FOR (c:`{label}`) ON (c.{EMBEDDING_PROPERTY})
+    OPTIONS {{indexConfig: {{
+      `vector.dimensions`: {int(dimensions)},
+      `vector.similarity_function`: '{similarity}'
+    }}}}
+    """
+
+
+def ensure_partition(session, project: str, dimensions: int | None = None, similarity: str = "cosine") -> dict[str, Any]:
+    """
+    Label the project's chunks and create its partition vector index. The
+    index needs the embedding size: taken from `dimensions` or an embedded
+    chunk, and skipped (reported as None) while the project has none.
+    Must run in an auto-commit session (labelling uses IN TRANSACTIONS).
+    """
+    label = partition_label(project)
+    labelled = session.run(
+        f"""
+        MATCH (c:{CHUNK_LABEL} {{projectName: $project}})
+        WHERE NOT c:`{label}`
+        CALL {{ WITH c SET c:`{label}` }} IN TRANSACTIONS OF 10000 ROWS
+        RETURN count(c) AS labelled
+        """,
+        project=project,
+    ).single()["labelled"]
+
+    dimensions = dimensions or _detect_dimensions(session, project)
+    vector = None
+    if dimensions:
+        vector = vector_index_name(project)
+        session.run(_vector_index_ddl(vector, label, dimensions, similarity)).consume()
+
+    _lookups.forget(project)
+    return {
+        "project": project,
+        "label": label,
+        "labelled": int(labelled or 0),
+        "vector_index": vector,
+        "dimensions": dimensions,
+    }
+
+
+def chunk_vector_indexes(session, project: str | None) -> list[dict[str, Any]]:
+    """
+    Vector indexes on `Chunk.embedding` that the project's chunks feed: the
+    global ones and the project's partition (every partition for None),
+    with their `dimensions` and `similarity`.
+    """
+    partition = partition_label(project) if project else None
+    found = []
+    for row in session.run(VECTOR_INDEXES_CYPHER).data():
+        labels = row.get("labelsOrTypes") or []
+        if list(row.get("properties") or []) != [EMBEDDING_PROPERTY] or len(labels) != 1:
+            continue
+        label = labels[0]
+        if label != CHUNK_LABEL and not (label == partition if partition else label.startswith(CHUNK_LABEL + "_")):
+            continue
+        config = (row.get("options") or {}).get("indexConfig") or {}
+        dimensions = config.get("vector.dimensions")
+        found.append({
+            "name": row["name"],
+            "label": label,
+            "dimensions": int(dimensions) if dimensions else None,
+            "similarity": str(config.get("vector.similarity_function") or "cosine").lower(),
+        })
+    return found
+
+
+def ensure_vector_dimensions(
+    session, project: str | None, dimensions: int, recreate: bool = False, include_global: bool = True
+) -> list[str]:
+    """
+    Check `dimensions` against `chunk_vector_indexes`. Neo4j leaves vectors of
+    another size out of an index without an error, so a mismatch raises
+    VectorDimensionError; with `recreate` the mismatched indexes are dropped
+    and created again for the new size instead. Returns the recreated names.
+
+    The global indexes serve every project; per-user callers pass
+    `include_global=False` so only the project's partition is checked and
+    recreated, and leave the global ones to an operator.
+    """
+    wrong = [
+        ix for ix in chunk_vector_indexes(session, project)
+        if ix["dimensions"] not in (None, dimensions) and (include_global or ix["label"] != CHUNK_LABEL)
+    ]
+    if not wrong:
+        return []
+    if not recreate:
+        found = ", ".join(f"{ix['name']} ({ix['dimensions']})" for ix in wrong)
+        raise VectorDimensionError(
+            f"Embeddings have {dimensions} dimensions but these vector indexes expect another size: {found}. "
+            "Recreate them for the new size (recreate_indexes / --recreate-indexes) "
+            "and re-embed every project that uses them."
+        )
+    for ix in wrong:
+        session.run(f"DROP INDEX {ix['name']} IF EXISTS").consume()
+        session.run(_vector_index_ddl(ix["name"], ix["label"], dimensions, ix["similarity"])).consume()
+    if project and not include_global:
+        _lookups.forget(project)
+    else:
+        _lookups.clear()
+    return [ix["name"] for ix in wrong]
+
+
+class PartitionLookup:
+    """Whether a project's partition index is ONLINE, cached per project for `ttl` seconds."""
+
+    def __init__(self, ttl: float = LOOKUP_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, dict[str, str | None]]] = {}
+
+    @staticmethod
+    def names(project: str) -> list[str]:
+        return [vector_index_name(project)]
+
+    def cached(self, project: str) -> dict[str, str | None] | None:
+        with self._lock:
+            entry = self._entries.get(project)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def store(self, project: str, rows: list[dict[str, Any]]) -> dict[str, str | None]:
+        """Record the rows of PARTITION_INDEXES_CYPHER for `project`."""
+        online = {r.get("name") for r in rows if str(r.get("state") or "").upper() == "ONLINE"}
+        vector = vector_index_name(project)
+        found = {"vector": vector if vector in online else None}
+        with self._lock:
+            self._entries[project] = (time.monotonic(), found)
+        return found
+
+    def forget(self, project: str) -> None:
+        with self._lock:
+            self._entries.pop(project, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def lookup(self, session, project: str) -> dict[str, str | None]:
+        found = self.cached(project)
+        if found is None:
+            rows = session.run(PARTITION_INDEXES_CYPHER, names=self.names(project)).data()
+            found = self.store(project, rows)
+        return found
+
+    async def lookup_async(self, session, project: str) -> dict[str, str | None]:
+        """`lookup` for an async Neo4j session."""
+        found = self.cached(project)
+        if found is None:
+            result = await session.run(PARTITION_INDEXES_CYPHER, names=self.names(project))
+            found = self.store(project, await result.data())
+        return found
+
+
+_lookups = PartitionLookup()
+
+
+def partition_indexes(session, project: str | None) -> dict[str, str | None]:
+    """ONLINE partition index names for `project` ({"vector": ...}, None when absent)."""
+    if not project:
+        return {"vector": None}
+    return _lookups.lookup(session, project)
+
+
+async def partition_indexes_async(session, project: str | None) -> dict[str, str | None]:
+    if not project:
+        return {"vector": None}
+    return await _lookups.lookup_async(session, project)
+
+
+def resolve_vector_index(session, project: str | None, requested: str) -> str:
+    """
+    The index to query for `requested`: the project's partition when the
+    request names a global Chunk index and the partition is online.
+    """
+    if requested not in GLOBAL_VECTOR_INDEXES:
+        return requested
+    return partition_indexes(session, project)["vector"] or requested
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import configparser
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(frozen=True)
+class ProjectionPolicy:
+    """
+    What the graph UI gets to see of a node's properties.
+
+    - drop_keys: always removed (vector columns by name)
+    - vector_min_len: numeric lists at least this long are treated as vectors and removed
+    - max_string_chars: longer strings are cut to this length
+    - max_node_bytes: approximate JSON budget for one node's properties;
+      keys past the budget are left out
+    - keep_keys: never dropped or truncated (identity/visual keys the UI relies on)
+    """
+    drop_keys: frozenset[str] = frozenset({"embedding"})
+    vector_min_len: int = 32
+    max_string_chars: int = 1000
+    max_node_bytes: int = 16 * 1024
+    keep_keys: frozenset[str] = field(
+        default_factory=lambda: frozenset({"id_rc", "name", "projectName", "image", "color", "shape", "size"})
+    )
+
+
+DEFAULT_POLICY = ProjectionPolicy()
+
+
+def load_projection_policy(cfg: configparser.ConfigParser | None = None) -> ProjectionPolicy:
+    """
+    Reads the optional [GRAPH_UI] section:
+      PROPERTY_DROP_KEYS = embedding, textEmbedding
+      VECTOR_MIN_LEN = 32
+      MAX_STRING_CHARS = 1000
+      MAX_NODE_BYTES = 16384
+    Missing values fall back to DEFAULT_POLICY.
+    """
+    if cfg is None or not cfg.has_section("GRAPH_UI"):
+        return DEFAULT_POLICY
+
+    section = cfg["GRAPH_UI"]
+    drop_raw = section.get("PROPERTY_DROP_KEYS")
+    drop_keys = (
+        frozenset(k.strip() for k in drop_raw.split(",") if k.strip())
+        if drop_raw is not None
+        else DEFAULT_POLICY.drop_keys
+    )
+    return ProjectionPolicy(
+        drop_keys=drop_keys,
+        vector_min_len=section.getint("VECTOR_MIN_LEN", DEFAULT_POLICY.vector_min_len),
+        max_string_chars=section.getint("MAX_STRING_CHARS", DEFAULT_POLICY.max_string_chars),
+        max_node_bytes=section.getint("MAX_NODE_BYTES", DEFAULT_POLICY.max_node_bytes),
+    )
+
+
+_policy = DEFAULT_POLICY
+
+
+def set_projection_policy(policy: ProjectionPolicy) -> None:
+    global _policy
+    _policy = policy
+
+
+def get_projection_policy() -> ProjectionPolicy:
+    return _policy
+
+
+def is_vector(value: Any, min_len: int) -> bool:
+    return (
+        isinstance(value, (list, tuple))
+        and len(value) >= min_len
+        and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value)
+    )
+
+
+def _approx_bytes(key: str, value: Any) -> int:
+    if isinstance(value, str):
+        return len(key) + len(value) + 6
+    try:
+        return len(key) + len(json.dumps(value, default=str)) + 4
+    except (TypeError, ValueError):
+        return len(key) + len(str(value)) + 4
+
+
+def project_properties(
+    properties: dict[str, Any],
+    policy: ProjectionPolicy | None = None,
+    truncate: bool = True,
+) -> tuple[dict[str, Any], list[str]]:
+    """
+    Applies the policy to a property dict.
+    Returns (projected, omitted) where omitted lists the keys that were dropped
+    or shortened. With truncate=False only vectors are removed.
+    """
+    policy = policy or _policy
+    projected: dict[str, Any] = {}
+    omitted: list[str] = []
+
+    # keep_keys are charged up front so the byte budget never pushes them out
+    budget = policy.max_node_bytes - sum(
+        _approx_bytes(k, v) for k, v in properties.items() if k in policy.keep_keys
+    )
+    for key, value in properties.items():
+        if key in policy.drop_keys or is_vector(value, policy.vector_min_len):
+            omitted.append(key)
+            continue
+        if key in policy.keep_keys:
+            projected[key] = value
+            continue
+        if not truncate:
+            projected[key] = value
+            continue
+
+        if isinstance(value, str) and len(value) > policy.max_string_chars:
+            value = value[:policy.max_string_chars]
+            omitted.append(key)
+
+        size = _approx_bytes(key, value)
+        if size > budget:
+            if key not in omitted:
+                omitted.append(key)
+            continue
+        budget -= size
+        projected[key] = value
+
+    return projected, omitted
+
+
+def project_vis_node(item: dict[str, Any], policy: ProjectionPolicy | None = None) -> dict[str, Any]:
+    """
+    Projects item["properties"] of a vis-network node dict in place.
+    When anything was left out the node is marked with truncated: true and
+    truncatedKeys, so the UI knows to fetch full properties
+    (POST /api/nodes/properties) before showing or editing them.
+    """
+    properties = item.get("properties")
+    if not isinstance(properties, dict):
+        return item
+    projected, omitted = project_properties(properties, policy)
+    item["properties"] = projected
+    if omitted:
+        item["truncated"] = True
+        item["truncatedKeys"] = omitted
+    return item
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+
+# Every node that carries an id_rc gets this extra label (except layout nodes),
+# so lookups by id_rc hit the unique constraint index instead of scanning all
+# nodes: MATCH (n:IVNode {id_rc: $id}).
+IV_NODE_LABEL = "IVNode"
+IV_NODE_CONSTRAINT = "ivnode_id_rc_unique"
+
+# Labels used for saved layouts; never rendered as domain nodes and never
+# labelled IVNode (CustomGraphNode rows of one save share a single id_rc).
+LAYOUT_LABELS = ("CustomGraph", "CustomGraphNode", "customGraphNode", "customGraphNodePosition")
+
+
+def ensure_iv_node_constraint(session) -> None:
+    session.run(
+        f"CREATE CONSTRAINT {IV_NODE_CONSTRAINT} IF NOT EXISTS "
+        f"FOR (n:{IV_NODE_LABEL}) REQUIRE n.id_rc IS UNIQUE"
+    ).consume()
+
+
+def iv_node_constraint_exists(session) -> bool:
+    row = session.run(
+        "SHOW CONSTRAINTS YIELD name WHERE name = $name RETURN count(*) AS c",
+        name=IV_NODE_CONSTRAINT,
+    ).single()
+    return bool(row and row["c"])
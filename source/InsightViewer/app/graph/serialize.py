@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator
+
+from graph.projection import project_vis_node
+from graph.schema import IV_NODE_LABEL, LAYOUT_LABELS
+
+
+def convert_dates(obj):
+    """
+    Recursively convert datetime/date/neo4j.time.Date to ISO strings
+    in nested dict/list structures.
+    """
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if type(obj).__module__.startswith('neo4j'):
+        return obj.isoformat() if hasattr(obj, 'isoformat') else str(obj)
+    if isinstance(obj, dict):
+        return {k: convert_dates(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [convert_dates(v) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(convert_dates(v) for v in obj)
+    return obj
+
+
+def infer_visual_node_type(labels):
+    label_list = list(labels or [])
+    if not label_list:
+        return "Unknown"
+
+    # IVNode is on every domain node, so it never names the node's type
+    excluded = set(LAYOUT_LABELS) | {IV_NODE_LABEL}
+
+    for label in label_list:
+        if label not in excluded and label != "NodeType":
+            return label
+
+    for label in label_list:
+        if label not in excluded:
+            return label
+
+    return label_list[0]
+
+
+def is_node(value) -> bool:
+    return hasattr(value, "id") and hasattr(value, "labels")
+
+
+def is_relationship(value) -> bool:
+    return hasattr(value, "start_node") and hasattr(value, "end_node")
+
+
+def node_key(node) -> str:
+    return dict(node).get("id_rc", str(node.id))
+
+
+def relationship_key(rel) -> str:
+    return dict(rel).get("id_rc") or str(rel.id)
+
+
+def node_to_vis(node) -> dict[str, Any]:
+    """Shape a Neo4j node the way /run-cypher returns it (properties projected)."""
+    properties = convert_dates(dict(node))
+    node_id = properties.get("id_rc", str(node.id))
+    full_name = properties.get("name", f"Node {node_id}")
+    return project_vis_node({
+        "id": node_id,
+        "label": full_name.split(".")[-1],
+        "nodeType": infer_visual_node_type(node.labels),
+        "labels": list(node.labels),
+        "properties": properties,
+    })
+
+
+def expanded_node_to_vis(node) -> dict[str, Any]:
+    """Node shape returned by the expand endpoints (carries id_rc, color and shape)."""
+    node_id_rc = node.get("id_rc")
+    full_name = node.get("name") or infer_visual_node_type(node.labels)
+    return project_vis_node({
+        "id": node_id_rc,
+        "id_rc": node_id_rc,
+        "label": full_name.split(".")[-1] if full_name else full_name,
+        "nodeType": infer_visual_node_type(node.labels),
+        "labels": list(node.labels),
+        "properties": convert_dates(dict(node)),
+        "color": node.get("color", "#97C2FC"),
+        "shape": node.get("shape", "ellipse"),
+    })
+
+
+def relationship_to_vis(rel) -> dict[str, Any]:
+    return {
+        "id": relationship_key(rel),
+        "from": node_key(rel.start_node),
+        "to": node_key(rel.end_node),
+        "type": rel.type,
+        "label": rel.type,
+    }
+
+
+class GraphAccumulator:
+    """
+    Turns Neo4j record values into vis-network nodes/edges, deduplicating as
+    records arrive. Each add_* call yields only the items seen for the first
+    time, so callers can either collect everything or forward items as they
+    come in.
+
+    With retain=False only the ids are remembered, which keeps memory bounded
+    by the number of distinct ids instead of the full payload (streaming mode).
+    """
+
+    def __init__(self, project: str | None = None, retain: bool = True):
+        self.project = project
+        self.retain = retain
+        self._node_ids: set[str] = set()
+        self._edge_ids: set[str] = set()
+        self._nodes: list[dict[str, Any]] = []
+        self._edges: list[dict[str, Any]] = []
+
+    @property
+    def nodes(self) -> list[dict[str, Any]]:
+        return self._nodes
+
+    @property
+    def edges(self) -> list[dict[str, Any]]:
+        return self._edges
+
+    @property
+    def node_count(self) -> int:
+        return len(self._node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edge_ids)
+
+    def _node_in_project(self, node) -> bool:
+        return not self.project or node.get("projectName") == self.project
+
+    def add_node(self, node) -> Iterator[tuple[str, dict[str, Any]]]:
+        # FILTER BY PROJECT for nodes
+        if not self._node_in_project(node):
+            return
+        key = node_key(node)
+        if key in self._node_ids:
+            return
+        self._node_ids.add(key)
+        item = node_to_vis(node)
+        if self.retain:
+            self._nodes.append(item)
+        yield "node", item
+
+    def add_relationship(self, rel) -> Iterator[tuple[str, dict[str, Any]]]:
+        # FILTER BY PROJECT for relationships: skip when neither end is in the project
+        if self.project and not (self._node_in_project(rel.start_node) or self._node_in_project(rel.end_node)):
+            return
+        key = relationship_key(rel)
+        if key in self._edge_ids:
+            return
+        self._edge_ids.add(key)
+        item = relationship_to_vis(rel)
+        if self.retain:
+            self._edges.append(item)
+        yield "edge", item
+
+    def add_value(self, value) -> Iterator[tuple[str, dict[str, Any]]]:
+        if is_node(value):
+            yield from self.add_node(value)
+        if is_relationship(value):
+            yield from self.add_relationship(value)
+
+    def add_record(self, record) -> Iterator[tuple[str, dict[str, Any]]]:
+        for value in record.values():
+            yield from self.add_value(value)
+
+    def add_records(self, records: Iterable) -> None:
+        for record in records:
+            for _ in self.add_record(record):
+                pass
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import gzip
+from typing import Any
+
+from flask import Response, current_app, jsonify, request
+
+try:  # optional; gzip is used when brotli is not installed
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+
+COMPACT_MIMETYPE = "application/vnd.insightviewer.graph+json"
+COMPACT_FORMAT = "iv-compact/1"
+
+# Bodies smaller than this are sent uncompressed.
+COMPRESS_MIN_BYTES = 16 * 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+def _is_str_or_none(value) -> bool:
+    return value is None or isinstance(value, str)
+
+
+def _is_str_list(value) -> bool:
+    return isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value)
+
+
+class _Table:
+    """Append-only string -> index table."""
+
+    def __init__(self):
+        self.items: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def idx(self, value: str) -> int:
+        pos = self._index.get(value)
+        if pos is None:
+            pos = len(self.items)
+            self._index[value] = pos
+            self.items.append(value)
+        return pos
+
+
+def _encode_columns(items: list[dict], skip: set[str], strings: _Table, known: dict[str, list]) -> list[list]:
+    """
+    Column-encodes every key of items (except skip) into ordered
+    [name, column] pairs (ordered, so "same" never points forward):
+      {"s": [...]}    indices into the string table (-1 = missing)
+      {"l": [[...]]}  lists of string-table indices (labels)
+      {"same": col}   identical to another column, e.g. id_rc == id
+      {"v": [...]}    raw values
+    """
+    keys: list[str] = []
+    for item in items:
+        for key in item:
+            if key not in skip and key not in keys:
+                keys.append(key)
+
+    cols: list[list] = []
+    for key in keys:
+        values = [item.get(key) for item in items]
+
+        same = next((name for name, other in known.items() if other == values), None)
+        if same is not None:
+            cols.append([key, {"same": same}])
+            continue
+        known[key] = values
+
+        if all(v is None or _is_str_list(v) for v in values):
+            cols.append([key, {"l": [None if v is None else [strings.idx(s) for s in v] for v in values]}])
+        elif all(_is_str_or_none(v) for v in values) and len(set(values)) * 2 <= len(values):
+            cols.append([key, {"s": [-1 if v is None else strings.idx(v) for v in values]}])
+        else:
+            cols.append([key, {"v": values}])
+    return cols
+
+
+def encode_compact(payload: dict[str, Any]) -> dict[str, Any]:
+    """
+    Compact columnar form of a {"nodes": [...], "edges": [...]} graph payload.
+
+    - "ids": node ids first ("nodes.count" of them), then any edge endpoint ids
+      that are not part of the node list; edges reference them by index.
+    - "strings": shared table for labels, node types, shapes, colors, edge types.
+    - "keys": property key table; each node's properties are a flat
+      [keyIndex, value, keyIndex, value, ...] list.
+    Any other top-level keys (success, meta, ...) are passed through.
+    """
+    nodes = payload.get("nodes") or []
+    edges = payload.get("edges") or []
+
+    strings = _Table()
+    keys = _Table()
+    ids = _Table()
+    unique_nodes = []
+    for node in nodes:
+        # duplicate node ids (should not happen) collapse onto the first occurrence
+        node_id = str(node.get("id"))
+        if node_id not in ids._index:
+            ids.idx(node_id)
+            unique_nodes.append(node)
+    node_count = len(unique_nodes)
+
+    node_known: dict[str, list] = {"id": list(ids.items)}
+    node_cols = _encode_columns(unique_nodes, {"id", "properties"}, strings, node_known)
+    props = []
+    for node in unique_nodes:
+        flat = []
+        for key, value in (node.get("properties") or {}).items():
+            flat.append(keys.idx(key))
+            flat.append(value)
+        props.append(flat)
+
+    edge_from = [ids.idx(str(e.get("from"))) for e in edges]
+    edge_to = [ids.idx(str(e.get("to"))) for e in edges]
+    edge_cols = _encode_columns(edges, {"from", "to"}, strings, {})
+
+    out = {k: v for k, v in payload.items() if k not in ("nodes", "edges")}
+    out.update({
+        "format": COMPACT_FORMAT,
+        "strings": strings.items,
+        "keys": keys.items,
+        "ids": ids.items,
+        "nodes": {"count": node_count, "cols": node_cols, "props": props},
+        "edges": {"count": len(edges), "from": edge_from, "to": edge_to, "cols": edge_cols},
+    })
+    return out
+
+
+def _decode_columns(cols: list[list], count: int, strings: list[str], base: dict[str, list]) -> list[dict]:
+    rows: list[dict] = [{} for _ in range(count)]
+    for key, col in cols:
+        if "same" in col:
+            values = base[col["same"]]
+        elif "s" in col:
+            values = [None if i < 0 else strings[i] for i in col["s"]]
+        elif "l" in col:
+            values = [None if v is None else [strings[i] for i in v] for v in col["l"]]
+        else:
+            values = col["v"]
+        base[key] = values
+        for row, value in zip(rows, values):
+            if value is not None:
+                row[key] = value
+    return rows
+
+
+def decode_compact(doc: dict[str, Any]) -> dict[str, Any]:
+    """Inverse of encode_compact (keys whose value was None are omitted)."""
+    if doc.get("format") != COMPACT_FORMAT:
+        return doc
+
+    strings, keys, ids = doc["strings"], doc["keys"], doc["ids"]
+    node_part, edge_part = doc["nodes"], doc["edges"]
+
+    node_ids = ids[:node_part["count"]]
+    nodes = _decode_columns(node_part["cols"], node_part["count"], strings, {"id": node_ids})
+    for node, node_id, flat in zip(nodes, node_ids, node_part["props"]):
+        node["id"] = node_id
+        node["properties"] = {keys[flat[i]]: flat[i + 1] for i in range(0, len(flat), 2)}
+
+    edges = _decode_columns(edge_part["cols"], edge_part["count"], strings, {})
+    for edge, f, t in zip(edges, edge_part["from"], edge_part["to"]):
+        edge["from"] = ids[f]
+        edge["to"] = ids[t]
+
+    out = {k: v for k, v in doc.items() if k not in ("format", "strings", "keys", "ids", "nodes", "edges")}
+    out["nodes"] = nodes
+    out["edges"] = edges
+    return out
+
+
+def wants_compact() -> bool:
+    if (request.args.get("format") or "").lower() == "compact":
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", COMPACT_MIMETYPE])
+    return best == COMPACT_MIMETYPE
+
+
+def _pick_encoding() -> str | None:
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = request.accept_encodings.best_match(offered)
+    return best if best in offered else None
+
+
+def graph_response(payload: dict[str, Any], status: int = 200) -> Response:
+    """
+    Returns a graph payload as JSON, or in the compact format when the client
+    asks for it (Accept: application/vnd.insightviewer.graph+json or
+    ?format=compact). Compact bodies above COMPRESS_MIN_BYTES are compressed
+    with brotli/gzip according to Accept-Encoding.
+    """
+    if not wants_compact():
+        response = jsonify(payload)
+        response.status_code = status
+        return response
+
+    body = current_app.json.dumps(encode_compact(payload), separators=(",", ":")).encode("utf-8")
+    headers = {"Vary": "Accept, Accept-Encoding"}
+
+    encoding = _pick_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    return Response(body, status=status, mimetype=COMPACT_MIMETYPE, headers=headers)
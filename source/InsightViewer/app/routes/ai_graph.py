@@ -2,10 +2,20 @@ from __future__ import annotations
 
 from typing import Any
 
-from flask import Blueprint, jsonify, request
-
-from ai.errors import AIError, ProviderConfigError, ProviderRequestError, ProviderResponseError
-from ai.registry import ProviderRegistry
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from ai.deadline import with_deadline
+from ai.errors import (
+    AIError,
+    DeadlineExceeded,
+    ProviderBusyError,
+    ProviderConfigError,
+    ProviderRequestError,
+    ProviderResponseError,
+    ProviderUnavailableError,
+)
+from ai.packing import PackedContext, evidence_budget, pack_chunks
+from ai.registry import ProviderRegistry, get_registry
 from ai.selection import (
     COOKIE_MODEL,
     COOKIE_PROVIDER,
@@ -14,8 +24,9 @@ from ai.selection import (
     selection_to_json,
     validate_selection,
 )
+from ai.streaming import SSE_HEADERS, SSE_MIMETYPE, sse_answer, wants_event_stream
 from ai.types import ChatRequest, ModelSelection
-from graph.context import fetch_graph_context, format_context_for_prompt
+from graph.context import format_context_for_prompt, get_graph_context
 from routes.retrieval import build_chunks_by_depth_response
 
 
@@ -23,19 +34,9 @@ ai_graph_bp = Blueprint("ai_graph", __name__, url_prefix="/api/ai")
 
 driver = None
 
-
-def _fetch_node_type_names(session, project):
-    cypher = """
-    MATCH (n:NodeType)
-    WHERE $project IS NULL OR n.projectName = $project OR n.projectName IS NULL
-    RETURN DISTINCT n.name AS name
-    ORDER BY name
-    LIMIT 200
-    """
-    rows = session.run(cypher, project=project).data()
-    if not rows and project:
-        rows = session.run(cypher, project=None).data()
-    return [str(row.get("name") or "").strip() for row in rows if str(row.get("name") or "").strip()]
+# Time budget for answering one question (retrieval plus a buffered answer).
+# Streamed answers are bounded by the provider timeouts instead.
+ASK_DEADLINE_SECONDS = 180.0
 
 
 def init_driver(d) -> None:
@@ -67,27 +68,22 @@ def _parse_selection(payload: dict[str, Any]) -> ModelSelection:
     return ModelSelection(provider=provider, model=model)  # type: ignore[arg-type]
 
 
-def _chunks_to_prompt(chunks: list[dict[str, Any]], max_chars: int) -> str:
+def _chunks_to_prompt(packed: PackedContext, node_names: dict[str, str]) -> str:
+    """Packed chunks under one heading per owning node."""
     parts: list[str] = []
-    total = 0
-    for i, ch in enumerate(chunks, start=1):
+    owner: Any = None
+    for i, ch in enumerate(packed.chunks, start=1):
         cid = ch.get("id_rc") or f"chunk-{i}"
-        txt = str(ch.get("text") or "").strip()
-        if not txt:
-            continue
-        if len(txt) > 1400:
-            txt = txt[:1400].rstrip() + " ..."
-        block = f"[Chunk {i} | id_rc={cid}]\n{txt}\n"
-        if total + len(block) > max_chars:
-            break
-        parts.append(block)
-        total += len(block)
+        if ch.get("owner_id_rc") and ch.get("owner_id_rc") != owner:
+            owner = ch["owner_id_rc"]
+            parts.append(f"## From {node_names.get(owner) or owner} | id_rc={owner}")
+        parts.append(f"[Chunk {i} | id_rc={cid}]\n{ch.get('text')}\n")
     return "\n".join(parts).strip()
 
 
 @ai_graph_bp.route("/providers", methods=["GET"])
 def list_ai_providers():
-    registry = ProviderRegistry()
+    registry = get_registry()
     providers = [
         {
             "id": p.id,
@@ -100,6 +96,7 @@ def list_ai_providers():
 
 
 @ai_graph_bp.route("/graph/ask", methods=["POST"])
+@with_deadline(ASK_DEADLINE_SECONDS)
 def ask_graph():
     try:
         _ensure_driver()
@@ -109,7 +106,7 @@ def ask_graph():
         if not question:
             return jsonify({"success": False, "error": "question is required"}), 400
 
-        registry = ProviderRegistry()
+        registry = get_registry()
         provider_models = _provider_models_map(registry)
 
         requested_selection = _parse_selection(payload)
@@ -126,9 +123,8 @@ def ask_graph():
         sample_limit = int(payload.get("sample_limit") or 8)
         sample_limit = max(1, min(sample_limit, 30))
 
-        with driver.session() as session:
-            ctx = fetch_graph_context(session, project=project, sample_limit=sample_limit)
-            node_type_names = _fetch_node_type_names(session, project)
+        ctx = get_graph_context(driver, project, sample_limit=sample_limit)
+        node_type_names = ctx.node_type_names
 
         prompt_parts = [format_context_for_prompt(ctx).strip()]
         if node_type_names:
@@ -160,32 +156,36 @@ def ask_graph():
         temperature = float(payload.get("temperature") or 0.2)
         max_tokens = int(payload.get("max_tokens") or 1200)
 
-        resp = provider.chat(
-            ChatRequest(
-                system=system_prompt,
-                user=user_prompt,
-                model=selection.model,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+        chat_request = ChatRequest(
+            system=system_prompt,
+            user=user_prompt,
+            model=selection.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
         )
+        meta = {
+            "provider": selection.provider,
+            "model": selection.model,
+            "selection": selection_to_json(selection),
+        }
+        graph_context = {
+            "project": ctx.project,
+            "labels": ctx.labels,
+            "relationship_types": ctx.rel_types,
+            "sample_nodes": ctx.sample_nodes,
+            "node_types": node_type_names,
+        }
 
-        out = jsonify(
-            {
-                "success": True,
-                "provider": selection.provider,
-                "model": selection.model,
-                "selection": selection_to_json(selection),
-                "graph_context": {
-                    "project": ctx.project,
-                    "labels": ctx.labels,
-                    "relationship_types": ctx.rel_types,
-                    "sample_nodes": ctx.sample_nodes,
-                    "node_types": node_type_names,
-                },
-                "answer": resp.text,
-            }
-        )
+        # Opt-in streaming: "Accept: text/event-stream"
+        if wants_event_stream(request):
+            out = Response(
+                stream_with_context(sse_answer({"graph_context": graph_context}, provider.chat_stream(chat_request), meta)),
+                mimetype=SSE_MIMETYPE,
+                headers=SSE_HEADERS,
+            )
+        else:
+            resp = provider.chat(chat_request)
+            out = jsonify({"success": True, **meta, "graph_context": graph_context, "answer": resp.text})
         out.set_cookie(COOKIE_PROVIDER, selection.provider, max_age=60 * 60 * 24 * 30, samesite="Lax")
         out.set_cookie(COOKIE_MODEL, selection.model, max_age=60 * 60 * 24 * 30, samesite="Lax")
         return out
@@ -194,6 +194,10 @@ def ask_graph():
         return jsonify({"success": False, "error": str(e)}), 400
     except ProviderConfigError as e:
         return jsonify({"success": False, "error": str(e)}), 500
+    except (ProviderUnavailableError, ProviderBusyError) as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    except DeadlineExceeded as e:
+        return jsonify({"success": False, "error": str(e)}), 504
     except ProviderRequestError as e:
         return jsonify({"success": False, "error": str(e)}), 502
     except ProviderResponseError as e:
@@ -205,6 +209,7 @@ def ask_graph():
 
 
 @ai_graph_bp.route("/graph/ask-by-depth", methods=["POST"])
+@with_deadline(ASK_DEADLINE_SECONDS)
 def ask_graph_by_depth():
     try:
         _ensure_driver()
@@ -230,6 +235,16 @@ def ask_graph_by_depth():
         visited_nodes = retrieval["visited_nodes"]
         chunks = retrieval["chunks"]
 
+        retrieval_summary = {
+            "project": project,
+            "input_node_ids": node_ids,
+            "depth": depth,
+            "visited_nodes_count": len(visited_nodes),
+            "chunks_count": len(chunks),
+            "visited_nodes": visited_nodes[:200],
+            "chunks": chunks,
+        }
+
         if not chunks:
             suggestion = (
                 f"No text chunks were found within traversal depth {depth}. "
@@ -237,25 +252,23 @@ def ask_graph_by_depth():
                 f"Try increasing the traversal depth (currently {depth}) to reach more nodes, "
                 "or verify that the selected nodes have neighbours with HAS_CHUNK relationships."
             )
+            if wants_event_stream(request):
+                return Response(
+                    sse_answer({"retrieval": retrieval_summary}, [suggestion], {"provider": None, "model": None}),
+                    mimetype=SSE_MIMETYPE,
+                    headers=SSE_HEADERS,
+                )
             return jsonify(
                 {
                     "success": True,
                     "provider": None,
                     "model": None,
                     "answer": suggestion,
-                    "retrieval": {
-                        "project": project,
-                        "input_node_ids": node_ids,
-                        "depth": depth,
-                        "visited_nodes_count": len(visited_nodes),
-                        "chunks_count": 0,
-                        "visited_nodes": visited_nodes[:200],
-                        "chunks": [],
-                    },
+                    "retrieval": retrieval_summary,
                 }
             )
 
-        registry = ProviderRegistry()
+        registry = get_registry()
         provider_models = _provider_models_map(registry)
         requested_selection = _parse_selection(payload)
         model_explicitly_set = bool(str(payload.get("model") or "").strip())
@@ -265,9 +278,8 @@ def ask_graph_by_depth():
             selection = validate_selection(requested_selection, provider_models)
         provider = registry.get_provider(selection.provider)
 
-        with driver.session() as session:
-            ctx = fetch_graph_context(session, project=project, sample_limit=8)
-            node_type_names = _fetch_node_type_names(session, project)
+        ctx = get_graph_context(driver, project, sample_limit=8)
+        node_type_names = ctx.node_type_names
 
         schema_parts = [format_context_for_prompt(ctx).strip()]
         if node_type_names:
@@ -276,7 +288,6 @@ def ask_graph_by_depth():
             schema_parts.append(f"Known NodeType names:\n- {shown}{suffix}")
         schema_block = "\n\n".join(schema_parts)
 
-        chunks_block = _chunks_to_prompt(chunks, max_chars=max_chunk_chars)
         system_prompt = str(
             payload.get("system")
             or (
@@ -286,7 +297,7 @@ def ask_graph_by_depth():
             )
         ).strip()
 
-        user_prompt = (
+        prompt_head = (
             f"{schema_block}\n\n"
             "Retrieved evidence from graph traversal.\n"
             f"- project: {project or 'ALL'}\n"
@@ -295,8 +306,9 @@ def ask_graph_by_depth():
             f"- visited_nodes_count: {len(visited_nodes)}\n"
             f"- chunks_count: {len(chunks)}\n\n"
             "Evidence chunks:\n"
-            f"{chunks_block}\n\n"
-            "Task instructions:\n"
+        )
+        prompt_tail = (
+            "\n\nTask instructions:\n"
             "- Prefer the evidence chunks when answering; use your general knowledge to fill gaps when chunks are insufficient.\n"
             "- Use only label names and relationship types from the graph context above.\n"
             "- Do NOT add projectName filters to any Cypher query you write.\n"
@@ -317,34 +329,42 @@ def ask_graph_by_depth():
         temperature = float(payload.get("temperature") or 0.2)
         max_tokens = int(payload.get("max_tokens") or 1400)
 
-        resp = provider.chat(
-            ChatRequest(
-                system=system_prompt,
-                user=user_prompt,
-                model=selection.model,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+        # Evidence gets what the model's context window leaves after the rest
+        # of the prompt and the answer; max_chunk_chars still caps it.
+        budget = evidence_budget(
+            selection.model,
+            system_prompt + prompt_head + prompt_tail,
+            max_tokens,
+            cap=max_chunk_chars // 4,
         )
-
-        out = jsonify(
-            {
-                "success": True,
-                "provider": selection.provider,
-                "model": selection.model,
-                "selection": selection_to_json(selection),
-                "answer": resp.text,
-                "retrieval": {
-                    "project": project,
-                    "input_node_ids": node_ids,
-                    "depth": depth,
-                    "visited_nodes_count": len(visited_nodes),
-                    "chunks_count": len(chunks),
-                    "visited_nodes": visited_nodes[:200],
-                    "chunks": chunks,
-                },
-            }
+        packed = pack_chunks(chunks, budget)
+        retrieval_summary["packing"] = packed.stats()
+        node_names = {n["id_rc"]: n.get("name") for n in visited_nodes if n.get("name")}
+        user_prompt = prompt_head + _chunks_to_prompt(packed, node_names) + prompt_tail
+
+        chat_request = ChatRequest(
+            system=system_prompt,
+            user=user_prompt,
+            model=selection.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
         )
+        meta = {
+            "provider": selection.provider,
+            "model": selection.model,
+            "selection": selection_to_json(selection),
+        }
+
+        # Opt-in streaming: "Accept: text/event-stream"
+        if wants_event_stream(request):
+            out = Response(
+                stream_with_context(sse_answer({"retrieval": retrieval_summary}, provider.chat_stream(chat_request), meta)),
+                mimetype=SSE_MIMETYPE,
+                headers=SSE_HEADERS,
+            )
+        else:
+            resp = provider.chat(chat_request)
+            out = jsonify({"success": True, **meta, "answer": resp.text, "retrieval": retrieval_summary})
         out.set_cookie(COOKIE_PROVIDER, selection.provider, max_age=60 * 60 * 24 * 30, samesite="Lax")
         out.set_cookie(COOKIE_MODEL, selection.model, max_age=60 * 60 * 24 * 30, samesite="Lax")
         return out
@@ -353,6 +373,10 @@ def ask_graph_by_depth():
         return jsonify({"success": False, "error": str(e)}), 400
     except ProviderConfigError as e:
         return jsonify({"success": False, "error": str(e)}), 500
+    except (ProviderUnavailableError, ProviderBusyError) as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    except DeadlineExceeded as e:
+        return jsonify({"success": False, "error": str(e)}), 504
     except ProviderRequestError as e:
         return jsonify({"success": False, "error": str(e)}), 502
     except ProviderResponseError as e:
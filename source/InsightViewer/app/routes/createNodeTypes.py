@@ -12,6 +12,13 @@ import configparser
 import sys
 import uuid
 import re  # add near other imports
+import json
+import hashlib
+import threading
+import time
+
+from graph.context import bump_graph_version
+from graph.serialize import convert_dates
 
 # JWT configuration
 JWT_SECRET = os.environ["JWT_SECRET"]
@@ -72,6 +79,57 @@ def _ensure_driver():
     if driver is None:
         raise RuntimeError("Neo4j driver not initialized. Call init_driver(driver) in app startup.")
 
+
+# --- NodeType registry ---
+# All NodeType nodes, loaded once per process and shared by the routes below,
+# add_node and loadCustomGraph. Writes in this process call
+# invalidate_node_type_registry(); the TTL bounds staleness for writes made by
+# other workers or directly in the database.
+NODE_TYPE_REGISTRY_TTL_SECONDS = 300
+
+_node_type_lock = threading.Lock()
+_node_types = None          # {name: {property: value}}
+_node_types_etag = None
+_node_types_loaded_at = 0.0
+
+
+def _load_node_types():
+    query = "MATCH (t:NodeType) WHERE t.name IS NOT NULL RETURN t ORDER BY t.name"
+    node_types = {}
+    with driver.session() as session:
+        for record in session.run(query):
+            props = dict(record["t"])
+            node_types.setdefault(props["name"], props)
+    digest = hashlib.sha1(json.dumps(node_types, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return node_types, digest
+
+
+def _node_type_snapshot():
+    global _node_types, _node_types_etag, _node_types_loaded_at
+    _ensure_driver()
+    with _node_type_lock:
+        if _node_types is None or time.monotonic() - _node_types_loaded_at > NODE_TYPE_REGISTRY_TTL_SECONDS:
+            _node_types, _node_types_etag = _load_node_types()
+            _node_types_loaded_at = time.monotonic()
+        return _node_types, _node_types_etag
+
+
+def get_node_type_registry():
+    """Return {name: properties} for all NodeTypes. Treat the result as read-only."""
+    return _node_type_snapshot()[0]
+
+
+def get_node_type(name):
+    """Properties of one NodeType, or None if there is no NodeType with that name."""
+    return get_node_type_registry().get(name)
+
+
+def invalidate_node_type_registry():
+    global _node_types, _node_types_etag
+    with _node_type_lock:
+        _node_types = None
+        _node_types_etag = None
+
 # Function to create NodeType nodes
 def create_node_types():
     _ensure_driver()
@@ -83,6 +141,8 @@ def create_node_types():
     with driver.session() as session:
         result = session.run(query)
         node_types = [record["nt.name"] for record in result]
+    invalidate_node_type_registry()
+    bump_graph_version()
     
     print("Created NodeType nodes:", node_types)
 
@@ -109,7 +169,7 @@ def update_node_properties():
     print("20 update_node_properties")
     try:
         query = """
-        MATCH (t)
+        MATCH (t:IVNode)
         WHERE t.id_rc = $node_id
         SET t += $properties
         RETURN t
@@ -119,8 +179,10 @@ def update_node_properties():
             print(query)
             print("node_id " + str(node_id))
             print("properties:" + str(properties))
-            session.run(query, node_id=str(node_id), properties=properties)
+            record = session.run(query, node_id=str(node_id), properties=properties).single()
             print("40 update_node_properties")
+        if record and "NodeType" in record["t"].labels:
+            invalidate_node_type_registry()
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500    
@@ -143,28 +205,13 @@ def get_node_types():
     projectName = request.args.get("projectName") or data.get("projectName") or None
     createdBy = request.args.get("createdBy") or data.get("createdBy") or None
 
-    # Build query with optional filters
-    base = "MATCH (t:NodeType)"
-    conditions = []
-    params = {}
-    if projectName:
-        conditions.append("t.projectName = $projectName OR $projectName = 'ALL'")
-        params["projectName"] = projectName
-    if createdBy:
-        conditions.append("t.createdBy = $createdBy")
-        params["createdBy"] = createdBy
-
-    query = base
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    query += " RETURN t.name AS name, t.shape AS shape, t.color AS color"
-
-    print("get_node_types query:", query)
-    print("get_node_types params:", params)
-
-    with driver.session() as session:
-        result = session.run(query, **params) if params else session.run(query)
-        node_types = [{"name": record["name"], "shape": record["shape"], "color": record["color"]} for record in result]
+    node_types = []
+    for props in get_node_type_registry().values():
+        if projectName and projectName != "ALL" and props.get("projectName") != projectName:
+            continue
+        if createdBy and props.get("createdBy") != createdBy:
+            continue
+        node_types.append({"name": props.get("name"), "shape": props.get("shape"), "color": props.get("color")})
 
     return jsonify(node_types)
 
@@ -173,6 +220,18 @@ def get_node_types():
 
 #if 
 
+def _node_type_visuals(node_type_properties):
+    # shape, color and size are returned separately, everything else as properties
+    excluded_keys = {"shape", "color", "size"}
+    return {
+        "success": True,
+        "name": node_type_properties.get("name"),
+        "shape": node_type_properties.get("shape"),
+        "color": node_type_properties.get("color"),
+        "size": node_type_properties.get("size"),
+        "properties": convert_dates({k: v for k, v in node_type_properties.items() if k not in excluded_keys}),
+    }
+
 @nodes_bp.route("/get_node_type_visuals", methods=["POST"])
 def get_node_type_visuals():
     # Validate JWT and extract user data
@@ -193,47 +252,42 @@ def get_node_type_visuals():
         if not node_type:
             return jsonify({"success": False, "error": "Missing 'nodeType' in request"}), 400
 
-        # Query to fetch NodeType properties
-        query = """
-        MATCH (t:NodeType {name: $nodeType})
-        RETURN t
-        """        
-        
-        with driver.session() as session:
-            # print query with parameters
-            print("Query:", query)
-            print("Running query with parameters:", {"nodeType": node_type})
-            
-            result = session.run(query, nodeType=node_type)
-            record = result.single()
-            if not record:
-                return jsonify({
-                    "success": True
-                })
-                #return jsonify({"success": False, "error": f"NodeType '{node_type}' not found"}), 404
-
-            node_type_properties = dict(record["t"])  # Extract all properties of the NodeType node
-            print("NodeType properties before filtering:", node_type_properties)
-
-            # Exclude specific properties
-            excluded_keys = {"shape", "color", "size"}
-            filtered_properties = {k: v for k, v in node_type_properties.items() if k not in excluded_keys}
-            print("Filtered NodeType properties:", filtered_properties)
-
-            # Return the filtered properties, including shape and color separately
+        node_type_properties = get_node_type(node_type)
+        if not node_type_properties:
             return jsonify({
-                "success": True,
-                "name": node_type_properties.get("name"),
-                "shape": node_type_properties.get("shape"),
-                "color": node_type_properties.get("color"),
-                "size": node_type_properties.get("size"),
-                "properties": filtered_properties  # Include only filtered properties
+                "success": True
             })
+            #return jsonify({"success": False, "error": f"NodeType '{node_type}' not found"}), 404
+
+        return jsonify(_node_type_visuals(node_type_properties))
     except Exception as e:
         print(f"Error in get_node_type_visuals: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@nodes_bp.route("/node_type_visuals_bundle", methods=["GET"])
+def node_type_visuals_bundle():
+    """
+    Visuals of all NodeTypes in one response, keyed by name (same fields as
+    /get_node_type_visuals). Carries an ETag; a matching If-None-Match gets 304.
+    """
+    user_data, error_response, status_code = validate_jwt()
+    if error_response:
+        return error_response, status_code
+
+    try:
+        registry, etag = _node_type_snapshot()
+        response = jsonify({
+            "success": True,
+            "node_types": {name: _node_type_visuals(props) for name, props in registry.items()},
+        })
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response.make_conditional(request)
+    except Exception as e:
+        print(f"Error in node_type_visuals_bundle: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @nodes_bp.route("/test_post", methods=["POST"])
 def test_post():
     return jsonify({"success": True, "message": "POST request successful"})
@@ -280,6 +334,7 @@ def add_node_type():
         t.size = $size,
         t.projectName = coalesce(t.projectName, $projectName),
         t.id_rc = coalesce(t.id_rc, $id_rc)
+    SET t:IVNode
     // only set createdBy when provided (avoid overwriting with null)
     FOREACH (_ IN CASE WHEN _createdBy IS NOT NULL THEN [1] ELSE [] END |
       SET t.createdBy = _createdBy
@@ -309,6 +364,8 @@ def add_node_type():
             )
             record = result.single()
             print("add_node_type record:", record)
+        invalidate_node_type_registry()
+        bump_graph_version(projectName)
         print("Query add_node_type:", query)
         print("Parameters add_node_type:", {
             "name": name, "shape": shape, "color": color, "size": size,
@@ -633,22 +690,16 @@ def get_node_type_properties(node_type):
     if not node_type:
         return jsonify({"success": False, "error": "node_type is required"}), 400
 
-    query = "MATCH (n:NodeType) WHERE n.name=$node_type RETURN n LIMIT 1"
     try:
-        with driver.session() as session:
-            result = session.run(query, node_type=node_type)
-            record = result.single()
+        properties = get_node_type(node_type)
     except Exception as e:
         print(f"Error querying node type properties: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-    if not record:
+    if properties is None:
         return jsonify({"success": False, "error": f"NodeType '{node_type}' not found"}), 404
 
-    node = record.get("n")
-    properties = dict(node) if node is not None else {}
-
-    return jsonify({"success": True, "node_type": node_type, "properties": properties})
+    return jsonify({"success": True, "node_type": node_type, "properties": convert_dates(properties)})
 
 # Add a POST endpoint to fetch node type properties by JSON payload
 @nodes_bp.route("/get_node_type_property", methods=["POST"])
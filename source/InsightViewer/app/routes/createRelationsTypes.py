@@ -11,6 +11,9 @@ from pathlib import Path
 import os
 import sys
 
+from graph.context import bump_graph_version
+from graph.schema import LAYOUT_LABELS
+
 # Create a Flask Blueprint
 relations_bp = Blueprint("createRelationsTypes", __name__)
 
@@ -76,10 +79,15 @@ def backfill_idrc_nodes():
         MATCH (n)
         WHERE n.id_rc IS NULL
         SET n.id_rc = randomUUID()
+        WITH n
+        // domain nodes also get the shared id_rc lookup label
+        FOREACH (_ IN CASE WHEN none(l IN labels(n) WHERE l IN $layout_labels) THEN [1] ELSE [] END |
+          SET n:IVNode
+        )
         RETURN count(n) AS updated
         """
         with driver.session() as session:
-            result = session.run(query)
+            result = session.run(query, layout_labels=list(LAYOUT_LABELS))
             updated = result.single()["updated"]
         return jsonify({"success": True, "updated": updated}), 200
     except Exception as e:
@@ -146,10 +154,9 @@ def add_edge():
 
     # match by id_rc (string) and create relationship with id_rc property
     query = f"""
-    MATCH (a), (b)
-    WHERE a.id_rc = $from_node AND b.id_rc = $to_node
+    MATCH (a:IVNode {{id_rc: $from_node}}), (b:IVNode {{id_rc: $to_node}})
     CREATE (a)-[r:{edge_type} {{name: $edge_name, id_rc: $id_rc}}]->(b)
-    RETURN r.id_rc AS edge_id
+    RETURN r.id_rc AS edge_id, a.projectName AS project
     """
 
     with driver.session() as session:
@@ -158,6 +165,7 @@ def add_edge():
         if not rec:
             return jsonify({"success": False, "error": "Failed to create relationship (nodes not found or other error)"}), 500
         edge_id = rec["edge_id"]
+    bump_graph_version(rec["project"])
 
     return jsonify({"success": True, "edge_id": str(edge_id)})
 
@@ -186,7 +194,7 @@ def get_edge_types():
 
     # Query NodeType graph based on the labels of the provided nodes
     query = """
-        MATCH (n)
+        MATCH (n:IVNode)
         WHERE n.id_rc IN $ids
         WITH labels(n) AS node_types
         UNWIND node_types AS node_type
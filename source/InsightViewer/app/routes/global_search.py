@@ -7,7 +7,7 @@ from flask import Blueprint, jsonify, request
 from neo4j.exceptions import ClientError, CypherSyntaxError
 
 from ai.errors import AIError, ProviderConfigError, ProviderRequestError, ProviderResponseError
-from ai.registry import ProviderRegistry
+from ai.registry import ProviderRegistry, get_registry
 from ai.selection import (
     COOKIE_MODEL,
     COOKIE_PROVIDER,
@@ -17,7 +17,8 @@ from ai.selection import (
     validate_selection,
 )
 from ai.types import ChatRequest, ModelSelection
-from graph.context import fetch_graph_context, format_context_for_prompt
+from graph.context import format_context_for_prompt, get_graph_context
+from graph.serialize import infer_visual_node_type
 from routes.retrieval import build_fulltext_error_response, build_query_cypher_response
 
 ## BUILDERS
@@ -158,22 +159,6 @@ def _extract_cypher_from_text(text: str) -> str:
     return stripped.strip("`").strip()
 
 
-def _fetch_node_type_names(session, project):
-    cypher = """
-    MATCH (n:NodeType)
-    WHERE $project IS NULL OR n.projectName = $project OR n.projectName IS NULL
-    RETURN DISTINCT n.name AS name
-    ORDER BY name
-    LIMIT 200
-    """
-
-    rows = session.run(cypher, project=project).data()
-    if not rows and project:
-        rows = session.run(cypher, project=None).data()
-
-    return [str(row.get("name") or "").strip() for row in rows if str(row.get("name") or "").strip()]
-
-
 def validate_jwt():
     token = request.cookies.get("access_token")
     if not token:
@@ -335,7 +320,7 @@ def _lookup_nodes_by_type_and_name(session, node_type, name, project):
 
 def _lookup_node_by_id_rc(session, id_rc, project):
     cypher = """
-    MATCH (n {id_rc: $id_rc})
+    MATCH (n:IVNode {id_rc: $id_rc})
     WHERE $project IS NULL OR n.projectName = $project OR n.projectName IS NULL
     RETURN n.id_rc AS id_rc, n.name AS name, labels(n) AS labels, n.projectName AS project_name
     LIMIT 1
@@ -357,7 +342,8 @@ def _resolve_node_identity(session, node, field_name, project):
             resolved["name"] = str(row.get("name") or "")
         if not resolved.get("node_type"):
             labels = row.get("labels") or []
-            resolved["node_type"] = str(labels[0]) if labels else ""
+            # skips IVNode, which every domain node carries
+            resolved["node_type"] = infer_visual_node_type(labels) if labels else ""
         return resolved
 
     if not node["node_type"] or not node["name"]:
@@ -393,58 +379,19 @@ def _quote_cypher_string(value):
     return f"'{escaped}'"
 
 
-def _cypher_list(values):
-    return "[" + ", ".join(_quote_cypher_string(v) for v in values) + "]"
+def _project_filter(alias):
+    return f"($project IS NULL OR {alias}.projectName = $project OR {alias}.projectName IS NULL)"
 
 
-def _project_filter(alias, project):
-    if not project:
+def _path_edge_filter(edge_types):
+    if not edge_types:
         return "TRUE"
-    quoted = _quote_cypher_string(project)
-    return f"({alias}.projectName = {quoted} OR {alias}.projectName IS NULL)"
-
-
-def _build_fulltext_graph_cypher(hit_ids, project, edge_types):
-    if not hit_ids:
-        return ""
-
-    edge_filter = "TRUE"
-    if edge_types:
-        edge_filter = f"(r IS NULL OR type(r) IN {_cypher_list(edge_types)})"
-
-    return f"""
-MATCH (h)
-WHERE h.id_rc IN {_cypher_list(hit_ids)}
-  AND {_project_filter('h', project)}
-OPTIONAL MATCH (h)-[r]-(n)
-WHERE {_project_filter('n', project)}
-  AND {edge_filter}
-RETURN DISTINCT h AS s, r, n AS t
-""".strip()
-
+    return "ALL(rel IN relationships(p) WHERE type(rel) IN $edge_types)"
 
-def _build_scoped_fulltext_graph_cypher(hit_ids, scope_node_id_rc, scope_hops, project, edge_types):
-    if not hit_ids:
-        return ""
 
-    edge_filter = "TRUE"
-    if edge_types:
-        edge_filter = f"(r IS NULL OR type(r) IN {_cypher_list(edge_types)})"
-
-    scope_hops = max(1, min(int(scope_hops or 1), 2))
-
-    return f"""
-MATCH (scope {{id_rc: {_quote_cypher_string(scope_node_id_rc)}}})
-WHERE {_project_filter('scope', project)}
-MATCH p = (scope)-[*..{scope_hops}]-(h)
-WHERE h.id_rc IN {_cypher_list(hit_ids)}
-  AND ALL(n1 IN nodes(p) WHERE {_project_filter('n1', project)})
-WITH DISTINCT h
-OPTIONAL MATCH (h)-[r]-(n)
-WHERE {_project_filter('n', project)}
-  AND {edge_filter}
-RETURN DISTINCT h AS s, r, n AS t
-""".strip()
+# Builders return (cypher, params). The text depends only on the template and
+# on whether an edge filter is set, so Neo4j can reuse cached plans; ids,
+# project and edge types travel as parameters.
 
 
 def _fulltext_hits(session, *, index_name, query_text, node_type, project, limit):
@@ -487,15 +434,16 @@ def _build_connected_to_node(source, target, edge_types, project):
 
     edge_filter = "TRUE"
     if edge_types:
-        edge_filter = f"(r IS NULL OR type(r) IN {_cypher_list(edge_types)})"
+        edge_filter = "(r IS NULL OR type(r) IN $edge_types)"
 
-    return f"""
-MATCH (s {{id_rc: {_quote_cypher_string(source['id_rc'])}}})
-WHERE {_project_filter('s', project)}
+    cypher = f"""
+MATCH (s:IVNode {{id_rc: $source_id}})
+WHERE {_project_filter('s')}
 OPTIONAL MATCH (s)-[r]-(t)
-WHERE {_project_filter('t', project)} AND {edge_filter}
+WHERE {_project_filter('t')} AND {edge_filter}
 RETURN s, r, t
 """.strip()
+    return cypher, {"source_id": source["id_rc"], "project": project, "edge_types": edge_types}
 
 
 def _build_related_nodes_of_target_type(source, target, edge_types, project):
@@ -506,17 +454,23 @@ def _build_related_nodes_of_target_type(source, target, edge_types, project):
 
     edge_filter = "TRUE"
     if edge_types:
-        edge_filter = f"type(r) IN {_cypher_list(edge_types)}"
+        edge_filter = "type(r) IN $edge_types"
 
-    return f"""
-MATCH (s {{id_rc: {_quote_cypher_string(source['id_rc'])}}})
-WHERE {_project_filter('s', project)}
+    cypher = f"""
+MATCH (s:IVNode {{id_rc: $source_id}})
+WHERE {_project_filter('s')}
 MATCH (s)-[r]-(t)
-WHERE {_quote_cypher_string(target['node_type'])} IN labels(t)
-  AND {_project_filter('t', project)}
+WHERE $target_type IN labels(t)
+  AND {_project_filter('t')}
   AND {edge_filter}
 RETURN s, r, t
 """.strip()
+    return cypher, {
+        "source_id": source["id_rc"],
+        "target_type": target["node_type"],
+        "project": project,
+        "edge_types": edge_types,
+    }
 
 
 def _build_direct_connection_between_a_b(source, target, edge_types, project):
@@ -527,15 +481,16 @@ def _build_direct_connection_between_a_b(source, target, edge_types, project):
 
     edge_filter = "TRUE"
     if edge_types:
-        edge_filter = f"(r IS NULL OR type(r) IN {_cypher_list(edge_types)})"
+        edge_filter = "(r IS NULL OR type(r) IN $edge_types)"
 
-    return f"""
-MATCH (a {{id_rc: {_quote_cypher_string(source['id_rc'])}}}), (b {{id_rc: {_quote_cypher_string(target['id_rc'])}}})
-WHERE {_project_filter('a', project)} AND {_project_filter('b', project)}
+    cypher = f"""
+MATCH (a:IVNode {{id_rc: $source_id}}), (b:IVNode {{id_rc: $target_id}})
+WHERE {_project_filter('a')} AND {_project_filter('b')}
 OPTIONAL MATCH (a)-[r]-(b)
 WHERE {edge_filter}
 RETURN a AS s, r, b AS t
 """.strip()
+    return cypher, _pair_params(source, target, edge_types, project)
 
 
 def _build_shortest_path_between_a_b(source, target, edge_types, project):
@@ -544,140 +499,107 @@ def _build_shortest_path_between_a_b(source, target, edge_types, project):
     if not target["id_rc"]:
         raise ValueError("target.id_rc is required")
 
-    path_filter = "TRUE"
-    if edge_types:
-        path_filter = f"ALL(rel IN relationships(p) WHERE type(rel) IN {_cypher_list(edge_types)})"
-
-    return f"""
-MATCH (a {{id_rc: {_quote_cypher_string(source['id_rc'])}}}), (b {{id_rc: {_quote_cypher_string(target['id_rc'])}}})
-WHERE {_project_filter('a', project)} AND {_project_filter('b', project)}
+    cypher = f"""
+MATCH (a:IVNode {{id_rc: $source_id}}), (b:IVNode {{id_rc: $target_id}})
+WHERE {_project_filter('a')} AND {_project_filter('b')}
 MATCH p = shortestPath((a)-[*..8]-(b))
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
+WHERE ALL(n IN nodes(p) WHERE {_project_filter('n')})
+  AND {_path_edge_filter(edge_types)}
 WITH relationships(p) AS rels
 UNWIND rels AS r
 RETURN startNode(r) AS s, r, endNode(r) AS t
 """.strip()
+    return cypher, _pair_params(source, target, edge_types, project)
 
-def _build_apex_app_writes_to_db_object(source, target, edge_types, project):
-    if not source["id_rc"]:
-        raise ValueError("source.id_rc is required")
-    if not target["id_rc"]:
-        raise ValueError("target.id_rc is required")
 
+def _pair_params(source, target, edge_types, project):
+    return {
+        "source_id": source["id_rc"],
+        "target_id": target["id_rc"],
+        "project": project,
+        "edge_types": edge_types,
+    }
+
+
+def _apex_start(source):
     source_type = str(source.get("node_type") or "").strip()
     if source_type not in ("APEXApp", "APEXPage"):
         raise ValueError("source.node_type must be APEXApp or APEXPage for this template")
 
-    source_id = _quote_cypher_string(source["id_rc"])
-    obj_id = _quote_cypher_string(target["id_rc"])
-
-    path_filter = "TRUE"
-    if edge_types:
-        path_filter = f"ALL(rel IN relationships(p) WHERE type(rel) IN {_cypher_list(edge_types)})"
-
     if source_type == "APEXApp":
-        start_match = f"MATCH (start:APEXApp {{id_rc: {source_id}}})"
-        start_pattern = "(start)-[:HAS_PAGE]->(page:APEXPage)"
-    else:
-        start_match = f"MATCH (start:APEXPage {{id_rc: {source_id}}})"
-        start_pattern = "(start:APEXPage)"
-
-    return f"""
-{start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
-MATCH p =
-  {start_pattern}
-       -[:HAS_BUTTON]->(btn:APEXButton)
-       -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
-       -[:INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
-UNWIND relationships(p) AS r
-RETURN startNode(r) AS s, r, endNode(r) AS t
+        return "MATCH (start:APEXApp:IVNode {id_rc: $source_id})", "(start)-[:HAS_PAGE]->(page:APEXPage)"
+    return "MATCH (start:APEXPage:IVNode {id_rc: $source_id})", "(start:APEXPage)"
 
-UNION
 
+def _apex_union(start_match, start_pattern, chains, path_filter):
+    """One UNION branch per relationship chain from the APEX start to $target_id."""
+    branches = []
+    for chain in chains:
+        branches.append(f"""
 {start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
+MATCH (obj:ORADbObject:IVNode {{id_rc: $target_id}})
 MATCH p =
   {start_pattern}
-       -[:HAS_PROCESS]->(procNode:APEXPageProcess)
-       -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
-       -[:INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
+{chain}(obj)
+WHERE ALL(n IN nodes(p) WHERE {_project_filter('n')})
   AND {path_filter}
 UNWIND relationships(p) AS r
 RETURN startNode(r) AS s, r, endNode(r) AS t
+""".strip())
+    return "\n\nUNION\n\n".join(branches)
 
-UNION
 
-{start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
-MATCH p =
-  {start_pattern}
-       -[:HAS_BUTTON]->(btn:APEXButton)
+APEX_WRITES = "INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO"
+APEX_ACCESS = "SELECTS_FROM|INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO"
+
+APEX_BUTTON_PROCEDURE_CHAIN = """       -[:HAS_BUTTON]->(btn:APEXButton)
+       -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
+       -[:{access}]->"""
+APEX_PROCESS_PROCEDURE_CHAIN = """       -[:HAS_PROCESS]->(procNode:APEXPageProcess)
+       -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
+       -[:{access}]->"""
+APEX_DA_STEP_PROCEDURE_CHAIN = """       -[:HAS_BUTTON]->(btn:APEXButton)
        -[:TRIGGERS_DA]->(da:APEXDynamicAction)
        -[:HAS_ACTION]->(step:APEXDynamicActionStep)
        -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
-       -[:INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
-UNWIND relationships(p) AS r
-RETURN startNode(r) AS s, r, endNode(r) AS t
-
-UNION
-
-{start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
-MATCH p =
-  {start_pattern}
-       -[:HAS_BUTTON]->(btn:APEXButton)
+       -[:{access}]->"""
+APEX_DA_PROCEDURE_CHAIN = """       -[:HAS_BUTTON]->(btn:APEXButton)
        -[:TRIGGERS_DA]->(da:APEXDynamicAction)
        -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
-       -[:INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
-UNWIND relationships(p) AS r
-RETURN startNode(r) AS s, r, endNode(r) AS t
-""".strip()
+       -[:{access}]->"""
+APEX_REGION_CHAIN = """       -[:HAS_REGION]->(region:APEXRegion)
+       -[:{access}]->"""
 
-def _build_apex_app_region_db_access_to_db_object(source, target, edge_types, project):
+
+def _build_apex_app_writes_to_db_object(source, target, edge_types, project):
     if not source["id_rc"]:
         raise ValueError("source.id_rc is required")
     if not target["id_rc"]:
         raise ValueError("target.id_rc is required")
 
-    source_type = str(source.get("node_type") or "").strip()
-    if source_type not in ("APEXApp", "APEXPage"):
-        raise ValueError("source.node_type must be APEXApp or APEXPage for this template")
-
-    source_id = _quote_cypher_string(source["id_rc"])
-    obj_id = _quote_cypher_string(target["id_rc"])
-
-    path_filter = "TRUE"
-    if edge_types:
-        path_filter = f"ALL(rel IN relationships(p) WHERE type(rel) IN {_cypher_list(edge_types)})"
+    start_match, start_pattern = _apex_start(source)
+    chains = [
+        APEX_BUTTON_PROCEDURE_CHAIN,
+        APEX_PROCESS_PROCEDURE_CHAIN,
+        APEX_DA_STEP_PROCEDURE_CHAIN,
+        APEX_DA_PROCEDURE_CHAIN,
+    ]
+    cypher = _apex_union(
+        start_match, start_pattern, [c.format(access=APEX_WRITES) for c in chains], _path_edge_filter(edge_types)
+    )
+    return cypher, _pair_params(source, target, edge_types, project)
 
-    if source_type == "APEXApp":
-        start_match = f"MATCH (start:APEXApp {{id_rc: {source_id}}})"
-        start_pattern = "(start)-[:HAS_PAGE]->(page:APEXPage)"
-    else:
-        start_match = f"MATCH (start:APEXPage {{id_rc: {source_id}}})"
-        start_pattern = "(start:APEXPage)"
+def _build_apex_app_region_db_access_to_db_object(source, target, edge_types, project):
+    if not source["id_rc"]:
+        raise ValueError("source.id_rc is required")
+    if not target["id_rc"]:
+        raise ValueError("target.id_rc is required")
 
-    return f"""
-{start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
-MATCH p =
-  {start_pattern}
-       -[:HAS_REGION]->(region:APEXRegion)
-       -[:SELECTS_FROM|INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
-UNWIND relationships(p) AS r
-RETURN startNode(r) AS s, r, endNode(r) AS t
-""".strip()
+    start_match, start_pattern = _apex_start(source)
+    cypher = _apex_union(
+        start_match, start_pattern, [APEX_REGION_CHAIN.format(access=APEX_ACCESS)], _path_edge_filter(edge_types)
+    )
+    return cypher, _pair_params(source, target, edge_types, project)
 
 
 def _build_apex_source_db_access_to_db_object(source, target, edge_types, project):
@@ -686,94 +608,18 @@ def _build_apex_source_db_access_to_db_object(source, target, edge_types, projec
     if not target["id_rc"]:
         raise ValueError("target.id_rc is required")
 
-    source_type = str(source.get("node_type") or "").strip()
-    if source_type not in ("APEXApp", "APEXPage"):
-        raise ValueError("source.node_type must be APEXApp or APEXPage for this template")
-
-    source_id = _quote_cypher_string(source["id_rc"])
-    obj_id = _quote_cypher_string(target["id_rc"])
-
-    path_filter = "TRUE"
-    if edge_types:
-        path_filter = f"ALL(rel IN relationships(p) WHERE type(rel) IN {_cypher_list(edge_types)})"
-
-    if source_type == "APEXApp":
-        start_match = f"MATCH (start:APEXApp {{id_rc: {source_id}}})"
-        start_pattern = "(start)-[:HAS_PAGE]->(page:APEXPage)"
-    else:
-        start_match = f"MATCH (start:APEXPage {{id_rc: {source_id}}})"
-        start_pattern = "(start:APEXPage)"
-    return f"""
-{start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
-MATCH p =
-  {start_pattern}
-       -[:HAS_BUTTON]->(btn:APEXButton)
-       -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
-       -[:SELECTS_FROM|INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
-UNWIND relationships(p) AS r
-RETURN startNode(r) AS s, r, endNode(r) AS t
-
-UNION
-
-{start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
-MATCH p =
-  {start_pattern}
-       -[:HAS_PROCESS]->(procNode:APEXPageProcess)
-       -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
-       -[:SELECTS_FROM|INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
-UNWIND relationships(p) AS r
-RETURN startNode(r) AS s, r, endNode(r) AS t
-
-UNION
-
-{start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
-MATCH p =
-  {start_pattern}
-       -[:HAS_BUTTON]->(btn:APEXButton)
-       -[:TRIGGERS_DA]->(da:APEXDynamicAction)
-       -[:HAS_ACTION]->(step:APEXDynamicActionStep)
-       -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
-       -[:SELECTS_FROM|INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
-UNWIND relationships(p) AS r
-RETURN startNode(r) AS s, r, endNode(r) AS t
-
-UNION
-
-{start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
-MATCH p =
-  {start_pattern}
-       -[:HAS_BUTTON]->(btn:APEXButton)
-       -[:TRIGGERS_DA]->(da:APEXDynamicAction)
-       -[:CALLS_PROCEDURE]->(pr:OracleProcedure)
-       -[:SELECTS_FROM|INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
-UNWIND relationships(p) AS r
-RETURN startNode(r) AS s, r, endNode(r) AS t
-
-UNION
-
-{start_match}
-MATCH (obj:ORADbObject {{id_rc: {obj_id}}})
-MATCH p =
-  {start_pattern}
-       -[:HAS_REGION]->(region:APEXRegion)
-       -[:SELECTS_FROM|INSERTS_INTO|UPDATES|DELETES_FROM|MERGES_INTO]->(obj)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
-UNWIND relationships(p) AS r
-RETURN startNode(r) AS s, r, endNode(r) AS t
-""".strip()
+    start_match, start_pattern = _apex_start(source)
+    chains = [
+        APEX_BUTTON_PROCEDURE_CHAIN,
+        APEX_PROCESS_PROCEDURE_CHAIN,
+        APEX_DA_STEP_PROCEDURE_CHAIN,
+        APEX_DA_PROCEDURE_CHAIN,
+        APEX_REGION_CHAIN,
+    ]
+    cypher = _apex_union(
+        start_match, start_pattern, [c.format(access=APEX_ACCESS) for c in chains], _path_edge_filter(edge_types)
+    )
+    return cypher, _pair_params(source, target, edge_types, project)
 
 def _build_filtered_paths_between_a_b(source, target, edge_types, project):
     if not source["id_rc"]:
@@ -783,18 +629,17 @@ def _build_filtered_paths_between_a_b(source, target, edge_types, project):
     if not edge_types:
         raise ValueError("At least one edge type must be selected")
 
-    path_filter = f"ALL(rel IN relationships(p) WHERE type(rel) IN {_cypher_list(edge_types)})"
-
-    return f"""
-MATCH (a {{id_rc: {_quote_cypher_string(source['id_rc'])}}}),
-      (b {{id_rc: {_quote_cypher_string(target['id_rc'])}}})
-WHERE {_project_filter('a', project)} AND {_project_filter('b', project)}
+    cypher = f"""
+MATCH (a:IVNode {{id_rc: $source_id}}),
+      (b:IVNode {{id_rc: $target_id}})
+WHERE {_project_filter('a')} AND {_project_filter('b')}
 MATCH p = (a)-[*..8]-(b)
-WHERE ALL(n IN nodes(p) WHERE {_project_filter('n', project)})
-  AND {path_filter}
+WHERE ALL(n IN nodes(p) WHERE {_project_filter('n')})
+  AND {_path_edge_filter(edge_types)}
 UNWIND relationships(p) AS r
 RETURN DISTINCT startNode(r) AS s, r, endNode(r) AS t
 """.strip()
+    return cypher, _pair_params(source, target, edge_types, project)
 
 
 BUILDERS = {
@@ -1005,7 +850,7 @@ def build_cypher():
         with driver.session() as session:
             source = _resolve_node_identity(session, source, "source", project)
             target = _resolve_node_identity(session, target, "target", project) if (target.get("id_rc") or target.get("name")) else target
-        cypher = BUILDERS[template_id](source, target, edge_types, project)
+        cypher, params = BUILDERS[template_id](source, target, edge_types, project)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
@@ -1017,6 +862,7 @@ def build_cypher():
             "success": True,
             "template": template_id,
             "cypher": cypher,
+            "params": params,
             "meta": {
                 "project": project,
                 "edge_types": edge_types,
@@ -1063,7 +909,7 @@ def build_cypher_with_ai():
         if not question:
             return jsonify({"success": False, "error": "question is required"}), 400
 
-        registry = ProviderRegistry()
+        registry = get_registry()
         provider_models = _provider_models_map(registry)
 
         requested_selection = _parse_selection(payload)
@@ -1080,9 +926,8 @@ def build_cypher_with_ai():
         target = _normalize_node_selection(payload.get("target") or {}, "target")
         sample_limit = max(1, min(int(payload.get("sample_limit") or 12), 20))
 
-        with driver.session() as session:
-            ctx = fetch_graph_context(session, project=project, sample_limit=sample_limit)
-            node_type_names = _fetch_node_type_names(session, project)
+        ctx = get_graph_context(driver, project, sample_limit=sample_limit)
+        node_type_names = ctx.node_type_names
 
         prompt_parts = [format_context_for_prompt(ctx).strip()]
         if node_type_names:
@@ -1140,6 +985,7 @@ def build_cypher_with_ai():
                 model=selection.model,
                 temperature=0.0,
                 max_tokens=int(payload.get("max_tokens") or 900),
+                no_cache=bool(payload.get("no_cache")),
             )
         )
 
@@ -1163,6 +1009,7 @@ def build_cypher_with_ai():
                 "model": selection.model,
                 "selection": selection_to_json(selection),
                 "cypher": cypher,
+                "cached": resp.cached,
                 "graph_context": {
                     "project": ctx.project,
                     "labels": ctx.labels,
@@ -0,0 +1,265 @@
+import os
+from typing import Any
+
+import jwt
+from flask import Blueprint, jsonify, request
+
+from graph.projection import get_projection_policy, project_properties
+from graph.schema import LAYOUT_LABELS
+from graph.serialize import convert_dates, expanded_node_to_vis
+from graph.wire import graph_response
+
+JWT_SECRET = os.environ["JWT_SECRET"]
+JWT_ALG = "HS256"
+
+graph_api_bp = Blueprint("graph_api", __name__)
+
+driver = None
+
+MAX_PROPERTY_IDS = 500
+MAX_EXPAND_IDS = 200
+MAX_PER_TYPE_LIMIT = 1000
+
+# Per seed node and relationship type: the total degree (apoc.node.degree reads
+# the node's degree store, no traversal) and up to $per_type_limit neighbours.
+# Relationship types are listed with apoc.node.relationship.types, so a seed
+# with no matching relationships produces no rows.
+EXPAND_CYPHER = """
+UNWIND $ids AS seed_id
+MATCH (n:IVNode {id_rc: seed_id})
+UNWIND [t IN apoc.node.relationship.types(n) WHERE $edge_types IS NULL OR t IN $edge_types] AS rel_type
+CALL {
+  WITH n, rel_type
+  MATCH (n)-[r]-(m)
+  WHERE type(r) = rel_type
+    AND none(l IN labels(m) WHERE l IN $layout_labels)
+  RETURN r, m
+  <<limit>>
+}
+WITH n, rel_type, collect({rel: r, m: m, from: startNode(r).id_rc, to: endNode(r).id_rc}) AS hits
+RETURN n, rel_type, apoc.node.degree(n, rel_type) AS degree, hits
+"""
+
+
+def init_driver(d):
+    global driver
+    driver = d
+
+
+def _ensure_driver():
+    if driver is None:
+        raise RuntimeError("Neo4j driver not initialized. Call init_driver(driver) on startup.")
+
+
+def validate_jwt():
+    token = request.cookies.get("access_token")
+    if not token:
+        return None, jsonify({"error": "Unauthorized: No token provided"}), 401
+
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+        uid = payload.get("sub")
+        project = payload.get("project")
+        if not uid or not project:
+            return None, jsonify({"error": "Unauthorized: Invalid token"}), 401
+        return {"uid": uid, "project": project}, None, None
+    except jwt.PyJWTError as e:
+        print(f"JWT Error: {e}")
+        return None, jsonify({"error": "Unauthorized: Invalid token"}), 401
+
+
+def _normalize_project(project_value) -> str | None:
+    project = str(project_value or "").strip()
+    if not project or project.upper() == "ALL":
+        return None
+    return project
+
+
+def _normalize_ids(raw: Any, limit: int) -> list[str]:
+    if not isinstance(raw, list):
+        raise ValueError("ids must be a list of id_rc strings")
+    unique: list[str] = []
+    seen: set[str] = set()
+    for x in raw:
+        s = str(x or "").strip()
+        if s and s not in seen:
+            seen.add(s)
+            unique.append(s)
+    if not unique:
+        raise ValueError("ids must not be empty")
+    if len(unique) > limit:
+        raise ValueError(f"ids supports at most {limit} entries")
+    return unique
+
+
+def _normalize_edge_types(raw: Any) -> list[str] | None:
+    if raw is None:
+        return None
+    if not isinstance(raw, list):
+        raise ValueError("edge_types must be a list of relationship types")
+    types = [str(t).strip() for t in raw if str(t or "").strip()]
+    return types or None
+
+
+def _normalize_per_type_limit(raw: Any) -> int | None:
+    if raw is None or raw == "":
+        return None
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError("per_type_limit must be an integer")
+    if limit <= 0:
+        return None
+    return min(limit, MAX_PER_TYPE_LIMIT)
+
+
+def expand_nodes(session, ids: list[str], edge_types: list[str] | None, per_type_limit: int | None) -> dict[str, Any]:
+    """
+    Expands all seed nodes in one query. Returns vis-network nodes/edges plus
+    an overflow list with one entry per (seed, type) whose degree exceeded
+    per_type_limit, so supernodes are summarised instead of sent in full.
+    """
+    limit_clause = "LIMIT $per_type_limit" if per_type_limit else ""
+    cypher = EXPAND_CYPHER.replace("<<limit>>", limit_clause)
+
+    nodes: dict[str, dict[str, Any]] = {}
+    edges: dict[str, dict[str, Any]] = {}
+    overflow: list[dict[str, Any]] = []
+    expanded: set[str] = set()
+
+    rows = session.run(
+        cypher,
+        ids=ids,
+        edge_types=edge_types,
+        per_type_limit=per_type_limit,
+        layout_labels=list(LAYOUT_LABELS),
+    )
+    for row in rows:
+        seed = row["n"]
+        seed_id = seed.get("id_rc")
+        expanded.add(seed_id)
+        if seed_id and seed_id not in nodes:
+            nodes[seed_id] = expanded_node_to_vis(seed)
+
+        hits = row["hits"] or []
+        for hit in hits:
+            m = hit["m"]
+            m_id = m.get("id_rc")
+            if m_id and m_id not in nodes:
+                nodes[m_id] = expanded_node_to_vis(m)
+
+            rel = hit["rel"]
+            if not hit["from"] or not hit["to"]:
+                continue
+            rel_id = rel.get("id_rc") or str(rel.id)
+            if rel_id not in edges:
+                edges[rel_id] = {
+                    "id": rel_id,
+                    "id_rc": rel_id,
+                    "from": hit["from"],
+                    "to": hit["to"],
+                    "type": rel.type,
+                    "label": rel.type,
+                }
+
+        degree = int(row["degree"] or 0)
+        if per_type_limit and len(hits) >= per_type_limit and degree > len(hits):
+            overflow.append({
+                "id_rc": seed_id,
+                "type": row["rel_type"],
+                "degree": degree,
+                "returned": len(hits),
+                "omitted": degree - len(hits),
+            })
+
+    return {
+        "nodes": list(nodes.values()),
+        "edges": list(edges.values()),
+        "overflow": overflow,
+        "meta": {
+            "requested": len(ids),
+            "expanded": len(expanded),
+            "per_type_limit": per_type_limit,
+        },
+    }
+
+
+def fetch_node_properties(session, ids: list[str], project: str | None, include_vectors: bool = False) -> dict[str, Any]:
+    cypher = """
+    MATCH (n:IVNode)
+    WHERE n.id_rc IN $ids
+      AND ($project IS NULL OR n.projectName = $project)
+    RETURN n.id_rc AS id_rc, labels(n) AS labels, properties(n) AS properties
+    """
+    policy = get_projection_policy()
+    nodes = []
+    found: set[str] = set()
+    for row in session.run(cypher, ids=ids, project=project):
+        properties = convert_dates(dict(row["properties"] or {}))
+        if not include_vectors:
+            properties, _ = project_properties(properties, policy, truncate=False)
+        found.add(row["id_rc"])
+        nodes.append({"id_rc": row["id_rc"], "labels": list(row["labels"] or []), "properties": properties})
+    return {"nodes": nodes, "missing": [i for i in ids if i not in found]}
+
+
+@graph_api_bp.post("/api/nodes/properties")
+def node_properties():
+    """
+    Full (untruncated) properties for a batch of nodes, for the graph UI to
+    load lazily when a node was sent with truncated: true.
+
+    Request JSON: {"ids": ["<id_rc>", ...], "project": "...", "include_vectors": false}
+    Vector properties stay excluded unless include_vectors is true.
+    """
+    user_data, error_response, status_code = validate_jwt()
+    if error_response:
+        return error_response, status_code
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        ids = _normalize_ids(payload.get("ids"), MAX_PROPERTY_IDS)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    project = _normalize_project(payload.get("project", user_data.get("project")))
+    include_vectors = bool(payload.get("include_vectors"))
+
+    try:
+        _ensure_driver()
+        with driver.session() as session:
+            result = fetch_node_properties(session, ids, project, include_vectors)
+        return jsonify({"success": True, **result})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@graph_api_bp.post("/api/graph/expand")
+def expand():
+    """
+    Expands several nodes at once.
+
+    Request JSON:
+      {"ids": ["<id_rc>", ...], "edge_types": ["TYPE", ...] | null, "per_type_limit": 50}
+    Response: {"success", "nodes", "edges", "overflow", "meta"}; graph payload
+    negotiation (compact format) works as for /expand-node.
+    """
+    user_data, error_response, status_code = validate_jwt()
+    if error_response:
+        return error_response, status_code
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        ids = _normalize_ids(payload.get("ids"), MAX_EXPAND_IDS)
+        edge_types = _normalize_edge_types(payload.get("edge_types"))
+        per_type_limit = _normalize_per_type_limit(payload.get("per_type_limit"))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        _ensure_driver()
+        with driver.session() as session:
+            result = expand_nodes(session, ids, edge_types, per_type_limit)
+        return graph_response({"success": True, **result})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -5,7 +5,10 @@ from bs4 import BeautifulSoup
 from datetime import datetime
 import os
 import re
-import uuid 
+import uuid
+
+from graph.context import bump_graph_version
+from graph.partitions import ensure_partition, partition_label
 
 meeting_graph_bp = Blueprint("meeting_graph", __name__, url_prefix="/graph")
 
@@ -301,14 +304,16 @@ def parse_meeting_html(html: str) -> dict:
 def write_meeting_graph(tx, project_name: str, html: str, parsed: dict, node_id: str = None):
     tx.run("""
         MERGE (m:Meeting {id_rc: $meetingId})
-        SET m.name = $projectName + '.Meeting.' + $title,
+        SET m:IVNode,
+            m.name = $projectName + '.Meeting.' + $title,
             m.title = $title,
             m.language = $language,
             m.projectName = $projectName,
             m.createdAt = datetime()
 
         MERGE (doc:DocumentHTML {id_rc: $documentId})
-        SET doc.name = $projectName + '.Document.' + $title,
+        SET doc:IVNode,
+            doc.name = $projectName + '.Document.' + $title,
             doc.title = $title,
             doc.html = $html,
             doc.language = $language,
@@ -328,7 +333,7 @@ def write_meeting_graph(tx, project_name: str, html: str, parsed: dict, node_id:
 
     for attendee in parsed["attendees"]:
         tx.run("""
-            MATCH (m:Meeting {id_rc: $meetingId})
+            MATCH (m:Meeting:IVNode {id_rc: $meetingId})
 
             MERGE (person:Person {name: $personName})
             SET person.projectName = $projectName
@@ -351,13 +356,14 @@ def write_meeting_graph(tx, project_name: str, html: str, parsed: dict, node_id:
 
     for agenda_item in parsed["agenda"]:
         tx.run("""
-            MATCH (m:Meeting {id_rc: $meetingId})
+            MATCH (m:Meeting:IVNode {id_rc: $meetingId})
 
             MERGE (a:AgendaItem {
                 meetingId: $meetingId,
                 title: $title
             })
-            SET a.id_rc = coalesce(a.id_rc, randomUUID()),
+            SET a:IVNode,
+                a.id_rc = coalesce(a.id_rc, randomUUID()),
                 a.name = $projectName + '.AgendaItem.' + $title,
                 a.projectName = $projectName
 
@@ -370,10 +376,11 @@ def write_meeting_graph(tx, project_name: str, html: str, parsed: dict, node_id:
 
     if parsed["notes"]:
         tx.run("""
-            MATCH (m:Meeting {id_rc: $meetingId})
+            MATCH (m:Meeting:IVNode {id_rc: $meetingId})
 
             MERGE (n:MeetingNote {meetingId: $meetingId})
-            SET n.id_rc = coalesce(n.id_rc, randomUUID()),
+            SET n:IVNode,
+                n.id_rc = coalesce(n.id_rc, randomUUID()),
                 n.name = $projectName + '.MeetingNote.' + $meetingId,
                 n.text = $notes,
                 n.projectName = $projectName
@@ -389,10 +396,11 @@ def write_meeting_graph(tx, project_name: str, html: str, parsed: dict, node_id:
         task_id = str(uuid.uuid4())
 
         tx.run("""
-            MATCH (m:Meeting {id_rc: $meetingId})
+            MATCH (m:Meeting:IVNode {id_rc: $meetingId})
 
             MERGE (t:Task {id_rc: $taskId})
-            SET t.name = $projectName + '.Task.' + $title,
+            SET t:IVNode,
+                t.name = $projectName + '.Task.' + $title,
                 t.title = $title,
                 t.description = $description,
                 t.assignedDate = CASE
@@ -429,12 +437,15 @@ def write_meeting_graph(tx, project_name: str, html: str, parsed: dict, node_id:
             "projectName": project_name
         })
 
+    chunk_label = partition_label(project_name)
     for chunk in parsed["chunks"]:
-        tx.run("""
-            MATCH (doc:DocumentHTML {id_rc: $documentId})
+        tx.run(f"""
+            MATCH (doc:DocumentHTML:IVNode {{id_rc: $documentId}})
 
-            MERGE (c:Chunk {id_rc: $chunkId})
-            SET c.name = $projectName + '.Chunk.' + $title,
+            MERGE (c:Chunk {{id_rc: $chunkId}})
+            SET c:IVNode,
+                c:`{chunk_label}`,
+                c.name = $projectName + '.Chunk.' + $title,
                 c.title = $title,
                 c.section = $section,
                 c.text = $text,
@@ -453,8 +464,8 @@ def write_meeting_graph(tx, project_name: str, html: str, parsed: dict, node_id:
 
     if node_id:
         tx.run("""
-            MATCH (parent {id_rc: $nodeId})
-            MATCH (m:Meeting {id_rc: $meetingId})
+            MATCH (parent:IVNode {id_rc: $nodeId})
+            MATCH (m:Meeting:IVNode {id_rc: $meetingId})
             MERGE (parent)-[:HAS_MEETING]->(m)
         """, {
             "nodeId": node_id,
@@ -482,6 +493,9 @@ def generate_meeting_graph():
         _ensure_driver()
         with driver.session() as session:
             session.execute_write(write_meeting_graph, project_name, html, parsed, node_id)
+            if parsed["chunks"]:
+                ensure_partition(session, project_name)
+        bump_graph_version(project_name)
 
         return jsonify({
             "ok": True,
@@ -4,7 +4,11 @@ from typing import Any
 import requests
 from flask import Blueprint, jsonify, request
 
-from ai.registry import ProviderRegistry
+from ai.embed_cache import get_embedding_cache
+from ai.reembed import default_embedding_model, reembed_stale
+from ai.registry import ProviderRegistry, get_registry
+from ai.vector_store import get_vector_store, vector_store_stats
+from graph.partitions import VectorDimensionError, ensure_partition, ensure_vector_dimensions, partition_indexes
 from routes.retrieval import validate_jwt
 
 ops_vector_bp = Blueprint("ops_vector", __name__, url_prefix="/api/ops")
@@ -36,15 +40,19 @@ def _query_embedding_coverage(session, project: str | None) -> dict[str, int]:
     RETURN
       count(c) AS total,
       count(c.embedding) AS withEmbedding,
-      count(c) - count(c.embedding) AS missing
+      count(c) - count(c.embedding) AS missing,
+      count(c.embedding) - count(c.embeddingModel) AS unversioned,
+      count(CASE WHEN c.embeddingModel <> $model THEN 1 END) AS otherModel
     """
-    row = session.run(cypher, project=project).single()
+    row = session.run(cypher, project=project, model=default_embedding_model()).single()
     if not row:
-        return {"total": 0, "withEmbedding": 0, "missing": 0}
+        return {"total": 0, "withEmbedding": 0, "missing": 0, "unversioned": 0, "otherModel": 0}
     return {
         "total": int(row.get("total") or 0),
         "withEmbedding": int(row.get("withEmbedding") or 0),
         "missing": int(row.get("missing") or 0),
+        "unversioned": int(row.get("unversioned") or 0),
+        "otherModel": int(row.get("otherModel") or 0),
     }
 
 
@@ -82,13 +90,21 @@ def _probe_ollama(registry: ProviderRegistry) -> dict[str, Any]:
         return {"configured": False, "reachable": False, "error": "OLLAMA base URL missing"}
 
     url = f"{base_url.rstrip('/')}/api/tags"
+    embed_route = getattr(provider, "embed_route", None)
+    scheduler = getattr(provider, "scheduler", None)
+    queue = scheduler.stats() if scheduler is not None else None
+    breaker = getattr(provider, "breaker", None)
+    circuit = breaker.stats() if breaker is not None else None
     try:
-        r = requests.get(url, timeout=6)
+        r = getattr(provider, "_session", requests).get(url, timeout=6)
         return {
             "configured": True,
             "reachable": bool(r.ok),
             "http_status": int(r.status_code),
             "base_url": base_url,
+            "embed_endpoint": ({"path": embed_route[0], "payload_key": embed_route[1]} if embed_route else None),
+            "queue": queue,
+            "circuit": circuit,
         }
     except requests.RequestException as e:
         return {
@@ -96,6 +112,8 @@ def _probe_ollama(registry: ProviderRegistry) -> dict[str, Any]:
             "reachable": False,
             "base_url": base_url,
             "error": str(e),
+            "queue": queue,
+            "circuit": circuit,
         }
 
 
@@ -116,6 +134,7 @@ def _probe_openai(registry: ProviderRegistry) -> dict[str, Any]:
         "reachable": True,
         "base_url": base_url,
         "note": "Key present; provider initialized",
+        "circuit": provider.breaker.stats() if getattr(provider, "breaker", None) else None,
     }
 
 
@@ -154,10 +173,128 @@ def vector_health():
         except Exception as e:
             result["indexes_error"] = str(e)
 
-    registry = ProviderRegistry()
+        if project:
+            try:
+                result["partition"] = partition_indexes(session, project)
+            except Exception as e:
+                result["partition_error"] = str(e)
+
+    registry = get_registry()
     result["providers"] = {
         "ollama": _probe_ollama(registry),
         "openai": _probe_openai(registry),
     }
+    result["embedding_cache"] = get_embedding_cache().stats()
+    llm_cache = registry.response_cache
+    result["llm_cache"] = llm_cache.stats() if llm_cache is not None else {"enabled": False}
+    result["vector_store"] = vector_store_stats()
 
     return jsonify(result), 200
+
+
+@ops_vector_bp.route("/vector-store/sync", methods=["POST"])
+def vector_store_sync():
+    """Bring the local vector store of the user's project in line with Neo4j."""
+    user_info, err_resp, status = validate_jwt()
+    if err_resp:
+        return err_resp, status
+
+    _ensure_driver()
+
+    project = _normalize_project(user_info.get("project"))
+    if not project:
+        return jsonify({"success": False, "error": "A project is required for the local vector store"}), 400
+    store = get_vector_store(project, create=True)
+    if store is None:
+        return jsonify({
+            "success": False,
+            "error": "Local vector store is disabled ([VECTOR_STORE] ENABLED) or numpy is not installed",
+        }), 400
+
+    with driver.session() as session:
+        summary = store.sync_from_neo4j(session, project)
+
+    return jsonify({"success": True, "project": project, "sync": summary, "store": store.stats()}), 200
+
+
+@ops_vector_bp.route("/partitions/ensure", methods=["POST"])
+def partitions_ensure():
+    """Label the user's project chunks and create its partition indexes."""
+    user_info, err_resp, status = validate_jwt()
+    if err_resp:
+        return err_resp, status
+
+    _ensure_driver()
+
+    project = _normalize_project(user_info.get("project"))
+    if not project:
+        return jsonify({"success": False, "error": "A project is required for a partition"}), 400
+
+    try:
+        with driver.session() as session:
+            partition = ensure_partition(session, project)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    return jsonify({"success": True, "partition": partition}), 200
+
+
+@ops_vector_bp.route("/embeddings/reembed", methods=["POST"])
+def embeddings_reembed():
+    """
+    Re-embed the user's project chunks whose vector is missing or stale
+    (other model, changed text). JSON body, all optional: dry_run,
+    max_chunks (default 2000 per call; repeat while complete is false),
+    max_chars (text cut before embedding, 0: none; chunks embedded with
+    another cut count as stale; by default each chunk keeps its own cut),
+    adopt_unversioned, recreate_indexes. A model whose vectors have another
+    size than the project's partition index is refused with 409 unless
+    recreate_indexes drops and recreates it for the new size. The global
+    Chunk indexes serve every project and are never touched from here
+    (05_reembed_stale.py --recreate-indexes).
+    """
+    user_info, err_resp, status = validate_jwt()
+    if err_resp:
+        return err_resp, status
+
+    _ensure_driver()
+
+    project = _normalize_project(user_info.get("project"))
+    if not project:
+        return jsonify({"success": False, "error": "A project is required for re-embedding"}), 400
+
+    data = request.get_json(silent=True) or {}
+    try:
+        max_chunks = max(1, int(data.get("max_chunks") or 2000))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "max_chunks must be an integer"}), 400
+    try:
+        max_chars = None if data.get("max_chars") is None else max(0, int(data["max_chars"]))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "max_chars must be an integer"}), 400
+
+    recreate = bool(data.get("recreate_indexes"))
+    try:
+        provider = get_registry().get_provider("ollama")
+        with driver.session() as session:
+            summary = reembed_stale(
+                session,
+                provider,
+                default_embedding_model(),
+                project=project,
+                max_chunks=max_chunks,
+                max_chars=max_chars,
+                adopt_unversioned=bool(data.get("adopt_unversioned")),
+                dry_run=bool(data.get("dry_run")),
+                check_dimensions=lambda dims: ensure_vector_dimensions(
+                    session, project, dims, recreate=recreate, include_global=False
+                ),
+            )
+            if summary["reembedded"] and not summary["dry_run"]:
+                summary["partition"] = ensure_partition(session, project)
+    except VectorDimensionError as e:
+        return jsonify({"success": False, "error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    return jsonify({"success": True, "project": project, "reembed": summary}), 200
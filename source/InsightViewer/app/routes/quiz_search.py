@@ -0,0 +1,244 @@
+"""
+Vector search over Chunk nodes for the quiz pages.
+
+`/api/quiz/search` answers one question, `/api/quiz/search/batch` a whole
+quiz in one request: the questions are embedded together (through the
+shared embedding cache, so repeated questions cost nothing) and ranked in a
+single Cypher round trip, or in one `score_many` call when the project has a
+synced local vector store.
+
+Results are limited to the user's project. The project's partition index
+ranks within the project directly; on the global index the search asks for
+GLOBAL_OVERFETCH times as many neighbours so the project filter still leaves
+`top_k` rows in most cases.
+"""
+
+from typing import Any
+
+from flask import Blueprint, jsonify, request
+
+from ai.embed_cache import embed_texts, normalize_text
+from ai.errors import (
+    AIError,
+    DeadlineExceeded,
+    ProviderBusyError,
+    ProviderConfigError,
+    ProviderUnavailableError,
+)
+from ai.reembed import default_embedding_model
+from ai.registry import get_registry
+from ai.vector_store import get_vector_store
+from graph.partitions import resolve_vector_index
+from routes.retrieval import validate_jwt
+
+quiz_search_bp = Blueprint("quiz_search", __name__, url_prefix="/api/quiz")
+
+driver = None
+
+GLOBAL_VECTOR_INDEX = "chunk_embedding_index"
+EMBED_PROVIDER = "ollama"
+
+DEFAULT_TOP_K = 6
+MAX_TOP_K = 50
+MAX_BATCH_QUESTIONS = 100
+GLOBAL_OVERFETCH = 4
+
+# One row per (question, hit); the subquery keeps top_k per question.
+INDEX_SEARCH_CYPHER = """
+UNWIND $queries AS q
+CALL {
+    WITH q
+    CALL db.index.vector.queryNodes($index, $vector_k, q.vec) YIELD node, score
+    WITH node, score
+    WHERE $project IS NULL OR node.projectName = $project
+    RETURN node, score
+    ORDER BY score DESC
+    LIMIT $k
+}
+RETURN q.i AS i, node.id_rc AS id, node.text AS text, score
+ORDER BY i, score DESC
+"""
+
+# Resolves (question, id_rc, score) triples ranked by the local vector store.
+LOCAL_SEARCH_CYPHER = """
+UNWIND $hits AS h
+MATCH (node:Chunk {id_rc: h.id_rc})
+RETURN h.i AS i, node.id_rc AS id, node.text AS text, h.score AS score
+ORDER BY i, score DESC
+"""
+
+
+def init_driver(d):
+    global driver
+    driver = d
+
+
+def _ensure_driver():
+    if driver is None:
+        raise RuntimeError("Neo4j driver not initialized. Call init_driver(driver) on startup.")
+
+
+def _normalize_project(project_value, user_project) -> str | None:
+    project = str(project_value or user_project or "").strip()
+    if not project or project.upper() == "ALL":
+        return None
+    return project
+
+
+def _top_k(value) -> int:
+    try:
+        k = int(value if value is not None else DEFAULT_TOP_K)
+    except (TypeError, ValueError):
+        raise ValueError("top_k must be an integer")
+    if k < 1:
+        raise ValueError("top_k must be at least 1")
+    return min(k, MAX_TOP_K)
+
+
+def search_questions(
+    session,
+    questions: list[str],
+    *,
+    project: str | None,
+    top_k: int,
+    provider=None,
+    model: str | None = None,
+    cache=None,
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """
+    Top-k chunks for every question, in input order, plus search metadata.
+    Questions that only differ in whitespace are embedded and searched
+    once; a question whose embedding failed gets an "error" instead
+    of rows.
+    """
+    provider = provider or get_registry().get_provider(EMBED_PROVIDER)
+    model = model or default_embedding_model()
+
+    slots: dict[str, int] = {}
+    unique: list[str] = []
+    slot_of: list[int] = []
+    for question in questions:
+        key = normalize_text(question)
+        if key not in slots:
+            slots[key] = len(unique)
+            unique.append(question)
+        slot_of.append(slots[key])
+
+    embedded = embed_texts(provider, unique, model, cache=cache).items
+    vectors = {i: item.embedding for i, item in enumerate(embedded) if item.error is None}
+    rows_by_slot: dict[int, list[dict[str, Any]]] = {i: [] for i in vectors}
+
+    meta: dict[str, Any] = {"questions": len(questions), "unique": len(unique), "top_k": top_k, "project": project}
+    if vectors:
+        dim = len(next(iter(vectors.values())))
+        store = get_vector_store(project)
+        if store is not None and store.dim == dim:
+            order = list(vectors)
+            ranked = store.score_many([vectors[i] for i in order], top_k)
+            hits = [
+                {"i": i, "id_rc": id_rc, "score": score}
+                for i, pairs in zip(order, ranked)
+                for id_rc, score in pairs
+            ]
+            rows = session.run(LOCAL_SEARCH_CYPHER, hits=hits).data() if hits else []
+            meta["source"] = "vector_store"
+        else:
+            index = resolve_vector_index(session, project, GLOBAL_VECTOR_INDEX)
+            partitioned = index != GLOBAL_VECTOR_INDEX
+            vector_k = top_k if partitioned or project is None else top_k * GLOBAL_OVERFETCH
+            rows = session.run(
+                INDEX_SEARCH_CYPHER,
+                queries=[{"i": i, "vec": vec} for i, vec in vectors.items()],
+                index=index,
+                vector_k=vector_k,
+                k=top_k,
+                project=project,
+            ).data()
+            meta.update({"source": "index", "index": index, "vector_k": vector_k})
+        for row in rows:
+            rows_by_slot[row["i"]].append({"id": row["id"], "text": row["text"], "score": row["score"]})
+
+    results = []
+    for question, slot in zip(questions, slot_of):
+        if slot in rows_by_slot:
+            results.append({"question": question, "rows": rows_by_slot[slot]})
+        else:
+            results.append({"question": question, "rows": [], "error": str(embedded[slot].error)})
+    return results, meta
+
+
+def _error_response(e: Exception):
+    if isinstance(e, ValueError):
+        return jsonify({"success": False, "error": str(e)}), 400
+    if isinstance(e, (ProviderUnavailableError, ProviderBusyError)):
+        return jsonify({"success": False, "error": str(e)}), 503
+    if isinstance(e, DeadlineExceeded):
+        return jsonify({"success": False, "error": str(e)}), 504
+    if isinstance(e, ProviderConfigError):
+        return jsonify({"success": False, "error": str(e)}), 500
+    if isinstance(e, AIError):
+        return jsonify({"success": False, "error": str(e)}), 502
+    return jsonify({"success": False, "error": str(e)}), 500
+
+
+@quiz_search_bp.route("/search", methods=["POST"])
+def quiz_search():
+    """
+    POST JSON: { "question": "...", "top_k": 6, "project": optional }
+    Returns top matching Chunk nodes (id, text, score).
+    """
+    user_info, err_resp, status = validate_jwt()
+    if err_resp:
+        return err_resp, status
+
+    _ensure_driver()
+
+    data = request.get_json(silent=True) or {}
+    question = str(data.get("question") or "").strip()
+    if not question:
+        return jsonify({"success": False, "error": "Missing 'question'"}), 400
+
+    try:
+        top_k = _top_k(data.get("top_k"))
+        project = _normalize_project(data.get("project"), user_info.get("project"))
+        with driver.session() as session:
+            results, meta = search_questions(session, [question], project=project, top_k=top_k)
+    except Exception as e:
+        return _error_response(e)
+
+    if "error" in results[0]:
+        return jsonify({"success": False, "error": results[0]["error"]}), 502
+    return jsonify({"success": True, "rows": results[0]["rows"], "meta": meta}), 200
+
+
+@quiz_search_bp.route("/search/batch", methods=["POST"])
+def quiz_search_batch():
+    """
+    POST JSON: { "questions": ["...", ...], "top_k": 6, "project": optional }
+    Returns one { question, rows } entry per question, in order.
+    """
+    user_info, err_resp, status = validate_jwt()
+    if err_resp:
+        return err_resp, status
+
+    _ensure_driver()
+
+    data = request.get_json(silent=True) or {}
+    questions = data.get("questions")
+    if not isinstance(questions, list) or not questions:
+        return jsonify({"success": False, "error": "'questions' must be a non-empty list"}), 400
+    if len(questions) > MAX_BATCH_QUESTIONS:
+        return jsonify({"success": False, "error": f"At most {MAX_BATCH_QUESTIONS} questions per request"}), 400
+    questions = [str(q or "").strip() for q in questions]
+    if not all(questions):
+        return jsonify({"success": False, "error": "Questions must not be empty"}), 400
+
+    try:
+        top_k = _top_k(data.get("top_k"))
+        project = _normalize_project(data.get("project"), user_info.get("project"))
+        with driver.session() as session:
+            results, meta = search_questions(session, questions, project=project, top_k=top_k)
+    except Exception as e:
+        return _error_response(e)
+
+    return jsonify({"success": True, "results": results, "meta": meta}), 200
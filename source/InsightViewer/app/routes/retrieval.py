@@ -1,13 +1,22 @@
+import contextvars
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from typing import Any
 
 import jwt
 from flask import Blueprint, current_app, jsonify, request
+from neo4j import Query
 from neo4j.exceptions import ClientError, CypherSyntaxError
 
-from ai.registry import ProviderRegistry
-from ai.types import EmbedRequest
+from ai.deadline import check_deadline, deadline, remaining, with_deadline
+from ai.embed_cache import embed_text
+from ai.errors import DeadlineExceeded
+from ai.registry import get_registry
+from ai.vector_store import get_vector_store
+from graph.partitions import resolve_vector_index
 
 JWT_SECRET = os.environ["JWT_SECRET"]
 JWT_ALG = "HS256"
@@ -16,6 +25,18 @@ retrieval_bp = Blueprint("retrieval", __name__, url_prefix="/api/retrieval")
 
 driver = None
 
+# Time budget for one retrieval request. In auto mode the vector attempt may
+# use at most VECTOR_BUDGET_SECONDS of it, so fulltext always has time left.
+REQUEST_DEADLINE_SECONDS = 20.0
+VECTOR_BUDGET_SECONDS = 5.0
+
+# Reciprocal rank fusion constant for hybrid mode: a hit at rank r in one leg
+# adds 1 / (RRF_K + r) to its fused score.
+RRF_K = 60
+
+# Runs the vector leg of hybrid searches next to the fulltext leg.
+_hybrid_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval-hybrid")
+
 READ_ONLY_DISALLOWED = re.compile(
     r"\b(CREATE|MERGE|DELETE|SET|REMOVE|DROP|CALL|LOAD\s+CSV|USING\s+PERIODIC\s+COMMIT|FOREACH|CREATE\s+CONSTRAINT|DROP\s+CONSTRAINT)\b",
     re.IGNORECASE,
@@ -28,6 +49,15 @@ def init_driver(d):
     driver = d
 
 
+def _query(cypher: str):
+    """`cypher` with a transaction timeout of whatever the request deadline leaves."""
+    left = remaining()
+    if left is None:
+        return cypher
+    check_deadline()
+    return Query(cypher, timeout=left)
+
+
 def _ensure_driver():
     if driver is None:
         raise RuntimeError("Neo4j driver not initialized. Call init_driver(driver) on startup.")
@@ -95,84 +125,132 @@ def normalize_node_ids(payload: dict[str, Any]) -> list[str]:
     return unique
 
 
+DEPTH_NODE_BUDGET = 2000
+DEPTH_NODE_BUDGET_MAX = 10000
+
+DEPTH_START_CYPHER = """
+UNWIND $node_ids AS nid
+MATCH (s:IVNode {id_rc: nid})
+WHERE $project IS NULL OR s.projectName = $project
+RETURN DISTINCT elementId(s) AS eid, s.id_rc AS id_rc, labels(s) AS labels, s.name AS name
+"""
+
+# One BFS hop. For every frontier node: its chunks and, when $expand, its
+# neighbours inside the project (Chunk nodes always pass), at most
+# $neighbour_limit per frontier node. Visited-set bookkeeping is done by the
+# caller, so each node is expanded once however many paths lead to it.
+DEPTH_HOP_CYPHER = """
+UNWIND $frontier AS eid
+MATCH (f)
+WHERE elementId(f) = eid
+CALL {
+  WITH f
+  MATCH (f)-[:HAS_CHUNK]->(c:Chunk)
+  RETURN collect(DISTINCT {
+    eid: elementId(c),
+    id_rc: c.id_rc,
+    labels: labels(c),
+    text: coalesce(c.text, c.content, c.body, c.chunkText, c.value, '')
+  }) AS chunks
+}
+CALL {
+  WITH f
+  MATCH (f)--(v)
+  WHERE $expand AND ($project IS NULL OR v.projectName = $project OR v:Chunk)
+  WITH DISTINCT v
+  LIMIT $neighbour_limit
+  RETURN collect({eid: elementId(v), id_rc: v.id_rc, labels: labels(v), name: v.name}) AS neighbours
+}
+RETURN eid, chunks, neighbours
+"""
+
+
+def _bounded_int(value, default: int, low: int, high: int) -> int:
+    return max(low, min(int(value or default), high))
+
+
 def retrieve_chunks_by_depth(session, payload: dict[str, Any]) -> dict[str, Any]:
+    """
+    Breadth-first expansion from the start nodes, one query per hop.
+
+    Every node is expanded at most once, so the cost grows with the nodes
+    touched rather than the number of paths. The walk stops at `depth`, when
+    the node budget is used up, after the hop where `chunk_limit` chunks have
+    been collected, or when the request deadline runs out. Visited nodes and
+    chunks carry their BFS distance.
+    """
     node_ids = normalize_node_ids(payload)
     depth = int(payload.get("depth") or 2)
     depth = max(0, min(depth, 100))
     chunk_limit = int(payload.get("chunk_limit") or 80)
     chunk_limit = max(1, min(chunk_limit, 300))
+    node_budget = _bounded_int(payload.get("node_budget"), DEPTH_NODE_BUDGET, 1, DEPTH_NODE_BUDGET_MAX)
     project = (str(payload.get("project") or "").strip() or None)
 
-    visited_query = f"""
-        UNWIND $node_ids AS nid
-        MATCH (s {{id_rc: nid}})
-        WHERE $project IS NULL OR s.projectName = $project
-        WITH collect(DISTINCT s) AS starts
-        UNWIND starts AS s
-        MATCH p = (s)-[*0..{depth}]-(v)
-        WHERE ALL(n IN nodes(p) WHERE $project IS NULL OR n.projectName = $project OR n:Chunk)
-        WITH collect(DISTINCT v) AS all_nodes
-        UNWIND all_nodes AS n
-        WITH DISTINCT n
-        RETURN n.id_rc AS id_rc, labels(n) AS labels, n.name AS name
-        LIMIT 2000
-    """
-    rows = session.run(
-        visited_query,
-        node_ids=node_ids,
-        project=project,
-    ).data()
-
-    visited_nodes = [
-        {
-            "id_rc": r.get("id_rc"),
-            "labels": r.get("labels") or [],
-            "name": r.get("name"),
-        }
-        for r in rows
-        if r.get("id_rc")
-    ]
-
-    chunks_query = f"""
-        UNWIND $node_ids AS nid
-        MATCH (s  {{id_rc: nid}})
-        WHERE $project IS NULL OR s.projectName = $project
-
-        MATCH p = (s)-[*0..{depth}]-(n)
-        WHERE ALL(x IN nodes(p) WHERE $project IS NULL OR x.projectName = $project OR x:Chunk)
-
-        WITH n, min(length(p)) AS dist
-        WITH DISTINCT n, dist
-
-        OPTIONAL MATCH (n)-[:HAS_CHUNK]->(c:Chunk)
-        WHERE c IS NOT NULL
-
-        WITH c, min(dist) AS min_dist
-        RETURN
-        c.id_rc AS id_rc,
-        labels(c) AS labels,
-        coalesce(c.text, c.content, c.body, c.chunkText, c.value, '') AS text,
-        min_dist
-        ORDER BY min_dist ASC, id_rc ASC
-        LIMIT $chunk_limit
-    """
-
-    chunk_rows = session.run(
-        chunks_query,
-        node_ids=node_ids,
-        project=project,
-        chunk_limit=chunk_limit,
-    ).data()
-
-    chunks = [
-        {
-            "id_rc": r.get("id_rc"),
-            "labels": r.get("labels") or ["Chunk"],
-            "text": str(r.get("text") or "").strip(),
-        }
-        for r in chunk_rows
-        if str(r.get("text") or "").strip()
-    ]
+    visited: dict[str, dict[str, Any]] = {}
+    frontier: list[str] = []
+    for r in session.run(_query(DEPTH_START_CYPHER), node_ids=node_ids, project=project).data():
+        eid = r.get("eid")
+        if eid and eid not in visited and len(visited) < node_budget:
+            visited[eid] = {"id_rc": r.get("id_rc"), "labels": r.get("labels") or [], "name": r.get("name"), "distance": 0}
+            frontier.append(eid)
+
+    chunks: list[dict[str, Any]] = []
+    seen_chunks: set[str] = set()
+    distance = 0
+    hops = 0
+    stopped = "exhausted"
+    while frontier:
+        left = remaining()
+        if hops and left is not None and left <= 0:
+            # Out of time: answer with the hops walked so far.
+            stopped = "deadline"
+            break
+        expand = distance < depth and len(visited) < node_budget
+        rows = session.run(
+            _query(DEPTH_HOP_CYPHER),
+            frontier=frontier,
+            expand=expand,
+            neighbour_limit=max(0, node_budget - len(visited)),
+            project=project,
+        ).data()
+        hops += 1
+
+        level_chunks: list[dict[str, Any]] = []
+        next_frontier: list[str] = []
+        for row in rows:
+            owner = visited.get(row.get("eid")) or {}
+            for c in row.get("chunks") or []:
+                text = str(c.get("text") or "").strip()
+                if not text or c.get("eid") in seen_chunks:
+                    continue
+                seen_chunks.add(c.get("eid"))
+                level_chunks.append({
+                    "id_rc": c.get("id_rc"),
+                    "labels": c.get("labels") or ["Chunk"],
+                    "text": text,
+                    "distance": distance,
+                    "owner_id_rc": owner.get("id_rc"),
+                })
+            for v in row.get("neighbours") or []:
+                eid = v.get("eid")
+                if not eid or eid in visited or len(visited) >= node_budget:
+                    continue
+                visited[eid] = {"id_rc": v.get("id_rc"), "labels": v.get("labels") or [], "name": v.get("name"), "distance": distance + 1}
+                next_frontier.append(eid)
+
+        level_chunks.sort(key=lambda c: str(c.get("id_rc") or ""))
+        chunks.extend(level_chunks)
+        if len(chunks) >= chunk_limit:
+            stopped = "chunk_limit"
+            break
+        if not expand:
+            stopped = "depth" if distance >= depth else "node_budget"
+            break
+        frontier = next_frontier
+        distance += 1
+
+    visited_nodes = [n for n in visited.values() if n.get("id_rc")]
 
     return {
         "project": project,
@@ -180,7 +258,14 @@ def retrieve_chunks_by_depth(session, payload: dict[str, Any]) -> dict[str, Any]
         "depth": depth,
         "chunk_limit": chunk_limit,
         "visited_nodes": visited_nodes,
-        "chunks": chunks,
+        "chunks": chunks[:chunk_limit],
+        "traversal": {
+            "hops": hops,
+            "max_distance": distance,
+            "nodes_touched": len(visited),
+            "node_budget": node_budget,
+            "stopped": stopped,
+        },
         "telemetry": _telemetry_payload(
             entry_point=str(payload.get("entry_point") or "unknown"),
             strategy_used="depth_chunks",
@@ -207,6 +292,7 @@ def build_chunks_by_depth_response(session, payload: dict[str, Any]) -> dict[str
                 "chunks_count": len(chunks),
                 "visited_nodes": visited_nodes[:200],
                 "chunks": chunks,
+                "traversal": retrieval["traversal"],
                 "telemetry": retrieval["telemetry"],
             },
         },
@@ -272,8 +358,8 @@ def _normalize_fulltext_request(payload, user_project):
 
 def _normalize_retrieval_mode(payload: dict[str, Any]) -> dict[str, Any]:
     mode = str(payload.get("retrieval_mode") or "auto").strip().lower()
-    if mode not in {"auto", "vector", "fulltext"}:
-        raise ValueError("retrieval_mode must be one of: auto, vector, fulltext")
+    if mode not in {"auto", "vector", "fulltext", "hybrid"}:
+        raise ValueError("retrieval_mode must be one of: auto, vector, fulltext, hybrid")
 
     vector_index_name = str(payload.get("vector_index_name") or "chunk_embedding_index").strip()
     if not vector_index_name:
@@ -319,63 +405,61 @@ def _normalize_edge_types(value):
     return out
 
 
-def _quote_cypher_string(value):
-    escaped = str(value).replace("\\", "\\\\").replace("'", "\\'")
-    return f"'{escaped}'"
-
-
-def _cypher_list(values):
-    return "[" + ", ".join(_quote_cypher_string(v) for v in values) + "]"
-
-
-def _project_filter(alias, project):
-    if not project:
-        return "TRUE"
-    quoted = _quote_cypher_string(project)
-    return f"({alias}.projectName = {quoted} OR {alias}.projectName IS NULL)"
+def _project_filter(alias):
+    return f"($project IS NULL OR {alias}.projectName = $project OR {alias}.projectName IS NULL)"
 
 
+# Both builders return (cypher, params): the text only varies with the edge
+# filter (and scope_hops), so Neo4j reuses the cached plan across searches.
 def _build_fulltext_graph_cypher(hit_ids, project, edge_types):
     if not hit_ids:
-        return ""
+        return "", {}
 
     edge_filter = "TRUE"
     if edge_types:
-        edge_filter = f"(r IS NULL OR type(r) IN {_cypher_list(edge_types)})"
+        edge_filter = "(r IS NULL OR type(r) IN $edge_types)"
 
-    return f"""
-MATCH (h)
-WHERE h.id_rc IN {_cypher_list(hit_ids)}
-  AND {_project_filter('h', project)}
+    cypher = f"""
+MATCH (h:IVNode)
+WHERE h.id_rc IN $hit_ids
+  AND {_project_filter('h')}
 OPTIONAL MATCH (h)-[r]-(n)
-WHERE {_project_filter('n', project)}
+WHERE {_project_filter('n')}
   AND {edge_filter}
 RETURN DISTINCT h AS s, r, n AS t
 """.strip()
+    return cypher, {"hit_ids": list(hit_ids), "project": project, "edge_types": edge_types}
 
 
 def _build_scoped_fulltext_graph_cypher(hit_ids, scope_node_id_rc, scope_hops, project, edge_types):
     if not hit_ids:
-        return ""
+        return "", {}
 
     edge_filter = "TRUE"
     if edge_types:
-        edge_filter = f"(r IS NULL OR type(r) IN {_cypher_list(edge_types)})"
+        edge_filter = "(r IS NULL OR type(r) IN $edge_types)"
 
+    # variable-length bounds cannot be parameters; 1 or 2 gives two plans
     scope_hops = max(1, min(int(scope_hops or 1), 2))
 
-    return f"""
-MATCH (scope {{id_rc: {_quote_cypher_string(scope_node_id_rc)}}})
-WHERE {_project_filter('scope', project)}
+    cypher = f"""
+MATCH (scope:IVNode {{id_rc: $scope_id}})
+WHERE {_project_filter('scope')}
 MATCH p = (scope)-[*..{scope_hops}]-(h)
-WHERE h.id_rc IN {_cypher_list(hit_ids)}
-  AND ALL(n1 IN nodes(p) WHERE {_project_filter('n1', project)})
+WHERE h.id_rc IN $hit_ids
+  AND ALL(n1 IN nodes(p) WHERE {_project_filter('n1')})
 WITH DISTINCT h
 OPTIONAL MATCH (h)-[r]-(n)
-WHERE {_project_filter('n', project)}
+WHERE {_project_filter('n')}
   AND {edge_filter}
 RETURN DISTINCT h AS s, r, n AS t
 """.strip()
+    return cypher, {
+        "hit_ids": list(hit_ids),
+        "scope_id": scope_node_id_rc,
+        "project": project,
+        "edge_types": edge_types,
+    }
 
 
 def is_safe_read_query(cypher: str) -> bool:
@@ -397,7 +481,7 @@ def _fulltext_hits(session, *, index_name, query_text, node_type, project, limit
     """
 
     rows = session.run(
-        cypher,
+        _query(cypher),
         index_name=index_name,
         query_text=query_text,
         node_type=node_type,
@@ -407,7 +491,7 @@ def _fulltext_hits(session, *, index_name, query_text, node_type, project, limit
 
     if not rows and project:
         rows = session.run(
-            cypher,
+            _query(cypher),
             index_name=index_name,
             query_text=query_text,
             node_type=node_type,
@@ -418,6 +502,44 @@ def _fulltext_hits(session, *, index_name, query_text, node_type, project, limit
     return rows
 
 
+# Vector hits come from the Neo4j index or, when a local store is synced for
+# the project, from UNWINDing the store's (id_rc, score) pairs; both feed the
+# same owner resolution.
+INDEX_VECTOR_HEAD = """
+CALL db.index.vector.queryNodes($vector_index_name, $vector_k, $qvec) YIELD node, score
+WHERE ($project IS NULL OR node.projectName = $project OR node.projectName IS NULL)
+"""
+
+LOCAL_VECTOR_HEAD = """
+UNWIND $hits AS h
+MATCH (node:Chunk {id_rc: h.id_rc})
+WITH node, h.score AS score
+"""
+
+VECTOR_HITS_TAIL = """
+OPTIONAL MATCH (owner)-[:HAS_CHUNK]->(node)
+WHERE owner.id_rc IS NOT NULL
+    AND ($node_type = '' OR $node_type IN labels(owner))
+    AND ($project IS NULL OR owner.projectName = $project OR owner.projectName IS NULL)
+WITH coalesce(owner, node) AS hit, max(score) AS score
+WHERE hit.id_rc IS NOT NULL
+RETURN
+    hit.id_rc AS id_rc,
+    coalesce(
+        hit.name,
+        hit.title,
+        hit.heading,
+        hit.number,
+        toString(hit.order),
+        substring(coalesce(hit.text, hit.content, hit.body, hit.chunkText, hit.value, ''), 0, 120)
+    ) AS name,
+    labels(hit) AS labels,
+    score
+ORDER BY score DESC, name
+LIMIT $limit
+"""
+
+
 def _vector_hits(
         session,
         *,
@@ -430,38 +552,31 @@ def _vector_hits(
         vector_k: int,
         limit: int,
 ):
-        registry = ProviderRegistry()
+        registry = get_registry()
         embed_provider = registry.get_provider(provider)
-        qvec = embed_provider.embed(EmbedRequest(text=query_text, model=embedding_model)).embedding
-
-        cypher = """
-        CALL db.index.vector.queryNodes($vector_index_name, $vector_k, $qvec) YIELD node, score
-        WHERE ($project IS NULL OR node.projectName = $project OR node.projectName IS NULL)
-        OPTIONAL MATCH (owner)-[:HAS_CHUNK]->(node)
-        WHERE owner.id_rc IS NOT NULL
-            AND ($node_type = '' OR $node_type IN labels(owner))
-            AND ($project IS NULL OR owner.projectName = $project OR owner.projectName IS NULL)
-        WITH coalesce(owner, node) AS hit, max(score) AS score
-        WHERE hit.id_rc IS NOT NULL
-        RETURN
-            hit.id_rc AS id_rc,
-            coalesce(
-                hit.name,
-                hit.title,
-                hit.heading,
-                hit.number,
-                toString(hit.order),
-                substring(coalesce(hit.text, hit.content, hit.body, hit.chunkText, hit.value, ''), 0, 120)
-            ) AS name,
-            labels(hit) AS labels,
-            score
-        ORDER BY score DESC, name
-        LIMIT $limit
-        """
+        qvec = embed_text(embed_provider, query_text, embedding_model)
+
+        # A synced local store ranks within the project in-process; Neo4j
+        # then only resolves the hit ids.
+        store = get_vector_store(project)
+        if store is not None and store.dim == len(qvec):
+                hits = store.search(qvec, vector_k)
+                rows = session.run(
+                        _query(LOCAL_VECTOR_HEAD + VECTOR_HITS_TAIL),
+                        hits=[{"id_rc": id_rc, "score": score} for id_rc, score in hits],
+                        node_type=node_type,
+                        project=project,
+                        limit=limit,
+                ).data()
+                if rows:
+                        return rows
+
+        cypher = INDEX_VECTOR_HEAD + VECTOR_HITS_TAIL
 
+        # The project's partition index, when online, ranks within the project.
         rows = session.run(
-                cypher,
-                vector_index_name=vector_index_name,
+                _query(cypher),
+                vector_index_name=resolve_vector_index(session, project, vector_index_name),
                 vector_k=vector_k,
                 qvec=qvec,
                 node_type=node_type,
@@ -471,7 +586,7 @@ def _vector_hits(
 
         if not rows and project:
                 rows = session.run(
-                        cypher,
+                        _query(cypher),
                         vector_index_name=vector_index_name,
                         vector_k=vector_k,
                         qvec=qvec,
@@ -483,6 +598,115 @@ def _vector_hits(
         return rows
 
 
+def fuse_ranked(legs: dict[str, list[dict[str, Any]]], limit: int, k: int = RRF_K) -> list[dict[str, Any]]:
+    """
+    Reciprocal rank fusion of per-leg hit lists (each best first). Hits are
+    merged by id_rc; `score` becomes the fused score and `sources` records the
+    rank and original score the hit had in each leg that found it.
+    """
+    fused: dict[str, dict[str, Any]] = {}
+    for leg, rows in legs.items():
+        rank = 0
+        for row in rows:
+            key = row.get("id_rc")
+            if not key:
+                continue
+            rank += 1
+            hit = fused.get(key)
+            if hit is None:
+                hit = fused[key] = {**row, "score": 0.0, "sources": {}}
+            if leg in hit["sources"]:
+                continue
+            hit["score"] += 1.0 / (k + rank)
+            hit["sources"][leg] = {"rank": rank, "score": row.get("score")}
+    ordered = sorted(fused.values(), key=lambda h: (-h["score"], str(h.get("name") or "")))
+    return ordered[:limit]
+
+
+def _vector_kwargs(normalized, retrieval_mode) -> dict[str, Any]:
+    return {
+        "vector_index_name": retrieval_mode["vector_index_name"],
+        "query_text": normalized["query"],
+        "provider": retrieval_mode["provider"],
+        "embedding_model": retrieval_mode["embedding_model"],
+        "node_type": normalized["node_type"],
+        "project": normalized["project"],
+        "vector_k": retrieval_mode["vector_k"],
+        "limit": normalized["limit"],
+    }
+
+
+def _fulltext_kwargs(normalized) -> dict[str, Any]:
+    return {
+        "index_name": normalized["index_name"],
+        "query_text": normalized["query"],
+        "node_type": normalized["node_type"],
+        "project": normalized["project"],
+        "limit": normalized["limit"],
+    }
+
+
+def _timed_leg(fn, *args, **kwargs) -> dict[str, Any]:
+    """Run one retrieval leg; returns its rows, error and wall time."""
+    started = time.monotonic()
+    try:
+        rows, error = fn(*args, **kwargs), None
+    except Exception as e:
+        rows, error = [], e
+    return {"rows": rows, "error": error, "elapsed_ms": round(1000 * (time.monotonic() - started), 1)}
+
+
+def _vector_leg(kwargs: dict[str, Any]) -> list[dict[str, Any]]:
+    # Neo4j sessions are not thread safe: the concurrent leg opens its own.
+    _ensure_driver()
+    with deadline(VECTOR_BUDGET_SECONDS), driver.session() as session:
+        return _vector_hits(session, **kwargs)
+
+
+def _hybrid_hits(session, normalized, retrieval_mode) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """
+    Vector and fulltext legs run concurrently (vector in the pool, fulltext
+    here) and are fused with RRF, so the slower leg's latency hides the
+    faster one's. A failing leg leaves the other's hits; if both fail the
+    fulltext error is raised for the route's error mapping.
+    """
+    started = time.monotonic()
+    # copy_context carries the request deadline into the worker thread.
+    future = _hybrid_pool.submit(
+        contextvars.copy_context().run, _timed_leg, _vector_leg, _vector_kwargs(normalized, retrieval_mode)
+    )
+    fulltext = _timed_leg(_fulltext_hits, session, **_fulltext_kwargs(normalized))
+    try:
+        vector = future.result(timeout=max(0.0, started + VECTOR_BUDGET_SECONDS - time.monotonic()) + 1.0)
+    except FutureTimeout:
+        vector = {
+            "rows": [],
+            "error": DeadlineExceeded("Vector leg exceeded its time budget"),
+            "elapsed_ms": round(1000 * (time.monotonic() - started), 1),
+        }
+
+    legs = {"vector": vector, "fulltext": fulltext}
+    if fulltext["error"] is not None and not vector["rows"]:
+        raise fulltext["error"]
+
+    rows = fuse_ranked({name: leg["rows"] for name, leg in legs.items()}, normalized["limit"])
+    report = {
+        "rrf_k": RRF_K,
+        "elapsed_ms": round(1000 * (time.monotonic() - started), 1),
+        "overlap": sum(1 for r in rows if len(r["sources"]) > 1),
+        "legs": {
+            name: {
+                "elapsed_ms": leg["elapsed_ms"],
+                "hits": len(leg["rows"]),
+                "contributed": sum(1 for r in rows if name in r["sources"]),
+                "error": None if leg["error"] is None else str(leg["error"]),
+            }
+            for name, leg in legs.items()
+        },
+    }
+    return rows, report
+
+
 def retrieve_nodes_for_query(session, payload, user_project):
     normalized = _normalize_fulltext_request(payload, user_project)
     retrieval_mode = _normalize_retrieval_mode(payload)
@@ -494,20 +718,20 @@ def retrieve_nodes_for_query(session, payload, user_project):
     fallback_from = None
     fallback_to = None
     fallback_reason = None
+    hybrid = None
+
+    if retrieval_mode["mode"] == "hybrid":
+        rows, hybrid = _hybrid_hits(session, normalized, retrieval_mode)
+        vector_error = hybrid["legs"]["vector"]["error"]
+        strategy_used = "hybrid_rrf"
 
     if retrieval_mode["mode"] in {"auto", "vector"}:
+        # An open provider breaker or an exhausted vector budget fails here at
+        # once, leaving the rest of the request deadline to fulltext.
+        budget = VECTOR_BUDGET_SECONDS if retrieval_mode["mode"] == "auto" else REQUEST_DEADLINE_SECONDS
         try:
-            rows = _vector_hits(
-                session,
-                vector_index_name=retrieval_mode["vector_index_name"],
-                query_text=normalized["query"],
-                provider=retrieval_mode["provider"],
-                embedding_model=retrieval_mode["embedding_model"],
-                node_type=normalized["node_type"],
-                project=normalized["project"],
-                vector_k=retrieval_mode["vector_k"],
-                limit=normalized["limit"],
-            )
+            with deadline(budget):
+                rows = _vector_hits(session, **_vector_kwargs(normalized, retrieval_mode))
             strategy_used = "vector_query"
         except Exception as e:
             vector_error = str(e)
@@ -519,14 +743,7 @@ def retrieve_nodes_for_query(session, payload, user_project):
             fallback_from = "vector"
             fallback_to = "fulltext"
             fallback_reason = vector_error or "vector_no_hits"
-        rows = _fulltext_hits(
-            session,
-            index_name=normalized["index_name"],
-            query_text=normalized["query"],
-            node_type=normalized["node_type"],
-            project=normalized["project"],
-            limit=normalized["limit"],
-        )
+        rows = _fulltext_hits(session, **_fulltext_kwargs(normalized))
         strategy_used = "fulltext_query"
 
     if retrieval_mode["mode"] == "vector" and vector_error and not rows:
@@ -538,6 +755,7 @@ def retrieve_nodes_for_query(session, payload, user_project):
             "name": row.get("name"),
             "labels": row.get("labels") or [],
             "score": row.get("score"),
+            **({"sources": row["sources"]} if "sources" in row else {}),
         }
         for row in rows
         if row.get("id_rc") and row.get("name")
@@ -563,6 +781,7 @@ def retrieve_nodes_for_query(session, payload, user_project):
             "fallback_from": fallback_from,
             "fallback_to": fallback_to,
             "fallback_reason": fallback_reason,
+            **({"hybrid": hybrid} if hybrid is not None else {}),
         },
         "telemetry": {
             **_telemetry_payload(
@@ -600,9 +819,9 @@ def build_query_cypher_response(session, payload, user_project):
         }
 
     if scope_node_id_rc:
-        cypher = _build_scoped_fulltext_graph_cypher(hit_ids, scope_node_id_rc, scope_hops, project, edge_types)
+        cypher, params = _build_scoped_fulltext_graph_cypher(hit_ids, scope_node_id_rc, scope_hops, project, edge_types)
     else:
-        cypher = _build_fulltext_graph_cypher(hit_ids, project, edge_types)
+        cypher, params = _build_fulltext_graph_cypher(hit_ids, project, edge_types)
 
     if not is_safe_read_query(cypher):
         return {
@@ -618,6 +837,7 @@ def build_query_cypher_response(session, payload, user_project):
         "body": {
             "success": True,
             "cypher": cypher,
+            "params": params,
             "items": hits,
             "meta": {
                 **meta,
@@ -632,6 +852,7 @@ def build_query_cypher_response(session, payload, user_project):
 
 
 @retrieval_bp.post("/query")
+@with_deadline(REQUEST_DEADLINE_SECONDS)
 def retrieval_query():
     user_data, error_response, status_code = validate_jwt()
     if error_response:
@@ -646,6 +867,8 @@ def retrieval_query():
             result = retrieve_nodes_for_query(session, payload, user_data["project"])
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
+    except DeadlineExceeded as e:
+        return jsonify({"success": False, "error": str(e)}), 504
     except (CypherSyntaxError, ClientError) as e:
         body, status = build_fulltext_error_response(payload, e)
         return jsonify(body), status
@@ -657,6 +880,7 @@ def retrieval_query():
 
 
 @retrieval_bp.post("/chunks-by-depth")
+@with_deadline(REQUEST_DEADLINE_SECONDS)
 def retrieval_chunks_by_depth():
     user_data, error_response, status_code = validate_jwt()
     if error_response:
@@ -673,6 +897,8 @@ def retrieval_chunks_by_depth():
             result = build_chunks_by_depth_response(session, payload)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
+    except DeadlineExceeded as e:
+        return jsonify({"success": False, "error": str(e)}), 504
     except (CypherSyntaxError, ClientError) as e:
         return jsonify({"success": False, "error": f"Neo4j depth retrieval failed: {e}"}), 400
 
@@ -684,6 +910,7 @@ def retrieval_chunks_by_depth():
 
 
 @retrieval_bp.post("/query-cypher")
+@with_deadline(REQUEST_DEADLINE_SECONDS)
 def retrieval_query_cypher():
     user_data, error_response, status_code = validate_jwt()
     if error_response:
@@ -698,6 +925,8 @@ def retrieval_query_cypher():
             result = build_query_cypher_response(session, payload, user_data["project"])
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
+    except DeadlineExceeded as e:
+        return jsonify({"success": False, "error": str(e)}), 504
     except (CypherSyntaxError, ClientError) as e:
         body, status = build_fulltext_error_response(payload, e)
         return jsonify(body), status
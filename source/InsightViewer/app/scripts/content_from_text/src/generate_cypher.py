@@ -437,9 +437,9 @@ def generate_cypher(project: str, nodes: List[Node], rels: List[Tuple[str, str,
     lines.append("  ON CREATE SET n.id_rc = randomUUID()")
     lines.append("  SET n.projectName = projectName,")
     lines.append("      n.name = row.name")
-    lines.append("  // Set single label (Chapter / Section / Chunk)")
+    lines.append("  // Set the label (Chapter / Section / Chunk) plus IVNode for id_rc lookups")
     lines.append("  WITH n, row")
-    lines.append("  CALL apoc.create.setLabels(n, [row.label]) YIELD node")
+    lines.append("  CALL apoc.create.setLabels(n, [row.label, 'IVNode']) YIELD node")
     lines.append("  WITH node, row")
     lines.append("  // Optional properties")
     lines.append("  SET node.sid       = row.sid")
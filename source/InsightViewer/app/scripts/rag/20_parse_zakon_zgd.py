@@ -112,12 +112,12 @@ def merge_core(tx, act: Dict[str, Any], version: Dict[str, Any]):
     tx.run(
         """
         MERGE (a:Act {actId: $actId})
-        ON CREATE SET a.id_rc = randomUUID()
+        ON CREATE SET a.id_rc = randomUUID(), a:IVNode
         SET a.title=$title, a.shortTitle=$shortTitle, a.jurisdiction=$jurisdiction,
             a.language=$language, a.source=$source, a.projectName=$projectName
 
         MERGE (v:ActVersion {versionId: $versionId})
-        ON CREATE SET v.id_rc = randomUUID()
+        ON CREATE SET v.id_rc = randomUUID(), v:IVNode
         SET v.npbNumber=$npbNumber, v.effectiveFrom=$effectiveFrom,
             v.retrievedAt=$retrievedAt, v.projectName=$projectName
 
@@ -131,7 +131,7 @@ def merge_part(tx, part: Dict[str, Any]):
     tx.run(
         """
         MERGE (p:Part {pid:$pid})
-        ON CREATE SET p.id_rc = randomUUID()
+        ON CREATE SET p.id_rc = randomUUID(), p:IVNode
         SET p.number=$number, p.title=$title, p.projectName=$projectName
 
         WITH p, $versionId AS versionId
@@ -146,7 +146,7 @@ def merge_chapter(tx, chapter: Dict[str, Any]):
     tx.run(
         """
         MERGE (c:Chapter {cid:$cid})
-        ON CREATE SET c.id_rc = randomUUID()
+        ON CREATE SET c.id_rc = randomUUID(), c:IVNode
         SET c.number=$number, c.title=$title, c.projectName=$projectName
 
         WITH c, $pid AS pid
@@ -161,7 +161,7 @@ def merge_article(tx, article: Dict[str, Any]):
     tx.run(
         """
         MERGE (a:Article {aid:$aid})
-        ON CREATE SET a.id_rc = randomUUID()
+        ON CREATE SET a.id_rc = randomUUID(), a:IVNode
         SET a.num=$num, a.heading=$heading, a.projectName=$projectName
 
         WITH a, $cid AS cid
@@ -176,7 +176,7 @@ def merge_paragraph(tx, par: Dict[str, Any]):
     tx.run(
         """
         MERGE (p:Paragraph {parId:$parId})
-        ON CREATE SET p.id_rc = randomUUID()
+        ON CREATE SET p.id_rc = randomUUID(), p:IVNode
         SET p.order=$order, p.text=$text, p.projectName=$projectName
 
         WITH p, $aid AS aid, $prevParId AS prevParId
@@ -196,7 +196,7 @@ def merge_point(tx, point: Dict[str, Any]):
     tx.run(
         """
         MERGE (p:Point {pointId:$pointId})
-        ON CREATE SET p.id_rc = randomUUID()
+        ON CREATE SET p.id_rc = randomUUID(), p:IVNode
         SET p.marker=$marker, p.order=$order, p.text=$text, p.projectName=$projectName
 
         WITH p, $parId AS parId, $prevPointId AS prevPointId
@@ -216,7 +216,7 @@ def merge_item(tx, item: Dict[str, Any]):
     tx.run(
         """
         MERGE (i:IndentItem {itemId:$itemId})
-        ON CREATE SET i.id_rc = randomUUID()
+        ON CREATE SET i.id_rc = randomUUID(), i:IVNode
         SET i.order = $order, i.text = $text, i.projectName = $projectName
 
         // Prefer attaching to Point if pointId is provided
@@ -75,6 +75,7 @@ def merge_section(tx, sid: str, stype: str, title: str, number: str, parent_labe
         MATCH (parent:{parent_label} {{{parent_key}: $parentVal, projectName:$projectName}})
         MERGE (s:Section {{sid:$sid}})
         ON CREATE SET
+          s:IVNode,
           s.id_rc = $id_rc,
           s.type = $stype,
           s.title = $title,
@@ -131,6 +131,7 @@ def upsert_reference(tx, source_label: str, source_key: str, source_id: str,
         MATCH (src:{source_label} {{{source_key}: $sourceId, projectName:$projectName}})
         MERGE (r:Reference {{refId:$refId}})
         ON CREATE SET
+          r:IVNode,
           r.id_rc = $id_rc,
           r.raw = $raw,
           r.articleNum = $articleNum,
@@ -1,10 +1,20 @@
 import os
+import sys
 from pathlib import Path
 import uuid
 import requests
 from neo4j import GraphDatabase
 import configparser
 
+# Make app/ai importable for the shared embedding cache.
+APP_DIR = Path(__file__).resolve().parents[2]
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from ai.embed_cache import cache_key, get_embedding_cache
+from ai.reembed import content_hash, reembed_stale
+from ai.registry import get_registry
+from graph.partitions import ensure_partition, ensure_vector_dimensions
+
 
 
 
@@ -37,6 +47,7 @@ EMB_MODEL = config['OLLAMA']['EMB_MODEL']
 MODEL = config['OLLAMA']['MODEL']
 
 PROJECT = "ZGD1"
+EMBED_BATCH_SIZE = 32
 
 def rc_id() -> str:
     return str(uuid.uuid4())
@@ -52,6 +63,26 @@ def ollama_embed(text: str) -> list[float]:
     return r.json()["embedding"]
 
 
+def ollama_embed_batch(texts: list[str]) -> list[list[float]]:
+    # Unchanged text is served from the embedding cache; only the misses go
+    # to /api/embed, which takes a list and returns one vector per input.
+    cache = get_embedding_cache()
+    keys = [cache_key("ollama", EMB_MODEL, t) for t in texts]
+    out = [cache.get(k) for k in keys]
+    missing = [i for i, v in enumerate(out) if v is None]
+    if missing:
+        r = requests.post(
+            f"{OLLAMA_BASE}/api/embed",
+            json={"model": EMB_MODEL, "input": [texts[i] for i in missing]},
+            timeout=180,
+        )
+        r.raise_for_status()
+        for i, emb in zip(missing, r.json()["embeddings"]):
+            cache.put(keys[i], emb)
+            out[i] = emb
+    return out
+
+
 def ensure_vector_index(tx, dim: int):
     # Neo4j DDL: safe to run repeatedly due to IF NOT EXISTS
     tx.run(
@@ -72,9 +103,15 @@ def upsert_chunk(tx, chunkId: str, text: str, embedding: list[float], parId: str
         MATCH (p:Paragraph {parId:$parId, projectName:$projectName})
         MERGE (c:Chunk {chunkId:$chunkId})
         ON CREATE SET
+          c:IVNode,
           c.id_rc = $id_rc,
           c.text = $text,
           c.embedding = $embedding,
+          c.embeddingHash = $embeddingHash,
+          c.embeddingModel = $embeddingModel,
+          c.embeddingDims = size($embedding),
+          c.embeddingMaxChars = 0,
+          c.embeddingAt = datetime(),
           c.projectName = $projectName
         MERGE (c)-[:CHUNK_OF]->(p)
         """,
@@ -83,6 +120,8 @@ def upsert_chunk(tx, chunkId: str, text: str, embedding: list[float], parId: str
         id_rc=rc_id(),
         text=text,
         embedding=embedding,
+        embeddingHash=content_hash(text),
+        embeddingModel=EMB_MODEL,
         projectName=PROJECT,
     )
 
@@ -106,6 +145,12 @@ def main():
         # 1) dimenzija + index
         dim = len(ollama_embed("test"))
         with driver.session() as session:
+            # drugačna dimenzija (nov model): ustavi se, razen z --recreate-indexes
+            recreated = ensure_vector_dimensions(
+                session, PROJECT, dim, recreate="--recreate-indexes" in sys.argv[1:]
+            )
+            if recreated:
+                print("Recreated vector indexes:", recreated)
             session.execute_write(ensure_vector_index, dim)
         print(f"OK: vector index 'chunk_embedding' ensured (dim={dim})")
 
@@ -114,25 +159,34 @@ def main():
             rows = list(fetch_paragraphs_without_chunk(session))
 
         # 3) nato v ločeni seji PIŠI (ustvarjaj chanke)
+        todo = [(r["parId"], (r["text"] or "").strip()) for r in rows]
+        todo = [(parId, text) for parId, text in todo if text]
+
         n = 0
         with driver.session() as session:
-            for r in rows:
-                parId = r["parId"]
-                text = (r["text"] or "").strip()
-                if not text:
-                    continue
-
-                chunkId = parId + "#c1"
-                emb = ollama_embed(text)
+            for start in range(0, len(todo), EMBED_BATCH_SIZE):
+                batch = todo[start:start + EMBED_BATCH_SIZE]
+                embs = ollama_embed_batch([text for _, text in batch])
 
-                session.execute_write(upsert_chunk, chunkId, text, emb, parId)
+                for (parId, text), emb in zip(batch, embs):
+                    chunkId = parId + "#c1"
+                    session.execute_write(upsert_chunk, chunkId, text, emb, parId)
 
-                n += 1
-                if n % 50 == 0:
-                    print("Embedded:", n)
+                n += len(batch)
+                print("Embedded:", n)
 
         print("DONE: embedded new paragraphs =", n)
 
+        # 4) obstoječi chunki, ki jih je naredil drug model ali starejše besedilo
+        with driver.session() as session:
+            stale = reembed_stale(session, get_registry().get_provider("ollama"), EMB_MODEL, project=PROJECT, max_chars=0)
+        print("Re-embedded stale chunks:", stale)
+
+        # 5) projektna particija (oznaka Chunk_<projekt> + indeksa)
+        with driver.session() as session:
+            print("Partition:", ensure_partition(session, PROJECT, dim))
+        print("Embedding cache:", get_embedding_cache().stats())
+
     finally:
         driver.close()
 
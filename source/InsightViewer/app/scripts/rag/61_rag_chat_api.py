@@ -1,4 +1,5 @@
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
+import asyncio
 import importlib.util
 import configparser
 import os
@@ -21,20 +22,29 @@ NEO4J_USERNAME = os.getenv("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 NEO4J_DATABASE = os.getenv("NEO4J_DATABASE")
 
-driver = GraphDatabase.driver(
-    NEO4J_URI,
-    auth=(NEO4J_USERNAME, NEO4J_PASSWORD),
-)
-
 q = "Kaj določa 10.a člen ZGD-1?"
-qvec = rag_chat_api.ollama_embed(q)
-
-with driver.session() as s:
-    rows = s.run(
-        rag_chat_api.RETRIEVAL_CYPHER,
-        qvec=qvec,
-        topK=512,
-        projectName=rag_chat_api.PROJECT,
+
+
+async def main():
+    driver = AsyncGraphDatabase.driver(
+        NEO4J_URI,
+        auth=(NEO4J_USERNAME, NEO4J_PASSWORD),
     )
-    for r in rows:
-        print(r["clen"], r["odst"], r["score"])
+    try:
+        qvec = await rag_chat_api.ollama_embed(q)
+
+        async with driver.session() as s:
+            rows = await s.run(
+                rag_chat_api.RETRIEVAL_CYPHER,
+                qvec=qvec,
+                topK=512,
+                projectName=rag_chat_api.PROJECT,
+            )
+            async for r in rows:
+                print(r["clen"], r["odst"], r["score"])
+    finally:
+        await driver.close()
+        await rag_chat_api.http.aclose()
+
+
+asyncio.run(main())
@@ -1,14 +1,25 @@
 import configparser
 import os
+import sys
 import uuid
-import requests
+from pathlib import Path
 from typing import List, Dict, Any, Optional
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
 import re
 
+# Shared Ollama client, scheduler and embedding cache live in the app's ai package.
+APP_DIR = Path(__file__).resolve().parents[2]
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from ai.async_ollama import AsyncOllamaClient
+from ai.breaker import breaker_from_config
+from ai.embed_cache import get_embedding_cache
+from ai.errors import AIError
+from ai.scheduler import AsyncRequestScheduler, scheduler_from_config
+
 
 # ===== CONFIG =====
 PROJECT = "ZGD1"
@@ -43,6 +54,15 @@ OLLAMA_BASE = config['OLLAMA']['BASE']
 EMB_MODEL = config['OLLAMA']['EMB_MODEL']
 MODEL = config['OLLAMA']['MODEL']
 TOP_K = int(config['OLLAMA'].get('TOP_K', '8'))
+# Concurrency limit for this service's Ollama calls ([OLLAMA] MAX_CONCURRENCY).
+OLLAMA_SCHEDULER = scheduler_from_config(config, "OLLAMA", AsyncRequestScheduler)
+OLLAMA = AsyncOllamaClient(
+    OLLAMA_BASE,
+    max_connections=config.getint("OLLAMA", "HTTP_MAX_CONNECTIONS", fallback=100),
+    scheduler=OLLAMA_SCHEDULER,
+    breaker=breaker_from_config(config, "OLLAMA", "Ollama"),
+)
+GENERATE_OPTIONS = {"temperature": 0.2, "num_ctx": 8192}
 
 
 
@@ -72,37 +92,20 @@ def rc_id() -> str:
     return str(uuid.uuid4())
 
 
-def ollama_embed(text: str) -> List[float]:
-    r = requests.post(
-        f"{OLLAMA_BASE}/api/embeddings",
-        json={"model": EMB_MODEL, "prompt": text},
-        timeout=180,
-    )
-    if r.status_code != 200:
-        raise HTTPException(status_code=502, detail=f"Ollama embeddings error: {r.text}")
-    return r.json()["embedding"]
+async def ollama_embed(text: str) -> List[float]:
+    try:
+        return await get_embedding_cache().get_or_compute_async(
+            "ollama", EMB_MODEL, text, lambda t: OLLAMA.embed(t, EMB_MODEL)
+        )
+    except AIError as e:
+        raise HTTPException(status_code=502, detail=f"Ollama embeddings error: {e}")
 
 
-def ollama_generate(prompt: str) -> str:
-    """
-    /api/generate vrne stream; nastavimo stream=False da dobimo en JSON.
-    """
-    r = requests.post(
-        f"{OLLAMA_BASE}/api/generate",
-        json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.2,
-                "num_ctx": 8192
-            },
-        },
-        timeout=300,
-    )
-    if r.status_code != 200:
-        raise HTTPException(status_code=502, detail=f"Ollama generate error: {r.text}")
-    return (r.json().get("response") or "").strip()
+async def ollama_generate(prompt: str) -> str:
+    try:
+        return await OLLAMA.generate(prompt, MODEL, GENERATE_OPTIONS)
+    except AIError as e:
+        raise HTTPException(status_code=502, detail=f"Ollama generate error: {e}")
 
 
 RETRIEVAL_CYPHER = """
@@ -156,16 +159,17 @@ def build_prompt(question: str, contexts: List[Dict[str, Any]]) -> str:
 # ===== App =====
 app = FastAPI(title="ZGD1 RAG Chat API")
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
 
 
 @app.on_event("shutdown")
-def shutdown_event():
-    driver.close()
+async def shutdown_event():
+    await driver.close()
+    await OLLAMA.aclose()
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     question = req.question.strip()
     top_k = req.top_k or TOP_K
 
@@ -173,8 +177,8 @@ def chat(req: ChatRequest):
     m = re.search(r"(\d+\.\w?)\s*člen", question, flags=re.IGNORECASE)
     if m:
         wanted = m.group(1)  # npr. "10.a" ali "10."
-        with driver.session() as session:
-            rows = session.run(
+        async with driver.session() as session:
+            result = await session.run(
                 """
                 MATCH (a:Article {projectName:$projectName, num:$num})
                 MATCH (a)-[:HAS_PARAGRAPH]->(p:Paragraph {projectName:$projectName})
@@ -191,7 +195,7 @@ def chat(req: ChatRequest):
                 projectName=PROJECT,
                 num=wanted,
             )
-            rows = list(rows)
+            rows = [record async for record in result]
 
         if rows:
             contexts: List[Dict[str, Any]] = []
@@ -217,20 +221,20 @@ def chat(req: ChatRequest):
                 })
 
             prompt = build_prompt(question, contexts)
-            answer = ollama_generate(prompt)
+            answer = await ollama_generate(prompt)
 
             return ChatResponse(answer=answer, citations=citations)
 
     # ---- 2) Obstoječi vektorski RAG za ostala vprašanja ----
-    with driver.session() as session:
-        qvec = ollama_embed(question)
-        result = session.run(
+    qvec = await ollama_embed(question)
+    async with driver.session() as session:
+        result = await session.run(
             RETRIEVAL_CYPHER,
             qvec=qvec,
             topK=top_k,
             projectName=PROJECT,
         )
-        rows = list(result)
+        rows = [record async for record in result]
 
     if not rows:
         return ChatResponse(
@@ -261,6 +265,6 @@ def chat(req: ChatRequest):
 
     # (optional: your existing heuristic that reorders contexts if question mentions a člen)
     prompt = build_prompt(question, contexts)
-    answer = ollama_generate(prompt)
+    answer = await ollama_generate(prompt)
 
     return ChatResponse(answer=answer, citations=citations)
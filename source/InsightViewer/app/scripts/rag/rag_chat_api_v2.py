@@ -1,15 +1,27 @@
 import configparser
 import os
 from pathlib import Path
+import sys
 from queue import Full
 import uuid
-import requests
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import re
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
+
+# app/ is on the path so the service shares the embedding cache (ai.embed_cache).
+APP_DIR = Path(__file__).resolve().parents[2]
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from ai.async_ollama import AsyncOllamaClient
+from ai.breaker import breaker_from_config
+from ai.embed_cache import get_embedding_cache
+from ai.errors import AIError
+from ai.scheduler import AsyncRequestScheduler, scheduler_from_config
+from ai.vector_store import get_vector_store, vector_store_stats
+from graph.partitions import partition_indexes_async
 
 
 # ===== CONFIG =====
@@ -36,6 +48,14 @@ OLLAMA_BASE = config["OLLAMA"]["BASE"]
 EMB_MODEL = config["OLLAMA"]["EMB_MODEL"]          # e.g. mxbai-embed-large:latest
 MODEL = config["OLLAMA"]["MODEL"]                  # e.g. qwen2.5:14b
 TOP_K = int(config["OLLAMA"].get("TOP_K", "8"))
+# Concurrency limit for this service's Ollama calls ([OLLAMA] MAX_CONCURRENCY).
+OLLAMA_SCHEDULER = scheduler_from_config(config, "OLLAMA", AsyncRequestScheduler)
+OLLAMA = AsyncOllamaClient(
+    OLLAMA_BASE,
+    max_connections=config.getint("OLLAMA", "HTTP_MAX_CONNECTIONS", fallback=100),
+    scheduler=OLLAMA_SCHEDULER,
+    breaker=breaker_from_config(config, "OLLAMA", "Ollama"),
+)
 
 
 # ===== FastAPI models =====
@@ -63,34 +83,20 @@ def rc_id() -> str:
     return str(uuid.uuid4())
 
 
-def ollama_embed(text: str) -> List[float]:
-    r = requests.post(
-        f"{OLLAMA_BASE}/api/embeddings",
-        json={"model": EMB_MODEL, "prompt": text},
-        timeout=180,
-    )
-    if r.status_code != 200:
-        raise HTTPException(status_code=502, detail=f"Ollama embeddings error: {r.text}")
-    return r.json()["embedding"]
-
-
-def ollama_generate(prompt: str) -> str:
-    r = requests.post(
-        f"{OLLAMA_BASE}/api/generate",
-        json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.2,
-                "num_ctx": 8192,
-            },
-        },
-        timeout=300,
-    )
-    if r.status_code != 200:
-        raise HTTPException(status_code=502, detail=f"Ollama generate error: {r.text}")
-    return (r.json().get("response") or "").strip()
+async def ollama_embed(text: str) -> List[float]:
+    try:
+        return await get_embedding_cache().get_or_compute_async(
+            "ollama", EMB_MODEL, text, lambda t: OLLAMA.embed(t, EMB_MODEL)
+        )
+    except AIError as e:
+        raise HTTPException(status_code=502, detail=f"Ollama embeddings error: {e}")
+
+
+async def ollama_generate(prompt: str) -> str:
+    try:
+        return await OLLAMA.generate(prompt, MODEL, {"temperature": 0.2, "num_ctx": 8192})
+    except AIError as e:
+        raise HTTPException(status_code=502, detail=f"Ollama generate error: {e}")
 
 
 # Detect explicit article numbers in Slovene legal phrasing.
@@ -138,7 +144,7 @@ LIMIT $limit
 
 # Vector retrieval for general questions.
 RETRIEVAL_CYPHER = """
-CALL db.index.vector.queryNodes('chunk_embedding', $topK, $qvec)
+CALL db.index.vector.queryNodes($indexName, $topK, $qvec)
 YIELD node, score
 WHERE node.projectName = $projectName
 MATCH (node)-[:CHUNK_OF]->(p:Paragraph {projectName:$projectName})<-[:HAS_PARAGRAPH]-(a:Article {projectName:$projectName})
@@ -152,6 +158,35 @@ RETURN
 ORDER BY score DESC
 """
 
+# Same rows for hits ranked by the local vector store (ai.vector_store).
+LOCAL_VECTOR_CYPHER = """
+UNWIND $hits AS h
+MATCH (node:Chunk {id_rc: h.id_rc, projectName:$projectName})
+MATCH (node)-[:CHUNK_OF]->(p:Paragraph {projectName:$projectName})<-[:HAS_PARAGRAPH]-(a:Article {projectName:$projectName})
+RETURN
+  a.num AS clen,
+  p.order AS odst,
+  p.id_rc AS paragraph_id_rc,
+  node.id_rc AS chunk_id_rc,
+  node.text AS chunk_text,
+  h.score AS score
+ORDER BY score DESC
+"""
+
+
+async def vector_query(session, qvec: List[float], top_k: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Cypher and parameters for the vector route: the local store when synced,
+    else the project's partition index (graph.partitions) when online, else
+    the global index.
+    """
+    store = get_vector_store(PROJECT)
+    if store is not None and store.dim == len(qvec):
+        hits = store.search(qvec, top_k)
+        return LOCAL_VECTOR_CYPHER, {"hits": [{"id_rc": i, "score": s} for i, s in hits]}
+    partition = await partition_indexes_async(session, PROJECT)
+    return RETRIEVAL_CYPHER, {"indexName": partition["vector"] or "chunk_embedding", "qvec": qvec, "topK": top_k}
+
 
 def build_prompt(question: str, contexts: List[Dict[str, Any]]) -> str:
     lines = []
@@ -211,35 +246,39 @@ def rows_to_context_and_citations(rows, limit: int) -> tuple[list[dict], list[Ci
 # ===== App =====
 app = FastAPI(title="ZGD1 RAG Chat API v2 (efficient routing)")
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
 
 
 @app.on_event("shutdown")
-def shutdown_event():
-    driver.close()
+async def shutdown_event():
+    await driver.close()
+    await OLLAMA.aclose()
 
 
 @app.get("/health")
-def health():
+async def health():
     # Cheap smoke test: checks connectivity + chunk availability
-    with driver.session() as session:
-        n = session.run(
+    async with driver.session() as session:
+        result = await session.run(
             "MATCH (c:Chunk {projectName:$p}) RETURN count(c) AS n",
             p=PROJECT
-        ).single()["n"]
+        )
+        n = (await result.single())["n"]
     return {
         "ok": True,
         "project": PROJECT,
         "chunks": n,
         "neo4j_uri": NEO4J_URI,
         "ollama": OLLAMA_BASE,
+        "ollama_queue": OLLAMA_SCHEDULER.stats(),
+        "vector_store": vector_store_stats(),
         "emb_model": EMB_MODEL,
         "model": MODEL,
     }
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     question = (req.question or "").strip()
     if not question:
         raise HTTPException(status_code=400, detail="question is required")
@@ -249,32 +288,30 @@ def chat(req: ChatRequest):
     # ===== ROUTE 1: explicit "X člen" => DIRECT LOOKUP ONLY (fastest) =====
     wanted_num = extract_article_num(question)
     if wanted_num:
-        with driver.session() as session:
-            rows = list(session.run(
+        async with driver.session() as session:
+            result = await session.run(
                 DIRECT_ARTICLE_CYPHER,
                 projectName=PROJECT,
                 num=wanted_num,
                 limit=max(200, top_k),  # fetch whole article; cap later with top_k for response
-            ))
+            )
+            rows = [record async for record in result]
 
         # If direct lookup found content, answer without embeddings/vector
         if rows:
             contexts, citations = rows_to_context_and_citations(rows, top_k)
             prompt = build_prompt(question, contexts)
-            answer = ollama_generate(prompt)
+            answer = await ollama_generate(prompt)
             return ChatResponse(answer=answer, citations=citations)
 
         # If article not found (should be rare), fall through to vector search.
 
     # ===== ROUTE 2: general question => vector retrieval =====
-    qvec = ollama_embed(question)
-    with driver.session() as session:
-        rows = list(session.run(
-            RETRIEVAL_CYPHER,
-            qvec=qvec,
-            topK=top_k,
-            projectName=PROJECT,
-        ))
+    qvec = await ollama_embed(question)
+    async with driver.session() as session:
+        cypher, params = await vector_query(session, qvec, top_k)
+        result = await session.run(cypher, projectName=PROJECT, **params)
+        rows = [record async for record in result]
 
     if not rows:
         return ChatResponse(
@@ -284,6 +321,6 @@ def chat(req: ChatRequest):
 
     contexts, citations = rows_to_context_and_citations(rows, top_k)
     prompt = build_prompt(question, contexts)
-    answer = ollama_generate(prompt)
+    answer = await ollama_generate(prompt)
     #return ChatResponse(answer=answer, citations=citations)
     return ChatResponse(answer=answer, citations=citations)
@@ -3,14 +3,30 @@
 import configparser
 import os
 from pathlib import Path
-import requests
+import sys
+import time
 import re
 from typing import List, Dict, Any, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
+
+# Shared embedding cache lives in the app's ai package (app/ai/embed_cache.py).
+APP_DIR = Path(__file__).resolve().parents[2]
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from ai.async_ollama import AsyncOllamaClient
+from ai.breaker import breaker_from_config
+from ai.embed_cache import get_embedding_cache
+from ai.errors import AIError
+from ai.packing import evidence_budget, pack_chunks
+from ai.scheduler import AsyncRequestScheduler, scheduler_from_config
+from ai.vector_store import get_vector_store, vector_store_stats
+from graph.partitions import partition_indexes_async
+from ai.streaming import SSE_HEADERS, SSE_MIMETYPE, sse_frame
 
 
 # ===== CONFIG =====
@@ -36,6 +52,15 @@ OLLAMA_BASE = config["OLLAMA"]["BASE"]
 EMB_MODEL = config["OLLAMA"]["EMB_MODEL"]          # e.g. mxbai-embed-large:latest
 MODEL = config["OLLAMA"]["MODEL"]                  # e.g. qwen2.5:14b
 TOP_K = int(config["OLLAMA"].get("TOP_K", "8"))
+# Concurrency limit for this service's Ollama calls ([OLLAMA] MAX_CONCURRENCY).
+OLLAMA_SCHEDULER = scheduler_from_config(config, "OLLAMA", AsyncRequestScheduler)
+OLLAMA = AsyncOllamaClient(
+    OLLAMA_BASE,
+    max_connections=config.getint("OLLAMA", "HTTP_MAX_CONNECTIONS", fallback=100),
+    scheduler=OLLAMA_SCHEDULER,
+    breaker=breaker_from_config(config, "OLLAMA", "Ollama"),
+)
+GENERATE_OPTIONS = {"temperature": 0.2, "num_ctx": 8192}
 
 ASSESSABLE_CYPHER = """
 MATCH (a:Article {projectName:$projectName})
@@ -84,31 +109,20 @@ class GradeResponse(BaseModel):
 
 
 # ===== Ollama helpers =====
-def ollama_embed(text: str) -> List[float]:
-    r = requests.post(
-        f"{OLLAMA_BASE}/api/embeddings",
-        json={"model": EMB_MODEL, "prompt": text},
-        timeout=180,
-    )
-    if r.status_code != 200:
-        raise HTTPException(status_code=502, detail=f"Ollama embeddings error: {r.text}")
-    return r.json()["embedding"]
+async def ollama_embed(text: str) -> List[float]:
+    try:
+        return await get_embedding_cache().get_or_compute_async(
+            "ollama", EMB_MODEL, text, lambda t: OLLAMA.embed(t, EMB_MODEL)
+        )
+    except AIError as e:
+        raise HTTPException(status_code=502, detail=f"Ollama embeddings error: {e}")
 
 
-def ollama_generate(prompt: str) -> str:
-    r = requests.post(
-        f"{OLLAMA_BASE}/api/generate",
-        json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0.2, "num_ctx": 8192},
-        },
-        timeout=300,
-    )
-    if r.status_code != 200:
-        raise HTTPException(status_code=502, detail=f"Ollama generate error: {r.text}")
-    return (r.json().get("response") or "").strip()
+async def ollama_generate(prompt: str) -> str:
+    try:
+        return await OLLAMA.generate(prompt, MODEL, GENERATE_OPTIONS)
+    except AIError as e:
+        raise HTTPException(status_code=502, detail=f"Ollama generate error: {e}")
 
 def build_grading_prompt(
     question: str,
@@ -215,7 +229,7 @@ LIMIT $limit
 """
 
 VECTOR_CYPHER = """
-CALL db.index.vector.queryNodes('chunk_embedding', $topK, $qvec)
+CALL db.index.vector.queryNodes($indexName, $topK, $qvec)
 YIELD node, score
 WHERE node.projectName = $projectName
 MATCH (node)-[:CHUNK_OF]->(p:Paragraph {projectName:$projectName})<-[:HAS_PARAGRAPH]-(a:Article {projectName:$projectName})
@@ -229,6 +243,35 @@ RETURN
 ORDER BY score DESC
 """
 
+# Same rows for hits ranked by the local vector store (ai.vector_store).
+LOCAL_VECTOR_CYPHER = """
+UNWIND $hits AS h
+MATCH (node:Chunk {id_rc: h.id_rc, projectName:$projectName})
+MATCH (node)-[:CHUNK_OF]->(p:Paragraph {projectName:$projectName})<-[:HAS_PARAGRAPH]-(a:Article {projectName:$projectName})
+RETURN
+  a.num AS clen,
+  p.order AS odst,
+  p.id_rc AS paragraph_id_rc,
+  node.id_rc AS chunk_id_rc,
+  node.text AS chunk_text,
+  h.score AS score
+ORDER BY score DESC
+"""
+
+
+async def vector_query(session, qvec: List[float], top_k: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Cypher and parameters for the vector route: the local store when synced,
+    else the project's partition index (graph.partitions) when online, else
+    the global index.
+    """
+    store = get_vector_store(PROJECT)
+    if store is not None and store.dim == len(qvec):
+        hits = store.search(qvec, top_k)
+        return LOCAL_VECTOR_CYPHER, {"hits": [{"id_rc": i, "score": s} for i, s in hits]}
+    partition = await partition_indexes_async(session, PROJECT)
+    return VECTOR_CYPHER, {"indexName": partition["vector"] or "chunk_embedding", "qvec": qvec, "topK": top_k}
+
 
 def build_prompt(question: str, contexts: List[Dict[str, Any]]) -> str:
     lines = []
@@ -293,85 +336,157 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
 
 
 @app.on_event("shutdown")
-def shutdown_event():
-    driver.close()
+async def shutdown_event():
+    await driver.close()
+    await OLLAMA.aclose()
 
 
 @app.get("/health")
-def health():
-    with driver.session() as session:
-        chunks = session.run(
+async def health():
+    async with driver.session() as session:
+        result = await session.run(
             "MATCH (c:Chunk {projectName:$p}) RETURN count(c) AS n",
             p=PROJECT
-        ).single()["n"]
+        )
+        chunks = (await result.single())["n"]
     return {
         "ok": True,
         "project": PROJECT,
         "chunks": chunks,
         "neo4j_uri": NEO4J_URI,
         "ollama": OLLAMA_BASE,
+        "ollama_queue": OLLAMA_SCHEDULER.stats(),
+        "vector_store": vector_store_stats(),
         "emb_model": EMB_MODEL,
         "model": MODEL,
         "top_k_default": TOP_K,
     }
 
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    question = (req.question or "").strip()
-    if not question:
-        raise HTTPException(status_code=400, detail="question is required")
+# Part of num_ctx kept free for the answer when packing the context.
+ANSWER_TOKENS = 1024
 
-    top_k = req.top_k or TOP_K
 
+def _pack_contexts(
+    question: str, contexts: List[Dict[str, Any]], citations: List[Citation]
+) -> Tuple[List[Dict[str, Any]], List[Citation]]:
+    """
+    Drop near-duplicate and over-budget contexts, grouped by paragraph.
+    Contexts are whole paragraphs here, so they are never cut short: one that
+    fits the budget goes in as is, one that does not is left out.
+    """
+    budget = evidence_budget(MODEL, build_prompt(question, []), ANSWER_TOKENS)
+    packed = pack_chunks(
+        contexts, budget, text_key="chunk_text", owner_key="paragraph_id_rc", max_chunk_tokens=budget
+    )
+    kept = {c["chunk_id_rc"] for c in packed.chunks}
+    return packed.chunks, [c for c in citations if c.chunk_id_rc in kept]
+
+
+NO_CONTEXT_ANSWER = "Kontekst ne zadošča. V bazi ni najdenih ustreznih odstavkov."
+
+
+async def _chat_context(question: str, top_k: int) -> Tuple[Optional[str], List[Citation], str]:
+    """Prompt (None when nothing was retrieved), citations and route for a question."""
     wanted_num = extract_article_num(question)
 
     # ===== Route A: direct article lookup (fast + exact) =====
     if wanted_num:
-        with driver.session() as session:
-            rows = list(session.run(
+        async with driver.session() as session:
+            result = await session.run(
                 DIRECT_ARTICLE_CYPHER,
                 projectName=PROJECT,
                 num=wanted_num,
                 limit=max(200, top_k),  # fetch whole article; response will still cap to top_k
-            ))
+            )
+            rows = [record async for record in result]
 
         if rows:
-            contexts, citations = rows_to_context_and_citations(rows, top_k)
-            prompt = build_prompt(question, contexts)
-            answer = ollama_generate(prompt)
-            return ChatResponse(answer=answer, citations=citations, route="direct_article")
+            contexts, citations = _pack_contexts(question, *rows_to_context_and_citations(rows, top_k))
+            return build_prompt(question, contexts), citations, "direct_article"
 
         # If article wasn't found (rare), fall through to vector route.
 
     # ===== Route B: vector retrieval (semantic) =====
-    qvec = ollama_embed(question)
-    with driver.session() as session:
-        rows = list(session.run(
-            VECTOR_CYPHER,
-            qvec=qvec,
-            topK=top_k,
-            projectName=PROJECT,
-        ))
+    qvec = await ollama_embed(question)
+    async with driver.session() as session:
+        cypher, params = await vector_query(session, qvec, top_k)
+        result = await session.run(cypher, projectName=PROJECT, **params)
+        rows = [record async for record in result]
 
     if not rows:
-        return ChatResponse(
-            answer="Kontekst ne zadošča. V bazi ni najdenih ustreznih odstavkov.",
-            citations=[],
-            route="vector",
-        )
+        return None, [], "vector"
+
+    contexts, citations = _pack_contexts(question, *rows_to_context_and_citations(rows, top_k))
+    return build_prompt(question, contexts), citations, "vector"
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest):
+    question = (req.question or "").strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="question is required")
+
+    prompt, citations, route = await _chat_context(question, req.top_k or TOP_K)
+    if prompt is None:
+        return ChatResponse(answer=NO_CONTEXT_ANSWER, citations=[], route=route)
+
+    answer = await ollama_generate(prompt)
+    return ChatResponse(answer=answer, citations=citations, route=route)
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    /chat as server-sent events: `sources` (route + citations), `token` per
+    piece of the answer, then `done`. Generation stops when the client leaves.
+    """
+    question = (req.question or "").strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="question is required")
+
+    prompt, citations, route = await _chat_context(question, req.top_k or TOP_K)
+
+    async def events():
+        started = time.monotonic()
+        yield sse_frame("sources", {"route": route, "citations": [c.dict() for c in citations]})
+        if prompt is None:
+            yield sse_frame("token", {"text": NO_CONTEXT_ANSWER})
+            yield sse_frame("done", {"success": True, "route": route, "model": None})
+            return
+
+        # Closing the token stream drops the Ollama connection, which stops the
+        # generation and frees the scheduler slot.
+        tokens = OLLAMA.generate_stream(prompt, MODEL, GENERATE_OPTIONS)
+        chars = 0
+        try:
+            async for text in tokens:
+                if await request.is_disconnected():
+                    break
+                chars += len(text)
+                yield sse_frame("token", {"text": text})
+        except AIError as e:
+            yield sse_frame("error", {"success": False, "error": str(e)})
+            return
+        finally:
+            await tokens.aclose()
+
+        yield sse_frame("done", {
+            "success": True,
+            "route": route,
+            "model": MODEL,
+            "chars": chars,
+            "elapsed_ms": int((time.monotonic() - started) * 1000),
+        })
 
-    contexts, citations = rows_to_context_and_citations(rows, top_k)
-    prompt = build_prompt(question, contexts)
-    answer = ollama_generate(prompt)
-    return ChatResponse(answer=answer, citations=citations, route="vector")
+    return StreamingResponse(events(), media_type=SSE_MIMETYPE, headers=SSE_HEADERS)
 
 @app.post("/grade-answer", response_model=GradeResponse)
-def grade_answer(req: GradeRequest):
+async def grade_answer(req: GradeRequest):
     question = (req.question or "").strip()
     user_answer = (req.user_answer or "").strip()
     if not question or not user_answer:
@@ -382,12 +497,13 @@ def grade_answer(req: GradeRequest):
 
     # 1) poberi kontekst iz Neo4j (samo isAssessable=true)
     try:
-        with driver.session() as session:
-            rows = list(session.run(
+        async with driver.session() as session:
+            result = await session.run(
                 ASSESSABLE_CYPHER,
                 projectName=PROJECT,
                 articleNum=article_num,
-            ))
+            )
+            rows = await result.data()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Neo4j error in ASSESSABLE_CYPHER: {e}")
 
@@ -400,7 +516,7 @@ def grade_answer(req: GradeRequest):
     prompt = build_grading_prompt(question, user_answer, context_chunks, article_num)
 
     try:
-        evaluation = ollama_generate(prompt)
+        evaluation = await ollama_generate(prompt)
     except HTTPException:
         raise
     except Exception as e:
@@ -31,12 +31,14 @@
     if (mode === "auto") return "Smart";
     if (mode === "vector") return "Semantic";
     if (mode === "fulltext") return "Keyword";
+    if (mode === "hybrid") return "Hybrid";
     return mode || "Unknown";
   }
 
   function prettyStrategy(strategy) {
     if (strategy === "vector_query") return "Semantic search";
     if (strategy === "fulltext_query") return "Keyword search";
+    if (strategy === "hybrid_rrf") return "Hybrid search (rank fusion)";
     return strategy || "Unknown";
   }
 
@@ -48,6 +50,8 @@
       help.textContent = "Smart search tries semantic results first, then keyword fallback if needed.";
     } else if (mode === "vector") {
       help.textContent = "Semantic search only. If semantic retrieval fails, no keyword fallback is used.";
+    } else if (mode === "hybrid") {
+      help.textContent = "Runs semantic and keyword search together and merges their rankings.";
     } else {
       help.textContent = "Keyword search only. Uses the fulltext index path.";
     }
@@ -797,6 +801,8 @@
       }
 
       textarea.value = data.cypher || "";
+      // Template queries reference $params; /run-cypher sends them along.
+      textarea.dataset.cypherParams = JSON.stringify(data.params || {});
       focusCypherDialog();
       if (isAiMode) {
         setStatus("AI-generated Cypher inserted into the Cypher dialog.", false);
@@ -22,6 +22,14 @@ var nodeIdToNameMap = new Map();
 let showProperties = false; // Global variable to control the dialog behavior
 let isManualGraph = false; // Flag to indicate if the graph is manual
 
+// Carried by every domain node for the id_rc lookups; never a node's type.
+const IV_NODE_LABEL = "IVNode";
+
+function primaryNodeLabel(node) {
+   const labels = Array.isArray(node && node.labels) ? node.labels : [];
+   return labels.find(label => label !== IV_NODE_LABEL) || null;
+}
+
 function resolveVisualNodeType(node, allowedNodeLabels = []) {
    if (node && node.nodeType) {
        return node.nodeType;
@@ -38,7 +46,7 @@ function resolveVisualNodeType(node, allowedNodeLabels = []) {
        return allowedMatch;
    }
 
-   const excludedLabels = new Set(["CustomGraph", "customGraphNode", "customGraphNodePosition"]);
+   const excludedLabels = new Set(["CustomGraph", "customGraphNode", "customGraphNodePosition", IV_NODE_LABEL]);
    const preferredLabel = labels.find(label => !excludedLabels.has(label) && label !== "NodeType");
    if (preferredLabel) {
        return preferredLabel;
@@ -48,6 +56,128 @@ function resolveVisualNodeType(node, allowedNodeLabels = []) {
    return fallbackLabel || labels[0] || "Default";
 }
 
+// Compact graph wire format (see app/graph/wire.py). Graph endpoints
+// (/run-cypher, /expand-node, /loadCustomGraph) answer in this format when asked.
+const IV_GRAPH_ACCEPT = "application/vnd.insightviewer.graph+json, application/json;q=0.9";
+const IV_COMPACT_FORMAT = "iv-compact/1";
+
+function decodeCompactColumns(cols, count, strings, base) {
+   const rows = Array.from({ length: count }, () => ({}));
+   (cols || []).forEach(([key, col]) => {
+       let values;
+       if ("same" in col) {
+           values = base[col.same];
+       } else if ("s" in col) {
+           values = col.s.map(i => (i < 0 ? null : strings[i]));
+       } else if ("l" in col) {
+           values = col.l.map(v => (v === null ? null : v.map(i => strings[i])));
+       } else {
+           values = col.v;
+       }
+       base[key] = values;
+       for (let i = 0; i < count; i++) {
+           if (values[i] !== null && values[i] !== undefined) {
+               rows[i][key] = values[i];
+           }
+       }
+   });
+   return rows;
+}
+
+function decodeCompactGraph(data) {
+   if (!data || data.format !== IV_COMPACT_FORMAT) {
+       return data;
+   }
+   const { strings, keys, ids } = data;
+   const nodeIds = ids.slice(0, data.nodes.count);
+
+   const nodesOut = decodeCompactColumns(data.nodes.cols, data.nodes.count, strings, { id: nodeIds });
+   nodesOut.forEach((node, i) => {
+       const flat = data.nodes.props[i] || [];
+       const properties = {};
+       for (let j = 0; j < flat.length; j += 2) {
+           properties[keys[flat[j]]] = flat[j + 1];
+       }
+       node.id = nodeIds[i];
+       node.properties = properties;
+   });
+
+   const edgesOut = decodeCompactColumns(data.edges.cols, data.edges.count, strings, {});
+   edgesOut.forEach((edge, i) => {
+       edge.from = ids[data.edges.from[i]];
+       edge.to = ids[data.edges.to[i]];
+   });
+
+   const result = { ...data, nodes: nodesOut, edges: edgesOut };
+   ["format", "strings", "keys", "ids"].forEach(k => delete result[k]);
+   return result;
+}
+
+function readGraphResponse(response) {
+   return response.json().then(decodeCompactGraph);
+}
+
+// Per relationship type at most this many neighbours are added by one expand;
+// anything beyond is reported back as overflow by /api/graph/expand.
+const IV_EXPAND_PER_TYPE_LIMIT = 50;
+
+function reportExpandOverflow(overflow) {
+   if (!Array.isArray(overflow) || overflow.length === 0) {
+       return;
+   }
+   console.warn("Expand overflow:", overflow);
+   const lines = overflow.map(o => `${o.type}: showing ${o.returned} of ${o.degree}`);
+   alert("Some relationship types have too many neighbours to show all of them:\n" + lines.join("\n"));
+}
+
+// Expands one or more nodes with a single request and adds the result to the graph.
+function expandNodes(nodeIds, edgeTypes = null) {
+   return fetch("/api/graph/expand", {
+       method: "POST",
+       headers: { "Content-Type": "application/json", "Accept": IV_GRAPH_ACCEPT },
+       body: JSON.stringify({ ids: nodeIds, edge_types: edgeTypes, per_type_limit: IV_EXPAND_PER_TYPE_LIMIT })
+   })
+   .then(readGraphResponse)
+   .then(data => {
+       if (!data || data.success === false) {
+           throw new Error((data && data.error) || "Unknown error");
+       }
+       visualizeGraph(data, gAllowedNodeLabels);
+       reportExpandOverflow(data.overflow);
+       return data;
+   });
+}
+
+// Nodes sent with truncated: true only carry projected properties (no vectors,
+// long strings cut). Load the full set before the properties dialog shows
+// them, so saving the dialog never writes shortened values back.
+function ensureFullNodeProperties(node) {
+   if (!node || !node.truncated) {
+       return Promise.resolve(node);
+   }
+   const idRc = (node.properties && node.properties.id_rc) || node.id;
+   return fetch("/api/nodes/properties", {
+       method: "POST",
+       headers: { "Content-Type": "application/json" },
+       body: JSON.stringify({ ids: [idRc], project: currentProject })
+   })
+   .then(response => response.json())
+   .then(data => {
+       const full = data && data.success && Array.isArray(data.nodes) ? data.nodes[0] : null;
+       if (!full) {
+           console.error("Full properties not available for node:", idRc, data && data.error);
+           return node;
+       }
+       const updated = { ...node, properties: full.properties, truncated: false, truncatedKeys: [] };
+       nodes.update(updated);
+       return updated;
+   })
+   .catch(err => {
+       console.error("Error loading full node properties:", err);
+       return node;
+   });
+}
+
 var options = {
    interaction: { 
        hover: true,
@@ -262,13 +392,8 @@ async function submitNode(shape) {
            data.label = nodeName;
            data.labels = result.labels; // Store labels in the node object
 
-           // Fetch the node visuals from the backend
-           fetch(`/nodes/get_node_type_visuals`, {
-               method: "POST",
-               headers: { "Content-Type": "application/json" },
-               body: JSON.stringify({ nodeType: nodeType })
-           })
-           .then(response => response.json())
+           // Node visuals from the NodeType bundle
+           getNodeTypeVisuals(nodeType)
            .then(nodeVisuals => {
                if (nodeVisuals.success) {
                    // determine final shape (priority: backend visuals -> passed shape -> default)
@@ -622,6 +747,7 @@ function visualizeGraph(data, allowedNodeLabels = []) {
                         image: finalImage,
                         size: finalSize,
                         properties: node.properties,
+                        truncated: node.truncated,
                         labels: node.labels || ["Unknown"]
                     };
                     return n;
@@ -723,24 +849,9 @@ async function expandByEdgeType() {
 
         console.log("Expanding node by edge types:", selectedEdgeTypes);
 
-        // Send the selected edge types to the backend to expand the node
-        console.log("expandByEdgeType: " + JSON.stringify({ node_id: nodeId, edge_types: selectedEdgeTypes }));
-        const expandResponse = await fetch(`/expand-node`, {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ node_id: nodeId, edge_types: selectedEdgeTypes })
-        });
-
-        const expandData = await expandResponse.json();
-        if (!expandData.success) {
-            alert("Failed to expand node: " + (expandData.error || "Unknown error"));
-            return;
-        }
-
-        console.log("visualizeGraph:", typeof visualizeGraph);
-        console.log("visualizeGraph:", expandData);
-        console.log("visualizeGraph:", gAllowedNodeLabels);
-        visualizeGraph(expandData, gAllowedNodeLabels);
+        // Expand every selected node with the chosen edge types in one request
+        console.log("expandByEdgeType: " + JSON.stringify({ ids: selectedNodes, edge_types: selectedEdgeTypes }));
+        await expandNodes(selectedNodes, selectedEdgeTypes);
     } catch (error) {
         console.error("Error in expandByEdgeType:", error);
         alert("An error occurred while expanding the node.");
@@ -921,42 +1032,43 @@ document.addEventListener("DOMContentLoaded", function () {
            // A node was clicked, and the dialog is enabled
            const selectedNodes = network.getSelectedNodes();
            const nodeId = selectedNodes[0];
-           const node = nodes.get(nodeId);
 
-           if (!node) {
+           if (!nodes.get(nodeId)) {
                console.error("Node not found.");
                return;
            }
 
-           const dialog = document.getElementById("node-properties-dialog");
-           const content = document.getElementById("node-properties-content");
-
-           // Retrieve labels from the node object
-           //const labels = node.labels || ["Unknown"]; // Use stored labels or fallback to "Unknown"
-           const labels = node.labels ; // Use stored labels or fallback to "Unknown"
-
-           // Format the properties and include labels
-           const formattedProperties = `
-               <div><b>Labels:</b> ${labels.join(", ")}</div>
-               ${formatProperties(node.properties)}
-           `;
-
-           // Check if the dialog is already visible
-           if (dialog.style.display === "block") {
-               // Refresh the dialog content
-               content.innerHTML = formattedProperties;
-               console.log("Dialog refreshed with new node properties and labels:", { labels, properties: node.properties });
-           } else {
-               // Populate the dialog with node properties and labels
-               content.innerHTML = formattedProperties;
+           ensureFullNodeProperties(nodes.get(nodeId)).then(node => {
+               const dialog = document.getElementById("node-properties-dialog");
+               const content = document.getElementById("node-properties-content");
+
+               // Retrieve labels from the node object
+               //const labels = node.labels || ["Unknown"]; // Use stored labels or fallback to "Unknown"
+               const labels = node.labels ; // Use stored labels or fallback to "Unknown"
+
+               // Format the properties and include labels
+               const formattedProperties = `
+                   <div><b>Labels:</b> ${labels.join(", ")}</div>
+                   ${formatProperties(node.properties)}
+               `;
+
+               // Check if the dialog is already visible
+               if (dialog.style.display === "block") {
+                   // Refresh the dialog content
+                   content.innerHTML = formattedProperties;
+                   console.log("Dialog refreshed with new node properties and labels:", { labels, properties: node.properties });
+               } else {
+                   // Populate the dialog with node properties and labels
+                   content.innerHTML = formattedProperties;
 
-               // Show the dialog
-               dialog.style.display = "block";
+                   // Show the dialog
+                   dialog.style.display = "block";
 
-               // Make the dialog draggable
-               makeDialogDraggable(dialog);
-               console.log("Dialog opened with node properties and labels:", { labels, properties: node.properties });
-           }
+                   // Make the dialog draggable
+                   makeDialogDraggable(dialog);
+                   console.log("Dialog opened with node properties and labels:", { labels, properties: node.properties });
+               }
+           });
        }
    });
 
@@ -1007,6 +1119,7 @@ document.addEventListener("DOMContentLoaded", function () {
                    if (suggested && suggested.trim()) {
                        // Put the suggested cypher into the textarea for user review / execution
                        textarea.value = suggested.trim();
+                       delete textarea.dataset.cypherParams;
                        // Optionally auto-resize dialog height if present
                        if (typeof resizeDialog === "function") resizeDialog();
                        alert("Suggested Cypher placed into textarea. Review and press Run to execute.");
@@ -1026,14 +1139,22 @@ document.addEventListener("DOMContentLoaded", function () {
            return;
        }
 
+       // Parameters of a guided-search query (set by globalSearch.js)
+       let cypherParams = {};
+       try {
+           cypherParams = JSON.parse(textarea.dataset.cypherParams || "{}");
+       } catch (e) {
+           console.warn("Ignoring invalid Cypher params:", e);
+       }
+
        // Otherwise (contains MATCH) call the original run-cypher endpoint
        fetch("/run-cypher", {
            method: "POST",
-           headers: { "Content-Type": "application/json" },
+           headers: { "Content-Type": "application/json", "Accept": IV_GRAPH_ACCEPT },
            //body: JSON.stringify({ query: cypherQuery })
-            body: JSON.stringify({query: cypherQuery, project: currentProject, email: currentEmail})
+            body: JSON.stringify({query: cypherQuery, params: cypherParams, project: currentProject, email: currentEmail})
        })
-       .then(response => response.json())
+       .then(readGraphResponse)
        .then(data => {
            fetchNodeTypesAndVisualizeGraph(data); // Add new data to the graph
        })
@@ -1259,10 +1380,18 @@ document.addEventListener("DOMContentLoaded", function () {
 
        if (result) result.textContent = 'Thinking...';
 
+       const renderAnswer = (text) => {
+           if (!result) return;
+           result._rawMarkdown = text || '';
+           result.innerHTML = (typeof marked !== 'undefined')
+               ? marked.parse(text || '')
+               : (text || '').replace(/\n/g, '<br>');
+       };
+
        try {
            const res = await fetch('/api/ai/graph/ask-by-depth', {
                method: 'POST',
-               headers: { 'Content-Type': 'application/json' },
+               headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
                body: JSON.stringify({
                    question,
                    node_ids: [nodeId],
@@ -1273,16 +1402,32 @@ document.addEventListener("DOMContentLoaded", function () {
                    project: window.IV_CURRENT_USER?.project || currentProject || localStorage.getItem('iv_project'),
                })
            });
-           const data = await res.json();
-           if (!res.ok || !data.success) {
-               throw new Error(data.error || 'Graph AI request failed');
-           }
-           if (result) {
-               result._rawMarkdown = data.answer || '';
-               result.innerHTML = (typeof marked !== 'undefined')
-                   ? marked.parse(data.answer || '')
-                   : (data.answer || '').replace(/\n/g, '<br>');
+           const contentType = res.headers.get('Content-Type') || '';
+           if (!contentType.includes('text/event-stream')) {
+               // Validation errors (and older servers) still answer with JSON.
+               const data = await res.json();
+               if (!res.ok || !data.success) {
+                   throw new Error(data.error || 'Graph AI request failed');
+               }
+               renderAnswer(data.answer);
+               return;
            }
+
+           let answer = '';
+           let renderQueued = false;
+           await readEventStream(res, (event, data) => {
+               if (event === 'token') {
+                   answer += data.text || '';
+                   // Re-render at most once per frame while tokens stream in.
+                   if (!renderQueued) {
+                       renderQueued = true;
+                       requestAnimationFrame(() => { renderQueued = false; renderAnswer(answer); });
+                   }
+               } else if (event === 'error') {
+                   throw new Error(data.error || 'Graph AI request failed');
+               }
+           });
+           renderAnswer(answer);
        } catch (e) {
            console.error(e);
            if (result) result.textContent = `Error: ${e.message || e}`;
@@ -1290,6 +1435,35 @@ document.addEventListener("DOMContentLoaded", function () {
        }
    }
 
+   // Reads a text/event-stream fetch response, calling onEvent(event, data)
+   // for every frame; data is the parsed JSON payload.
+   async function readEventStream(res, onEvent) {
+       const reader = res.body.getReader();
+       const decoder = new TextDecoder();
+       let buffer = '';
+       try {
+           for (;;) {
+               const { value, done } = await reader.read();
+               if (done) break;
+               buffer += decoder.decode(value, { stream: true });
+               let sep;
+               while ((sep = buffer.indexOf('\n\n')) >= 0) {
+                   const frame = buffer.slice(0, sep);
+                   buffer = buffer.slice(sep + 2);
+                   let event = 'message';
+                   const dataLines = [];
+                   for (const line of frame.split('\n')) {
+                       if (line.startsWith('event:')) event = line.slice(6).trim();
+                       else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+                   }
+                   if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')));
+               }
+           }
+       } finally {
+           reader.cancel().catch(() => {});
+       }
+   }
+
    function copyGraphAiAnswer() {
        const output = document.getElementById('graph-ai-result');
        if (!output) return;
@@ -1633,36 +1807,11 @@ document.addEventListener("DOMContentLoaded", function () {
        console.log("Expanding node with id_rc:", nodeIdRC);
 
        // Fetch edges for the selected node
-       fetch(`/expand-node`, {
-           method: "POST",
-           headers: { "Content-Type": "application/json" },
-           body: JSON.stringify({ node_id: nodeId })
-       })
-       .then(response => {
-           if (!response.ok) {
-               throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-           }
-           const contentType = response.headers.get("Content-Type") || "";
-           if (!contentType.toLowerCase().includes("application/json")) {
-               return response.text().then(text => {
-                   console.error("Non-JSON response from /expand-node:", text);
-                   throw new Error("Server returned HTML instead of JSON");
-               });
-           }
-           return response.json();
-       })
-       .then(data => {
-           console.log("EXPAND-NODE response:", data);
-           if (!data || data.success === false) {
-               console.error("Expand-node failed:", data && data.error);
-               alert("Expand failed:\n" + (data && data.error ? data.error : "Unknown error"));
-               return;
-           }
-           console.log("data")
-           console.log(data)
-           visualizeGraph(data, gAllowedNodeLabels);
-       })
-       .catch(error => console.error("Error expanding node:", error));
+       expandNodes([nodeId])
+       .catch(error => {
+           console.error("Error expanding node:", error);
+           alert("Expand failed:\n" + error.message);
+       });
    });
 });
 
@@ -2030,6 +2179,7 @@ function submitNodeType(pNodeType, pName, pShape, pColor, pSize) {
    .then(data => {
        if (data.success) {
            alert("Node type created successfully!");
+           invalidateNodeTypeVisuals();
            closeCreateNodeTypeDialog();
            fetchNodeTypes(); // Optionally refresh the node types dropdown
        } else {
@@ -2200,6 +2350,7 @@ function saveNodeProperties() {
                id: nodeId,
                properties: updatedProperties
            });
+           invalidateNodeTypeVisuals();
            alert("Node properties updated successfully.");
            closeNodePropertiesDialog();
        } else {
@@ -2260,34 +2411,35 @@ function openNodePropertiesDialog() {
    }
 
    const nodeId = selectedNodes[0];
-   const node = nodes.get(nodeId);
 
-   if (!node) {
+   if (!nodes.get(nodeId)) {
        alert("Node not found.");
        return;
    }
 
-   const dialog = document.getElementById("node-properties-dialog");
-   const content = document.getElementById("node-properties-content");
+   ensureFullNodeProperties(nodes.get(nodeId)).then(node => {
+       const dialog = document.getElementById("node-properties-dialog");
+       const content = document.getElementById("node-properties-content");
 
-   // Retrieve labels from the node object
-   const labels = node.labels || ["Unknown"]; // Use stored labels or fallback to "Unknown"
+       // Retrieve labels from the node object
+       const labels = node.labels || ["Unknown"]; // Use stored labels or fallback to "Unknown"
 
-   // Format the properties and include labels
-   const formattedProperties = `
-       <div><b>Labels:</b> ${labels.join(", ")}</div>
-       ${formatProperties(node.properties)}
-   `;
+       // Format the properties and include labels
+       const formattedProperties = `
+           <div><b>Labels:</b> ${labels.join(", ")}</div>
+           ${formatProperties(node.properties)}
+       `;
 
-   // Populate the dialog with node properties and labels
-   content.innerHTML = formattedProperties;
+       // Populate the dialog with node properties and labels
+       content.innerHTML = formattedProperties;
 
-   // Show the dialog
-   dialog.style.display = "block";
+       // Show the dialog
+       dialog.style.display = "block";
 
-   // Make the dialog draggable
-   makeDialogDraggable(dialog);
-   console.log("Dialog opened with node properties and labels:", { labels, properties: node.properties });
+       // Make the dialog draggable
+       makeDialogDraggable(dialog);
+       console.log("Dialog opened with node properties and labels:", { labels, properties: node.properties });
+   });
 }
 
 function closeNodePropertiesDialog() {
@@ -2324,13 +2476,33 @@ function makeDialogDraggable(dialog) {
    }
 }
 
+// NodeType visuals are fetched once as a bundle and revalidated with the
+// bundle's ETag (cache: "no-cache"), so an unchanged registry costs a 304.
+let nodeTypeVisualsBundle = null;
+
+function invalidateNodeTypeVisuals() {
+   nodeTypeVisualsBundle = null;
+}
+
+function getNodeTypeVisuals(nodeType) {
+   if (!nodeTypeVisualsBundle) {
+       nodeTypeVisualsBundle = fetch("/nodes/node_type_visuals_bundle", { cache: "no-cache" })
+           .then(response => response.json())
+           .then(body => {
+               if (!body.success) throw new Error(body.error || "Failed to load node type visuals");
+               return body.node_types || {};
+           })
+           .catch(error => {
+               nodeTypeVisualsBundle = null;
+               throw error;
+           });
+   }
+   // same shape as /nodes/get_node_type_visuals: unknown types give { success: true }
+   return nodeTypeVisualsBundle.then(types => types[nodeType] || { success: true });
+}
+
 function fetchNodeVisuals(nodeType, callback) {
-   fetch("/nodes/get_node_type_visuals", {
-       method: "POST",
-       headers: { "Content-Type": "application/json" },
-       body: JSON.stringify({ nodeType: nodeType })
-   })
-   .then(response => response.json())
+   getNodeTypeVisuals(nodeType)
    .then(data => {
        if (data.success) {
            console.log("Node visuals received:", data);
@@ -2418,10 +2590,11 @@ function loadCustomGraph(pCustomGraphName) {
    fetch(`/loadCustomGraph/${encodeURIComponent(pCustomGraphName)}`, {
        method: "GET",
        headers: {
-           "Content-Type": "application/json"
+           "Content-Type": "application/json",
+           "Accept": IV_GRAPH_ACCEPT
        }
    })
-   .then(response => response.json())
+   .then(readGraphResponse)
    .then(data => {
        if (data.success) {
            console.log("Custom graph loaded successfully:", data);
@@ -2440,6 +2613,7 @@ function loadCustomGraph(pCustomGraphName) {
                    x: node.x,
                    y: node.y,
                    properties: node.properties,
+                   truncated: node.truncated,
                    image: node.image,
                    size: node.size,
                    labels: node.labels || ["not defined"], // Store labels in the node object
@@ -2617,7 +2791,7 @@ function renderExistingNodeList(nodesArray) {
        item.style.borderBottom = "1px solid #eee";
        item.style.cursor = "pointer";
        item.title = JSON.stringify(node.properties || {});
-       const nodeLabel = node.label || (node.properties && node.properties.name) || (`${(node.labels && node.labels[0]) || "Node"} (${node.id})`);
+       const nodeLabel = node.label || (node.properties && node.properties.name) || (`${primaryNodeLabel(node) || "Node"} (${node.id})`);
        item.textContent = `${nodeLabel} (id:${node.id})`;
        item.onclick = function () {
            addExistingNodeToGraph(node);
@@ -2639,7 +2813,7 @@ function addExistingNodeToGraph(node) {
    }
 
    // Fetch visuals for the node's primary label if available, then add
-   const primaryLabel = (node.labels && node.labels[0]) || null;
+   const primaryLabel = primaryNodeLabel(node);
    if (primaryLabel) {
        fetchNodeVisuals(primaryLabel, (visuals) => {
            if (!visuals) visuals = {};
@@ -2659,6 +2833,7 @@ function addExistingNodeToGraph(node) {
                color: visuals.color || "#97C2FC",
                image: image,
                properties: node.properties || {},
+               truncated: node.truncated,
                labels: node.labels || []
            };
            nodes.add(nobj);
@@ -2675,6 +2850,7 @@ function addExistingNodeToGraph(node) {
            shape: createNodeCurrentShape || "ellipse",
            color: "#97C2FC",
            properties: node.properties || {},
+           truncated: node.truncated,
            labels: node.labels || []
        };
        nodes.add(nobj);
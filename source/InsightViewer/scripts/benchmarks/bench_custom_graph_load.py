@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Times /loadCustomGraph loading against saved layout size.
+
+Creates throw-away layouts of increasing size in a dedicated project, loads
+each one with the per-node (N+1) loader the endpoint used before and with
+graph.custom_graph.load_custom_graph, and prints a table. Everything created
+is removed again unless --keep is given.
+
+  export NEO4J_URI=bolt://localhost:7687 NEO4J_USER=neo4j NEO4J_PASSWORD=...
+  python scripts/benchmarks/bench_custom_graph_load.py --sizes 50,200,500,1000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from neo4j import GraphDatabase
+
+APP_ROOT = Path(__file__).resolve().parents[2] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from graph.custom_graph import load_custom_graph
+
+BENCH_PROJECT = "__bench_custom_graph__"
+BENCH_LABEL = "BenchLayoutNode"
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark custom graph (layout) loading")
+    p.add_argument("--sizes", default="50,200,500,1000", help="Comma-separated layout sizes")
+    p.add_argument("--edges-per-node", type=int, default=3, help="Random relationships per node")
+    p.add_argument("--repeat", type=int, default=3, help="Timed runs per loader and size")
+    p.add_argument("--skip-legacy", action="store_true", help="Only time the set-based loader")
+    p.add_argument("--keep", action="store_true", help="Keep the generated data")
+    return p.parse_args()
+
+
+def _legacy_load(session, name: str, project: str) -> tuple[int, int]:
+    """The per-node loader /loadCustomGraph used before (one NodeType and one
+    relationship query per member, list-based edge dedup)."""
+    nodes = {}
+    edges = []
+    result = session.run(
+        """
+        MATCH (s:CustomGraph)-[r]-(t)
+        WHERE s.name = $name
+        WITH t
+        MATCH (origNode)
+        WHERE t.original_id = origNode.id_rc
+        MATCH (ntype:NodeType) WHERE ntype.name IN labels(origNode)
+        RETURN origNode, t.x AS x, t.y AS y, ntype.size AS size, t
+        """,
+        name=name,
+    )
+    for record in list(result):
+        orig = record["origNode"]
+        if orig.get("projectName") != project:
+            continue
+        node_id = orig.get("id_rc")
+        session.run("MATCH (s:NodeType) WHERE s.name = $n RETURN s", n=list(orig.labels)[0]).single()
+        nodes[node_id] = True
+        rels = session.run(
+            """
+            MATCH (n)-[r]->(m)
+            WHERE (n.id_rc = $node_id OR m.id_rc = $node_id)
+              AND NOT 'CustomGraph' IN labels(m)
+              AND NOT 'customGraphNode' IN labels(m)
+              AND NOT 'customGraphNodePosition' IN labels(m)
+              AND NOT 'CustomGraph' IN labels(n)
+              AND NOT 'customGraphNode' IN labels(n)
+              AND NOT 'customGraphNodePosition' IN labels(n)
+            RETURN n, r, m
+            """,
+            node_id=node_id,
+        )
+        for rel_record in rels:
+            rel = rel_record["r"]
+            edge = {
+                "id": rel.get("id_rc") or str(rel.id),
+                "from": rel.start_node.get("id_rc"),
+                "to": rel.end_node.get("id_rc"),
+                "type": rel.type,
+            }
+            if edge not in edges:
+                edges.append(edge)
+    return len(nodes), len(edges)
+
+
+def _create_layout(session, size: int, edges_per_node: int) -> str:
+    name = f"bench_layout_{size}_{uuid.uuid4().hex[:8]}"
+    ids = [str(uuid.uuid4()) for _ in range(size)]
+    session.run(
+        """
+        UNWIND $ids AS id
+        CREATE (n:%s:IVNode {id_rc: id, name: 'BENCH.' + id, projectName: $project})
+        """ % BENCH_LABEL,
+        ids=ids,
+        project=BENCH_PROJECT,
+    ).consume()
+    pairs = [
+        {"a": ids[i], "b": ids[random.randrange(size)]}
+        for i in range(size)
+        for _ in range(edges_per_node)
+    ]
+    session.run(
+        """
+        UNWIND $pairs AS p
+        MATCH (a:%s {id_rc: p.a}), (b:%s {id_rc: p.b})
+        CREATE (a)-[:BENCH_REL {id_rc: randomUUID()}]->(b)
+        """ % (BENCH_LABEL, BENCH_LABEL),
+        pairs=pairs,
+    ).consume()
+    session.run(
+        """
+        CREATE (g:CustomGraph {name: $name, projectName: $project})
+        WITH g
+        UNWIND range(0, size($ids) - 1) AS i
+        CREATE (g)-[:HAS_NODE]->(:CustomGraphNode {original_id: $ids[i], x: i * 10, y: (i % 40) * 10, projectName: $project})
+        """,
+        name=name,
+        ids=ids,
+        project=BENCH_PROJECT,
+    ).consume()
+    return name
+
+
+def _timed(fn, repeat: int) -> tuple[float, object]:
+    samples = []
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(samples), out
+
+
+def main() -> int:
+    args = parse_args()
+
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USER")
+    password = os.getenv("NEO4J_PASSWORD")
+    if not uri or not user or not password:
+        print("Missing NEO4J_URI/NEO4J_USER/NEO4J_PASSWORD in environment", file=sys.stderr)
+        return 2
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    try:
+        with driver.session() as session:
+            session.run(
+                "MERGE (t:NodeType {name: $name}) ON CREATE SET t.shape = 'dot', t.color = '#97C2FC', t.size = 20, t.bench = true",
+                name=BENCH_LABEL,
+            ).consume()
+            # the app serves these from its NodeType registry
+            node_types = {r["t"]["name"]: dict(r["t"]) for r in session.run("MATCH (t:NodeType) RETURN t")}
+
+            print(f"{'size':>6} {'nodes':>6} {'edges':>7} {'set-based ms':>13} {'legacy ms':>10} {'speedup':>8}")
+            for size in sizes:
+                name = _create_layout(session, size, args.edges_per_node)
+                new_ms, graph = _timed(lambda: load_custom_graph(session, name, BENCH_PROJECT, node_types), args.repeat)
+                legacy_ms = None
+                if not args.skip_legacy:
+                    legacy_ms, _ = _timed(lambda: _legacy_load(session, name, BENCH_PROJECT), args.repeat)
+                speedup = f"{legacy_ms / new_ms:7.1f}x" if legacy_ms and new_ms else "-"
+                legacy_col = f"{legacy_ms:10.1f}" if legacy_ms is not None else f"{'-':>10}"
+                print(f"{size:>6} {len(graph['nodes']):>6} {len(graph['edges']):>7} {new_ms:13.1f} {legacy_col} {speedup:>8}")
+    finally:
+        if not args.keep:
+            with driver.session() as session:
+                session.run(
+                    """
+                    MATCH (n)
+                    WHERE n.projectName = $project
+                    CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 1000 ROWS
+                    """,
+                    project=BENCH_PROJECT,
+                ).consume()
+                session.run("MATCH (t:NodeType {name: $name, bench: true}) DELETE t", name=BENCH_LABEL).consume()
+        driver.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Adds the IVNode label to every node with an id_rc (layout nodes excluded) and
+creates the unique constraint on IVNode.id_rc that backs id_rc lookups.
+
+Duplicate id_rc values would make the constraint fail, so they are reported
+first and the script stops unless --skip-constraint is given.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from neo4j import GraphDatabase
+
+APP_ROOT = Path(__file__).resolve().parents[2] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from graph.schema import IV_NODE_LABEL, LAYOUT_LABELS, ensure_iv_node_constraint
+
+
+DUPLICATES_CYPHER = """
+MATCH (n)
+WHERE n.id_rc IS NOT NULL
+  AND none(l IN labels(n) WHERE l IN $layout_labels)
+WITH n.id_rc AS id_rc, count(*) AS c, collect(labels(n))[..5] AS sample_labels
+WHERE c > 1
+RETURN id_rc, c, sample_labels
+ORDER BY c DESC
+LIMIT $limit
+"""
+
+LABEL_BATCH_CYPHER = f"""
+MATCH (n)
+WHERE n.id_rc IS NOT NULL
+  AND NOT n:{IV_NODE_LABEL}
+  AND none(l IN labels(n) WHERE l IN $layout_labels)
+WITH n LIMIT $batch_size
+SET n:{IV_NODE_LABEL}
+RETURN count(n) AS labelled
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Label id_rc nodes as IVNode and create the id_rc constraint")
+    p.add_argument("--batch-size", type=int, default=10000, help="Nodes labelled per transaction")
+    p.add_argument("--skip-constraint", action="store_true", help="Only add labels, do not create the constraint")
+    p.add_argument("--dry-run", action="store_true", help="Report duplicates and pending nodes only")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USER")
+    password = os.getenv("NEO4J_PASSWORD")
+    if not uri or not user or not password:
+        print("Missing NEO4J_URI/NEO4J_USER/NEO4J_PASSWORD in environment", file=sys.stderr)
+        return 2
+
+    layout_labels = list(LAYOUT_LABELS)
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    try:
+        with driver.session() as session:
+            duplicates = list(session.run(DUPLICATES_CYPHER, layout_labels=layout_labels, limit=50))
+            for row in duplicates:
+                print(f"duplicate id_rc={row['id_rc']} count={row['c']} labels={row['sample_labels']}")
+
+            pending = session.run(
+                f"MATCH (n) WHERE n.id_rc IS NOT NULL AND NOT n:{IV_NODE_LABEL} "
+                "AND none(l IN labels(n) WHERE l IN $layout_labels) RETURN count(n) AS c",
+                layout_labels=layout_labels,
+            ).single()["c"]
+            print(f"nodes to label: {pending}")
+            if args.dry_run:
+                return 1 if duplicates else 0
+
+            total = 0
+            while True:
+                labelled = session.execute_write(
+                    lambda tx: tx.run(
+                        LABEL_BATCH_CYPHER, layout_labels=layout_labels, batch_size=args.batch_size
+                    ).single()["labelled"]
+                )
+                if not labelled:
+                    break
+                total += labelled
+                print(f"labelled {total}/{pending}")
+
+            if args.skip_constraint:
+                return 0
+            if duplicates:
+                print("Duplicate id_rc values found; resolve them before creating the constraint", file=sys.stderr)
+                return 1
+            ensure_iv_node_constraint(session)
+            print("constraint ensured")
+    finally:
+        driver.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Compares db hits of an unlabelled id_rc lookup, MATCH (n {id_rc: $id}), with
+the IVNode form the app now uses. Samples a few existing id_rc values and runs
+PROFILE for both query shapes.
+"""
+import argparse
+import os
+import sys
+
+from neo4j import GraphDatabase
+
+
+LOOKUPS = {
+    "unlabelled": "MATCH (n {id_rc: $id}) RETURN n.id_rc",
+    "IVNode": "MATCH (n:IVNode {id_rc: $id}) RETURN n.id_rc",
+}
+
+
+def _db_hits(plan) -> int:
+    if plan is None:
+        return 0
+    return int(plan.get("dbHits", 0)) + sum(_db_hits(child) for child in plan.get("children", []))
+
+
+def _operators(plan) -> list[str]:
+    if plan is None:
+        return []
+    ops = [plan.get("operatorType", "?")]
+    for child in plan.get("children", []):
+        ops.extend(_operators(child))
+    return ops
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="PROFILE id_rc lookups with and without the IVNode label")
+    p.add_argument("--samples", type=int, default=5, help="Number of id_rc values to profile")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USER")
+    password = os.getenv("NEO4J_PASSWORD")
+    if not uri or not user or not password:
+        print("Missing NEO4J_URI/NEO4J_USER/NEO4J_PASSWORD in environment", file=sys.stderr)
+        return 2
+
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    try:
+        with driver.session() as session:
+            ids = [
+                r["id"] for r in session.run(
+                    "MATCH (n:IVNode) RETURN n.id_rc AS id LIMIT $n", n=args.samples
+                )
+            ]
+            if not ids:
+                print("No IVNode nodes found; run 01_add_ivnode_label.py first", file=sys.stderr)
+                return 1
+
+            print(f"{'lookup':>11} {'db hits (avg)':>14}  plan")
+            for name, cypher in LOOKUPS.items():
+                hits = []
+                ops: list[str] = []
+                for node_id in ids:
+                    summary = session.run("PROFILE " + cypher, id=node_id).consume()
+                    hits.append(_db_hits(summary.profile))
+                    ops = _operators(summary.profile)
+                print(f"{name:>11} {sum(hits) / len(hits):14.0f}  {' <- '.join(ops)}")
+    finally:
+        driver.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,26 @@
 #!/usr/bin/env python3
+"""
+Backfill missing embeddings on Chunk nodes.
+
+Chunks are read in elementId order (keyset pages, so every chunk is read
+once and failures are not selected again), embedded by a bounded pool of
+workers using batched embedding calls, and written back with one UNWIND per
+page. The last contiguous page written is recorded in a checkpoint file, so
+an interrupted run resumes where it stopped; chunks that cannot be embedded
+go to a dead-letter file (JSON lines) and can be retried later with
+--retry-dead-letter. Provider outages (open circuit, busy, transport errors,
+5xx) are not dead-lettered: the page is retried with backoff and, if the
+provider stays down, the run stops without moving the checkpoint past it.
+"""
 import argparse
+import json
 import os
 import sys
+import time
 import importlib
-from typing import Iterable
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 from neo4j import GraphDatabase
 
@@ -12,22 +29,30 @@ if APP_ROOT not in sys.path:
     sys.path.insert(0, APP_ROOT)
 
 ProviderRegistry = importlib.import_module("ai.registry").ProviderRegistry
-EmbedRequest = importlib.import_module("ai.types").EmbedRequest
-
-
-def _pick_text(row: dict, properties: Iterable[str]) -> str:
-    for name in properties:
-        value = row.get(name)
-        if isinstance(value, str) and value.strip():
-            return value.strip()
-    return ""
+ai_config = importlib.import_module("ai.config")
+embed_cache = importlib.import_module("ai.embed_cache")
+reembed = importlib.import_module("ai.reembed")
+partitions = importlib.import_module("graph.partitions")
 
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Backfill embeddings on Chunk nodes")
     p.add_argument("--provider", default="ollama", choices=["ollama", "openai"], help="Embedding provider")
     p.add_argument("--model", default="mxbai-embed-large:latest", help="Embedding model name")
-    p.add_argument("--batch-size", type=int, default=100, help="Rows per fetch")
+    p.add_argument("--batch-size", type=int, default=100, help="Rows per fetch (one worker task and one write)")
+    p.add_argument(
+        "--embed-batch-size",
+        type=int,
+        default=0,
+        help="Texts per embedding request (0 uses the provider's EMBED_BATCH_SIZE)",
+    )
+    p.add_argument("--workers", type=int, default=4, help="Pages embedded concurrently")
+    p.add_argument(
+        "--retries",
+        type=int,
+        default=5,
+        help="Retries of a page while the provider is unavailable (backoff 5 s doubling up to 60 s)",
+    )
     p.add_argument("--chunk-label", default="Chunk", help="Chunk label to process")
     p.add_argument("--embedding-property", default="embedding", help="Property name for vector")
     p.add_argument(
@@ -42,10 +67,142 @@ def parse_args() -> argparse.Namespace:
         default=1000,
         help="Truncate chunk text to this many chars before embedding (0 disables truncation)",
     )
-    p.add_argument("--dry-run", action="store_true", help="Do not write embeddings")
+    p.add_argument(
+        "--checkpoint",
+        default=str(ai_config.resolve_data_path("cache/backfill_checkpoint.json")),
+        help="Resume position file (empty disables checkpointing)",
+    )
+    p.add_argument(
+        "--dead-letter",
+        default=str(ai_config.resolve_data_path("cache/backfill_dead_letter.jsonl")),
+        help="JSON lines file collecting chunks that could not be embedded",
+    )
+    p.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first chunk")
+    p.add_argument("--retry-dead-letter", action="store_true", help="Only re-embed the chunks in the dead-letter file")
+    p.add_argument("--progress-every", type=float, default=10.0, help="Seconds between progress lines")
+    p.add_argument("--dry-run", action="store_true", help="Embed the first page only and write nothing")
     return p.parse_args()
 
 
+class Checkpoint:
+    """
+    Last elementId whose page, and every page before it, has been written,
+    plus the running totals. Only valid for the same label, property,
+    project, provider and model.
+    """
+
+    def __init__(self, path: str, key: dict[str, str]):
+        self.path = path
+        self.key = key
+        self.after = ""
+        self.totals = {"processed": 0, "skipped": 0, "failed": 0}
+
+    def load(self) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("key") != self.key:
+            print(f"checkpoint {self.path} belongs to another run ({data.get('key')}); ignoring it", file=sys.stderr)
+            return False
+        self.after = data.get("after") or ""
+        self.totals.update(data.get("totals") or {})
+        return True
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "after": self.after, "totals": self.totals, "saved_at": time.time()}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        """Forget the position once a run completes; new chunks may sort before it."""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class DeadLetter:
+    def __init__(self, path: str):
+        self.path = path
+
+    def add(self, entries: list[dict[str, Any]]) -> None:
+        if not entries or not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def take(self) -> list[str]:
+        """
+        elementIds in the file, which is then removed; chunks failing again
+        are added back. Their embedding is still NULL either way, so a
+        --restart run would pick them up too.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            eids = list(dict.fromkeys(json.loads(line)["eid"] for line in f if line.strip()))
+        os.remove(self.path)
+        return eids
+
+
+def run_in_order(pages, work, finish, workers: int) -> None:
+    """
+    `work(page)` on a pool of `workers` threads with at most 2 x workers
+    pages in flight; `finish(result)` is called in page order, so everything
+    before a finished page is finished too. The first failing page raises
+    here and no later page is finished.
+    """
+    workers = max(1, workers)
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill-embed") as pool:
+        try:
+            for page in pages:
+                in_flight.append(pool.submit(work, page))
+                while len(in_flight) >= 2 * workers or (in_flight and in_flight[0].done()):
+                    finish(in_flight.popleft().result())
+            while in_flight:
+                finish(in_flight.popleft().result())
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+class Progress:
+    def __init__(self, total: int | None, every: float, totals: dict[str, int]):
+        self.total = total
+        self.every = every
+        self.totals = totals
+        self.started = self.last = time.monotonic()
+        self.start_count = self.last_count = self._done()
+
+    def _done(self) -> int:
+        return self.totals["processed"] + self.totals["skipped"] + self.totals["failed"]
+
+    def report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last < self.every:
+            return
+        done = self._done()
+        rate = (done - self.start_count) / max(now - self.started, 1e-9)
+        recent = (done - self.last_count) / max(now - self.last, 1e-9)
+        line = (
+            f"processed={self.totals['processed']} skipped={self.totals['skipped']} failed={self.totals['failed']}"
+            f" rate={rate:.1f}/s recent={recent:.1f}/s elapsed={now - self.started:.0f}s"
+        )
+        if self.total:
+            left = max(self.total - (done - self.start_count), 0)
+            line += f" remaining={left}"
+            if rate > 0:
+                line += f" eta={left / rate / 60:.1f}min"
+        print(line, flush=True)
+        self.last, self.last_count = now, done
+
+
 def main() -> int:
     args = parse_args()
 
@@ -56,7 +213,9 @@ def main() -> int:
         print("Missing NEO4J_URI/NEO4J_USER/NEO4J_PASSWORD in environment", file=sys.stderr)
         return 2
 
-    registry = ProviderRegistry()
+    # The app's scheduler cannot see this process, so nothing here yields to
+    # chat; BATCH_MAX_CONCURRENCY caps what this script sends to Ollama.
+    registry = ProviderRegistry(batch_job=True)
     provider = registry.get_provider(args.provider)
 
     text_props = [x.strip() for x in args.text_properties.split(",") if x.strip()]
@@ -66,62 +225,175 @@ def main() -> int:
 
     driver = GraphDatabase.driver(uri, auth=(user, password))
 
-    fetch_cypher = f"""
+    returned = "elementId(c) AS eid, c.id_rc AS id_rc, c.projectName AS projectName, " + ", ".join(
+        f"c.{p} AS {p}" for p in text_props
+    )
+    match_missing = f"""
     MATCH (c:{args.chunk_label})
     WHERE c.{args.embedding_property} IS NULL
       AND ($project = '' OR c.projectName = $project)
-    RETURN elementId(c) AS eid, c.id_rc AS id_rc, c.text AS text, c.content AS content, c.body AS body, c.chunkText AS chunkText, c.value AS value
+    """
+    after_checkpoint = "  AND elementId(c) > $after\n"
+    count_cypher = match_missing + after_checkpoint + "RETURN count(c) AS missing"
+    page_cypher = match_missing + after_checkpoint + f"""
+    RETURN {returned}
+    ORDER BY eid
     LIMIT $limit
     """
-
-    write_cypher = f"""
-    MATCH (c)
-    WHERE elementId(c) = $eid
-    SET c.{args.embedding_property} = $embedding
+    retry_cypher = f"""
+    UNWIND $eids AS eid
+    MATCH (c:{args.chunk_label})
+    WHERE elementId(c) = eid AND c.{args.embedding_property} IS NULL
+    RETURN {returned}
     """
 
-    processed = 0
-    skipped = 0
-    failed = 0
+    # Stores the text hash, model, dims, truncation and time next to the vector (ai/reembed.py).
+    write_cypher = reembed.write_embeddings_cypher(args.embedding_property)
 
-    with driver.session() as session:
+    checkpoint = Checkpoint(
+        "" if args.dry_run or args.retry_dead_letter else args.checkpoint,
+        {
+            "label": args.chunk_label,
+            "property": args.embedding_property,
+            "project": args.project,
+            "provider": args.provider,
+            "model": args.model,
+        },
+    )
+    if not args.restart and checkpoint.load():
+        print(f"resuming after {checkpoint.after!r} with {checkpoint.totals}")
+    totals = checkpoint.totals
+    dead_letter = DeadLetter(args.dead_letter)
+    projects = set()
+
+    def pages(session):
+        """Lists of rows to embed, in elementId order."""
+        if args.retry_dead_letter:
+            eids = dead_letter.take()
+            print(f"retrying {len(eids)} dead-letter chunks")
+            for start in range(0, len(eids), args.batch_size):
+                rows = session.run(retry_cypher, eids=eids[start:start + args.batch_size]).data()
+                if rows:
+                    yield rows
+            return
+        after = checkpoint.after
         while True:
-            rows = session.run(fetch_cypher, project=args.project, limit=args.batch_size).data()
+            rows = session.run(page_cypher, project=args.project, after=after, limit=args.batch_size).data()
             if not rows:
+                return
+            after = rows[-1]["eid"]
+            yield rows
+            if args.dry_run:
+                return
+
+    def embed_page(rows):
+        """(last eid, writes, dead-letter entries, skipped) for one page."""
+        todo = []
+        skipped = 0
+        for row in rows:
+            text = reembed.pick_text(row, text_props)
+            if not text:
+                skipped += 1
+                continue
+            text_hash = reembed.content_hash(text)
+            if args.max_chars > 0 and len(text) > args.max_chars:
+                text = text[: args.max_chars]
+            todo.append((row, text, text_hash))
+
+        for attempt in range(args.retries + 1):
+            try:
+                result = embed_cache.embed_texts(
+                    provider,
+                    [text for _, text, _ in todo],
+                    args.model,
+                    max_batch_size=args.embed_batch_size or None,
+                )
                 break
+            except Exception as e:
+                if attempt == args.retries:
+                    raise
+                print(f"page after {rows[0]['eid']!r} failed ({e}); retry {attempt + 1}/{args.retries}", file=sys.stderr)
+                time.sleep(min(5 * 2 ** attempt, 60))
 
-            for row in rows:
-                text = _pick_text(row, text_props)
-                if not text:
-                    skipped += 1
-                    continue
+        writes = []
+        dead = []
+        for (row, text, text_hash), item in zip(todo, result.items):
+            if item.error is not None:
+                dead.append({
+                    "eid": row["eid"],
+                    "id_rc": row.get("id_rc"),
+                    "projectName": row.get("projectName"),
+                    "chars": len(text),
+                    "error": str(item.error),
+                    "at": time.time(),
+                })
+                continue
+            writes.append({
+                "eid": row["eid"],
+                "embedding": item.embedding,
+                "hash": text_hash,
+                "projectName": row.get("projectName"),
+            })
+        return rows[-1]["eid"], writes, dead, skipped
 
-                if args.max_chars > 0 and len(text) > args.max_chars:
-                    text = text[: args.max_chars]
+    status = 0
+    with driver.session() as read_session, driver.session() as session:
+        total = None if args.retry_dead_letter else read_session.run(
+            count_cypher, project=args.project, after=checkpoint.after
+        ).single()["missing"]
+        print(f"chunks without {args.embedding_property}: {total if total is not None else 'n/a'}; workers={args.workers}")
+        progress = Progress(total, args.progress_every, totals)
 
-                try:
-                    emb = provider.embed(EmbedRequest(text=text, model=args.model)).embedding
-                except Exception as e:
-                    failed += 1
-                    print(
-                        f"embed-fail eid={row.get('eid')} chars={len(text)} err={type(e).__name__}: {e}",
-                        file=sys.stderr,
-                    )
-                    continue
+        def finish(result) -> None:
+            last_eid, writes, dead, skipped = result
+            if writes and not args.dry_run:
+                session.run(
+                    write_cypher,
+                    rows=[{"eid": w["eid"], "embedding": w["embedding"], "hash": w["hash"]} for w in writes],
+                    model=args.model,
+                    max_chars=max(0, args.max_chars),
+                ).consume()
+            projects.update(w["projectName"] for w in writes if w["projectName"])
+            dead_letter.add(dead)
+            for entry in dead:
+                print(f"embed-fail eid={entry['eid']} chars={entry['chars']} err={entry['error']}", file=sys.stderr)
+            totals["processed"] += len(writes)
+            totals["skipped"] += skipped
+            totals["failed"] += len(dead)
+            checkpoint.after = last_eid
+            checkpoint.save()
+            progress.report()
 
-                if not args.dry_run:
-                    session.run(write_cypher, eid=row["eid"], embedding=emb).consume()
-                processed += 1
+        # Pages finish in submission order, so the checkpoint only moves past
+        # pages that are written.
+        try:
+            run_in_order(pages(read_session), embed_page, finish, args.workers)
+        except KeyboardInterrupt:
+            print("interrupted; the checkpoint holds the last written page", file=sys.stderr)
+            status = 130
+        except Exception as e:
+            print(f"stopping: {e}; re-run to resume from the checkpoint", file=sys.stderr)
+            status = 1
 
-            print(f"processed={processed} skipped={skipped} failed={failed}")
+        progress.report(force=True)
+        if status == 0:
+            checkpoint.clear()
+        if args.dry_run:
+            print("dry-run mode: embedded the first page only; nothing was written")
 
-            if args.dry_run:
-                print("dry-run mode: stopping after first batch to avoid re-reading unchanged NULL rows")
-                break
+        # New vectors belong in their project's partition index as well.
+        if not args.dry_run and args.embedding_property == partitions.EMBEDDING_PROPERTY:
+            for project in sorted(projects):
+                print(f"partition: {partitions.ensure_partition(session, project)}")
 
     driver.close()
-    print(f"Done. processed={processed} skipped={skipped} failed={failed} dry_run={args.dry_run}")
-    return 0
+    print(
+        f"Done. processed={totals['processed']} skipped={totals['skipped']} failed={totals['failed']} "
+        f"dry_run={args.dry_run}"
+    )
+    if totals["failed"] and args.dead_letter:
+        print(f"failed chunks are listed in {args.dead_letter}; re-run with --retry-dead-letter to retry them")
+    return status
 
 
 if __name__ == "__main__":
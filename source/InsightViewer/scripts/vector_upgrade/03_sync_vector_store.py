@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import importlib
+
+from neo4j import GraphDatabase
+
+APP_ROOT = "/home/robert/insightViewer/source/InsightViewer/app"
+if APP_ROOT not in sys.path:
+    sys.path.insert(0, APP_ROOT)
+
+vector_store = importlib.import_module("ai.vector_store")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Sync the local vector store ([VECTOR_STORE]) from Chunk embeddings")
+    p.add_argument("--project", action="append", required=True, help="projectName to sync (repeatable)")
+    p.add_argument("--page-size", type=int, default=2000, help="Chunks fetched per query")
+    p.add_argument("--rebuild-ivf", action="store_true", help="Retrain the IVF cells even if nothing changed")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USER")
+    password = os.getenv("NEO4J_PASSWORD")
+    if not uri or not user or not password:
+        print("Missing NEO4J_URI/NEO4J_USER/NEO4J_PASSWORD in environment", file=sys.stderr)
+        return 2
+    if not vector_store.available():
+        print("numpy is not installed", file=sys.stderr)
+        return 2
+
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    status = 0
+    with driver.session() as session:
+        for project in args.project:
+            store = vector_store.get_vector_store(project, create=True)
+            if store is None:
+                print("Local vector store is disabled: set ENABLED = true in [VECTOR_STORE]", file=sys.stderr)
+                status = 2
+                break
+            summary = store.sync_from_neo4j(session, project, page_size=args.page_size)
+            if args.rebuild_ivf and len(store) >= store.ivf_min_rows:
+                store.build_ivf()
+                store.flush()
+            print(f"{project}: {summary}")
+            print(f"{project}: {store.stats()}")
+
+    driver.close()
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
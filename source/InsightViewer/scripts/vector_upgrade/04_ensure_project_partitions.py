@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import importlib
+
+from neo4j import GraphDatabase
+
+APP_ROOT = "/home/robert/insightViewer/source/InsightViewer/app"
+if APP_ROOT not in sys.path:
+    sys.path.insert(0, APP_ROOT)
+
+partitions = importlib.import_module("graph.partitions")
+
+PROJECTS_CYPHER = """
+MATCH (c:Chunk)
+WHERE c.projectName IS NOT NULL
+RETURN DISTINCT c.projectName AS project
+ORDER BY project
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Label Chunk nodes per project and create the partition indexes")
+    p.add_argument("--project", action="append", default=None, help="projectName to partition (repeatable; default: all)")
+    p.add_argument("--dimensions", type=int, default=None, help="Vector size (default: taken from an embedded chunk)")
+    p.add_argument("--similarity", default="cosine", choices=["cosine", "euclidean"], help="Vector similarity function")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USER")
+    password = os.getenv("NEO4J_PASSWORD")
+    if not uri or not user or not password:
+        print("Missing NEO4J_URI/NEO4J_USER/NEO4J_PASSWORD in environment", file=sys.stderr)
+        return 2
+
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    with driver.session() as session:
+        projects = args.project or [r["project"] for r in session.run(PROJECTS_CYPHER).data()]
+        for project in projects:
+            summary = partitions.ensure_partition(
+                session, project, dimensions=args.dimensions, similarity=args.similarity
+            )
+            print(f"{project}: {summary}")
+            if summary["vector_index"] is None:
+                print(f"{project}: no embedded chunks yet; vector index skipped", file=sys.stderr)
+
+    driver.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
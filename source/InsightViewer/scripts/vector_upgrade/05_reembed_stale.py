@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import importlib
+
+from neo4j import GraphDatabase
+
+APP_ROOT = "/home/robert/insightViewer/source/InsightViewer/app"
+if APP_ROOT not in sys.path:
+    sys.path.insert(0, APP_ROOT)
+
+ProviderRegistry = importlib.import_module("ai.registry").ProviderRegistry
+reembed = importlib.import_module("ai.reembed")
+partitions = importlib.import_module("graph.partitions")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        description="Re-embed Chunk nodes whose embedding is missing, from another model, or of older text"
+    )
+    p.add_argument("--provider", default="ollama", choices=["ollama", "openai"], help="Embedding provider")
+    p.add_argument("--model", default="", help="Embedding model name (default: [OLLAMA] EMB_MODEL)")
+    p.add_argument("--project", action="append", default=None, help="projectName to process (repeatable; default: all)")
+    p.add_argument("--page-size", type=int, default=500, help="Chunks read per query")
+    p.add_argument(
+        "--max-chars",
+        type=int,
+        default=None,
+        help="Truncate text before embedding (0 disables; default: the cut each chunk was embedded with)",
+    )
+    p.add_argument("--max-chunks", type=int, default=0, help="Stop after this many re-embedded chunks (0: no limit)")
+    p.add_argument(
+        "--adopt-unversioned",
+        action="store_true",
+        help="Stamp vectors without provenance with the current model instead of re-embedding them",
+    )
+    p.add_argument(
+        "--recreate-indexes",
+        action="store_true",
+        help="Drop and recreate Chunk vector indexes built for another embedding size (after a model switch)",
+    )
+    p.add_argument("--dry-run", action="store_true", help="Only count stale chunks")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USER")
+    password = os.getenv("NEO4J_PASSWORD")
+    if not uri or not user or not password:
+        print("Missing NEO4J_URI/NEO4J_USER/NEO4J_PASSWORD in environment", file=sys.stderr)
+        return 2
+
+    provider = ProviderRegistry(batch_job=True).get_provider(args.provider)
+    model = args.model or reembed.default_embedding_model()
+
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    status = 0
+    with driver.session() as session:
+        for project in args.project or [None]:
+            try:
+                summary = reembed.reembed_stale(
+                    session,
+                    provider,
+                    model,
+                    project=project,
+                    page_size=args.page_size,
+                    max_chars=args.max_chars,
+                    max_chunks=args.max_chunks or None,
+                    adopt_unversioned=args.adopt_unversioned,
+                    dry_run=args.dry_run,
+                    check_dimensions=lambda dims: partitions.ensure_vector_dimensions(
+                        session, project, dims, recreate=args.recreate_indexes
+                    ),
+                )
+            except partitions.VectorDimensionError as e:
+                print(f"{project or 'ALL'}: {e}", file=sys.stderr)
+                status = 1
+                break
+            print(f"{project or 'ALL'}: {summary}")
+            if project and summary["reembedded"]:
+                print(f"{project}: partition {partitions.ensure_partition(session, project)}")
+
+    driver.close()
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,314 @@
+import configparser
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from ai.errors import ProviderRequestError
+from ai.providers import OllamaProvider, OpenAIProvider
+from ai.providers.base import split_batches
+from ai.registry import ProviderRegistry
+from ai.response_cache import CachingProvider, ResponseCache
+from ai.streaming import sse_answer, wants_event_stream
+from ai.types import ChatRequest, ChatResponse, EmbedBatchRequest, EmbedRequest
+
+
+class _Response:
+    def __init__(self, status, body):
+        self.status_code = status
+        self.ok = status < 400
+        self.body = body
+        self.text = str(body)
+
+    def json(self):
+        return self.body
+
+
+class _FakeHttp:
+    """Accepts one endpoint/payload-key combination, rejects the rest."""
+
+    def __init__(self, endpoint, key):
+        self.endpoint = endpoint
+        self.key = key
+        self.calls = []
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        path = url.split("11434", 1)[1]
+        self.calls.append((path, next(k for k in json if k != "model")))
+        if path == self.endpoint and self.key in json:
+            return _Response(200, {"embedding": [0.1, 0.2, 0.3]})
+        return _Response(404, "not found")
+
+
+class OllamaEmbedRouteTests(unittest.TestCase):
+    def test_route_is_probed_once_and_reused(self):
+        http = _FakeHttp("/api/embed", "input")
+        provider = OllamaProvider("http://ollama:11434", session=http)
+
+        first = provider.embed(EmbedRequest(text="a", model="m"))
+        probed = len(http.calls)
+        self.assertEqual(first.embedding, [0.1, 0.2, 0.3])
+        self.assertEqual(provider.embed_route, ("/api/embed", "input"))
+        self.assertGreater(probed, 1)
+
+        provider.embed(EmbedRequest(text="b", model="m"))
+        provider.embed(EmbedRequest(text="c", model="m"))
+        self.assertEqual(http.calls[probed:], [("/api/embed", "input")] * 2)
+
+    def test_reprobes_when_known_route_fails(self):
+        http = _FakeHttp("/api/embeddings", "prompt")
+        provider = OllamaProvider("http://ollama:11434", session=http)
+        provider.embed(EmbedRequest(text="a", model="m"))
+        self.assertEqual(http.calls, [("/api/embeddings", "prompt")])
+
+        http.endpoint, http.key = "/api/embed", "input"
+        provider.embed(EmbedRequest(text="b", model="m"))
+        self.assertEqual(provider.embed_route, ("/api/embed", "input"))
+        # The stale route is tried first and not probed a second time.
+        self.assertEqual(http.calls[1:].count(("/api/embeddings", "prompt")), 1)
+
+        http.endpoint = "/nowhere"
+        with self.assertRaises(ProviderRequestError):
+            provider.embed(EmbedRequest(text="c", model="m"))
+        self.assertIsNone(provider.embed_route)
+
+
+class _FakeOpenAIHttp:
+    """Embeds every input as [len(text)], rejecting any request containing 'bad'."""
+
+    def __init__(self):
+        self.batches = []
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        inputs = json["input"] if isinstance(json["input"], list) else [json["input"]]
+        self.batches.append(inputs)
+        if "bad" in inputs:
+            return _Response(400, "invalid input")
+        data = [{"index": i, "embedding": [float(len(t))]} for i, t in enumerate(inputs)]
+        return _Response(200, {"data": list(reversed(data))})
+
+
+class EmbedBatchTests(unittest.TestCase):
+    def test_split_batches_respects_items_and_tokens(self):
+        self.assertEqual(split_batches(["a"] * 5, 2, 1000), [[0, 1], [2, 3], [4]])
+        self.assertEqual(split_batches(["x" * 40, "y" * 40, "z" * 400], 10, 25), [[0, 1], [2]])
+
+    def test_batches_and_isolates_failing_items(self):
+        http = _FakeOpenAIHttp()
+        provider = OpenAIProvider(api_key="k", session=http, embed_batch_size=4)
+        texts = ["a", "bb", "bad", "dddd", "eeeee"]
+
+        result = provider.embed_batch(EmbedBatchRequest(texts=texts, model="m"))
+
+        self.assertEqual(http.batches[:2], [["a", "bb", "bad", "dddd"], ["a", "bb"]])
+        self.assertEqual([item.index for item in result.items], [0, 1, 2, 3, 4])
+        self.assertEqual(result.items[1].embedding, [2.0])
+        self.assertEqual(result.items[4].embedding, [5.0])
+        self.assertEqual([item.index for item in result.failed], [2])
+        self.assertIn("400", result.failed[0].error)
+
+    def test_outages_raise_instead_of_failing_items(self):
+        from ai.breaker import CircuitBreaker
+        from ai.errors import ProviderUnavailableError
+
+        class _DownHttp(_FakeOpenAIHttp):
+            def post(self, url, json=None, headers=None, timeout=None):
+                self.batches.append(json["input"])
+                return _Response(503, "overloaded")
+
+        http = _DownHttp()
+        provider = OpenAIProvider(api_key="k", session=http, embed_batch_size=4)
+        with self.assertRaises(ProviderRequestError) as ctx:
+            provider.embed_batch(EmbedBatchRequest(texts=["a", "b", "c"], model="m"))
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(len(http.batches), 1)
+
+        provider.breaker = CircuitBreaker("OpenAI", failure_threshold=1, reset_timeout=30)
+        with self.assertRaises(ProviderRequestError):
+            provider.embed_batch(EmbedBatchRequest(texts=["a"], model="m"))
+        with self.assertRaises(ProviderUnavailableError):
+            provider.embed_batch(EmbedBatchRequest(texts=["a", "b"], model="m"))
+
+    def test_ollama_falls_back_when_list_endpoint_missing(self):
+        http = _FakeHttp("/api/embeddings", "prompt")
+        provider = OllamaProvider("http://ollama:11434", session=http)
+
+        result = provider.embed_batch(EmbedBatchRequest(texts=["a", "b", "c"], model="m"))
+
+        self.assertEqual(result.failed, [])
+        self.assertEqual(http.calls[0], ("/api/embed", "input"))
+        self.assertEqual(http.calls[1:], [("/api/embeddings", "prompt")] * 3)
+
+
+class _StreamResponse:
+    def __init__(self, lines, status=200):
+        self.lines = lines
+        self.status_code = status
+        self.ok = status < 400
+        self.text = ""
+        self.closed = False
+
+    def iter_lines(self, decode_unicode=False):
+        yield from self.lines
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class _StreamHttp:
+    def __init__(self, lines):
+        self.response = _StreamResponse(lines)
+        self.payloads = []
+
+    def post(self, url, json=None, headers=None, timeout=None, stream=False):
+        self.payloads.append(json)
+        return self.response
+
+
+class ChatStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.req = ChatRequest(system="s", user="u", model="gpt-4o-mini")
+
+    def test_openai_stream_yields_deltas(self):
+        http = _StreamHttp([
+            'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            "",
+            'data: {"choices": [{"delta": {"content": "Hel"}}]}',
+            'data: {"choices": [{"delta": {"content": "lo"}}]}',
+            "data: [DONE]",
+        ])
+        provider = OpenAIProvider(api_key="k", session=http)
+
+        self.assertEqual(list(provider.chat_stream(self.req)), ["Hel", "lo"])
+        self.assertTrue(http.payloads[0]["stream"])
+        self.assertTrue(http.response.closed)
+
+    def test_ollama_stream_stops_upstream_when_closed(self):
+        http = _StreamHttp(['{"response": "a", "done": false}', '{"response": "b", "done": false}', '{"done": true}'])
+        provider = OllamaProvider("http://ollama:11434", session=http)
+
+        frames = sse_answer({"chunks": []}, provider.chat_stream(self.req), {"model": "m"})
+        self.assertTrue(next(frames).startswith("event: sources"))
+        self.assertEqual(next(frames), 'event: token\ndata: {"text": "a"}\n\n')
+        frames.close()
+        self.assertTrue(http.response.closed)
+
+    def test_event_stream_is_opt_in(self):
+        from flask import Flask, request
+
+        app = Flask(__name__)
+        for accept, expected in (("text/event-stream", True), ("*/*", False), ("application/json", False)):
+            with app.test_request_context("/", headers={"Accept": accept}):
+                self.assertEqual(wants_event_stream(request), expected, accept)
+
+    def test_sse_answer_ends_with_done_or_error(self):
+        frames = list(sse_answer([], iter(["x", "yz"]), {"model": "m"}))
+        self.assertEqual([f.split("\n", 1)[0] for f in frames], ["event: sources", "event: token", "event: token", "event: done"])
+        self.assertIn('"chars": 3', frames[-1])
+
+        def failing():
+            yield "x"
+            raise ProviderRequestError("upstream 500")
+
+        frames = list(sse_answer([], failing()))
+        self.assertTrue(frames[-1].startswith("event: error"))
+        self.assertIn("upstream 500", frames[-1])
+
+
+class ProviderRegistryTests(unittest.TestCase):
+    def test_providers_are_reused(self):
+        cfg = configparser.ConfigParser()
+        cfg.read_dict({"OLLAMA": {"BASE": "http://ollama:11434", "MODEL": "qwen"}, "LLM_CACHE": {"PATH": ""}})
+        registry = ProviderRegistry(cfg)
+
+        provider = registry.get_provider("ollama")
+        self.assertIs(registry.get_provider("ollama"), provider)
+        self.assertEqual([p.models for p in registry.list_providers() if p.id == "ollama"], [["qwen"]])
+
+
+    def test_providers_are_wrapped_in_response_cache(self):
+        cfg = configparser.ConfigParser()
+        cfg.read_dict({"OLLAMA": {"BASE": "http://ollama:11434"}, "LLM_CACHE": {"PATH": "", "TTL_SECONDS": "60"}})
+        registry = ProviderRegistry(cfg)
+
+        self.assertIsInstance(registry.get_provider("ollama"), CachingProvider)
+        self.assertEqual(registry.response_cache.ttl_seconds, 60)
+
+        cfg.read_dict({"LLM_CACHE": {"ENABLED": "false"}})
+        self.assertIsInstance(ProviderRegistry(cfg).get_provider("ollama"), OllamaProvider)
+
+    def test_batch_jobs_take_the_batch_concurrency(self):
+        cfg = configparser.ConfigParser()
+        cfg.read_dict({"OLLAMA": {"BASE": "http://ollama:11434", "MAX_CONCURRENCY": "4"}, "LLM_CACHE": {"ENABLED": "false"}})
+
+        self.assertEqual(ProviderRegistry(cfg).get_provider("ollama").scheduler.max_concurrency, 4)
+        self.assertEqual(ProviderRegistry(cfg, batch_job=True).get_provider("ollama").scheduler.max_concurrency, 1)
+
+
+class _CountingChat:
+    id = "openai"
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, req):
+        self.calls += 1
+        return ChatResponse(text=f"answer {self.calls}", raw={"n": self.calls})
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_deterministic_requests_are_cached(self):
+        inner = _CountingChat()
+        provider = CachingProvider(inner, ResponseCache())
+        req = ChatRequest(system="s", user="q", model="m", temperature=0.0)
+
+        first = provider.chat(req)
+        second = provider.chat(req)
+
+        self.assertEqual((first.text, first.cached), ("answer 1", False))
+        self.assertEqual((second.text, second.raw, second.cached), ("answer 1", {"n": 1}, True))
+        self.assertEqual(provider.chat(ChatRequest(system="s", user="q", model="m", temperature=0.0, max_tokens=99)).text, "answer 2")
+        self.assertEqual(inner.calls, 2)
+
+    def test_no_cache_and_sampling_bypass_cache(self):
+        inner = _CountingChat()
+        provider = CachingProvider(inner, ResponseCache())
+        provider.chat(ChatRequest(system="s", user="q", model="m", temperature=0.0))
+
+        self.assertFalse(provider.chat(ChatRequest(system="s", user="q", model="m", temperature=0.0, no_cache=True)).cached)
+        provider.chat(ChatRequest(system="s", user="q", model="m", temperature=0.7))
+        provider.chat(ChatRequest(system="s", user="q", model="m", temperature=0.7))
+        self.assertEqual(inner.calls, 4)
+
+    def test_entries_expire_after_ttl(self):
+        cache = ResponseCache(ttl_seconds=60)
+        cache.put("k", ChatResponse(text="old"))
+        cache._memory["k"] = (0.0,) + cache._memory["k"][1:]
+        self.assertIsNone(cache.get("k"))
+
+    def test_sqlite_backend_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "llm.sqlite"
+            req = ChatRequest(system="s", user="q", model="m", temperature=0.0)
+            CachingProvider(_CountingChat(), ResponseCache(path)).chat(req)
+
+            inner = _CountingChat()
+            resp = CachingProvider(inner, ResponseCache(path)).chat(req)
+
+            self.assertEqual((resp.text, resp.cached, inner.calls), ("answer 1", True, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import importlib.util
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+APP_ROOT = ROOT / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+BACKFILL_PATH = ROOT / "scripts" / "vector_upgrade" / "02_backfill_chunk_embeddings.py"
+spec = importlib.util.spec_from_file_location("backfill_under_test", BACKFILL_PATH)
+backfill = importlib.util.module_from_spec(spec)
+assert spec is not None and spec.loader is not None
+spec.loader.exec_module(backfill)
+
+KEY = {"label": "Chunk", "property": "embedding", "project": "", "provider": "ollama", "model": "m"}
+
+
+class CheckpointTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = str(Path(self.tmp.name) / "cp" / "checkpoint.json")
+
+    def test_save_and_load_resume_position(self):
+        cp = backfill.Checkpoint(self.path, KEY)
+        cp.after = "4:00042"
+        cp.totals.update(processed=40, failed=2)
+        cp.save()
+
+        resumed = backfill.Checkpoint(self.path, dict(KEY))
+        self.assertTrue(resumed.load())
+        self.assertEqual(resumed.after, "4:00042")
+        self.assertEqual(resumed.totals, {"processed": 40, "skipped": 0, "failed": 2})
+
+        resumed.clear()
+        self.assertFalse(backfill.Checkpoint(self.path, KEY).load())
+
+    def test_checkpoint_of_another_run_is_ignored(self):
+        cp = backfill.Checkpoint(self.path, KEY)
+        cp.after = "4:00042"
+        cp.save()
+
+        other = backfill.Checkpoint(self.path, dict(KEY, model="other-model"))
+        self.assertFalse(other.load())
+        self.assertEqual(other.after, "")
+        self.assertEqual(other.totals["processed"], 0)
+
+
+class DeadLetterTests(unittest.TestCase):
+    def test_take_returns_unique_ids_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dead = backfill.DeadLetter(str(Path(tmp) / "dead.jsonl"))
+            dead.add([{"eid": "4:1", "error": "x"}, {"eid": "4:2", "error": "y"}])
+            dead.add([{"eid": "4:1", "error": "again"}])
+
+            self.assertEqual(dead.take(), ["4:1", "4:2"])
+            self.assertEqual(dead.take(), [])
+
+            dead.add([{"eid": "4:2", "error": "still failing"}])
+            self.assertEqual(dead.take(), ["4:2"])
+
+
+class RunInOrderTests(unittest.TestCase):
+    def test_pages_finish_in_order_when_later_pages_are_faster(self):
+        finished = []
+
+        def work(page):
+            time.sleep(0.05 if page == 0 else 0.0)
+            return page
+
+        backfill.run_in_order(range(8), work, finished.append, workers=4)
+        self.assertEqual(finished, list(range(8)))
+
+    def test_checkpoint_stops_before_a_failing_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cp = backfill.Checkpoint(str(Path(tmp) / "cp.json"), KEY)
+            later_done = threading.Event()
+
+            def work(page):
+                if page == 2:
+                    # Fails only after the pages behind it have completed.
+                    later_done.wait(1.0)
+                    raise RuntimeError("provider down")
+                if page == 3:
+                    later_done.set()
+                return f"4:{page:05d}"
+
+            def finish(last_eid):
+                cp.after = last_eid
+                cp.save()
+
+            with self.assertRaises(RuntimeError):
+                backfill.run_in_order(range(6), work, finish, workers=3)
+
+            resumed = backfill.Checkpoint(cp.path, KEY)
+            self.assertTrue(resumed.load())
+            self.assertEqual(resumed.after, "4:00001")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+
+import requests
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from ai.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from ai.deadline import deadline, remaining, request_timeout
+from ai.errors import DeadlineExceeded, ProviderRequestError, ProviderUnavailableError
+from ai.providers import OllamaProvider
+from ai.types import EmbedRequest
+
+
+class _DownHttp:
+    """Every request fails to connect."""
+
+    def __init__(self):
+        self.timeouts = []
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        self.timeouts.append(timeout)
+        raise requests.ConnectionError("connection refused")
+
+
+def _fail(status_code=None):
+    raise ProviderRequestError("upstream failed", status_code=status_code)
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def _call(self, breaker, fn):
+        with breaker.guard():
+            return fn()
+
+    def test_opens_after_consecutive_outages_and_fails_fast(self):
+        breaker = CircuitBreaker("ollama", failure_threshold=2, reset_timeout=60)
+        for _ in range(2):
+            with self.assertRaises(ProviderRequestError):
+                self._call(breaker, lambda: _fail(502))
+        self.assertEqual(breaker.state, OPEN)
+
+        calls = []
+        with self.assertRaises(ProviderUnavailableError) as ctx:
+            self._call(breaker, lambda: calls.append(1))
+        self.assertEqual(calls, [])
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(breaker.stats()["rejected"], 1)
+
+    def test_client_errors_do_not_open_the_breaker(self):
+        breaker = CircuitBreaker("openai", failure_threshold=1)
+        with self.assertRaises(ProviderRequestError):
+            self._call(breaker, lambda: _fail(400))
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_half_open_allows_one_probe(self):
+        breaker = CircuitBreaker("ollama", failure_threshold=1, reset_timeout=0.01)
+        with self.assertRaises(ProviderRequestError):
+            self._call(breaker, _fail)
+        time.sleep(0.02)
+
+        with breaker.guard():
+            self.assertEqual(breaker.state, HALF_OPEN)
+            with self.assertRaises(ProviderUnavailableError):
+                breaker.before_call()
+        self.assertEqual(breaker.state, CLOSED)
+
+        with self.assertRaises(ProviderRequestError):
+            self._call(breaker, _fail)
+        time.sleep(0.02)
+        with self.assertRaises(ProviderRequestError):
+            self._call(breaker, _fail)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.stats()["opened"], 3)
+
+
+class DeadlineTests(unittest.TestCase):
+    def test_nested_deadlines_only_shorten(self):
+        self.assertIsNone(remaining())
+        self.assertEqual(request_timeout(60), 60)
+        with deadline(5):
+            with deadline(30):
+                self.assertLessEqual(remaining(), 5)
+            self.assertLessEqual(request_timeout(60), 5)
+        with deadline(0):
+            with self.assertRaises(DeadlineExceeded):
+                request_timeout(60)
+
+
+class OllamaOutageTests(unittest.TestCase):
+    def test_down_server_is_not_probed_and_then_skipped(self):
+        http = _DownHttp()
+        provider = OllamaProvider(
+            "http://ollama:11434",
+            session=http,
+            breaker=CircuitBreaker("Ollama", failure_threshold=2, reset_timeout=60),
+        )
+
+        with deadline(2):
+            for text in ("a", "b"):
+                with self.assertRaises(ProviderRequestError):
+                    provider.embed(EmbedRequest(text=text, model="m"))
+        # One connection attempt per call instead of one per endpoint variant,
+        # each bounded by the deadline rather than the 60 s provider timeout.
+        self.assertEqual(len(http.timeouts), 2)
+        self.assertTrue(all(t <= 2 for t in http.timeouts))
+
+        with self.assertRaises(ProviderUnavailableError):
+            provider.embed(EmbedRequest(text="c", model="m"))
+        self.assertEqual(len(http.timeouts), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
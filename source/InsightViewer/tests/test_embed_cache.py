@@ -0,0 +1,77 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from ai.embed_cache import EmbeddingCache, cache_key, embed_texts
+from ai.providers.base import AIProvider
+from ai.types import EmbedResponse
+
+
+class _CountingProvider(AIProvider):
+    id = "ollama"
+
+    def __init__(self):
+        self.embedded = []
+
+    def chat(self, req):
+        raise NotImplementedError
+
+    def embed(self, req):
+        self.embedded.append(req.text)
+        if req.text == "bad":
+            from ai.errors import ProviderRequestError
+            raise ProviderRequestError("rejected", status_code=400)
+        return EmbedResponse(embedding=[float(len(req.text)), 0.5])
+
+
+class EmbeddingCacheTests(unittest.TestCase):
+    def test_key_normalizes_text_and_separates_models(self):
+        self.assertEqual(cache_key("ollama", "m", " a  b\n"), cache_key("ollama", "m", "a b"))
+        self.assertNotEqual(cache_key("ollama", "m", "a"), cache_key("ollama", "m2", "a"))
+        self.assertNotEqual(cache_key("ollama", "m", "a"), cache_key("openai", "m", "a"))
+
+    def test_disk_tier_is_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "emb.sqlite"
+            first = EmbeddingCache(path, memory_items=2)
+            calls = []
+            vec = first.get_or_compute("ollama", "m", "hello", lambda t: calls.append(t) or [1.0, 2.0])
+            self.assertEqual(vec, [1.0, 2.0])
+
+            second = EmbeddingCache(path, memory_items=2)
+            self.assertEqual(second.get_or_compute("ollama", "m", "hello ", lambda t: [9.0]), [1.0, 2.0])
+            self.assertEqual(second.get_or_compute("ollama", "m", "hello", lambda t: [9.0]), [1.0, 2.0])
+            self.assertEqual(calls, ["hello"])
+
+            stats = second.stats()
+            self.assertEqual((stats["disk_hits"], stats["memory_hits"], stats["misses"]), (1, 1, 0))
+            self.assertEqual(stats["saved_calls"], 2)
+
+    def test_memory_tier_is_bounded(self):
+        cache = EmbeddingCache(None, memory_items=2)
+        for text in ("a", "b", "c"):
+            cache.put(cache_key("ollama", "m", text), [1.0])
+        self.assertIsNone(cache.get(cache_key("ollama", "m", "a")))
+        self.assertEqual(cache.get(cache_key("ollama", "m", "c")), [1.0])
+
+    def test_embed_texts_only_sends_misses(self):
+        cache = EmbeddingCache(None)
+        provider = _CountingProvider()
+        embed_texts(provider, ["aa", "bbb"], "m", cache=cache)
+
+        result = embed_texts(provider, ["aa", "cccc", "bad", "bbb"], "m", cache=cache)
+
+        self.assertEqual(provider.embedded, ["aa", "bbb", "cccc", "bad"])
+        self.assertEqual([item.embedding for item in result.items if item.error is None], [[2.0, 0.5], [4.0, 0.5], [3.0, 0.5]])
+        self.assertEqual([item.index for item in result.failed], [2])
+        self.assertIsNone(cache.get(cache_key("ollama", "m", "bad")))
+
+
+if __name__ == "__main__":
+    unittest.main()
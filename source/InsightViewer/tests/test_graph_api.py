@@ -0,0 +1,112 @@
+import os
+import sys
+import unittest
+import importlib.util
+from pathlib import Path
+
+import jwt
+from flask import Flask
+
+
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+GRAPH_API_PATH = APP_ROOT / "routes" / "graph_api.py"
+spec = importlib.util.spec_from_file_location("graph_api_under_test", GRAPH_API_PATH)
+graph_api = importlib.util.module_from_spec(spec)
+assert spec is not None and spec.loader is not None
+spec.loader.exec_module(graph_api)
+
+
+class _FakeNode(dict):
+    def __init__(self, element_id, labels, **props):
+        super().__init__(props)
+        self.id = element_id
+        self.labels = frozenset(labels)
+
+
+class _FakeRel(dict):
+    def __init__(self, element_id, rel_type, **props):
+        super().__init__(props)
+        self.id = element_id
+        self.type = rel_type
+
+
+class _FakeSession:
+    def __init__(self):
+        self.queries = []
+
+    def run(self, query, **params):
+        self.queries.append((query, params))
+        seed = _FakeNode(1, ["ORADbObject"], id_rc="seed", name="HR.EMP")
+        hub_hits = [
+            {"rel": _FakeRel(100 + i, "READS"), "m": _FakeNode(10 + i, ["ApexPage"], id_rc=f"p{i}", name=f"P{i}"),
+             "from": f"p{i}", "to": "seed"}
+            for i in range(2)
+        ]
+        fk_hit = {"rel": _FakeRel(200, "FK", id_rc="fk"), "m": _FakeNode(20, ["ORADbObject"], id_rc="dept", name="HR.DEPT"),
+                  "from": "seed", "to": "dept"}
+        return [
+            {"n": seed, "rel_type": "READS", "degree": 10000, "hits": hub_hits},
+            {"n": seed, "rel_type": "FK", "degree": 1, "hits": [fk_hit]},
+        ]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _FakeDriver:
+    def __init__(self):
+        self.last_session = None
+
+    def session(self):
+        self.last_session = _FakeSession()
+        return self.last_session
+
+
+class GraphExpandTests(unittest.TestCase):
+    def setUp(self):
+        self.driver = _FakeDriver()
+        graph_api.init_driver(self.driver)
+        app = Flask(__name__)
+        app.register_blueprint(graph_api.graph_api_bp)
+        self.client = app.test_client()
+        token = jwt.encode({"sub": "u1", "project": "P1"}, os.environ["JWT_SECRET"], algorithm="HS256")
+        self.client.set_cookie("access_token", token)
+
+    def test_batched_expand_reports_overflow(self):
+        resp = self.client.post("/api/graph/expand", json={"ids": ["seed", "seed", "x"], "per_type_limit": 2})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+
+        query, params = self.driver.last_session.queries[0]
+        self.assertIn("LIMIT $per_type_limit", query)
+        self.assertEqual(params["ids"], ["seed", "x"])
+
+        self.assertEqual([n["id"] for n in body["nodes"]], ["seed", "p0", "p1", "dept"])
+        self.assertEqual([e["id"] for e in body["edges"]], ["100", "101", "fk"])
+        self.assertEqual(body["overflow"], [
+            {"id_rc": "seed", "type": "READS", "degree": 10000, "returned": 2, "omitted": 9998},
+        ])
+        self.assertEqual(body["meta"]["expanded"], 1)
+
+    def test_without_limit_has_no_limit_clause(self):
+        resp = self.client.post("/api/graph/expand", json={"ids": ["seed"]})
+        self.assertEqual(resp.status_code, 200)
+        query, _ = self.driver.last_session.queries[0]
+        self.assertNotIn("LIMIT", query)
+        self.assertEqual(resp.get_json()["overflow"], [])
+
+    def test_rejects_bad_ids(self):
+        resp = self.client.post("/api/graph/expand", json={"ids": "seed"})
+        self.assertEqual(resp.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from graph.context import GraphContextCache
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def data(self):
+        return self.rows
+
+
+class _FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, **params):
+        self.driver.queries += 1
+        if "RETURN DISTINCT labels(n)" in query:
+            return _Result([{"labels": ["Table", "IVNode"]}, {"labels": self.driver.labels}])
+        if "RETURN DISTINCT type(r)" in query:
+            return _Result([{"t": "FK"}])
+        if "NodeType" in query:
+            return _Result([{"name": "Table"}])
+        return _Result([{"labels": ["Table"], "name": f"T{i}", "id_rc": str(i)} for i in range(params["lim"])])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _FakeDriver:
+    def __init__(self):
+        self.queries = 0
+        self.labels = ["View"]
+
+    def session(self):
+        return _FakeSession(self)
+
+
+class GraphContextCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.driver = _FakeDriver()
+        self.cache = GraphContextCache(ttl_seconds=60, max_sample_limit=30)
+
+    def _wait_refreshed(self):
+        deadline = time.monotonic() + 2
+        while self.cache._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_cached_per_project_with_sample_limit(self):
+        ctx = self.cache.get(self.driver, "P1", sample_limit=8)
+        self.assertEqual(ctx.labels, ["Table", "View"])
+        self.assertEqual(ctx.rel_types, ["FK"])
+        self.assertEqual(ctx.node_type_names, ["Table"])
+        self.assertEqual(len(ctx.sample_nodes), 8)
+        fetched = self.driver.queries
+
+        ctx = self.cache.get(self.driver, " P1 ", sample_limit=20)
+        self.assertEqual(len(ctx.sample_nodes), 20)
+        self.assertEqual(self.driver.queries, fetched)
+
+        self.cache.get(self.driver, "P2")
+        self.assertGreater(self.driver.queries, fetched)
+
+    def test_bump_invalidates_and_rewarms(self):
+        self.cache.get(self.driver, "P1")
+        self.driver.labels = ["Package"]
+        self.cache.bump("P1")
+        self._wait_refreshed()
+
+        fetched = self.driver.queries
+        self.assertEqual(self.cache.get(self.driver, "P1").labels, ["Package", "Table"])
+        self.assertEqual(self.driver.queries, fetched)
+
+    def test_expired_entry_is_served_while_refreshing(self):
+        self.cache.get(self.driver, "P1")
+        self.cache._entries["P1"].fetched_at -= 120
+        self.driver.labels = ["Package"]
+
+        self.assertEqual(self.cache.get(self.driver, "P1").labels, ["Table", "View"])
+        self._wait_refreshed()
+        self.assertEqual(self.cache.get(self.driver, "P1").labels, ["Package", "Table"])
+
+
+if __name__ == "__main__":
+    unittest.main()
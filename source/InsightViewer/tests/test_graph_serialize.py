@@ -0,0 +1,208 @@
+import gzip
+import json
+import sys
+import unittest
+from datetime import date
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from flask import Flask
+
+from graph.custom_graph import LAYOUT_EDGES_CYPHER, LAYOUT_MEMBERS_CYPHER, load_custom_graph
+from graph.projection import ProjectionPolicy, project_properties, project_vis_node
+from graph.serialize import GraphAccumulator, expanded_node_to_vis, infer_visual_node_type
+from graph.wire import COMPACT_MIMETYPE, decode_compact, encode_compact, graph_response
+
+
+class _FakeNode(dict):
+    def __init__(self, element_id, labels, **props):
+        super().__init__(props)
+        self.id = element_id
+        self.labels = frozenset(labels)
+
+
+class _FakeRel(dict):
+    def __init__(self, element_id, rel_type, start_node, end_node, **props):
+        super().__init__(props)
+        self.id = element_id
+        self.type = rel_type
+        self.start_node = start_node
+        self.end_node = end_node
+
+
+class _FakeRecord:
+    def __init__(self, *values):
+        self._values = values
+
+    def values(self):
+        return list(self._values)
+
+
+def _records():
+    a = _FakeNode(1, ["Table"], id_rc="a", name="HR.EMPLOYEES", projectName="P1", created=date(2024, 1, 2))
+    b = _FakeNode(2, ["Table"], id_rc="b", name="HR.DEPARTMENTS", projectName="P1")
+    c = _FakeNode(3, ["Table"], id_rc="c", name="OTHER.T", projectName="P2")
+    ab = _FakeRel(10, "FK", a, b, id_rc="ab")
+    bc = _FakeRel(11, "FK", b, c)
+    return [
+        _FakeRecord(a, ab, b),
+        _FakeRecord(a, ab, b),
+        _FakeRecord(b, bc, c),
+    ]
+
+
+class GraphAccumulatorTests(unittest.TestCase):
+    def test_dedup_and_project_filter(self):
+        graph = GraphAccumulator(project="P1")
+        graph.add_records(_records())
+
+        self.assertEqual([n["id"] for n in graph.nodes], ["a", "b"])
+        self.assertEqual([e["id"] for e in graph.edges], ["ab", "11"])
+        self.assertEqual(graph.nodes[0]["label"], "EMPLOYEES")
+        self.assertEqual(graph.nodes[0]["nodeType"], "Table")
+        self.assertEqual(graph.nodes[0]["properties"]["created"], "2024-01-02")
+        self.assertEqual(graph.edges[1], {"id": "11", "from": "b", "to": "c", "type": "FK", "label": "FK"})
+
+    def test_streaming_yields_each_item_once_without_retaining(self):
+        graph = GraphAccumulator(project="P1", retain=False)
+        frames = [frame for record in _records() for frame in graph.add_record(record)]
+
+        self.assertEqual([kind for kind, _ in frames], ["node", "edge", "node", "edge"])
+        self.assertEqual((graph.node_count, graph.edge_count), (2, 2))
+        self.assertEqual(graph.nodes, [])
+        self.assertEqual(graph.edges, [])
+
+
+class _LayoutSession:
+    def __init__(self):
+        self.calls = []
+
+    def run(self, query, **params):
+        self.calls.append(query)
+        if query == LAYOUT_MEMBERS_CYPHER:
+            a = _FakeNode(1, ["IVNode", "Table"], id_rc="a", name="HR.EMPLOYEES", projectName="P1")
+            b = _FakeNode(2, ["IVNode", "Table"], id_rc="b", name="HR.DEPARTMENTS", projectName="P1")
+            untyped = _FakeNode(3, ["IVNode", "Scratch"], id_rc="c", name="X", projectName="P1")
+            return [
+                {"orig": a, "x": 1, "y": 2},
+                {"orig": b, "x": 3, "y": 4},
+                {"orig": untyped, "x": 5, "y": 6},
+            ]
+        if query == LAYOUT_EDGES_CYPHER:
+            assert params["ids"] == ["a", "b"]
+            return [
+                {"from": "a", "to": "b", "type": "FK", "rel_id_rc": "ab", "rel_id": 10},
+                {"from": "a", "to": "b", "type": "FK", "rel_id_rc": "ab", "rel_id": 10},
+                {"from": "b", "to": "a", "type": "REF", "rel_id_rc": None, "rel_id": 11},
+            ]
+        raise AssertionError(query)
+
+
+class NodeTypeTests(unittest.TestCase):
+    def test_ivnode_never_names_the_type(self):
+        self.assertEqual(infer_visual_node_type(["IVNode", "Table"]), "Table")
+        self.assertEqual(infer_visual_node_type(["Table", "IVNode"]), "Table")
+        self.assertEqual(infer_visual_node_type(["IVNode", "NodeType"]), "NodeType")
+
+        node = expanded_node_to_vis(_FakeNode(1, ["IVNode", "Table"], id_rc="a"))
+        self.assertEqual((node["nodeType"], node["label"]), ("Table", "Table"))
+
+
+class CustomGraphLoaderTests(unittest.TestCase):
+    def test_two_queries_and_dedup(self):
+        session = _LayoutSession()
+        node_types = {"Table": {"name": "Table", "shape": "box", "size": 20}}
+        graph = load_custom_graph(session, "layout", "P1", node_types)
+
+        self.assertEqual(len(session.calls), 2)
+        self.assertEqual([n["id"] for n in graph["nodes"]], ["a", "b"])
+        self.assertEqual((graph["nodes"][0]["shape"], graph["nodes"][0]["size"]), ("box", 20))
+        self.assertEqual(graph["nodes"][0]["color"], "#97C2FC")
+        self.assertEqual(graph["nodes"][0]["label"], "EMPLOYEES")
+        self.assertEqual(graph["nodes"][0]["properties"]["id"], "a")
+        self.assertEqual([e["id"] for e in graph["edges"]], ["ab", "11"])
+
+
+class ProjectionTests(unittest.TestCase):
+    def test_drops_vectors_and_truncates_strings(self):
+        policy = ProjectionPolicy(max_string_chars=10, max_node_bytes=10_000)
+        props = {
+            "id_rc": "c1",
+            "name": "Chunk 1",
+            "text": "x" * 50,
+            "embedding": [0.1] * 1024,
+            "altVector": [1.0] * 64,
+            "tags": [1, 2, 3],
+        }
+        item = project_vis_node({"id": "c1", "properties": props}, policy)
+
+        self.assertEqual(item["properties"], {"id_rc": "c1", "name": "Chunk 1", "text": "x" * 10, "tags": [1, 2, 3]})
+        self.assertTrue(item["truncated"])
+        self.assertEqual(sorted(item["truncatedKeys"]), ["altVector", "embedding", "text"])
+
+    def test_byte_budget_keeps_identity_keys(self):
+        policy = ProjectionPolicy(max_string_chars=1000, max_node_bytes=120)
+        props = {"a": "y" * 80, "b": "z" * 80, "id_rc": "n1", "name": "N" * 100}
+        projected, omitted = project_properties(props, policy)
+
+        self.assertEqual(list(projected), ["id_rc", "name"])
+        self.assertEqual(omitted, ["a", "b"])
+
+    def test_untruncated_mode_only_drops_vectors(self):
+        props = {"text": "x" * 5000, "embedding": [0.5] * 1024}
+        projected, omitted = project_properties(props, truncate=False)
+
+        self.assertEqual(projected, {"text": "x" * 5000})
+        self.assertEqual(omitted, ["embedding"])
+
+    def test_small_nodes_are_not_marked(self):
+        item = project_vis_node({"id": "a", "properties": {"id_rc": "a", "name": "A"}})
+        self.assertNotIn("truncated", item)
+
+
+class CompactWireTests(unittest.TestCase):
+    def _payload(self):
+        graph = GraphAccumulator(project="P1")
+        graph.add_records(_records())
+        nodes = [dict(n, color="#97C2FC", shape="box") for n in graph.nodes]
+        return {"success": True, "nodes": nodes, "edges": graph.edges}
+
+    def test_round_trip(self):
+        payload = self._payload()
+        doc = encode_compact(payload)
+
+        self.assertEqual(doc["ids"], ["a", "b", "c"])
+        self.assertEqual(doc["nodes"]["count"], 2)
+        self.assertEqual(doc["edges"]["from"], [0, 1])
+        self.assertEqual(doc["edges"]["to"], [1, 2])
+        self.assertIn(["label", {"same": "type"}], doc["edges"]["cols"])
+        self.assertEqual(decode_compact(json.loads(json.dumps(doc))), payload)
+
+    def test_graph_response_negotiation_and_gzip(self):
+        app = Flask(__name__)
+        payload = self._payload()
+        payload["nodes"] += [
+            {"id": f"n{i}", "label": f"T{i}", "nodeType": "Table", "labels": ["Table"],
+             "properties": {"id_rc": f"n{i}", "name": f"HR.T{i}", "projectName": "P1"}}
+            for i in range(500)
+        ]
+
+        with app.test_request_context(headers={"Accept": "application/json"}):
+            resp = graph_response(payload)
+            self.assertEqual(resp.mimetype, "application/json")
+
+        headers = {"Accept": COMPACT_MIMETYPE, "Accept-Encoding": "gzip"}
+        with app.test_request_context(headers=headers):
+            resp = graph_response(payload)
+            self.assertEqual(resp.mimetype, COMPACT_MIMETYPE)
+            self.assertEqual(resp.headers["Content-Encoding"], "gzip")
+            doc = json.loads(gzip.decompress(resp.get_data()))
+            self.assertEqual(decode_compact(doc)["nodes"], payload["nodes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import unittest
+import importlib.util
+from pathlib import Path
+
+import jwt
+from flask import Flask
+
+
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+MODULE_PATH = APP_ROOT / "routes" / "createNodeTypes.py"
+spec = importlib.util.spec_from_file_location("create_node_types_under_test", MODULE_PATH)
+create_node_types = importlib.util.module_from_spec(spec)
+assert spec is not None and spec.loader is not None
+spec.loader.exec_module(create_node_types)
+
+
+class _FakeNode(dict):
+    def __init__(self, labels, **props):
+        super().__init__(props)
+        self.labels = frozenset(labels)
+
+
+class _FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, **params):
+        self.driver.queries.append(query)
+        return [{"t": _FakeNode(["NodeType"], **props)} for props in self.driver.node_types]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _FakeDriver:
+    def __init__(self, node_types):
+        self.node_types = node_types
+        self.queries = []
+
+    def session(self):
+        return _FakeSession(self)
+
+
+class NodeTypeRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.driver = _FakeDriver([
+            {"name": "Person", "shape": "dot", "color": "#f00", "size": 20, "role": ""},
+            {"name": "Table", "shape": "box", "color": "#0f0", "size": 25, "projectName": "P1"},
+        ])
+        create_node_types.init_driver(self.driver)
+        create_node_types.invalidate_node_type_registry()
+
+        app = Flask(__name__)
+        app.register_blueprint(create_node_types.nodes_bp)
+        self.client = app.test_client()
+        token = jwt.encode({"sub": "u1", "project": "P1"}, os.environ["JWT_SECRET"], algorithm="HS256")
+        self.client.set_cookie("access_token", token)
+
+    def test_loads_once_until_invalidated(self):
+        self.assertEqual(create_node_types.get_node_type("Table")["shape"], "box")
+        self.assertIsNone(create_node_types.get_node_type("Missing"))
+        self.assertEqual(len(self.driver.queries), 1)
+
+        self.driver.node_types[1]["shape"] = "database"
+        create_node_types.invalidate_node_type_registry()
+        self.assertEqual(create_node_types.get_node_type("Table")["shape"], "database")
+        self.assertEqual(len(self.driver.queries), 2)
+
+    def test_visuals_served_from_registry(self):
+        resp = self.client.post("/nodes/get_node_type_visuals", json={"nodeType": "Person"})
+        self.assertEqual(resp.get_json()["properties"], {"name": "Person", "role": ""})
+
+        resp = self.client.get("/nodes/get_node_types?projectName=P1")
+        self.assertEqual([t["name"] for t in resp.get_json()], ["Table"])
+        self.assertEqual(len(self.driver.queries), 1)
+
+    def test_bundle_etag(self):
+        resp = self.client.get("/nodes/node_type_visuals_bundle")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(sorted(resp.get_json()["node_types"]), ["Person", "Table"])
+        etag = resp.headers["ETag"]
+
+        resp = self.client.get("/nodes/node_type_visuals_bundle", headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+
+        self.driver.node_types[0]["color"] = "#00f"
+        create_node_types.invalidate_node_type_registry()
+        resp = self.client.get("/nodes/node_type_visuals_bundle", headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.headers["ETag"], etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from ai.packing import context_window, evidence_budget, pack_chunks
+
+
+def _words(prefix, n):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+class PackChunksTests(unittest.TestCase):
+    def test_contained_chunks_are_dropped(self):
+        paragraph = _words("p", 60)
+        chunks = [
+            {"id_rc": "whole", "text": paragraph, "score": 0.9},
+            {"id_rc": "window", "text": _words("p", 40), "score": 0.8},
+            {"id_rc": "other", "text": _words("q", 40), "score": 0.5},
+        ]
+
+        packed = pack_chunks(chunks, 10_000)
+
+        self.assertEqual([c["id_rc"] for c in packed.chunks], ["whole", "other"])
+        self.assertEqual(packed.dropped_duplicates, 1)
+
+    def test_mmr_prefers_new_evidence_over_overlap(self):
+        base = _words("w", 40)
+        chunks = [
+            {"id_rc": "a", "text": base, "score": 1.0},
+            {"id_rc": "a-overlap", "text": _words("w", 20) + " " + _words("x", 20), "score": 0.95},
+            {"id_rc": "b", "text": _words("y", 40), "score": 0.9},
+        ]
+
+        # Room for two chunks: the distinct one wins over the overlapping one.
+        packed = pack_chunks(chunks, 2 * (len(base) // 4 + 1) + 5, mmr_lambda=0.5)
+
+        self.assertEqual(sorted(c["id_rc"] for c in packed.chunks), ["a", "b"])
+        self.assertEqual(packed.dropped_budget, 1)
+
+    def test_budget_and_grouping_by_owner(self):
+        chunks = [
+            {"id_rc": "c1", "owner_id_rc": "n1", "text": _words("a", 30), "distance": 0},
+            {"id_rc": "c2", "owner_id_rc": "n2", "text": _words("b", 30), "distance": 1},
+            {"id_rc": "c3", "owner_id_rc": "n1", "text": _words("c", 30), "distance": 1},
+            {"id_rc": "c4", "owner_id_rc": "n3", "text": _words("d", 30), "distance": 2},
+        ]
+
+        packed = pack_chunks(chunks, 3 * (len(chunks[0]["text"]) // 4 + 1))
+
+        self.assertEqual([c["id_rc"] for c in packed.chunks], ["c1", "c3", "c2"])
+        self.assertLessEqual(packed.tokens, packed.budget)
+        self.assertEqual(packed.stats()["dropped_budget"], 1)
+
+    def test_long_chunks_are_truncated(self):
+        packed = pack_chunks([{"id_rc": "c", "text": "x" * 5000}], 10_000, max_chunk_tokens=100)
+        self.assertTrue(packed.chunks[0]["text"].endswith(" ..."))
+        self.assertLessEqual(packed.chunks[0]["tokens"], 102)
+
+    def test_long_paragraph_within_budget_is_packed_whole(self):
+        # rag_chat_api_v3 packs whole paragraphs with max_chunk_tokens=budget
+        paragraph = " ".join(f"beseda{i}" for i in range(1500))
+        contexts = [{"chunk_id_rc": "p1", "paragraph_id_rc": "P1", "chunk_text": paragraph, "score": 0.9}]
+        packed = pack_chunks(
+            contexts, 4000, text_key="chunk_text", owner_key="paragraph_id_rc", max_chunk_tokens=4000
+        )
+        self.assertEqual(packed.chunks[0]["chunk_text"], paragraph)
+        self.assertGreater(packed.chunks[0]["tokens"], 350)
+
+
+class EvidenceBudgetTests(unittest.TestCase):
+    def test_budget_follows_model_window(self):
+        self.assertEqual(context_window("gpt-4o-mini"), 128_000)
+        self.assertEqual(context_window("qwen2.5:14b"), 8192)
+        self.assertEqual(evidence_budget("qwen2.5:14b", "x" * 4000, 1400), 8192 - 1001 - 1400)
+        self.assertEqual(evidence_budget("gpt-4o-mini", "", 1400, cap=4500), 4500)
+        self.assertEqual(evidence_budget("qwen2.5:14b", "x" * 40000, 1400), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
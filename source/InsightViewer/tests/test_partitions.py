@@ -0,0 +1,150 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from graph import partitions
+from graph.partitions import PartitionLookup
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def data(self):
+        return self._rows
+
+    def consume(self):
+        return None
+
+
+class _IndexSession:
+    """Answers PARTITION_INDEXES_CYPHER from a dict of index name -> state."""
+
+    def __init__(self, states):
+        self.states = states
+        self.queries = 0
+
+    def run(self, query, names=()):
+        self.queries += 1
+        return _FakeResult([{"name": n, "state": self.states[n]} for n in names if n in self.states])
+
+
+class PartitionNamingTests(unittest.TestCase):
+    def test_plain_names_are_kept(self):
+        self.assertEqual(partitions.partition_label("Alpha_1"), "Chunk_Alpha_1")
+        self.assertEqual(partitions.vector_index_name("Alpha_1"), "chunk_embedding_Alpha_1")
+
+    def test_sanitized_names_stay_distinct(self):
+        a = partitions.partition_slug("Team A")
+        b = partitions.partition_slug("Team-A")
+        self.assertRegex(a, r"^[A-Za-z0-9_]+$")
+        self.assertTrue(a.startswith("Team_A_"))
+        self.assertNotEqual(a, b)
+
+
+class PartitionLookupTests(unittest.TestCase):
+    def test_only_online_indexes_are_used(self):
+        session = _IndexSession({"chunk_embedding_P1": "POPULATING"})
+        self.assertEqual(PartitionLookup().lookup(session, "P1"), {"vector": None})
+
+        session.states["chunk_embedding_P1"] = "ONLINE"
+        self.assertEqual(PartitionLookup().lookup(session, "P1"), {"vector": "chunk_embedding_P1"})
+
+    def test_lookup_is_cached_until_forgotten(self):
+        session = _IndexSession({"chunk_embedding_P1": "ONLINE"})
+        lookups = PartitionLookup(ttl=60)
+        lookups.lookup(session, "P1")
+        lookups.lookup(session, "P1")
+        self.assertEqual(session.queries, 1)
+
+        lookups.forget("P1")
+        lookups.lookup(session, "P1")
+        self.assertEqual(session.queries, 2)
+
+    def test_resolve_vector_index_prefers_partition_and_falls_back(self):
+        partitions._lookups.forget("P1")
+        partitions._lookups.forget("P2")
+        self.addCleanup(partitions._lookups.forget, "P1")
+        self.addCleanup(partitions._lookups.forget, "P2")
+        session = _IndexSession({"chunk_embedding_P1": "ONLINE"})
+
+        self.assertEqual(
+            partitions.resolve_vector_index(session, "P1", "chunk_embedding_index"), "chunk_embedding_P1"
+        )
+        self.assertEqual(
+            partitions.resolve_vector_index(session, "P2", "chunk_embedding_index"), "chunk_embedding_index"
+        )
+        self.assertEqual(partitions.resolve_vector_index(session, None, "chunk_embedding"), "chunk_embedding")
+        self.assertEqual(partitions.resolve_vector_index(session, "P1", "custom_index"), "custom_index")
+
+
+class _VectorIndexSession:
+    """Answers VECTOR_INDEXES_CYPHER and records the index DDL."""
+
+    def __init__(self, indexes):
+        self.rows = [
+            {
+                "name": name,
+                "labelsOrTypes": [label],
+                "properties": ["embedding"],
+                "options": {"indexConfig": {"vector.dimensions": dims, "vector.similarity_function": "COSINE"}},
+            }
+            for name, label, dims in indexes
+        ]
+        self.ddl = []
+
+    def run(self, query, **kw):
+        if query.strip().startswith("SHOW INDEXES"):
+            return _FakeResult(self.rows)
+        self.ddl.append(" ".join(query.split()))
+        return _FakeResult([])
+
+
+class VectorDimensionTests(unittest.TestCase):
+    def _session(self):
+        return _VectorIndexSession([
+            ("chunk_embedding_index", "Chunk", 1024),
+            ("chunk_embedding_P1", "Chunk_P1", 1024),
+            ("chunk_embedding_P2", "Chunk_P2", 1024),
+            ("paragraph_embedding", "Paragraph", 1024),
+        ])
+
+    def test_matching_dimensions_pass(self):
+        session = self._session()
+        self.assertEqual(partitions.ensure_vector_dimensions(session, "P1", 1024), [])
+        self.assertEqual(session.ddl, [])
+
+    def test_mismatch_is_refused_without_recreate(self):
+        session = self._session()
+        with self.assertRaises(partitions.VectorDimensionError) as ctx:
+            partitions.ensure_vector_dimensions(session, "P1", 768)
+        self.assertIn("chunk_embedding_index (1024)", str(ctx.exception))
+        self.assertIn("chunk_embedding_P1 (1024)", str(ctx.exception))
+        self.assertNotIn("chunk_embedding_P2", str(ctx.exception))
+        self.assertEqual(session.ddl, [])
+
+    def test_recreate_drops_and_creates_with_new_dimensions(self):
+        session = self._session()
+        recreated = partitions.ensure_vector_dimensions(session, "P1", 768, recreate=True)
+
+        self.assertEqual(recreated, ["chunk_embedding_index", "chunk_embedding_P1"])
+        self.assertEqual(session.ddl[0], "DROP INDEX chunk_embedding_index IF EXISTS")
+        self.assertIn("CREATE VECTOR INDEX chunk_embedding_P1 IF NOT EXISTS FOR (c:`Chunk_P1`)", session.ddl[3])
+        self.assertIn("`vector.dimensions`: 768", session.ddl[3])
+        self.assertIn("'cosine'", session.ddl[3])
+
+    def test_project_scope_leaves_the_global_index_alone(self):
+        session = self._session()
+        recreated = partitions.ensure_vector_dimensions(session, "P1", 768, recreate=True, include_global=False)
+
+        self.assertEqual(recreated, ["chunk_embedding_P1"])
+        self.assertFalse(any("chunk_embedding_index" in ddl for ddl in session.ddl))
+
+
+if __name__ == "__main__":
+    unittest.main()
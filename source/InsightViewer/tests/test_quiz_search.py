@@ -0,0 +1,128 @@
+import os
+import sys
+import types
+import unittest
+from pathlib import Path
+
+
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from ai.embed_cache import EmbeddingCache
+from ai.providers.base import AIProvider
+from ai.types import EmbedResponse
+from graph import partitions
+
+# routes/__init__.py pulls in the legacy blueprints; the route modules under
+# test only need the package path.
+if "routes" not in sys.modules:
+    routes_pkg = types.ModuleType("routes")
+    routes_pkg.__path__ = [str(APP_ROOT / "routes")]
+    sys.modules["routes"] = routes_pkg
+
+from routes import quiz_search
+
+
+class _CountingProvider(AIProvider):
+    id = "ollama"
+
+    def __init__(self):
+        self.embedded = []
+
+    def chat(self, req):
+        raise NotImplementedError
+
+    def embed(self, req):
+        self.embedded.append(req.text)
+        if req.text == "bad":
+            from ai.errors import ProviderRequestError
+            raise ProviderRequestError("rejected", status_code=400)
+        return EmbedResponse(embedding=[float(len(req.text)), 0.5])
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def data(self):
+        return self._rows
+
+
+class _QuizSession:
+    """Online partition indexes come from `online`; searches return two rows per query."""
+
+    def __init__(self, online=()):
+        self.online = set(online)
+        self.searches = []
+
+    def run(self, query, **kwargs):
+        if "SHOW INDEXES" in query:
+            return _FakeResult([{"name": n, "state": "ONLINE"} for n in kwargs["names"] if n in self.online])
+        self.searches.append(kwargs)
+        return _FakeResult([
+            {"i": q["i"], "id": f"chunk-{q['i']}-{rank}", "text": "t", "score": 1.0 - rank / 10}
+            for q in kwargs["queries"]
+            for rank in range(2)
+        ])
+
+
+class QuizSearchTests(unittest.TestCase):
+    def setUp(self):
+        partitions._lookups.forget("P1")
+        self.addCleanup(partitions._lookups.forget, "P1")
+        self.provider = _CountingProvider()
+        self.cache = EmbeddingCache(None)
+
+    def _search(self, session, questions, project="P1", top_k=5):
+        return quiz_search.search_questions(
+            session, questions, project=project, top_k=top_k,
+            provider=self.provider, model="m", cache=self.cache,
+        )
+
+    def test_batch_is_one_query_with_repeats_embedded_once(self):
+        session = _QuizSession()
+        results, meta = self._search(session, ["what is osmosis", "diffusion", "what  is osmosis"])
+
+        self.assertEqual(len(session.searches), 1)
+        self.assertEqual(len(session.searches[0]["queries"]), 2)
+        self.assertEqual(self.provider.embedded, ["what is osmosis", "diffusion"])
+        self.assertEqual([r["question"] for r in results], ["what is osmosis", "diffusion", "what  is osmosis"])
+        self.assertEqual(results[0]["rows"], results[2]["rows"])
+        self.assertEqual(results[1]["rows"][0]["id"], "chunk-1-0")
+        self.assertEqual(meta["unique"], 2)
+
+        self._search(_QuizSession(), ["diffusion"])
+        self.assertEqual(self.provider.embedded, ["what is osmosis", "diffusion"])
+
+    def test_k_is_top_k_on_partition_and_overfetched_on_global_index(self):
+        global_session = _QuizSession()
+        _, meta = self._search(global_session, ["q"], top_k=5)
+        self.assertEqual(global_session.searches[0]["index"], "chunk_embedding_index")
+        self.assertEqual(global_session.searches[0]["vector_k"], 5 * quiz_search.GLOBAL_OVERFETCH)
+        self.assertEqual(global_session.searches[0]["k"], 5)
+        self.assertEqual(global_session.searches[0]["project"], "P1")
+
+        partitions._lookups.forget("P1")
+        part_session = _QuizSession(online={"chunk_embedding_P1"})
+        _, meta = self._search(part_session, ["q"], top_k=5)
+        self.assertEqual(meta["index"], "chunk_embedding_P1")
+        self.assertEqual(part_session.searches[0]["vector_k"], 5)
+
+    def test_failed_embedding_is_reported_per_question(self):
+        results, _ = self._search(_QuizSession(), ["bad", "good"])
+        self.assertIn("rejected", results[0]["error"])
+        self.assertEqual(results[0]["rows"], [])
+        self.assertEqual(len(results[1]["rows"]), 2)
+
+    def test_top_k_is_validated_and_capped(self):
+        self.assertEqual(quiz_search._top_k(None), quiz_search.DEFAULT_TOP_K)
+        self.assertEqual(quiz_search._top_k(1000), quiz_search.MAX_TOP_K)
+        with self.assertRaises(ValueError):
+            quiz_search._top_k(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
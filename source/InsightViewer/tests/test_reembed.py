@@ -0,0 +1,169 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from ai.embed_cache import EmbeddingCache
+from ai.providers.base import AIProvider
+from ai.reembed import content_hash, reembed_stale, staleness
+from ai.types import EmbedResponse
+import ai.embed_cache
+
+
+class _CountingProvider(AIProvider):
+    id = "ollama"
+
+    def __init__(self):
+        self.embedded = []
+
+    def chat(self, req):
+        raise NotImplementedError
+
+    def embed(self, req):
+        self.embedded.append(req.text)
+        return EmbedResponse(embedding=[float(len(req.text)), 0.5, 0.25])
+
+
+class _FakeResult:
+    def __init__(self, rows=()):
+        self._rows = list(rows)
+
+    def data(self):
+        return self._rows
+
+    def consume(self):
+        return None
+
+
+class _ChunkSession:
+    """Chunks keyed by elementId; serves the page query and applies the writes."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def run(self, query, **kw):
+        if "ORDER BY eid" in query:
+            rows = [
+                {
+                    "eid": eid,
+                    "text": c["text"],
+                    "embedded": c.get("embedding") is not None,
+                    "hash": c.get("embeddingHash"),
+                    "model": c.get("embeddingModel"),
+                    "max_chars": c.get("embeddingMaxChars"),
+                }
+                for eid, c in sorted(self.chunks.items())
+                if eid > kw["after"]
+            ]
+            return _FakeResult(rows[: kw["limit"]])
+        for row in kw["rows"]:
+            c = self.chunks[row["eid"]]
+            if "SET c.embedding =" in query:
+                c.update(embedding=row["embedding"], embeddingMaxChars=row["max_chars"])
+            elif c.get("embeddingMaxChars") is None:
+                c["embeddingMaxChars"] = row["max_chars"]
+            c.update(embeddingHash=row["hash"], embeddingModel=kw["model"])
+        return _FakeResult()
+
+
+class ReembedTests(unittest.TestCase):
+    def setUp(self):
+        cache = EmbeddingCache(None)
+        original = ai.embed_cache._cache
+        ai.embed_cache._cache = cache
+        self.addCleanup(setattr, ai.embed_cache, "_cache", original)
+        self.provider = _CountingProvider()
+
+    def _chunks(self):
+        def fresh(text, model="m1"):
+            return {"text": text, "embedding": [1.0], "embeddingHash": content_hash(text), "embeddingModel": model}
+
+        return {
+            "4:a": fresh("unchanged"),
+            "4:b": dict(fresh("old text"), text="edited text"),
+            "4:c": fresh("other model", model="m0"),
+            "4:d": {"text": "never embedded"},
+            "4:e": {"text": "legacy vector", "embedding": [1.0]},
+            "4:f": {"text": "  "},
+        }
+
+    def test_only_stale_chunks_are_reembedded(self):
+        chunks = self._chunks()
+        summary = reembed_stale(_ChunkSession(chunks), self.provider, "m1", page_size=2)
+
+        self.assertEqual(
+            sorted(self.provider.embedded), ["edited text", "legacy vector", "never embedded", "other model"]
+        )
+        self.assertEqual(
+            [summary[k] for k in ("fresh", "text_changed", "model_changed", "missing", "unversioned", "no_text")],
+            [1, 1, 1, 1, 1, 1],
+        )
+        self.assertEqual((summary["reembedded"], summary["complete"], summary["dims"]), (4, True, [3]))
+        for eid in ("4:a", "4:b", "4:c", "4:d", "4:e"):
+            c = chunks[eid]
+            self.assertIsNone(staleness({"embedded": True, "hash": c["embeddingHash"], "model": c["embeddingModel"]},
+                                        content_hash(c["text"]), "m1"))
+
+        again = reembed_stale(_ChunkSession(chunks), self.provider, "m1")
+        self.assertEqual((again["reembedded"], again["fresh"]), (0, 5))
+
+    def test_dry_run_adopt_and_limit(self):
+        chunks = self._chunks()
+        dry = reembed_stale(_ChunkSession(chunks), self.provider, "m1", dry_run=True)
+        self.assertEqual((dry["reembedded"], dry["missing"]), (0, 1))
+        self.assertEqual(self.provider.embedded, [])
+
+        limited = reembed_stale(
+            _ChunkSession(chunks), self.provider, "m1", adopt_unversioned=True, max_chunks=2
+        )
+        self.assertEqual((limited["reembedded"], limited["adopted"], limited["complete"]), (2, 1, False))
+        self.assertEqual(chunks["4:e"]["embeddingModel"], "m1")
+        self.assertEqual(chunks["4:e"]["embedding"], [1.0])
+
+    def test_dimension_check_runs_before_the_first_write(self):
+        chunks = self._chunks()
+        checked = []
+
+        def refuse(dims):
+            checked.append(dims)
+            raise ValueError("index expects 1024")
+
+        with self.assertRaises(ValueError):
+            reembed_stale(_ChunkSession(chunks), self.provider, "m1", check_dimensions=refuse)
+        self.assertEqual(checked, [3])
+        self.assertEqual(chunks["4:d"].get("embedding"), None)
+        self.assertEqual(chunks["4:c"]["embeddingModel"], "m0")
+
+        summary = reembed_stale(
+            _ChunkSession(chunks), self.provider, "m1", page_size=2, check_dimensions=lambda dims: ["idx"]
+        )
+        self.assertEqual((summary["reembedded"], summary["recreated_indexes"]), (4, ["idx"]))
+
+
+    def test_changed_truncation_is_stale_only_where_it_cuts(self):
+        long_text, short_text = "x" * 40, "short"
+        chunks = {
+            "4:a": {"text": long_text, "embedding": [1.0], "embeddingHash": content_hash(long_text),
+                    "embeddingModel": "m1", "embeddingMaxChars": 0},
+            "4:b": {"text": short_text, "embedding": [1.0], "embeddingHash": content_hash(short_text),
+                    "embeddingModel": "m1", "embeddingMaxChars": 0},
+        }
+
+        kept = reembed_stale(_ChunkSession(chunks), self.provider, "m1", max_chars=None)
+        self.assertEqual((kept["fresh"], kept["reembedded"]), (2, 0))
+
+        cut = reembed_stale(_ChunkSession(chunks), self.provider, "m1", max_chars=10)
+        self.assertEqual((cut["truncation_changed"], cut["fresh"], cut["reembedded"]), (1, 1, 1))
+        self.assertEqual(self.provider.embedded, ["x" * 10])
+        self.assertEqual(chunks["4:a"]["embeddingMaxChars"], 10)
+
+        again = reembed_stale(_ChunkSession(chunks), self.provider, "m1", max_chars=None)
+        self.assertEqual(again["fresh"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
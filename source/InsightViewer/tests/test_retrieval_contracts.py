@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 import unittest
 import importlib.util
 from pathlib import Path
@@ -30,7 +31,13 @@ class _FakeResult:
 
 
 class _FakeSession:
+    def __init__(self):
+        self.timeouts = []
+
     def run(self, query, **kwargs):
+        # Under a request deadline the route passes neo4j.Query objects.
+        self.timeouts.append(getattr(query, "timeout", None))
+        query = getattr(query, "text", query)
         if "db.index.fulltext.queryNodes" in query:
             return _FakeResult(
                 [
@@ -43,10 +50,11 @@ class _FakeSession:
                 ]
             )
 
-        if "RETURN n.id_rc AS id_rc, labels(n) AS labels, n.name AS name" in query:
+        if "UNWIND $node_ids AS nid" in query:
             return _FakeResult(
                 [
                     {
+                        "eid": "4:node-1",
                         "id_rc": "node-1",
                         "labels": ["Department"],
                         "name": "test",
@@ -54,13 +62,20 @@ class _FakeSession:
                 ]
             )
 
-        if "OPTIONAL MATCH (n)-[:HAS_CHUNK]->(c:Chunk)" in query:
+        if "UNWIND $frontier AS eid" in query:
             return _FakeResult(
                 [
                     {
-                        "id_rc": "chunk-1",
-                        "labels": ["Chunk"],
-                        "text": "chunk text",
+                        "eid": "4:node-1",
+                        "chunks": [
+                            {
+                                "eid": "4:chunk-1",
+                                "id_rc": "chunk-1",
+                                "labels": ["Chunk"],
+                                "text": "chunk text",
+                            }
+                        ],
+                        "neighbours": [],
                     }
                 ]
             )
@@ -75,8 +90,38 @@ class _FakeSession:
 
 
 class _FakeDriver:
+    def __init__(self):
+        self.sessions = []
+
     def session(self):
-        return _FakeSession()
+        self.sessions.append(_FakeSession())
+        return self.sessions[-1]
+
+
+class _GraphSession:
+    """Answers the depth traversal queries from an in-memory adjacency list."""
+
+    def __init__(self, edges, chunks):
+        self.edges = edges
+        self.chunks = chunks
+        self.hops = []
+
+    def run(self, query, **kwargs):
+        if "UNWIND $node_ids AS nid" in query:
+            return _FakeResult([{"eid": n, "id_rc": n, "labels": ["Table"], "name": n} for n in kwargs["node_ids"]])
+        self.hops.append(list(kwargs["frontier"]))
+        rows = []
+        for eid in kwargs["frontier"]:
+            neighbours = self.edges.get(eid, []) if kwargs["expand"] else []
+            rows.append({
+                "eid": eid,
+                "chunks": [{"eid": c, "id_rc": c, "labels": ["Chunk"], "text": f"text {c}"} for c in self.chunks.get(eid, [])],
+                "neighbours": [
+                    {"eid": n, "id_rc": n, "labels": ["Table"], "name": n}
+                    for n in neighbours[: kwargs["neighbour_limit"]]
+                ],
+            })
+        return _FakeResult(rows)
 
 
 class RetrievalContractTests(unittest.TestCase):
@@ -108,10 +153,21 @@ class RetrievalContractTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         body = response.get_json()
 
-        for key in ("success", "cypher", "items", "meta", "telemetry"):
+        for key in ("success", "cypher", "params", "items", "meta", "telemetry"):
             self.assertIn(key, body)
 
         self.assertEqual(body["telemetry"]["strategy_used"], "fulltext_to_cypher")
+        self.assertEqual(body["params"]["hit_ids"], ["node-1"])
+        self.assertNotIn("node-1", body["cypher"])
+
+    def test_fulltext_cypher_text_is_stable(self):
+        first, first_params = retrieval._build_fulltext_graph_cypher(["a"], "P1", ["FK"])
+        second, second_params = retrieval._build_fulltext_graph_cypher(["b", "c"], "P2", ["REF", "FK"])
+        self.assertEqual(first, second)
+        self.assertEqual(second_params["hit_ids"], ["b", "c"])
+
+        unfiltered, _ = retrieval._build_fulltext_graph_cypher(["a"], None, None)
+        self.assertNotIn("$edge_types", unfiltered)
 
     def test_chunks_by_depth_contract(self):
         response = self.client.post(
@@ -137,6 +193,35 @@ class RetrievalContractTests(unittest.TestCase):
             self.assertIn(key, retrieval_body)
 
         self.assertEqual(retrieval_body["telemetry"]["strategy_used"], "depth_chunks")
+        self.assertEqual(retrieval_body["chunks"][0]["distance"], 0)
+
+    def test_depth_traversal_expands_each_node_once(self):
+        edges = {"a": ["b", "c"], "b": ["a", "c", "d"], "c": ["a", "b", "d"], "d": ["b", "c", "e"], "e": ["d"]}
+        session = _GraphSession(edges, {"d": ["d1"], "e": ["e1"]})
+
+        result = retrieval.retrieve_chunks_by_depth(session, {"node_ids": ["a"], "depth": 5, "chunk_limit": 80})
+
+        self.assertEqual(session.hops, [["a"], ["b", "c"], ["d"], ["e"]])
+        distances = {n["id_rc"]: n["distance"] for n in result["visited_nodes"]}
+        self.assertEqual(distances, {"a": 0, "b": 1, "c": 1, "d": 2, "e": 3})
+        self.assertEqual([(c["id_rc"], c["distance"]) for c in result["chunks"]], [("d1", 2), ("e1", 3)])
+        self.assertEqual(result["traversal"]["stopped"], "exhausted")
+
+    def test_depth_traversal_stops_at_chunk_limit_and_budget(self):
+        edges = {"a": ["b", "c"], "b": ["d"], "c": ["e"], "d": ["f"]}
+        chunks = {"b": ["b1", "b2"], "d": ["d1"]}
+
+        session = _GraphSession(edges, chunks)
+        result = retrieval.retrieve_chunks_by_depth(session, {"node_ids": ["a"], "depth": 10, "chunk_limit": 2})
+        self.assertEqual(len(session.hops), 2)
+        self.assertEqual([c["id_rc"] for c in result["chunks"]], ["b1", "b2"])
+        self.assertEqual(result["traversal"]["stopped"], "chunk_limit")
+
+        session = _GraphSession(edges, chunks)
+        result = retrieval.retrieve_chunks_by_depth(session, {"node_ids": ["a"], "depth": 10, "node_budget": 3})
+        self.assertEqual(result["traversal"]["nodes_touched"], 3)
+        self.assertEqual(result["traversal"]["stopped"], "node_budget")
+        self.assertEqual([c["id_rc"] for c in result["chunks"]], ["b1", "b2"])
 
     def test_legacy_wrapper_parity(self):
         payload_retrieval = {
@@ -269,6 +354,111 @@ class RetrievalContractTests(unittest.TestCase):
         self.assertIn("provider timeout", str(result["telemetry"].get("fallback_reason") or ""))
         self.assertEqual(result["items"][0]["id_rc"], "node-ft-timeout")
 
+    def test_routes_pass_request_deadline_to_neo4j(self):
+        response = self.client.post(
+            "/api/retrieval/query-cypher",
+            json={"query": "test", "index_name": "iv_global_search_idx"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        timeouts = retrieval.driver.sessions[-1].timeouts
+        self.assertTrue(timeouts)
+        self.assertTrue(all(0 < t <= retrieval.REQUEST_DEADLINE_SECONDS for t in timeouts))
+
+    def test_auto_mode_bounds_vector_attempt_by_budget(self):
+        original_vector_hits = retrieval._vector_hits
+        budgets = []
+
+        def _slow(*args, **kwargs):
+            budgets.append(retrieval.remaining())
+            raise retrieval.DeadlineExceeded("Request deadline exceeded")
+
+        retrieval._vector_hits = _slow
+        try:
+            with _FakeSession() as session:
+                result = retrieval.retrieve_nodes_for_query(
+                    session,
+                    {"query": "test", "index_name": "iv_global_search_idx", "retrieval_mode": "auto"},
+                    "TestProject",
+                )
+        finally:
+            retrieval._vector_hits = original_vector_hits
+
+        self.assertLessEqual(budgets[0], retrieval.VECTOR_BUDGET_SECONDS)
+        self.assertTrue(result["telemetry"]["fallback_used"])
+        self.assertEqual(result["items"][0]["id_rc"], "node-1")
+
+    def test_fuse_ranked_rewards_hits_found_by_both_legs(self):
+        fused = retrieval.fuse_ranked(
+            {
+                "vector": [{"id_rc": "a", "name": "A", "score": 0.9}, {"id_rc": "b", "name": "B", "score": 0.8}],
+                "fulltext": [{"id_rc": "c", "name": "C", "score": 7.0}, {"id_rc": "b", "name": "B", "score": 5.0}],
+            },
+            limit=10,
+        )
+
+        self.assertEqual([h["id_rc"] for h in fused], ["b", "a", "c"])
+        self.assertAlmostEqual(fused[0]["score"], 2 / (retrieval.RRF_K + 2))
+        self.assertEqual(fused[0]["sources"]["fulltext"], {"rank": 2, "score": 5.0})
+
+    def test_hybrid_mode_runs_legs_concurrently_and_reports_them(self):
+        original_vector_hits = retrieval._vector_hits
+        original_fulltext_hits = retrieval._fulltext_hits
+        # Each leg waits for the other: this only completes when they overlap.
+        both_running = threading.Barrier(2, timeout=2)
+
+        def _vector(session, **kwargs):
+            both_running.wait()
+            return [{"id_rc": "v-1", "name": "semantic", "labels": ["Table"], "score": 0.9},
+                    {"id_rc": "both", "name": "shared", "labels": ["Table"], "score": 0.8}]
+
+        def _fulltext(session, **kwargs):
+            both_running.wait()
+            return [{"id_rc": "both", "name": "shared", "labels": ["Table"], "score": 3.0}]
+
+        retrieval._vector_hits = _vector
+        retrieval._fulltext_hits = _fulltext
+        try:
+            with _FakeSession() as session:
+                result = retrieval.retrieve_nodes_for_query(
+                    session,
+                    {"query": "test", "index_name": "iv_global_search_idx", "retrieval_mode": "hybrid"},
+                    "TestProject",
+                )
+        finally:
+            retrieval._vector_hits = original_vector_hits
+            retrieval._fulltext_hits = original_fulltext_hits
+
+        self.assertEqual(result["hit_ids"], ["both", "v-1"])
+        self.assertEqual(set(result["items"][0]["sources"]), {"vector", "fulltext"})
+        hybrid = result["meta"]["hybrid"]
+        self.assertEqual(hybrid["overlap"], 1)
+        self.assertEqual(hybrid["legs"]["vector"]["contributed"], 2)
+        self.assertEqual(hybrid["legs"]["fulltext"]["contributed"], 1)
+        self.assertIsNone(hybrid["legs"]["vector"]["error"])
+        self.assertEqual(result["telemetry"]["strategy_used"], "hybrid_rrf")
+
+    def test_hybrid_mode_keeps_fulltext_hits_when_vector_fails(self):
+        original_vector_hits = retrieval._vector_hits
+
+        def _boom(*args, **kwargs):
+            raise RuntimeError("embedding provider down")
+
+        retrieval._vector_hits = _boom
+        try:
+            with _FakeSession() as session:
+                result = retrieval.retrieve_nodes_for_query(
+                    session,
+                    {"query": "test", "index_name": "iv_global_search_idx", "retrieval_mode": "hybrid"},
+                    "TestProject",
+                )
+        finally:
+            retrieval._vector_hits = original_vector_hits
+
+        self.assertEqual(result["hit_ids"], ["node-1"])
+        self.assertIn("embedding provider down", result["meta"]["hybrid"]["legs"]["vector"]["error"])
+        self.assertEqual(result["meta"]["vector_error"], "embedding provider down")
+
     def test_fulltext_error_mapping_index_missing(self):
         body, status = retrieval.build_fulltext_error_response(
             {"index_name": "iv_global_search_idx"},
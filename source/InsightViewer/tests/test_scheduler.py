@@ -0,0 +1,204 @@
+import asyncio
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from ai.errors import ProviderBusyError
+from ai.scheduler import (
+    BATCH,
+    INTERACTIVE,
+    AsyncRequestScheduler,
+    RequestScheduler,
+    flight_key,
+    request_priority,
+)
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+class RequestSchedulerTests(unittest.TestCase):
+    def test_interactive_requests_are_admitted_before_batch(self):
+        scheduler = RequestScheduler(max_concurrency=1)
+        release = threading.Event()
+        order = []
+
+        def blocker():
+            with scheduler.slot():
+                release.wait(2)
+
+        def job(name, priority):
+            with request_priority(priority):
+                scheduler.run(lambda: order.append(name))
+
+        threads = [threading.Thread(target=blocker)]
+        threads[0].start()
+        _wait_for(lambda: scheduler.stats()["active"] == 1)
+        for name, priority in (("batch-1", BATCH), ("batch-2", BATCH), ("chat", INTERACTIVE)):
+            t = threading.Thread(target=job, args=(name, priority))
+            t.start()
+            threads.append(t)
+            _wait_for(lambda n=len(threads) - 1: scheduler.stats()["queued"] == n)
+
+        self.assertEqual(scheduler.stats()["queued_by_priority"], {INTERACTIVE: 1, BATCH: 2})
+        release.set()
+        for t in threads:
+            t.join(2)
+
+        self.assertEqual(order, ["chat", "batch-1", "batch-2"])
+        self.assertEqual(scheduler.stats()["admitted"], 4)
+
+    def test_identical_in_flight_requests_are_coalesced(self):
+        scheduler = RequestScheduler(max_concurrency=4)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return [1.0, 2.0]
+
+        key = flight_key("embed", "m", "same text")
+        threads = [threading.Thread(target=lambda: results.append(scheduler.run(compute, key=key))) for _ in range(3)]
+        threads[0].start()
+        started.wait(2)
+        for t in threads[1:]:
+            t.start()
+        _wait_for(lambda: scheduler.stats()["coalesced"] == 2)
+        release.set()
+        for t in threads:
+            t.join(2)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[1.0, 2.0]] * 3)
+        self.assertEqual(scheduler.stats()["in_flight_keys"], 0)
+
+    def test_errors_reach_coalesced_callers(self):
+        scheduler = RequestScheduler()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            release.wait(2)
+            raise ValueError("boom")
+
+        def call():
+            try:
+                scheduler.run(failing, key="k")
+            except ValueError as e:
+                errors.append(str(e))
+
+        first = threading.Thread(target=call)
+        first.start()
+        started.wait(2)
+        second = threading.Thread(target=call)
+        second.start()
+        _wait_for(lambda: scheduler.stats()["coalesced"] == 1)
+        release.set()
+        first.join(2)
+        second.join(2)
+
+        self.assertEqual(errors, ["boom", "boom"])
+
+    def test_queue_timeout_raises_busy(self):
+        scheduler = RequestScheduler(max_concurrency=1, queue_timeout=0.05)
+        with scheduler.slot():
+            with self.assertRaises(ProviderBusyError) as ctx:
+                scheduler.run(lambda: None)
+
+        self.assertEqual(ctx.exception.status_code, 503)
+        stats = scheduler.stats()
+        self.assertEqual((stats["timeouts"], stats["queued"], stats["active"]), (1, 0, 0))
+        self.assertEqual(scheduler.run(lambda: "free again"), "free again")
+
+
+class AsyncRequestSchedulerTests(unittest.TestCase):
+    def test_priority_order_and_coalescing(self):
+        async def scenario():
+            scheduler = AsyncRequestScheduler(max_concurrency=1)
+            release = asyncio.Event()
+            order = []
+            calls = []
+
+            async def blocker():
+                async with scheduler.slot():
+                    await release.wait()
+
+            async def job(name, priority):
+                with request_priority(priority):
+                    await scheduler.run(lambda: asyncio.sleep(0, order.append(name)))
+
+            async def embed():
+                calls.append(1)
+                return [1.0]
+
+            tasks = [asyncio.create_task(blocker())]
+            await asyncio.sleep(0)
+            tasks += [asyncio.create_task(job(n, p)) for n, p in (("batch", BATCH), ("chat", INTERACTIVE))]
+            embeds = [asyncio.create_task(scheduler.run(embed, key="k")) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            self.assertEqual(scheduler.stats()["queued_by_priority"], {INTERACTIVE: 2, BATCH: 1})
+            release.set()
+            await asyncio.gather(*tasks)
+
+            self.assertEqual(order, ["chat", "batch"])
+            self.assertEqual(await asyncio.gather(*embeds), [[1.0]] * 3)
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(scheduler.stats()["coalesced"], 2)
+
+        asyncio.run(scenario())
+
+    def test_follower_takes_over_when_the_leader_is_cancelled(self):
+        async def scenario():
+            scheduler = AsyncRequestScheduler(max_concurrency=1)
+            calls = []
+
+            async def embed():
+                calls.append(1)
+                if len(calls) == 1:
+                    await asyncio.sleep(10)
+                return [2.0]
+
+            leader = asyncio.create_task(scheduler.run(embed, key="k"))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(scheduler.run(embed, key="k"))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+
+            self.assertEqual(await follower, [2.0])
+            self.assertTrue(leader.cancelled())
+            self.assertEqual(len(calls), 2)
+
+        asyncio.run(scenario())
+
+    def test_queue_timeout_raises_busy(self):
+        async def scenario():
+            scheduler = AsyncRequestScheduler(max_concurrency=1, queue_timeout=0.05)
+            async with scheduler.slot():
+                with self.assertRaises(ProviderBusyError):
+                    await scheduler.run(lambda: asyncio.sleep(0))
+            self.assertEqual(scheduler.stats()["queued"], 0)
+            self.assertEqual(await scheduler.run(lambda: asyncio.sleep(0, "free again")), "free again")
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
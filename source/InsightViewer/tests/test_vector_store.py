@@ -0,0 +1,128 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1] / "app"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from ai import vector_store
+from ai.vector_store import VectorStore
+
+np = vector_store.np
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def data(self):
+        return self._rows
+
+
+class _ChunkSession:
+    """Serves SYNC_PAGE_CYPHER pages from a dict of id_rc -> embedding."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pages = 0
+
+    def run(self, query, project=None, after="", limit=0):
+        self.pages += 1
+        rows = [
+            {"eid": f"4:{id_rc}", "id_rc": id_rc, "embedding": vec}
+            for id_rc, vec in sorted(self.chunks.items())
+            if f"4:{id_rc}" > after
+        ]
+        return _FakeResult(rows[:limit])
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class VectorStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        rng = np.random.default_rng(7)
+        self.vectors = rng.normal(size=(300, 16)).astype("float32")
+
+    def _store(self, **kwargs):
+        return VectorStore(Path(self.tmp.name) / "P1", **kwargs)
+
+    def test_sync_writes_only_changes_and_persists(self):
+        chunks = {f"c{i:03d}": self.vectors[i].tolist() for i in range(120)}
+        store = self._store()
+
+        first = store.sync_from_neo4j(_ChunkSession(chunks), "P1", page_size=50)
+        self.assertEqual((first["added"], first["rows"]), (120, 120))
+
+        chunks["c000"] = self.vectors[200].tolist()
+        del chunks["c001"]
+        second = store.sync_from_neo4j(_ChunkSession(chunks), "P1", page_size=50)
+        self.assertEqual(
+            (second["added"], second["updated"], second["removed"], second["unchanged"]),
+            (0, 1, 1, 118),
+        )
+
+        reopened = self._store()
+        self.assertEqual(len(reopened), 119)
+        self.assertEqual(reopened.search(self.vectors[200], 1)[0][0], "c000")
+        self.assertNotIn("c001", [i for i, _ in reopened.search(self.vectors[1], 119)])
+
+    def test_sync_with_another_vector_size_replaces_the_store(self):
+        store = self._store()
+        store.sync_from_neo4j(_ChunkSession({f"c{i}": self.vectors[i].tolist() for i in range(10)}), "P1")
+
+        smaller = {f"c{i}": self.vectors[i][:8].tolist() for i in range(4)}
+        summary = store.sync_from_neo4j(_ChunkSession(smaller), "P1")
+        self.assertEqual((summary["added"], summary["wrong_dim"], summary["rows"]), (4, 0, 4))
+        self.assertEqual(self._store().dim, 8)
+        self.assertEqual(store.search(self.vectors[2][:8], 1)[0][0], "c2")
+
+    def test_exact_search_and_score_many_agree(self):
+        store = self._store()
+        store.upsert((f"c{i}", v) for i, v in enumerate(self.vectors))
+
+        batch = store.score_many(self.vectors[:5], k=4)
+        for i in range(5):
+            single = store.search(self.vectors[i], 4, mode="exact")
+            self.assertEqual([x for x, _ in batch[i]], [x for x, _ in single])
+            self.assertEqual(single[0][0], f"c{i}")
+            self.assertAlmostEqual(single[0][1], 1.0, places=5)
+
+    def test_ivf_search_finds_the_nearest_row(self):
+        store = self._store(ivf_min_rows=100, nprobe=4)
+        store.upsert((f"c{i}", v) for i, v in enumerate(self.vectors))
+        store.build_ivf()
+
+        self.assertGreater(store.stats()["ivf_cells"], 1)
+        hits = [store.search(v, 1, mode="ivf")[0][0] for v in self.vectors[:20]]
+        self.assertEqual(hits, [f"c{i}" for i in range(20)])
+        self.assertEqual(store.stats()["ivf_searches"], 20)
+
+    def test_reader_reloads_after_another_instance_writes(self):
+        writer = self._store()
+        writer.upsert([("a", self.vectors[0]), ("b", self.vectors[1]), ("c", self.vectors[2])])
+        writer.flush()
+        reader = self._store()
+        self.assertEqual(reader.search(self.vectors[2], 1)[0][0], "c")
+
+        # "c" moves into the row "a" used to occupy
+        self.assertEqual(writer.remove(["a"]), 1)
+        self.assertEqual(reader.search(self.vectors[0], 1)[0][0], "a")  # not published yet
+        writer.flush()
+
+        self.assertEqual(reader.search(self.vectors[2], 1)[0][0], "c")
+        self.assertNotIn("a", [i for i, _ in reader.search(self.vectors[0], 3)])
+        self.assertEqual(reader.stats()["reloads"], 1)
+
+        writer.upsert([("d", self.vectors[3])])
+        writer.flush()
+        self.assertEqual([i for i, _ in reader.score_many([self.vectors[3]], 1)[0]], ["d"])
+        versions = sorted(p.name for p in (Path(self.tmp.name) / "P1").glob("vectors*.f32"))
+        self.assertEqual(versions, ["vectors.2.f32", "vectors.3.f32"])
+
+
+if __name__ == "__main__":
+    unittest.main()